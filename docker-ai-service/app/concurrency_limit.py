@@ -0,0 +1,122 @@
+"""Adaptive concurrency limit for the scheduler, driven by measured latency.
+
+MAX_CONCURRENT_REQUESTS was a guess: the right number of simultaneous
+inferences depends on the model, the provider and whatever else the host runs
+(a Jellyfin transcode takes the same cores or GPU). AdaptiveLimit moves the
+scheduler's limit with an AIMD rule on latency relative to the no-load baseline:
+
+  * Every request's slot hold time is a sample. Requests differ wildly in size
+    (a 270p frame vs a 40 MP poster), so samples are bucketed by input size
+    (powers of two of the pixel count) and each bucket keeps its own baseline:
+    the lowest latency seen, drifting up by BASELINE_DRIFT per sample so that a
+    slower model or a permanently busier host becomes the new normal.
+  * Samples are judged in windows of WINDOW. When the median latency/baseline
+    ratio exceeds TOLERANCE, work is queueing inside the device: the limit is
+    multiplied by BACKOFF. When it stays under TOLERANCE while the limit was
+    binding (requests queued for a slot), the limit grows by one.
+  * The limit stays within MIN_LIMIT..MAX_LIMIT. Every change is kept in a
+    short history for /status and /metrics.
+
+Only real inferences count: the endpoints set the ticket's pixel count once the
+model has run, so unsized samples (dedup hits, 4xx exits, failures) are ignored -
+a 1 ms cache hit must not become the baseline a 50 ms inference is judged by.
+Not thread-safe; main.py calls observe() from the event loop only, like the
+scheduler itself.
+"""
+from __future__ import annotations
+
+import collections
+import math
+import statistics
+import time
+from typing import Optional
+
+# Wired by main.py from ADAPTIVE_CONCURRENCY / ADAPTIVE_CONCURRENCY_MIN / _MAX.
+ENABLED = True
+MIN_LIMIT = 1
+MAX_LIMIT = 32
+WINDOW = 10            # samples per decision
+TOLERANCE = 1.5        # median latency / baseline above this = overloaded
+BACKOFF = 0.75         # multiplicative decrease
+BASELINE_DRIFT = 0.01  # baseline creeps this fraction towards each slower sample
+HISTORY = 64
+
+
+class AdaptiveLimit:
+    """AIMD limit from latency samples against per-size baselines."""
+
+    def __init__(self, limit: int):
+        self.limit = self._clamp(limit)
+        self._baselines: dict = {}
+        self._ratios: list = []
+        self._binding = False
+        self.last_ratio = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.history: "collections.deque" = collections.deque(maxlen=HISTORY)
+        self.history.append((time.time(), self.limit, "initial"))
+
+    @staticmethod
+    def _clamp(limit: int) -> int:
+        return max(MIN_LIMIT, min(MAX_LIMIT, int(limit)))
+
+    def reset(self, limit: int, reason: str = "configured") -> None:
+        """Start over from an operator-set limit (baselines are kept)."""
+        self.limit = self._clamp(limit)
+        self._ratios, self._binding = [], False
+        self.history.append((time.time(), self.limit, reason))
+
+    @staticmethod
+    def bucket(pixels: int) -> int:
+        return int(math.log2(pixels))
+
+    def observe(self, latency_s: float, pixels: Optional[int], binding: bool) -> Optional[int]:
+        """Account one request; returns the new limit when it changed, else None."""
+        if latency_s <= 0 or not pixels or pixels <= 0:
+            return None
+        key = self.bucket(pixels)
+        base = self._baselines.get(key)
+        if base is None or latency_s < base:
+            base = latency_s
+        else:
+            base += (latency_s - base) * BASELINE_DRIFT
+        self._baselines[key] = base
+        self._ratios.append(latency_s / base)
+        self._binding = self._binding or binding
+        if len(self._ratios) < WINDOW:
+            return None
+
+        ratio = statistics.median(self._ratios)
+        binding, self._ratios, self._binding = self._binding, [], False
+        self.last_ratio = ratio
+        if ratio > TOLERANCE:
+            new, reason = self._clamp(math.floor(self.limit * BACKOFF)), f"latency x{ratio:.2f}"
+        elif binding:
+            new, reason = self._clamp(self.limit + 1), f"headroom x{ratio:.2f}"
+        else:
+            return None
+        if new == self.limit:
+            return None
+        if new > self.limit:
+            self.increases += 1
+        else:
+            self.decreases += 1
+        self.limit = new
+        self.history.append((time.time(), new, reason))
+        return new
+
+    def snapshot(self) -> dict:
+        recent = [limit for _, limit, _ in self.history]
+        return {
+            "enabled": ENABLED,
+            "limit": self.limit,
+            "min_limit": MIN_LIMIT,
+            "max_limit": MAX_LIMIT,
+            "last_ratio": round(self.last_ratio, 3),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "recent_min": min(recent),
+            "recent_max": max(recent),
+            "history": [{"time": round(t, 3), "limit": limit, "reason": reason}
+                        for t, limit, reason in self.history],
+        }
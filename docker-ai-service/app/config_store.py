@@ -0,0 +1,84 @@
+"""Small persistent JSON documents under CONFIG_DIR (tuning results, pins).
+
+Same rules as token_store: the path is resolved at call time (tests override
+CONFIG_DIR), writes are atomic (temp file + os.replace) and serialised by a
+process-wide lock, and a missing or corrupt file reads as the caller's default
+instead of failing a model load. Unlike tokens this is not secret - no chmod.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_memo: dict = {}  # path -> (mtime_ns, parsed document), see load_cached
+
+
+def _path(name: str) -> Path:
+    return Path(os.getenv("CONFIG_DIR", "/app/config")) / name
+
+
+def load(name: str, default: Callable[[], dict]) -> dict:
+    """Parsed CONFIG_DIR/<name>, or default() when absent/unreadable."""
+    path = _path(name)
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return default()
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable {path}: {e}")
+        return default()
+    return data if isinstance(data, dict) else default()
+
+
+def load_cached(name: str, default: Callable[[], dict]) -> dict:
+    """load() memoised on the file's mtime - for lookups on the inference path.
+
+    The returned dict is shared; callers must not mutate it.
+    """
+    path = _path(name)
+    try:
+        stamp = path.stat().st_mtime_ns
+    except OSError:
+        return default()
+    with _lock:
+        hit = _memo.get(str(path))
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    data = load(name, default)
+    with _lock:
+        _memo[str(path)] = (stamp, data)
+    return data
+
+
+def save(name: str, data: dict) -> None:
+    path = _path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)  # atomic on POSIX & Windows
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def update(name: str, default: Callable[[], dict], mutate: Callable[[dict], None]) -> dict:
+    """Read-modify-write under the lock; returns the saved document."""
+    with _lock:
+        data = load(name, default)
+        mutate(data)
+        save(name, data)
+        return data
@@ -0,0 +1,132 @@
+"""Workload-isolated thread pools for the blocking work behind the endpoints.
+
+Everything used to run on one ThreadPoolExecutor: realtime frame inference,
+/upscale of 40 MP posters, /detect-mask, face restore, the detector loader and
+the benchmarks. One poster held a worker for seconds while the playback frames
+queued behind it stuttered. Work is now split into four pools, each with its own
+size and its own queue:
+
+  * realtime - /upscale-frame, /upscale-stream, /upscale-video-chunk and any
+    inference admitted with the realtime priority (see scheduler.py)
+  * bulk     - /upscale and other interactive/batch inference
+  * aux      - auxiliary models (detector, face restore, RIFE) and cache I/O
+  * admin    - benchmarks, auto-tuning and model-load side work
+
+Pools are separate threads, so a long bulk job never sits in front of a frame.
+On top of that, a pool created with `yields_to` (bulk yields to realtime) does
+not start its next job while the other pool has work queued - realtime preempts
+bulk at the queue level (running jobs are never interrupted). A bulk job is held
+back at most YIELD_S, so a busy stream slows a library scan but cannot starve it.
+
+WorkloadExecutor is a concurrent.futures.Executor: loop.run_in_executor() and
+the tile pipeline take it as they took the ThreadPoolExecutor. Threads are
+started on demand up to `workers`.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Optional
+
+REALTIME, BULK, AUX, ADMIN = "realtime", "bulk", "aux", "admin"
+POOLS = (REALTIME, BULK, AUX, ADMIN)
+
+# Wired by main.py from BULK_YIELD_MS.
+YIELD_S = 0.25
+_POLL_S = 0.002  # how often a yielding worker re-checks the other pool
+
+
+class WorkloadExecutor(Executor):
+    """Thread pool with a FIFO queue, gauges and optional yielding to another pool."""
+
+    def __init__(self, name: str, workers: int, yields_to: Optional["WorkloadExecutor"] = None):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.yields_to = yields_to
+        self._queue: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._threads: list = []
+        self._idle = 0
+        self._shutdown = False
+        self.active = 0
+        self.completed = 0
+        self.yielded = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError(f"cannot schedule new work on the shut-down {self.name} pool")
+            self._queue.append((future, fn, args, kwargs))
+            if self._idle < len(self._queue) and len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"upscaler-{self.name}-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _hold_back(self) -> None:
+        """Wait (lock held by the caller) while the preferred pool has work queued."""
+        other = self.yields_to
+        if other is None or not other.queue_depth:
+            return
+        self.yielded += 1
+        until = time.monotonic() + YIELD_S
+        while other.queue_depth and not self._shutdown and time.monotonic() < until:
+            self._cond.wait(_POLL_S)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue and not self._shutdown:
+                    self._cond.wait()
+                self._idle -= 1
+                if not self._queue:
+                    return  # shut down
+                self._hold_back()
+                if not self._queue:
+                    continue  # another worker took it meanwhile
+                future, fn, args, kwargs = self._queue.popleft()
+                self.active += 1
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as exc:
+                        future.set_exception(exc)
+                    else:
+                        future.set_result(result)
+            finally:
+                del future, fn, args, kwargs
+                with self._cond:
+                    self.active -= 1
+                    self.completed += 1
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in list(self._threads):
+                thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "threads": len(self._threads),
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "yielded": self.yielded,
+        }
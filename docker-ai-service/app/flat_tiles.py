@@ -0,0 +1,62 @@
+"""Complexity-adaptive tiling: flat tiles are interpolated, not inferred.
+
+_run_onnx_tiled sent every tile through the network, including sky, walls and
+flat anime backgrounds, where a bicubic upscale is indistinguishable from the
+model's output. With ADAPTIVE_TILES on, each tile of the uint8 input is scored
+first (edge_fraction: share of pixels whose luma gradient |dx| + |dy| exceeds
+EDGE_LEVEL) and tiles below MAX_EDGE_FRACTION are resized with cv2 instead. They
+are stitched exactly like inferred tiles - same blend ramps or crop centres -
+so the borders between interpolated and inferred neighbours cross-fade as usual.
+
+Scoring a share of strong edges rather than a mean: a clear sky with one power
+line has a tiny mean gradient, but the line needs the model. Smooth gradients and
+1-2 level banding stay below EDGE_LEVEL and count as flat.
+"""
+from __future__ import annotations
+
+import threading
+
+import cv2
+import numpy as np
+
+# Wired by main.py from ADAPTIVE_TILES / ADAPTIVE_TILES_EDGE_LEVEL / ADAPTIVE_TILES_INTERPOLATION.
+ENABLED = False
+EDGE_LEVEL = 10             # 8-bit levels of |dx| + |dy| on luma
+MAX_EDGE_FRACTION = 0.005   # tiles with fewer edge pixels than this are flat
+INTERPOLATION = "cubic"     # cubic | lanczos
+
+_INTERPOLATIONS = {"cubic": cv2.INTER_CUBIC, "lanczos": cv2.INTER_LANCZOS4}
+
+_lock = threading.Lock()
+_stats = {"tiles": 0, "flat": 0}
+
+
+def edge_fraction(tile_u8: np.ndarray) -> float:
+    """Share of pixels with a luma gradient above EDGE_LEVEL (uint8 HWC, any channel order)."""
+    luma = tile_u8.astype(np.int16).sum(axis=2) if tile_u8.ndim == 3 else tile_u8.astype(np.int16)
+    level = EDGE_LEVEL * (tile_u8.shape[2] if tile_u8.ndim == 3 else 1)
+    grad = np.abs(np.diff(luma, axis=1))[:-1] + np.abs(np.diff(luma, axis=0))[:, :-1]
+    return float(np.count_nonzero(grad > level)) / max(1, grad.size)
+
+
+def flat_tiles(img_u8: np.ndarray, tiles) -> set:
+    """Indices of the plan tiles (objects with y0/y1/x0/x1) that are flat."""
+    flat = {i for i, t in enumerate(tiles)
+            if edge_fraction(img_u8[t.y0:t.y1, t.x0:t.x1]) < MAX_EDGE_FRACTION}
+    with _lock:
+        _stats["tiles"] += len(tiles)
+        _stats["flat"] += len(flat)
+    return flat
+
+
+def upscale(tile: np.ndarray, scale: int) -> np.ndarray:
+    """Interpolated float32 [0, 1] tile at scale x, in place of the model output."""
+    h, w = tile.shape[:2]
+    out = cv2.resize(tile, (w * scale, h * scale),
+                     interpolation=_INTERPOLATIONS.get(INTERPOLATION, cv2.INTER_CUBIC))
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
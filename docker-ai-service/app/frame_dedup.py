@@ -0,0 +1,83 @@
+"""Near-duplicate frame detection so repeated frames reuse the last output.
+
+Anime is drawn on twos or threes, and slideshows, pauses and title cards repeat
+one picture for many frames; /upscale-stream and /upscale-frame inferred every
+copy. A FrameDeduper per stream remembers the input its cached output was made
+from and answers lookup() with that output when a new frame matches it:
+
+  * a 16x16 area-averaged thumbnail is compared first (max abs difference up to
+    HASH_TOLERANCE levels) - it rejects almost every real change for the cost
+    of one small resize;
+  * frames that pass are compared in full: mean squared error over all pixels
+    and channels at most MAX_MSE. Re-encoded copies of the same picture (JPEG
+    noise) stay well below 1.0; a moving mouth or a subtitle does not.
+
+The reference is only replaced on store(), i.e. when a frame was inferred, so a
+slow change accumulates against it instead of creeping through frame by frame.
+Entries are tagged (model name, or quality rung on /upscale-stream): a different
+tag never matches.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+# Wired by main.py from FRAME_DEDUP / FRAME_DEDUP_MAX_MSE.
+ENABLED = True
+HASH_SIZE = 16
+HASH_TOLERANCE = 4   # 8-bit levels on the thumbnail
+MAX_MSE = 1.0        # full-frame mean squared error, 8-bit levels
+
+_lock = threading.Lock()
+_stats = {"frames": 0, "duplicates": 0}
+
+
+def thumbnail(img: np.ndarray) -> np.ndarray:
+    return cv2.resize(img, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA)
+
+
+def mse(a: np.ndarray, b: np.ndarray) -> float:
+    return cv2.norm(a, b, cv2.NORM_L2SQR) / max(1, a.size)
+
+
+class FrameDeduper:
+    """Last inferred input and its output for one stream."""
+
+    def __init__(self):
+        self._reference: Optional[np.ndarray] = None
+        self._thumb: Optional[np.ndarray] = None
+        self._output: Any = None
+        self._tag = ""
+        self._lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def lookup(self, img: np.ndarray, tag: str = "") -> Any:
+        """Cached output if img is a near duplicate of the last inferred frame, else None."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            ref = self._reference
+            hit = (ref is not None and self._tag == tag and ref.shape == img.shape
+                   and cv2.absdiff(thumbnail(img), self._thumb).max() <= HASH_TOLERANCE
+                   and mse(img, ref) <= MAX_MSE)
+            output = self._output if hit else None
+        with _lock:
+            _stats["frames"] += 1
+            _stats["duplicates"] += int(hit)
+        return output
+
+    def store(self, img: np.ndarray, output: Any, tag: str = "") -> None:
+        """Remember img (copied) and the output inferred from it."""
+        with self._lock:
+            self._reference = img.copy()
+            self._thumb = thumbnail(img)
+            self._output = output
+            self._tag = tag
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
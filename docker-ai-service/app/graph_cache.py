@@ -0,0 +1,232 @@
+"""On-disk cache of ONNX Runtime-optimised model graphs under CACHE_DIR.
+
+Every ort.InferenceSession built for the upscaler, RIFE or face-restore models
+re-ran ORT_ENABLE_ALL graph optimisation (constant folding, Conv+activation
+fusion, NCHWc layout transforms, ...) from scratch - on every container start,
+every model switch and every session_pool replica. For the larger GAN models
+that is seconds of CPU before the first frame.
+
+session() saves the optimised graph on the first build (SessionOptions
+.optimized_model_filepath) and later builds load that file with graph
+optimisation switched off.
+
+  * Key: sha256 of the model file + ORT version + machine architecture +
+    providers and provider options + the options that shape the graph
+    (optimisation level, execution mode). Thread counts, arenas and spinning do
+    not change the graph and are left out, so replicas share one entry.
+  * Only providers whose optimised graph round-trips are cached (CPU, CUDA,
+    ROCm). TensorRT, OpenVINO, CoreML, DirectML compile their own partitions and
+    keep their own engine caches - those sessions are built as before.
+  * A build whose active providers differ from the requested ones (CUDA asked
+    for, CPU fell back) is not stored: that graph was optimised for the wrong
+    device.
+  * Files from another ORT version are deleted by prune() (run at startup). A
+    cached file that fails to load is deleted and the model rebuilt from source.
+  * The directory is LRU-bounded to BUDGET_BYTES: a hit refreshes the file's
+    mtime, the oldest files go first.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Wired by main.py from GRAPH_CACHE / GRAPH_CACHE_MB and CACHE_DIR.
+ENABLED = True
+DIR = Path("/app/cache") / "ort-graphs"
+BUDGET_BYTES = 2048 * 1024 * 1024
+
+CACHEABLE_PROVIDERS = frozenset({"CPUExecutionProvider", "CUDAExecutionProvider", "ROCMExecutionProvider"})
+
+_lock = threading.Lock()
+_digests: dict = {}  # (path, size, mtime_ns) -> sha256 hex
+_stats = {"hits": 0, "misses": 0, "stored": 0, "bypassed": 0, "invalid": 0, "evicted": 0}
+
+
+def _provider_name(p) -> str:
+    return p[0] if isinstance(p, (tuple, list)) else p
+
+
+def model_digest(model_path) -> str:
+    """sha256 of the model file, memoised per (path, size, mtime)."""
+    st = os.stat(model_path)
+    memo = (str(model_path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        digest = _digests.get(memo)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _lock:
+            _digests[memo] = digest
+    return digest
+
+
+def _prefix(ort) -> str:
+    return f"ort{ort.__version__}-"
+
+
+def cache_path(ort, model_path, opts, providers: list, provider_options: Optional[list] = None) -> Path:
+    ident = json.dumps({
+        "machine": platform.machine(),
+        "providers": [_provider_name(p) for p in providers],
+        "provider_options": provider_options or [],
+        "level": int(opts.graph_optimization_level),
+        "mode": int(opts.execution_mode),
+    }, sort_keys=True, default=str)
+    variant = hashlib.sha256(ident.encode("utf-8")).hexdigest()[:16]
+    return DIR / f"{_prefix(ort)}{model_digest(model_path)[:24]}-{variant}.onnx"
+
+
+def session(ort, model_path, opts=None, providers: Optional[list] = None,
+            provider_options: Optional[list] = None):
+    """ort.InferenceSession(model_path, opts, providers, provider_options), cached.
+
+    Drop-in for the direct constructor; opts None means default SessionOptions
+    (ORT_ENABLE_ALL).
+    """
+    if opts is None:
+        opts = ort.SessionOptions()
+    providers = list(providers or ["CPUExecutionProvider"])
+    kwargs = {"providers": providers}
+    if provider_options is not None:
+        kwargs["provider_options"] = provider_options
+    names = [_provider_name(p) for p in providers]
+    if (not ENABLED or not set(names) <= CACHEABLE_PROVIDERS
+            or opts.graph_optimization_level == ort.GraphOptimizationLevel.ORT_DISABLE_ALL):
+        with _lock:
+            _stats["bypassed"] += 1
+        return ort.InferenceSession(str(model_path), opts, **kwargs)
+
+    try:
+        cached = cache_path(ort, model_path, opts, providers, provider_options)
+    except OSError as e:
+        logger.warning(f"Graph cache: cannot fingerprint {model_path} ({e}); building uncached")
+        return ort.InferenceSession(str(model_path), opts, **kwargs)
+
+    if cached.is_file():
+        level = opts.graph_optimization_level
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            sess = ort.InferenceSession(str(cached), opts, **kwargs)
+            os.utime(cached)  # LRU touch
+            with _lock:
+                _stats["hits"] += 1
+            return sess
+        except Exception as e:
+            logger.warning(f"Graph cache: dropping unusable {cached.name} ({e})")
+            _unlink(cached)
+            with _lock:
+                _stats["invalid"] += 1
+        finally:
+            opts.graph_optimization_level = level
+
+    with _lock:
+        _stats["misses"] += 1
+    try:
+        DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(DIR), prefix=".build-", suffix=".onnx")
+        os.close(fd)
+    except OSError as e:
+        logger.warning(f"Graph cache directory {DIR} not writable ({e}); building uncached")
+        return ort.InferenceSession(str(model_path), opts, **kwargs)
+    opts.optimized_model_filepath = tmp
+    try:
+        sess = ort.InferenceSession(str(model_path), opts, **kwargs)
+    except BaseException:
+        _unlink(Path(tmp))
+        raise
+    finally:
+        opts.optimized_model_filepath = ""
+    active = sess.get_providers()
+    if [n for n in names if n in active] != names or os.path.getsize(tmp) == 0:
+        _unlink(Path(tmp))  # optimised for a device we did not ask for
+    else:
+        os.replace(tmp, cached)
+        with _lock:
+            _stats["stored"] += 1
+        evict()
+    return sess
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _entries() -> list:
+    try:
+        files = [p for p in DIR.iterdir() if p.suffix == ".onnx" and not p.name.startswith(".")]
+    except OSError:
+        return []
+    out = []
+    for p in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        out.append((st.st_mtime, st.st_size, p))
+    return out
+
+
+def evict() -> int:
+    """Delete least-recently-used files until the directory fits BUDGET_BYTES."""
+    entries = sorted(_entries(), key=lambda e: e[0])
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= BUDGET_BYTES:
+            break
+        _unlink(path)
+        total -= size
+        removed += 1
+    if removed:
+        with _lock:
+            _stats["evicted"] += removed
+    return removed
+
+
+def prune(ort) -> int:
+    """Remove entries written by another ORT version and stale temp files."""
+    removed = 0
+    try:
+        files = list(DIR.iterdir())
+    except OSError:
+        return 0
+    for p in files:
+        if p.name.startswith(".build-") or (p.suffix == ".onnx" and not p.name.startswith(_prefix(ort))):
+            _unlink(p)
+            removed += 1
+    return removed + evict()
+
+
+def forget(model_path) -> int:
+    """Drop every cached graph built from this model file (e.g. before deleting it)."""
+    try:
+        digest = model_digest(model_path)[:24]
+    except OSError:
+        return 0
+    removed = 0
+    for _, _, path in _entries():
+        if f"-{digest}-" in path.name:
+            _unlink(path)
+            removed += 1
+    return removed
+
+
+def stats() -> dict:
+    entries = _entries()
+    with _lock:
+        return dict(_stats, files=len(entries), bytes=sum(size for _, size, _ in entries))
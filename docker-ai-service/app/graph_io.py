@@ -0,0 +1,236 @@
+"""Upscaler models with their pre/post-processing embedded as ONNX graph nodes.
+
+Every ONNX frame path converted on the host, per frame: BGR->RGB, uint8->float32
+/255, HWC->NCHW going in, and clip x255, astype(uint8), CHW->HWC, RGB->BGR coming
+out - four or so full-frame numpy passes each way, all on the Python thread that
+also feeds the session. wrap() writes a copy of the model whose graph does that
+itself:
+
+  frame  uint8 [N, H, W, 3] BGR
+    -> Gather(2,1,0) -> Cast(float) -> Mul(1/255) -> Transpose(NCHW) [-> Cast(fp16)]
+    -> original model
+    [-> Cast(float)] -> Mul(255) -> Clip(0, 255) -> Cast(uint8) -> Transpose(NHWC)
+    -> Gather(2,1,0) -> frame_out  uint8 [N, H*s, W*s, 3] BGR
+
+Multi-frame models ([1, T, 3, H, W] input with a fixed T) take `frame` as
+[T, H, W, 3]; a [1, T, 3, ...] output is reduced to its centre frame, as the host
+path does. The uint8 rounding (truncation after the clip) matches _to_uint8.
+
+The copy is keyed by the source model's sha256 and cached in DIR, so it is built
+once per model file; sessions on it go through graph_cache like any other.
+Models the wrapper does not understand (several inputs, non-float tensors, no
+3-channel axis, opset < 11) are left alone: wrapped() returns None and the host
+conversion stays in use. Requires the `onnx` package.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from . import graph_cache
+
+logger = logging.getLogger(__name__)
+
+# Wired by main.py from ONNX_GRAPH_IO and CACHE_DIR.
+ENABLED = False
+DIR = Path("/app/cache") / "io-graphs"
+
+INPUT = "frame"
+OUTPUT = "frame_out"
+VERSION = 1  # bump when the wrapper graph changes; older files are pruned
+
+_lock = threading.Lock()
+_unsupported: set = set()  # digests wrap() refused, not retried this process
+
+
+def available() -> bool:
+    try:
+        import onnx  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def path_for(model_path) -> Path:
+    return DIR / f"{graph_cache.model_digest(model_path)[:24]}-io{VERSION}.onnx"
+
+
+def _dim(d, fallback: str):
+    """Static size, symbolic name, or `fallback` for an unnamed dynamic dim."""
+    if d.HasField("dim_value"):
+        return d.dim_value
+    return d.dim_param or fallback
+
+
+def wrap(src_path, dst_path) -> bool:
+    """Write the uint8-BGR-in/out variant of src_path to dst_path.
+
+    Returns False (and writes nothing) for models this wrapper does not handle.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    import numpy as np
+
+    model = onnx.load(str(src_path))
+    graph = model.graph
+    opset = next((o.version for o in model.opset_import if o.domain in ("", "ai.onnx")), 0)
+    inits = {i.name for i in graph.initializer}
+    inputs = [i for i in graph.input if i.name not in inits]
+    if opset < 11 or len(inputs) != 1 or len(graph.output) != 1:
+        return False
+    src_in, src_out = inputs[0].type.tensor_type, graph.output[0].type.tensor_type
+    floats = (TensorProto.FLOAT, TensorProto.FLOAT16)
+    if src_in.elem_type not in floats or src_out.elem_type not in floats:
+        return False
+    in_dims, out_dims = list(src_in.shape.dim), list(src_out.shape.dim)
+    frames = 0
+    if len(in_dims) == 5 and in_dims[1].HasField("dim_value"):
+        frames = in_dims[1].dim_value  # [1, T, 3, H, W]
+        channel = in_dims[2]
+    elif len(in_dims) == 4:
+        channel = in_dims[1]
+    else:
+        return False
+    if channel.HasField("dim_value") and channel.dim_value != 3:
+        return False
+    if len(out_dims) not in (4, 5) or (len(out_dims) == 5 and not frames):
+        return False
+
+    prefix = "m."
+    inner_in, inner_out = prefix + inputs[0].name, prefix + graph.output[0].name
+    onnx.compose.add_prefix(model, prefix, inplace=True)
+
+    consts = [
+        numpy_helper.from_array(np.array([2, 1, 0], np.int64), "io.bgr"),
+        numpy_helper.from_array(np.array(1.0 / 255.0, np.float32), "io.inv255"),
+        numpy_helper.from_array(np.array(255.0, np.float32), "io.x255"),
+        numpy_helper.from_array(np.array(0.0, np.float32), "io.lo"),
+        numpy_helper.from_array(np.array(255.0, np.float32), "io.hi"),
+    ]
+    pre = [
+        helper.make_node("Gather", [INPUT, "io.bgr"], ["io.rgb"], axis=3),
+        helper.make_node("Cast", ["io.rgb"], ["io.f"], to=TensorProto.FLOAT),
+        helper.make_node("Mul", ["io.f", "io.inv255"], ["io.norm"]),
+        helper.make_node("Transpose", ["io.norm"], ["io.nchw"], perm=[0, 3, 1, 2]),
+    ]
+    last = "io.nchw"
+    if frames:
+        if opset >= 13:
+            consts.append(numpy_helper.from_array(np.array([0], np.int64), "io.axis0"))
+            pre.append(helper.make_node("Unsqueeze", [last, "io.axis0"], ["io.stack"]))
+        else:
+            pre.append(helper.make_node("Unsqueeze", [last], ["io.stack"], axes=[0]))
+        last = "io.stack"
+    if src_in.elem_type == TensorProto.FLOAT16:
+        pre.append(helper.make_node("Cast", [last], ["io.half"], to=TensorProto.FLOAT16))
+        last = "io.half"
+    pre.append(helper.make_node("Identity", [last], [inner_in]))
+
+    post, last = [], inner_out
+    if src_out.elem_type == TensorProto.FLOAT16:
+        post.append(helper.make_node("Cast", [last], ["io.out_f"], to=TensorProto.FLOAT))
+        last = "io.out_f"
+    if len(out_dims) == 5:
+        consts.append(numpy_helper.from_array(np.array(frames // 2, np.int64), "io.centre"))
+        post.append(helper.make_node("Gather", [last, "io.centre"], ["io.centre_frame"], axis=1))
+        last = "io.centre_frame"
+    post += [
+        helper.make_node("Mul", [last, "io.x255"], ["io.scaled"]),
+        helper.make_node("Clip", ["io.scaled", "io.lo", "io.hi"], ["io.clipped"]),
+        helper.make_node("Cast", ["io.clipped"], ["io.u8"], to=TensorProto.UINT8),
+        helper.make_node("Transpose", ["io.u8"], ["io.nhwc"], perm=[0, 2, 3, 1]),
+        helper.make_node("Gather", ["io.nhwc", "io.bgr"], [OUTPUT], axis=3),
+    ]
+
+    h_dim, w_dim = in_dims[-2], in_dims[-1]
+    oh_dim, ow_dim = out_dims[-2], out_dims[-1]
+    n_in = frames if frames else _dim(in_dims[0], "N")
+    n_out = 1 if frames else _dim(out_dims[0], "N")
+    wrapped = helper.make_graph(
+        pre + list(graph.node) + post,
+        graph.name or "upscaler",
+        [helper.make_tensor_value_info(INPUT, TensorProto.UINT8,
+                                       [n_in, _dim(h_dim, "H"), _dim(w_dim, "W"), 3])],
+        [helper.make_tensor_value_info(OUTPUT, TensorProto.UINT8,
+                                       [n_out, _dim(oh_dim, "OH"), _dim(ow_dim, "OW"), 3])],
+        initializer=list(graph.initializer) + consts,
+        value_info=list(graph.value_info),
+    )
+    out = helper.make_model(wrapped, opset_imports=list(model.opset_import),
+                            producer_name="jellyfin-upscaler-graph-io")
+    out.ir_version = model.ir_version
+    onnx.save(out, str(dst_path))
+    return True
+
+
+def wrapped(model_path) -> Optional[Path]:
+    """Path of the cached wrapped copy of model_path (built on first use), or None."""
+    if not ENABLED or not available():
+        return None
+    try:
+        target = path_for(model_path)
+    except OSError as e:
+        logger.warning(f"Graph I/O: cannot fingerprint {model_path} ({e})")
+        return None
+    with _lock:
+        if target.is_file():
+            return target
+        if target.name in _unsupported:
+            return None
+        try:
+            DIR.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(DIR), prefix=".build-", suffix=".onnx")
+            os.close(fd)
+        except OSError as e:
+            logger.warning(f"Graph I/O directory {DIR} not writable ({e})")
+            return None
+        try:
+            ok = wrap(model_path, tmp)
+        except Exception as e:
+            logger.warning(f"Graph I/O: wrapping {os.path.basename(str(model_path))} failed: {e}")
+            ok = False
+        if not ok:
+            _unsupported.add(target.name)
+            _unlink(Path(tmp))
+            return None
+        os.replace(tmp, target)
+    logger.info(f"Graph I/O: embedded pre/post-processing for {os.path.basename(str(model_path))}")
+    return target
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def prune() -> int:
+    """Remove wrapped copies from an older VERSION and stale temp files."""
+    removed = 0
+    try:
+        files = list(DIR.iterdir())
+    except OSError:
+        return 0
+    for p in files:
+        if p.name.startswith(".build-") or (p.suffix == ".onnx" and not p.name.endswith(f"-io{VERSION}.onnx")):
+            _unlink(p)
+            removed += 1
+    return removed
+
+
+def forget(model_path) -> int:
+    """Drop the wrapped copy of this model file and its optimised graphs."""
+    try:
+        target = path_for(model_path)
+    except OSError:
+        return 0
+    if not target.is_file():
+        return 0
+    graph_cache.forget(target)
+    _unlink(target)
+    return 1
@@ -0,0 +1,347 @@
+"""Optional multi-process inference: ONNX sessions in N child processes.
+
+All inference used to run inside the FastAPI process, behind one GIL. A CUDA or
+driver fault in any session took the whole service down (the reason
+_probe_tensorrt_subprocess exists), and the Python-side pre/post-processing of
+concurrent frames could not use more than one core. With INFERENCE_WORKERS > 0
+the loaded ONNX model also runs in that many child processes, and main.py turns
+into a thin dispatcher for the frame paths:
+
+  * Each worker owns a multiprocessing.shared_memory segment cut into SLOTS
+    slots of SLOT_BYTES. A slot is a ring entry: the uint8 BGR input frame at
+    its start, the upscaled output right behind it. Frames never get pickled -
+    the pipe only carries (job, slot, height, width) and (job, error).
+  * infer() picks the worker with the fewest jobs in flight, waits for one of
+    its free slots, copies the frame in and blocks until the output is there.
+    Frames that do not fit a slot stay in-process (fits()).
+  * A reader thread per worker resolves the jobs. When the pipe breaks (the
+    child crashed or was killed), every job in flight fails with WorkerCrashed
+    and the worker is started again on the same segment; infer() waits up to
+    START_TIMEOUT_S for it instead of failing everything behind the crash.
+  * Children build their own session (same providers, intra-op threads split
+    between the workers) and run frames the way upscale_frame_realtime does:
+    whole up to FULL_FRAME_PIXELS, above that TILE_SIZE tiles with a small
+    overlap and no blending.
+
+Workers are started with the "spawn" method: no CUDA context or lock held by
+the parent is inherited. The child only imports numpy, onnxruntime and this
+module.
+"""
+from __future__ import annotations
+
+import atexit
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from . import temporal_tiles
+
+logger = logging.getLogger(__name__)
+
+# Wired by main.py from INFERENCE_WORKERS / INFERENCE_WORKER_SLOTS / INFERENCE_WORKER_SLOT_MB.
+WORKERS = 0
+SLOTS = 4
+SLOT_BYTES = 64 * 1024 * 1024
+TILE_SIZE = 512
+FULL_FRAME_PIXELS = 512 * 512
+OVERLAP = 8
+START_TIMEOUT_S = 120.0
+
+
+# Names of the segments our workers own, so shm_transport never attaches to one
+_segment_names: set = set()
+
+
+def segment_names() -> frozenset:
+    return frozenset(_segment_names)
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process died (or never came up) with the job in flight."""
+
+
+def _upscale(session, img: np.ndarray, out: np.ndarray, scale: int, tile_size: int = TILE_SIZE) -> None:
+    """Upscale BGR uint8 `img` into BGR uint8 `out`, tiling like the realtime path."""
+    model_input = session.get_inputs()[0]
+    # FP16-exported models reject float32 input (INVALID_ARGUMENT)
+    dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+    h, w = img.shape[:2]
+    if h * w <= FULL_FRAME_PIXELS:
+        grid, tile = [(0, 0)], max(h, w)
+    else:
+        grid, tile = temporal_tiles.grid(h, w, tile_size, OVERLAP), tile_size
+    for y, x in grid:
+        part = img[y:y + tile, x:x + tile]
+        blob = np.ascontiguousarray(part[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32)
+        blob *= np.float32(1.0 / 255.0)
+        res = session.run(None, {model_input.name: blob.astype(dtype, copy=False)})[0][0]
+        res = np.clip(res.astype(np.float32, copy=False) * 255.0, 0, 255).astype(np.uint8)
+        oh, ow = res.shape[1:]
+        out[y * scale:y * scale + oh, x * scale:x * scale + ow] = res.transpose(1, 2, 0)[:, :, ::-1]
+
+
+def _serve(model_path: str, scale: int, providers: list, threads: int, shm_name: str,
+           slot_bytes: int, tile_size: int, conn) -> None:
+    """Child process main loop."""
+    import onnxruntime as ort
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        available = set(ort.get_available_providers())
+        session = ort.InferenceSession(model_path, opts,
+                                       providers=[p for p in providers if p in available] or ["CPUExecutionProvider"])
+    except Exception as exc:
+        conn.send(("failed", repr(exc)))
+        shm.close()
+        return
+    conn.send(("ready", session.get_providers()))
+
+    def _run(slot: int, h: int, w: int) -> None:
+        base = slot * slot_bytes
+        img = np.ndarray((h, w, 3), np.uint8, buffer=shm.buf, offset=base)
+        out = np.ndarray((h * scale, w * scale, 3), np.uint8, buffer=shm.buf, offset=base + h * w * 3)
+        _upscale(session, img, out, scale, tile_size)
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        job, slot, h, w = msg
+        try:
+            _run(slot, h, w)
+            conn.send((job, None))
+        except Exception as exc:
+            conn.send((job, repr(exc)))
+    shm.close()
+
+
+class _Worker:
+    """One child process, its shared-memory slots and the jobs in flight."""
+
+    def __init__(self, pool: "WorkerPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=pool.slots * pool.slot_bytes)
+        _segment_names.add(self.shm.name)
+        self.free = list(range(pool.slots))
+        self.slot_free = threading.Condition()
+        self.pending: dict = {}  # job -> (future, slot)
+        self.send_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.process = None
+        self.conn = None
+        self.providers: list = []
+        self.error: Optional[str] = None
+        self.jobs = 0
+
+    def start(self) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        parent, child = ctx.Pipe()
+        pool = self.pool
+        self.process = ctx.Process(
+            target=_serve, name=f"upscaler-worker-{self.index}", daemon=True,
+            args=(pool.model_path, pool.scale, pool.providers, pool.threads, self.shm.name, pool.slot_bytes,
+                  pool.tile_size, child))
+        self.process.start()
+        child.close()
+        self.conn = parent
+        threading.Thread(target=self._read, args=(parent,), name=f"upscaler-worker-{self.index}-reader",
+                         daemon=True).start()
+
+    def _read(self, conn) -> None:
+        try:
+            kind, detail = conn.recv()
+            if kind != "ready":
+                self.error = detail
+                raise WorkerCrashed(f"worker {self.index} could not load the model: {detail}")
+            self.providers = detail
+            self.ready.set()
+            while True:
+                job, error = conn.recv()
+                with self.slot_free:
+                    future, slot = self.pending.pop(job)
+                if error is None:
+                    future.set_result(slot)
+                else:
+                    future.set_exception(RuntimeError(f"inference worker {self.index}: {error}"))
+        except (EOFError, OSError, WorkerCrashed) as exc:
+            self._crashed(conn, exc)
+
+    def _crashed(self, conn, exc: BaseException) -> None:
+        self.ready.clear()
+        conn.close()
+        with self.slot_free:
+            lost, self.pending = list(self.pending.values()), {}
+        for future, _ in lost:
+            future.set_exception(WorkerCrashed(f"inference worker {self.index} exited"))
+        if self.pool.closed or not self.pool.started:
+            return  # start() reports it
+        self.process.join(timeout=5)
+        logger.error(f"Inference worker {self.index} exited (code {self.process.exitcode}, {exc!r}); restarting")
+        self.pool.restarts += 1
+        time.sleep(self.pool.restart_delay())
+        if not self.pool.closed:
+            self.start()
+
+    def submit(self, img: np.ndarray) -> tuple:
+        """Copy `img` into a free slot and send it; returns (future, slot)."""
+        h, w = img.shape[:2]
+        with self.slot_free:
+            while not self.free:
+                self.slot_free.wait()
+            slot = self.free.pop()
+        base = slot * self.pool.slot_bytes
+        np.ndarray((h, w, 3), np.uint8, buffer=self.shm.buf, offset=base)[:] = img
+        job, future = next(self.pool.jobs), Future()
+        with self.slot_free:
+            self.pending[job] = (future, slot)
+        try:
+            with self.send_lock:
+                self.conn.send((job, slot, h, w))
+        except (OSError, ValueError):
+            # Crashed between picking this worker and sending; the reader may
+            # already have failed the jobs it knew about
+            with self.slot_free:
+                lost = self.pending.pop(job, None)
+            if lost is not None:
+                future.set_exception(WorkerCrashed(f"inference worker {self.index} exited"))
+        self.jobs += 1
+        return future, slot
+
+    def release(self, slot: int) -> None:
+        with self.slot_free:
+            self.free.append(slot)
+            self.slot_free.notify()
+
+    def stop(self) -> None:
+        try:
+            with self.send_lock:
+                self.conn.send(None)
+        except (OSError, ValueError, AttributeError):
+            pass
+        if self.process is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join(timeout=5)
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a frame is still being copied out; the mapping goes with it
+        self.shm.unlink()
+        _segment_names.discard(self.shm.name)
+
+
+class WorkerPool:
+    """N worker processes serving one ONNX model."""
+
+    def __init__(self, model_path: str, scale: int, providers: list, workers: Optional[int] = None,
+                 slots: Optional[int] = None, slot_bytes: Optional[int] = None):
+        self.model_path = str(model_path)
+        self.scale = int(scale)
+        self.providers = list(providers)
+        self.slots = max(1, slots or SLOTS)
+        self.slot_bytes = slot_bytes or SLOT_BYTES
+        self.tile_size = TILE_SIZE  # read here: the spawned children do not see main.py's wiring
+        count = max(1, workers or WORKERS)
+        # CPU sessions share the cores; GPU sessions keep ORT's default
+        self.threads = 0 if any(p != "CPUExecutionProvider" for p in self.providers) else \
+            max(1, (os.cpu_count() or 4) // count)
+        self.jobs = itertools.count()
+        self.closed = False
+        self.started = False
+        self.restarts = 0
+        self._crash_times: list = []
+        self._workers = [_Worker(self, i) for i in range(count)]
+        # Before multiprocessing's own exit hook kills the children (no restarts then)
+        atexit.register(self.close)
+
+    def start(self, timeout: float = START_TIMEOUT_S) -> None:
+        """Start every worker and wait until all have loaded the model."""
+        for worker in self._workers:
+            worker.start()
+        until = time.monotonic() + timeout
+        for worker in self._workers:
+            while not worker.ready.wait(0.05):
+                if worker.error is not None or not worker.process.is_alive() or time.monotonic() > until:
+                    self.close()
+                    raise WorkerCrashed(f"inference worker {worker.index} did not come up: "
+                                        f"{worker.error or 'timed out'}")
+        self.started = True
+
+    def restart_delay(self) -> float:
+        """Back off when workers keep crashing (e.g. a broken driver): 0 s, then up to 30 s."""
+        now = time.monotonic()
+        self._crash_times = [t for t in self._crash_times if now - t < 60] + [now]
+        return min(30.0, 0.5 * (2 ** (len(self._crash_times) - 1))) if len(self._crash_times) > 1 else 0.0
+
+    def fits(self, h: int, w: int) -> bool:
+        return h * w * 3 * (1 + self.scale * self.scale) <= self.slot_bytes
+
+    def serves(self, model_path: Optional[str], h: int, w: int) -> bool:
+        """True when this pool runs `model_path` and a h x w frame fits a slot."""
+        return not self.closed and model_path is not None and str(model_path) == self.model_path and self.fits(h, w)
+
+    def infer(self, img: np.ndarray) -> np.ndarray:
+        """Upscale a BGR uint8 frame in a worker process (blocking)."""
+        h, w = img.shape[:2]
+        if not self.fits(h, w):
+            raise ValueError(f"{w}x{h} frame does not fit a {self.slot_bytes} byte worker slot")
+        until = time.monotonic() + START_TIMEOUT_S
+        while True:
+            live = [wk for wk in self._workers if wk.ready.is_set()]
+            if live:
+                break
+            if self.closed or time.monotonic() > until:
+                raise WorkerCrashed("no inference worker available")
+            time.sleep(0.01)
+        worker = min(live, key=lambda wk: len(wk.pending))
+        future, slot = worker.submit(img)
+        try:
+            future.result()
+            base = slot * self.slot_bytes + h * w * 3
+            return np.ndarray((h * self.scale, w * self.scale, 3), np.uint8, buffer=worker.shm.buf,
+                              offset=base).copy()
+        finally:
+            worker.release(slot)
+
+    def kill(self, index: int) -> None:
+        """Kill one worker process; the pool restarts it like any crash."""
+        self._workers[index].process.kill()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        for worker in self._workers:
+            worker.stop()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "model_path": self.model_path,
+            "workers": len(self._workers),
+            "alive": sum(1 for wk in self._workers if wk.ready.is_set()),
+            "slots": self.slots,
+            "slot_mb": round(self.slot_bytes / (1024 * 1024), 1),
+            "in_flight": sum(len(wk.pending) for wk in self._workers),
+            "jobs_total": sum(wk.jobs for wk in self._workers),
+            "restarts": self.restarts,
+            "providers": self._workers[0].providers if self._workers else [],
+        }
@@ -0,0 +1,222 @@
+"""Reusable I/O-bound buffers for ONNX Runtime inference on repeated tile shapes.
+
+session.run(feed) costs three full-size allocations per call on the hot path: the
+NCHW input blob built from the frame, the output tensor ONNX Runtime allocates for
+the result, and usually a converted copy of the input (fp16). At 24-60 fps in
+/upscale-stream that is hundreds of MB/s of fresh pages, each one faulted in by
+the kernel, for buffers that have exactly the same shape every frame.
+
+This module keeps, per session and per input shape, a tiny pool of "slots". A
+slot owns a preallocated input array, a preallocated output array and an ORT
+IOBinding with both bound by pointer, so run_with_iobinding() reads the input in
+place and writes the output straight into our buffer - no allocation on either
+side. Callers fill slot.input themselves (typically with a fused
+convert-and-transpose straight from the uint8 frame) and must finish with
+slot.output before the lease ends.
+
+  * The first call for a new shape runs the plain session.run once to learn the
+    output shape/dtype, then allocates a slot. Later calls reuse it.
+  * A slot busy with another request is never shared: a concurrent lease for the
+    same shape allocates an extra slot, kept if the pool has room (POOL_SLOTS).
+  * Shapes are LRU-bounded per session (MAX_SHAPES) - a stream of odd frame sizes
+    cannot pin unbounded memory. Sessions are weak keys and slots only hold a
+    weak reference back to theirs, so unloading a model frees its buffers;
+    main.py also calls forget() when it swaps a session out.
+  * A session whose provider refuses pointer bindings is remembered and served
+    by plain session.run from then on.
+  * A SessionPool is resolved to one replica per lease; pools are kept per replica.
+"""
+from __future__ import annotations
+
+import collections
+import contextlib
+import logging
+import threading
+import weakref
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .session_pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+# Wired by main.py from IO_BINDING / IO_BINDING_POOL_SLOTS / IO_BINDING_MAX_SHAPES.
+ENABLED = True
+POOL_SLOTS = 2
+MAX_SHAPES = 8
+
+_lock = threading.Lock()
+_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_unsupported: "weakref.WeakSet" = weakref.WeakSet()
+_stats = {"reused": 0, "allocated": 0, "fallbacks": 0, "evicted": 0}
+
+
+class Slot:
+    """Preallocated input/output buffers with an IOBinding bound to them."""
+
+    def __init__(self, session, input_name: str, output_name: str,
+                 in_shape: tuple, in_dtype, out_shape: tuple, out_dtype):
+        # Weak: the slot is a value of _pools, keyed by this very session
+        self._session = weakref.ref(session)
+        self.key = (in_shape, np.dtype(in_dtype).str, input_name, output_name)
+        self.input = np.empty(in_shape, dtype=in_dtype)
+        self.output = np.empty(out_shape, dtype=out_dtype)
+        self._binding = session.io_binding()
+        self._binding.bind_input(input_name, "cpu", 0, self.input.dtype, list(in_shape),
+                                 self.input.ctypes.data)
+        self._binding.bind_output(output_name, "cpu", 0, self.output.dtype, list(out_shape),
+                                  self.output.ctypes.data)
+
+    @property
+    def nbytes(self) -> int:
+        return self.input.nbytes + self.output.nbytes
+
+    def run(self) -> np.ndarray:
+        """Infer slot.input into slot.output (returned). Valid until the lease ends."""
+        self._session().run_with_iobinding(self._binding)
+        return self.output
+
+    @property
+    def session(self):
+        return self._session()
+
+
+class _PlainSlot:
+    """Same interface without binding: used for the first call and for fallbacks."""
+
+    def __init__(self, session, input_name: str, output_name: str, in_shape: tuple, in_dtype):
+        self.session = session
+        self.input = np.empty(in_shape, dtype=in_dtype)
+        self._names = (input_name, output_name)
+        self.output: Optional[np.ndarray] = None
+
+    def run(self) -> np.ndarray:
+        self.output = self.session.run([self._names[1]], {self._names[0]: self.input})[0]
+        return self.output
+
+
+def _session_pool(session) -> "collections.OrderedDict":
+    pool = _pools.get(session)
+    if pool is None:
+        pool = collections.OrderedDict()
+        _pools[session] = pool
+    return pool
+
+
+@contextlib.contextmanager
+def lease(session, input_name: str, output_name: str, in_shape: tuple, in_dtype) -> Iterator:
+    """Borrow a slot for one inference of this input shape.
+
+    Usage:
+        with io_binding.lease(session, "input", "output", (1, 3, h, w), np.float32) as slot:
+            fill(slot.input)
+            out = slot.run()
+            ...consume out...
+    """
+    if isinstance(session, SessionPool):
+        # A binding belongs to the replica that created it - pin one for the lease
+        with session.lease() as replica:
+            with lease(replica, input_name, output_name, in_shape, in_dtype) as slot:
+                yield slot
+        return
+    in_shape = tuple(int(d) for d in in_shape)
+    key = (in_shape, np.dtype(in_dtype).str, input_name, output_name)
+    slot = None
+    known_output = None
+    if ENABLED:
+        with _lock:
+            try:
+                supported = session not in _unsupported
+                pool = _session_pool(session) if supported else None
+            except TypeError:  # not weak-referenceable (test doubles)
+                supported, pool = False, None
+            if pool is not None:
+                entry = pool.get(key)
+                if entry is not None:
+                    pool.move_to_end(key)
+                    known_output = entry["out"]
+                    if entry["free"]:
+                        slot = entry["free"].pop()
+                        _stats["reused"] += 1
+    if slot is None and known_output is not None:
+        try:
+            slot = Slot(session, input_name, output_name, in_shape, in_dtype, *known_output)
+            with _lock:
+                _stats["allocated"] += 1
+        except Exception as exc:
+            _mark_unsupported(session, exc)
+    if slot is None:
+        # First sighting of this shape (or binding unsupported): plain run
+        plain = _PlainSlot(session, input_name, output_name, in_shape, in_dtype)
+        yield plain
+        if ENABLED and plain.output is not None:
+            _learn(session, key, plain.output)
+        return
+    try:
+        yield slot
+    finally:
+        _release(slot)
+
+
+def _mark_unsupported(session, exc: Exception) -> None:
+    logger.warning(f"ONNX I/O binding unavailable for this session ({exc}); using plain run()")
+    with _lock:
+        _stats["fallbacks"] += 1
+        try:
+            _unsupported.add(session)
+            _pools.pop(session, None)
+        except TypeError:
+            pass
+
+
+def _learn(session, key: tuple, output: np.ndarray) -> None:
+    with _lock:
+        try:
+            if session in _unsupported:
+                return
+            pool = _session_pool(session)
+        except TypeError:
+            return
+        if key not in pool:
+            pool[key] = {"out": (tuple(output.shape), output.dtype), "free": []}
+            while len(pool) > MAX_SHAPES:
+                pool.popitem(last=False)
+                _stats["evicted"] += 1
+
+
+def _release(slot: Slot) -> None:
+    session = slot.session
+    if session is None:
+        return
+    with _lock:
+        pool = _pools.get(session)
+        entry = pool.get(slot.key) if pool is not None else None
+        if entry is not None and len(entry["free"]) < POOL_SLOTS:
+            entry["free"].append(slot)
+
+
+def forget(session) -> None:
+    """Drop the slots of a session that is being replaced (all replicas of a pool)."""
+    sessions = session.replicas if isinstance(session, SessionPool) else [session]
+    with _lock:
+        for s in sessions:
+            try:
+                _pools.pop(s, None)
+            except TypeError:
+                pass
+
+
+def stats() -> dict:
+    with _lock:
+        pooled = sum(s.nbytes for pool in _pools.values()
+                     for entry in pool.values() for s in entry["free"])
+        return dict(_stats, pooled_bytes=pooled)
+
+
+def clear() -> None:
+    with _lock:
+        _pools.clear()
+        _unsupported.clear()
+        for k in _stats:
+            _stats[k] = 0
@@ -0,0 +1,193 @@
+"""Letterbox / pillarbox detection so frame paths only upscale the picture.
+
+A 2.39:1 film in a 16:9 frame is ~25% black bars, and /upscale-frame,
+/upscale-stream and /upscale-video-chunk ran all of it through the model. The
+bars are static for the length of a stream, so they are detected now and then
+(BorderTracker, one per stream / client), the model runs on the active area only
+and the output is padded back to full size with black - the same pixels the
+model would have produced for black input, give or take noise.
+
+detect() works on a 2x subsampled copy: a row (column) is picture when more than
+BRIGHT_FRACTION of its pixels exceed THRESHOLD in any channel. The active area is
+widened by MARGIN_PX and aligned outwards to ALIGN_PX, so soft picture edges
+are never cut; bars narrower than MIN_BAR_PX are ignored.
+
+A dark scene can look like bars. The tracker therefore widens the active area
+at once (never crops picture) but narrows it only after CONFIRM consecutive
+detections agree, and ignores all-black frames (fades) entirely. Detection
+reruns every REDETECT_FRAMES frames per stream.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+# Wired by main.py from the LETTERBOX_* env vars.
+ENABLED = True
+THRESHOLD = 16           # 0-255, max channel value still counted as black
+BRIGHT_FRACTION = 0.01   # share of bright pixels that makes a row/column picture
+MIN_BAR_PX = 8
+MARGIN_PX = 2
+ALIGN_PX = 2
+REDETECT_FRAMES = 48
+CONFIRM = 3
+MAX_TRACKERS = 64
+TRACKER_TTL_S = 300.0
+
+_lock = threading.Lock()
+_stats = {"detections": 0, "frames_cropped": 0, "pixels_skipped": 0}
+
+
+class Active(NamedTuple):
+    """Picture area of a frame, input pixels: rows y0:y1, columns x0:x1."""
+    y0: int
+    y1: int
+    x0: int
+    x1: int
+
+    def is_full(self, h: int, w: int) -> bool:
+        return self.y0 <= 0 and self.x0 <= 0 and self.y1 >= h and self.x1 >= w
+
+    def contains(self, other: "Active") -> bool:
+        return self.y0 <= other.y0 and self.x0 <= other.x0 and self.y1 >= other.y1 and self.x1 >= other.x1
+
+    def union(self, other: "Active") -> "Active":
+        return Active(min(self.y0, other.y0), max(self.y1, other.y1),
+                      min(self.x0, other.x0), max(self.x1, other.x1))
+
+    def bars(self, h: int, w: int) -> str:
+        """top,bottom,left,right bar sizes - the X-Letterbox header value."""
+        return f"{self.y0},{h - self.y1},{self.x0},{w - self.x1}"
+
+
+def _span(mask: np.ndarray, step: int, size: int) -> Optional[tuple]:
+    idx = np.flatnonzero(mask)
+    if idx.size == 0:
+        return None
+    lo = max(0, idx[0] * step - MARGIN_PX) // ALIGN_PX * ALIGN_PX
+    hi = min(size, -(-min(size, (idx[-1] + 1) * step + MARGIN_PX) // ALIGN_PX) * ALIGN_PX)
+    if lo < MIN_BAR_PX:
+        lo = 0
+    if size - hi < MIN_BAR_PX:
+        hi = size
+    return int(lo), int(hi)
+
+
+def detect(img: np.ndarray, step: int = 2) -> Optional[Active]:
+    """Active picture area of a BGR/RGB uint8 frame, or None for an all-black frame."""
+    h, w = img.shape[:2]
+    small = img[::step, ::step]
+    bright = (small.max(axis=2) if small.ndim == 3 else small) > THRESHOLD
+    with _lock:
+        _stats["detections"] += 1
+    rows = _span(bright.mean(axis=1) > BRIGHT_FRACTION, step, h)
+    if rows is None:
+        return None
+    r0, r1 = rows[0] // step, -(-rows[1] // step)
+    cols = _span(bright[r0:r1].mean(axis=0) > BRIGHT_FRACTION, step, w)
+    if cols is None:
+        return None
+    return Active(rows[0], rows[1], cols[0], cols[1])
+
+
+class BorderTracker:
+    """Static-border state for one stream: when to detect, what to crop."""
+
+    def __init__(self):
+        self.active: Optional[Active] = None
+        self.shape: Optional[tuple] = None
+        self._pending: Optional[Active] = None
+        self._agree = 0
+        self._frames = 0
+        self._lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def update(self, img: np.ndarray) -> Optional[Active]:
+        """Area to upscale for this frame, or None for the whole frame."""
+        h, w = img.shape[:2]
+        with self._lock:
+            self.last_used = time.monotonic()
+            if self.shape != (h, w):
+                self.shape, self.active, self._pending, self._agree, self._frames = (h, w), None, None, 0, 0
+            if self._frames % REDETECT_FRAMES == 0 or self._pending is not None:
+                self._observe(detect(img), h, w)
+            self._frames += 1
+            if self.active is None or self.active.is_full(h, w):
+                return None
+            return self.active
+
+    def _observe(self, found: Optional[Active], h: int, w: int) -> None:
+        if found is None:  # fade to black: says nothing about the bars
+            return
+        if self.active is None:
+            self.active = Active(0, h, 0, w)
+        self.active = self.active.union(found)  # more picture: take it now
+        if found == self.active:
+            self._pending, self._agree = None, 0
+            return
+        # Less picture than we crop to: only after CONFIRM frames in a row agree
+        self._pending = found if self._pending is None else self._pending.union(found)
+        self._agree += 1
+        if self._agree >= CONFIRM:
+            self.active, self._pending, self._agree = self._pending, None, 0
+
+
+class TrackerRegistry:
+    """Per-stream state by stream key, LRU-bounded with an idle TTL.
+
+    BorderTrackers by default; any factory whose objects keep a monotonic
+    last_used works (main.py also keeps frame_dedup.FrameDedupers here).
+    """
+
+    def __init__(self, max_entries: int = MAX_TRACKERS, ttl_s: float = TRACKER_TTL_S,
+                 factory: Callable[[], Any] = BorderTracker):
+        self.max_entries, self.ttl_s, self.factory = max_entries, ttl_s, factory
+        self._trackers: "collections.OrderedDict[str, Any]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            tracker = self._trackers.pop(key, None)
+            if tracker is None or now - tracker.last_used > self.ttl_s:
+                tracker = self.factory()
+            self._trackers[key] = tracker
+            while len(self._trackers) > self.max_entries:
+                self._trackers.popitem(last=False)
+            return tracker
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._trackers)
+
+
+def crop(img: np.ndarray, active: Active) -> np.ndarray:
+    return np.ascontiguousarray(img[active.y0:active.y1, active.x0:active.x1])
+
+
+def pad(result: np.ndarray, active: Active, h: int, w: int) -> np.ndarray:
+    """Place the upscaled active area into a black frame of the full output size."""
+    scale = result.shape[0] // (active.y1 - active.y0)
+    out = np.zeros((h * scale, w * scale) + result.shape[2:], dtype=result.dtype)
+    out[active.y0 * scale:active.y0 * scale + result.shape[0],
+        active.x0 * scale:active.x0 * scale + result.shape[1]] = result
+    with _lock:
+        _stats["frames_cropped"] += 1
+        _stats["pixels_skipped"] += h * w - (active.y1 - active.y0) * (active.x1 - active.x0)
+    return out
+
+
+def apply(img: np.ndarray, active: Optional[Active], upscale: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """upscale(img) computed on the active area only, padded back with black."""
+    if active is None:
+        return upscale(img)
+    return pad(upscale(crop(img, active)), active, *img.shape[:2])
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
@@ -12,6 +12,7 @@ import json
 import logging
 import asyncio
 import collections
+import contextvars
 import platform
 import shutil
 import subprocess
@@ -22,9 +23,9 @@ import hmac
 import socket
 import urllib.parse
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+import weakref
 from pathlib import Path
-from typing import Optional, Any
+from typing import Callable, Optional, Any
 from contextlib import asynccontextmanager
 
 import numpy as np
@@ -120,6 +121,29 @@ STATIC_DIR = Path(os.getenv("STATIC_DIR", "/app/static"))
 CONFIG_DIR = Path(os.getenv("CONFIG_DIR", "/app/config"))
 
 from . import token_store  # hashed, persistent multi-token store (lazy expiry)
+from . import tile_plan    # cached tile grids + blend normalisation shared by all tiled backends
+from . import png_stream   # row-incremental PNG encoder for band-streamed /upscale responses
+from . import tile_pipeline  # prepare/infer/stitch overlap for the tiled backends
+from . import io_binding   # pooled, pointer-bound ORT input/output buffers per tile shape
+from . import micro_batch  # cross-request batching of same-shaped /upscale-frame frames
+from . import session_pool  # CPU session replicas with split intra-op thread budgets
+from . import session_profiles  # named SessionOptions profiles, per-model pins, auto-tune results
+from . import model_cache  # several upscalers resident at once, LRU under a memory budget
+from . import graph_cache  # ORT-optimised model graphs persisted under CACHE_DIR
+from . import quantize     # INT8 variants of ONNX upscalers (calibration set + scoring)
+from . import graph_io     # uint8 BGR in/out model copies (pre/post-processing in the graph)
+from . import result_cache  # content-addressed /upscale results under CACHE_DIR
+from . import letterbox    # black-bar detection so frame paths upscale the picture only
+from . import flat_tiles   # complexity-adaptive tiling (flat tiles interpolated)
+from . import temporal_tiles  # per-stream reuse of unchanged realtime tiles
+from . import frame_dedup  # near-duplicate frames reuse the previous output
+from . import quality_ladder  # realtime quality steps down/up to hold the target FPS
+from . import scheduler    # priority/deadline admission for the inference endpoints
+from . import concurrency_limit  # AIMD inference limit from measured latency
+from . import executor_pools  # per-workload thread pools (realtime/bulk/aux/admin)
+from . import inference_workers  # optional ONNX inference in child processes
+from . import shm_transport  # raw frames through /dev/shm for co-located clients
+from . import tile_tuner   # per-(model, provider, resolution) tile/overlap/batch tuning
 
 # Version — single source of truth is the APP_VERSION build arg the
 # Dockerfiles pass; fall back to a literal only for bare local runs.
@@ -142,9 +166,12 @@ class AppState:
         self.cv_model_scale: int = 2
 
         # ONNX model
-        self.onnx_session = None
+        self.onnx_session = None  # a plain InferenceSession or a session_pool.SessionPool
         self.onnx_model_name: Optional[str] = None
         self.onnx_model_scale: int = 4
+        self.onnx_model_path: Optional[str] = None
+        self.session_replicas: int = 1  # CPU replicas of the upscaler session (see session_pool)
+        self.session_profile: str = "auto"  # global SessionOptions profile choice
 
         # ncnn-Vulkan model (for Vulkan GPU acceleration)
         self.ncnn_upscaler: Any = None
@@ -238,6 +265,11 @@ class RealtimeStats:
     def __init__(self):
         self.current_fps: float = 0.0
         self.dropped_frames: int = 0
+        self.tiles_total: int = 0   # temporal tile reuse (TEMPORAL_TILES)
+        self.tiles_reused: int = 0
+        self.frames_checked: int = 0   # near-duplicate detection (FRAME_DEDUP)
+        self.duplicate_frames: int = 0
+        self.quality: dict = {}  # QualityController.snapshot() of the running stream
         self._lock = threading.Lock()
         self._timestamps: collections.deque = collections.deque(maxlen=RealtimeStats._FPS_WINDOW_SIZE)
         # Bounded deque for avg latency — oldest entries dropped automatically
@@ -270,6 +302,23 @@ class RealtimeStats:
         with self._lock:
             self.dropped_frames += 1
 
+    def record_tiles(self, total: int, reused: int) -> None:
+        """Record a frame's temporal tile grid size and how many tiles were reused."""
+        with self._lock:
+            self.tiles_total += total
+            self.tiles_reused += reused
+
+    def record_dedup(self, duplicate: bool) -> None:
+        """Record a frame checked for duplication and whether its output was reused."""
+        with self._lock:
+            self.frames_checked += 1
+            self.duplicate_frames += int(duplicate)
+
+    def record_quality(self, quality: dict) -> None:
+        """Record the stream's current quality-ladder position."""
+        with self._lock:
+            self.quality = dict(quality)
+
     def snapshot(self) -> dict:
         """Return a copy of current stats."""
         with self._lock:
@@ -283,6 +332,11 @@ class RealtimeStats:
                 "current_fps": round(self.current_fps, 2),
                 "avg_frame_ms": round(avg_ms, 2),
                 "dropped_frames": self.dropped_frames,
+                "tiles_reused": self.tiles_reused,
+                "tile_reuse_ratio": round(self.tiles_reused / self.tiles_total, 3) if self.tiles_total else 0.0,
+                "duplicate_frames": self.duplicate_frames,
+                "dedup_ratio": round(self.duplicate_frames / self.frames_checked, 3) if self.frames_checked else 0.0,
+                **self.quality,
             }
 
     def reset(self) -> None:
@@ -290,6 +344,11 @@ class RealtimeStats:
         with self._lock:
             self.current_fps = 0.0
             self.dropped_frames = 0
+            self.tiles_total = 0
+            self.tiles_reused = 0
+            self.frames_checked = 0
+            self.duplicate_frames = 0
+            self.quality = {}
             self._timestamps.clear()
             self._durations.clear()
 
@@ -302,9 +361,64 @@ class ModelNotReadyError(ValueError):
     pass
 
 
-# Concurrency semaphore — created lazily in lifespan() to avoid
-# asyncio.Semaphore before event loop exists (breaks Python 3.10+)
-_upscale_semaphore: Optional[asyncio.Semaphore] = None
+# Inference admission: MAX_CONCURRENT_REQUESTS slots plus a bounded wait queue
+# ordered by priority class and deadline (see scheduler.py). The limit is set
+# from the env var in lifespan(); no asyncio objects are created before that.
+_scheduler = scheduler.Scheduler(4)
+# Moves _scheduler's limit with the measured latency (see concurrency_limit.py)
+_concurrency = concurrency_limit.AdaptiveLimit(4)
+
+
+def _on_slot_released(held_s: float, pixels: Optional[int], binding: bool) -> None:
+    if not concurrency_limit.ENABLED:
+        return
+    new_limit = _concurrency.observe(held_s, pixels, binding)
+    if new_limit is not None:
+        logger.info(f"Adaptive concurrency: limit {_scheduler.limit} -> {new_limit} "
+                    f"(latency x{_concurrency.last_ratio:.2f} of baseline)")
+        _scheduler.set_limit(new_limit)
+
+
+_scheduler.listener = _on_slot_released
+
+
+def _admission(request: Request, default_priority: str) -> tuple:
+    """(priority, absolute deadline or None) from X-Priority / X-Deadline-Ms.
+
+    X-Priority: realtime | interactive | batch (default per endpoint).
+    X-Deadline-Ms: how long the caller is prepared to wait for a slot.
+    """
+    priority = (request.headers.get("x-priority") or default_priority).strip().lower()
+    if priority not in scheduler.CLASSES:
+        raise HTTPException(status_code=400, detail=f"X-Priority must be one of: {', '.join(scheduler.CLASSES)}")
+    deadline = None
+    raw = request.headers.get("x-deadline-ms")
+    if raw:
+        try:
+            deadline_ms = int(raw)
+        except ValueError:
+            deadline_ms = -1
+        if deadline_ms <= 0 or deadline_ms > 3_600_000:
+            raise HTTPException(status_code=400, detail="X-Deadline-Ms must be 1-3600000")
+        deadline = time.monotonic() + deadline_ms / 1000.0
+    return priority, deadline
+
+
+async def _admit(admission: tuple, busy_status: int, measure: bool = True) -> scheduler.Ticket:
+    """Wait for an inference slot; busy_status (429/503) with Retry-After when not admitted."""
+    priority, deadline = admission
+    try:
+        return await _scheduler.acquire(priority, deadline, measure)
+    except scheduler.Rejected as e:
+        detail = "Busy" if busy_status == 503 else "Too many concurrent requests"
+        raise HTTPException(status_code=busy_status, detail=f"{detail} ({e.reason})",
+                            headers={"Retry-After": e.retry_after})
+
+
+def _inference_executor(ticket: scheduler.Ticket) -> executor_pools.WorkloadExecutor:
+    """Realtime-priority inference runs on the realtime pool, everything else on bulk."""
+    return _realtime_executor if ticket.priority == scheduler.REALTIME else _bulk_executor
+
 
 # Threading lock to prevent model-swap data races between load and inference
 _model_lock = threading.Lock()
@@ -348,16 +462,6 @@ def _invalidate_models_cache() -> None:
     global _models_cache_expiry
     _models_cache_expiry = 0.0
 
-# Bounded thread pool for CPU-bound upscaling work.
-# Using None in run_in_executor relies on the default pool which Python sizes to
-# min(32, cpu_count+4) — fine but uncontrolled. An explicit executor lets us cap
-# workers at MAX_CPU_WORKERS (default: cpu_count) so we don't over-subscribe the
-# CPU when multiple concurrent requests arrive simultaneously.
-_cpu_executor = ThreadPoolExecutor(
-    max_workers=int(os.getenv("MAX_CPU_WORKERS", str(os.cpu_count() or 4))),
-    thread_name_prefix="upscaler"
-)
-
 
 def _require_api_token(request: Request) -> None:
     """Authenticate a request via the X-Api-Token header.
@@ -406,8 +510,146 @@ def _safe_int_env(name: str, default: int, min_val: Optional[int] = None, max_va
 
 ONNX_TILE_SIZE = _safe_int_env("ONNX_TILE_SIZE", 512, min_val=64, max_val=2048)
 ONNX_TILE_SIZE_MULTIFRAME = _safe_int_env("ONNX_TILE_SIZE_MULTIFRAME", 256, min_val=64, max_val=1024)
+# Tile autotuner (POST /benchmark/tiles): use tuned tile/overlap/batch per model,
+# provider and resolution; TILE_AUTOTUNE_MAX_MB caps the peak memory of the chosen
+# setting (0 = fastest on the Pareto front), TILE_AUTOTUNE_BUDGET_S bounds a sweep.
+TILE_AUTOTUNE = os.getenv("TILE_AUTOTUNE", "true").lower() == "true"
+TILE_AUTOTUNE_MAX_MB = _safe_int_env("TILE_AUTOTUNE_MAX_MB", 0, min_val=0, max_val=262144)
+TILE_AUTOTUNE_BUDGET_S = _safe_int_env("TILE_AUTOTUNE_BUDGET_S", 300, min_val=0, max_val=86400)
+# Letterbox/pillarbox skipping on /upscale-frame, /upscale-stream and
+# /upscale-video-chunk: detected per stream, re-detected every
+# LETTERBOX_REDETECT_FRAMES frames (see letterbox.py)
+letterbox.ENABLED = os.getenv("LETTERBOX_DETECT", "true").lower() == "true"
+letterbox.THRESHOLD = _safe_int_env("LETTERBOX_THRESHOLD", 16, min_val=0, max_val=128)
+letterbox.REDETECT_FRAMES = _safe_int_env("LETTERBOX_REDETECT_FRAMES", 48, min_val=1, max_val=100000)
+# Frame dedup: a frame matching the stream's last inferred frame (anime on twos,
+# pauses, title cards) gets that frame's output again (see frame_dedup.py)
+frame_dedup.ENABLED = os.getenv("FRAME_DEDUP", "true").lower() == "true"
+try:
+    frame_dedup.MAX_MSE = max(0.0, min(100.0, float(os.getenv("FRAME_DEDUP_MAX_MSE", "1.0"))))
+except (ValueError, TypeError):
+    frame_dedup.MAX_MSE = 1.0
+# Realtime quality control: /upscale-stream trades resolution, model and finally
+# the model itself for keeping up with X-Target-FPS (see quality_ladder.py)
+quality_ladder.ENABLED = os.getenv("REALTIME_QUALITY_CONTROL", "true").lower() == "true"
+quality_ladder.REDUCED_SCALE = _safe_int_env("REALTIME_REDUCED_SCALE_PCT", 75, min_val=25, max_val=95) / 100.0
+# Requests waiting for an inference slot beyond MAX_CONCURRENT_REQUESTS (see scheduler.py)
+scheduler.MAX_QUEUE = _safe_int_env("SCHEDULER_MAX_QUEUE", 32, min_val=0, max_val=4096)
+# Adaptive concurrency: MAX_CONCURRENT_REQUESTS is the starting point, the limit
+# then follows latency against the no-load baseline (see concurrency_limit.py)
+concurrency_limit.ENABLED = os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+concurrency_limit.MIN_LIMIT = _safe_int_env("ADAPTIVE_CONCURRENCY_MIN", 1, min_val=1, max_val=256)
+concurrency_limit.MAX_LIMIT = _safe_int_env("ADAPTIVE_CONCURRENCY_MAX", 32, min_val=concurrency_limit.MIN_LIMIT, max_val=256)
+# Bounded thread pools for blocking work, one per workload so a 40 MP poster never
+# sits in front of a playback frame (see executor_pools.py). MAX_CPU_WORKERS
+# (default: cpu_count) sizes the realtime pool, bulk gets half of it by default;
+# bulk holds back up to BULK_YIELD_MS while realtime work is queued.
+_CPU_WORKERS = _safe_int_env("MAX_CPU_WORKERS", os.cpu_count() or 4, min_val=1, max_val=256)
+executor_pools.YIELD_S = _safe_int_env("BULK_YIELD_MS", 250, min_val=0, max_val=10000) / 1000.0
+_realtime_executor = executor_pools.WorkloadExecutor(
+    executor_pools.REALTIME, _safe_int_env("REALTIME_WORKERS", _CPU_WORKERS, min_val=1, max_val=256))
+_bulk_executor = executor_pools.WorkloadExecutor(
+    executor_pools.BULK, _safe_int_env("BULK_WORKERS", max(1, _CPU_WORKERS // 2), min_val=1, max_val=256),
+    yields_to=_realtime_executor)
+_aux_executor = executor_pools.WorkloadExecutor(
+    executor_pools.AUX, _safe_int_env("AUX_WORKERS", 2, min_val=1, max_val=64))
+_admin_executor = executor_pools.WorkloadExecutor(
+    executor_pools.ADMIN, _safe_int_env("ADMIN_WORKERS", 1, min_val=1, max_val=16))
+_executors = {e.name: e for e in (_realtime_executor, _bulk_executor, _aux_executor, _admin_executor)}
+# Multi-process inference: the active ONNX model also runs in INFERENCE_WORKERS child
+# processes fed through shared-memory slots (see inference_workers.py). 0 = in-process.
+inference_workers.WORKERS = _safe_int_env("INFERENCE_WORKERS", 0, min_val=0, max_val=32)
+inference_workers.SLOTS = _safe_int_env("INFERENCE_WORKER_SLOTS", 4, min_val=1, max_val=64)
+inference_workers.SLOT_BYTES = _safe_int_env("INFERENCE_WORKER_SLOT_MB", 64, min_val=1, max_val=4096) * 1024 * 1024
+inference_workers.TILE_SIZE = min(ONNX_TILE_SIZE, 512)  # as upscale_frame_realtime tiles
+# Started by load_model for the active ONNX model (_sync_inference_workers)
+_inference_pool: Optional[inference_workers.WorkerPool] = None
+# Shared-memory frame transport (/shm/*): raw frames in client-owned /dev/shm rings,
+# signalled over HTTP or the SHM_SOCKET Unix socket (see shm_transport.py). Opt-in.
+shm_transport.ENABLED = os.getenv("SHM_TRANSPORT", "false").lower() == "true"
+shm_transport.SOCKET_PATH = os.getenv("SHM_SOCKET", "").strip()
+shm_transport.MAX_RINGS = _safe_int_env("SHM_MAX_RINGS", 16, min_val=1, max_val=256)
+_shm_rings = shm_transport.Registry()
+_shm_server: Optional[asyncio.AbstractServer] = None
+
+# Tiles per session.run() in _run_onnx_tiled. "auto" picks per provider (see
+# _resolve_tile_batch_size); an integer forces that batch size everywhere.
+ONNX_TILE_BATCH = os.getenv("ONNX_TILE_BATCH", "auto").lower().strip()
+# Tile-plan LRU (see tile_plan.py): entry count and byte budget for the cached
+# grids + blend ramps. A plan is mostly its ramp: (tile * scale)^2 float32, 16 MB
+# for 512 px tiles at 4x, whatever the frame size.
+tile_plan.MAX_ENTRIES = _safe_int_env("TILE_PLAN_CACHE_SIZE", 8, min_val=0, max_val=256)
+tile_plan.MAX_BYTES = _safe_int_env("TILE_PLAN_CACHE_MB", 512, min_val=0, max_val=16384) * 1024 * 1024
+# Tile stitching: "blend" cross-fades overlaps in a float32 accumulator, "crop" keeps
+# each tile's centre and writes uint8 directly (no accumulator, no weight map).
+# "auto" switches to crop once the OUTPUT exceeds ONNX_CROP_STITCH_MPIX megapixels:
+# 4K in at 4x is 132 MP, i.e. ~1.6 GB for the float accumulator alone.
+_STITCH_MODES = ("auto", "blend", "crop")
+ONNX_STITCH_MODE = os.getenv("ONNX_STITCH_MODE", "auto").lower().strip()
+if ONNX_STITCH_MODE not in _STITCH_MODES:
+    logger.warning(f"Invalid ONNX_STITCH_MODE={ONNX_STITCH_MODE!r}, using auto")
+    ONNX_STITCH_MODE = "auto"
+ONNX_CROP_STITCH_MPIX = _safe_int_env("ONNX_CROP_STITCH_MPIX", 64, min_val=1, max_val=4096)
+# Tile pipeline: prepare tile k+1 and stitch tile k-1 on helper threads while tile k
+# infers. TILE_PIPELINE_DEPTH bounds the prepared/unstitched tiles held in flight.
+tile_pipeline.ENABLED = os.getenv("TILE_PIPELINE", "true").lower() == "true"
+tile_pipeline.DEPTH = _safe_int_env("TILE_PIPELINE_DEPTH", 2, min_val=1, max_val=8)
+# Adaptive tiles: tiles with almost no edges (sky, flat anime backgrounds) are
+# resized with cv2 instead of inferred (see flat_tiles.py)
+flat_tiles.ENABLED = os.getenv("ADAPTIVE_TILES", "false").lower() == "true"
+flat_tiles.EDGE_LEVEL = _safe_int_env("ADAPTIVE_TILES_EDGE_LEVEL", 10, min_val=1, max_val=255)
+flat_tiles.INTERPOLATION = os.getenv("ADAPTIVE_TILES_INTERPOLATION", "cubic").lower()
+if flat_tiles.INTERPOLATION not in ("cubic", "lanczos"):
+    logger.warning(f"Invalid ADAPTIVE_TILES_INTERPOLATION={flat_tiles.INTERPOLATION!r}, using cubic")
+    flat_tiles.INTERPOLATION = "cubic"
+# Temporal tiles: /upscale-stream re-infers only the tiles that changed since
+# their cached output was made (see temporal_tiles.py)
+temporal_tiles.ENABLED = os.getenv("TEMPORAL_TILES", "false").lower() == "true"
+temporal_tiles.TILE_SIZE = _safe_int_env("TEMPORAL_TILE_SIZE", 128, min_val=32, max_val=512)
+temporal_tiles.THRESHOLD = _safe_int_env("TEMPORAL_TILE_THRESHOLD", 6, min_val=0, max_val=64)
+temporal_tiles.REFRESH_FRAMES = _safe_int_env("TEMPORAL_TILE_REFRESH", 120, min_val=0, max_val=10000)
+# CPU session replicas: N copies of the upscaler session, each with its own intra-op
+# thread budget (0 = cpu_count / N), routed least-loaded. GPU sessions stay single.
+ONNX_SESSION_REPLICAS = _safe_int_env("ONNX_SESSION_REPLICAS", 1, min_val=1, max_val=64)
+ONNX_THREADS_PER_REPLICA = _safe_int_env("ONNX_THREADS_PER_REPLICA", 0, min_val=0, max_val=256)
+# SessionOptions profile for the upscaler session: auto | default | latency |
+# throughput | low-memory (see session_profiles.py). "auto" = auto-tune winner.
+ONNX_SESSION_PROFILE = os.getenv("ONNX_SESSION_PROFILE", "auto").lower().strip()
+if ONNX_SESSION_PROFILE not in session_profiles.CHOICES:
+    logger.warning(f"Invalid ONNX_SESSION_PROFILE={ONNX_SESSION_PROFILE!r}, using auto")
+    ONNX_SESSION_PROFILE = "auto"
+# Preallocated I/O-binding slots, reused per (session, tile shape) - see io_binding.py
+io_binding.ENABLED = os.getenv("IO_BINDING", "true").lower() == "true"
+io_binding.POOL_SLOTS = _safe_int_env("IO_BINDING_POOL_SLOTS", 2, min_val=1, max_val=16)
+io_binding.MAX_SHAPES = _safe_int_env("IO_BINDING_MAX_SHAPES", 8, min_val=1, max_val=64)
+# Resident model cache: keep up to MODEL_CACHE_MAX loaded upscalers within an
+# estimated MODEL_CACHE_MB of weights; switching between them skips the disk load.
+model_cache.BUDGET_BYTES = _safe_int_env("MODEL_CACHE_MB", 1024, min_val=0, max_val=262144) * 1024 * 1024
+model_cache.MAX_ENTRIES = _safe_int_env("MODEL_CACHE_MAX", 3, min_val=1, max_val=32)
+# Optimised-graph cache: sessions load a pre-optimised copy of the model from
+# CACHE_DIR/ort-graphs instead of re-running ORT_ENABLE_ALL (see graph_cache.py)
+graph_cache.ENABLED = os.getenv("GRAPH_CACHE", "true").lower() == "true"
+graph_cache.DIR = CACHE_DIR / "ort-graphs"
+graph_cache.BUDGET_BYTES = _safe_int_env("GRAPH_CACHE_MB", 2048, min_val=0, max_val=262144) * 1024 * 1024
+# Graph-embedded pre/post-processing: whole-frame paths feed uint8 BGR to a wrapped
+# copy of the model (CACHE_DIR/io-graphs) instead of converting on the host. Opt-in:
+# the wrapped session holds its own copy of the weights (see graph_io.py).
+graph_io.ENABLED = os.getenv("ONNX_GRAPH_IO", "false").lower() == "true"
+graph_io.DIR = CACHE_DIR / "io-graphs"
+# /upscale result cache: identical uploads (rescans, shared artwork) are served from
+# CACHE_DIR/results, LRU-bounded by RESULT_CACHE_MB (see result_cache.py)
+result_cache.ENABLED = os.getenv("RESULT_CACHE", "true").lower() == "true"
+result_cache.DIR = CACHE_DIR / "results"
+result_cache.BUDGET_BYTES = _safe_int_env("RESULT_CACHE_MB", 1024, min_val=0, max_val=262144) * 1024 * 1024
 MAX_UPLOAD_BYTES = _safe_int_env("MAX_UPLOAD_BYTES", 50 * 1024 * 1024, min_val=1024, max_val=500 * 1024 * 1024)
 MAX_IMAGE_PIXELS = 16000 * 16000  # ~256 MP — prevent OOM from decompression bombs
+# Band streaming for /upscale: inputs of at least UPSCALE_STREAM_MIN_MPIX megapixels
+# are upscaled UPSCALE_BAND_ROWS rows at a time and returned as a chunked PNG
+# (0 = never stream). UPSCALE_BAND_CONTEXT rows above/below each band hide the seams.
+UPSCALE_STREAM_MIN_MPIX = _safe_int_env("UPSCALE_STREAM_MIN_MPIX", 8, min_val=0, max_val=256)
+UPSCALE_BAND_ROWS = _safe_int_env("UPSCALE_BAND_ROWS", 256, min_val=16, max_val=4096)
+UPSCALE_BAND_CONTEXT = _safe_int_env("UPSCALE_BAND_CONTEXT", 32, min_val=0, max_val=512)
+png_stream.COMPRESSION_LEVEL = _safe_int_env("PNG_STREAM_COMPRESSION", 1, min_val=0, max_val=9)
 MAX_INPUT_FRAMES = 10  # Safety cap for multi-frame endpoints
 
 # FP16 mixed precision for ONNX inference.
@@ -444,6 +686,17 @@ try:
 except (ValueError, TypeError):
     GRAIN_READD_INTENSITY = 0.0
 
+# INT8 quantization (/models/quantize): a variant is registered only if its output
+# stays within these bounds of the FP32 model's (mean PSNR in dB, mean SSIM).
+try:
+    QUANTIZE_MIN_PSNR = max(0.0, min(100.0, float(os.getenv("QUANTIZE_MIN_PSNR", "32.0"))))
+except (ValueError, TypeError):
+    QUANTIZE_MIN_PSNR = 32.0
+try:
+    QUANTIZE_MIN_SSIM = max(0.0, min(1.0, float(os.getenv("QUANTIZE_MIN_SSIM", "0.95"))))
+except (ValueError, TypeError):
+    QUANTIZE_MIN_SSIM = 0.95
+
 # Custom model upload
 ENABLE_MODEL_UPLOAD = os.getenv("ENABLE_MODEL_UPLOAD", "true").lower() == "true"
 MAX_MODEL_UPLOAD_BYTES = _safe_int_env("MAX_MODEL_UPLOAD_BYTES", 500 * 1024 * 1024, 1024 * 1024, 2 * 1024 * 1024 * 1024)
@@ -1909,6 +2162,10 @@ async def lifespan(app: FastAPI):
     # Create directories
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    if ONNX_AVAILABLE:
+        pruned = graph_cache.prune(ort) + graph_io.prune()
+        if pruned:
+            logger.info(f"Graph cache: removed {pruned} stale optimised graph(s)")
 
     # Restore custom/imported models from their sidecar files (v1.8.3.7 —
     # previously they vanished from the catalog on every restart).
@@ -1944,10 +2201,14 @@ async def lifespan(app: FastAPI):
     except ValueError:
         logger.warning("Invalid GPU_DEVICE_ID env var, using default 0")
         state.gpu_device_id = 0
-
-    # Re-create semaphore with actual env var value (inside event loop)
-    global _upscale_semaphore, _benchmark_lock
-    _upscale_semaphore = asyncio.Semaphore(state.max_concurrent)
+    state.session_replicas = ONNX_SESSION_REPLICAS
+    state.session_profile = ONNX_SESSION_PROFILE
+
+    # Admission limit from the env var (the lock needs the running loop)
+    global _benchmark_lock
+    concurrency_limit.MAX_LIMIT = max(concurrency_limit.MAX_LIMIT, state.max_concurrent)
+    _concurrency.reset(state.max_concurrent, "MAX_CONCURRENT_REQUESTS")
+    _scheduler.set_limit(state.max_concurrent)
     _benchmark_lock = asyncio.Lock()
 
     # Track service uptime
@@ -1971,11 +2232,24 @@ async def lifespan(app: FastAPI):
     if default_model and AVAILABLE_MODELS.get(default_model, {}).get("available", True):
         await download_model(default_model)
         await load_model(default_model)
+
+    global _shm_server
+    if shm_transport.ENABLED and shm_transport.SOCKET_PATH:
+        try:
+            _shm_server = await shm_transport.serve_socket(shm_transport.SOCKET_PATH, _shm_frame)
+        except OSError as e:
+            logger.warning(f"Shared-memory frame socket unavailable ({shm_transport.SOCKET_PATH}): {e}")
     
     yield
 
     logger.info("Shutting down AI Upscaler Service...")
-    _cpu_executor.shutdown(wait=False)
+    if _shm_server is not None:
+        _shm_server.close()
+    _shm_rings.close_all()
+    if _inference_pool is not None:
+        _inference_pool.close()
+    for executor in _executors.values():
+        executor.shutdown(wait=False)
 
 
 app = FastAPI(
@@ -2037,6 +2311,126 @@ def get_model_path(model_name: str) -> Path:
     return path
 
 
+# ── Resident model cache (see model_cache.py) ────────────────────────────────
+_resident_models = model_cache.ModelCache()
+
+# Where the loaders publish a freshly loaded model: AppState (the active model)
+# unless a per-request load set a ResidentModel here, which leaves the active
+# model untouched.
+_model_load_target: contextvars.ContextVar = contextvars.ContextVar("model_load_target", default=None)
+
+# Per-thread model override for a request that named its model (see _with_model)
+_model_override = threading.local()
+
+# Serialises per-request background loads so two requests for the same cold
+# model load it once
+_resident_load_lock: Optional[asyncio.Lock] = None
+
+
+def _load_destination():
+    """Object the loaders write the new model into: state or a ResidentModel."""
+    target = _model_load_target.get()
+    return state if target is None else target
+
+
+def _active_model():
+    """Model the current thread should run on: a request's override, else state."""
+    return getattr(_model_override, "model", None) or state
+
+
+def _with_model(model, fn, *args):
+    """Run fn(*args) on this (executor) thread with `model` as the active model."""
+    if model is None:
+        return fn(*args)
+    previous = getattr(_model_override, "model", None)
+    _model_override.model = model
+    try:
+        return fn(*args)
+    finally:
+        _model_override.model = previous
+
+
+def _resident_nbytes(src) -> int:
+    """Estimated resident weight memory for a loaded model (file size per copy)."""
+    if src.current_model_type == "ncnn":
+        return 64 * 1024 * 1024  # bundled realsr/ncnn nets, ~17-67 MB on the device
+    path = src.onnx_model_path if src.current_model_type == "onnx" else None
+    if path is None and src.current_model:
+        path = get_model_path(src.current_model)
+    try:
+        size = os.path.getsize(path) if path else 0
+    except OSError:
+        size = 0
+    copies = len(src.onnx_session) if isinstance(src.onnx_session, session_pool.SessionPool) else 1
+    return size * copies
+
+
+def _remember_resident(src=None) -> None:
+    """Add the model in src (default: the active model) to the resident cache."""
+    with _model_lock:
+        src = state if src is None else src
+        if src.current_model is None:
+            return
+        entry = model_cache.ResidentModel.capture(src, state.use_gpu, state.gpu_device_id,
+                                                  _resident_nbytes(src))
+        active = state.current_model
+    evicted = _resident_models.put(entry, keep=[active] if active else [])
+    if evicted:
+        logger.info(f"Resident model cache: evicted {', '.join(evicted)} for {entry.name}")
+
+
+async def _resident_model(model_name: str) -> Optional[model_cache.ResidentModel]:
+    """Resolve a per-request model choice. None = use the active model.
+
+    A resident model is returned as is; otherwise the model is loaded from disk
+    into the cache without replacing the active one. Raises HTTPException for
+    unknown or not-downloaded models.
+    """
+    global _resident_load_lock
+    model_name = _resolve_model_key((model_name or "").strip())
+    if not model_name or model_name == state.current_model:
+        return None
+    entry = _resident_models.get(model_name, state.use_gpu, state.gpu_device_id)
+    if entry is not None:
+        return entry
+    info = AVAILABLE_MODELS.get(model_name)
+    if info is None or not info.get("available", True):
+        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+    if info.get("type", "pb") != "ncnn" and not get_model_path(model_name).exists():
+        raise HTTPException(status_code=400, detail=f"Model {model_name} is not downloaded")
+    if _resident_load_lock is None:
+        _resident_load_lock = asyncio.Lock()
+    async with _resident_load_lock:
+        entry = _resident_models.peek(model_name)
+        if entry is not None and (entry.use_gpu, entry.gpu_device_id) == (state.use_gpu, state.gpu_device_id):
+            return entry
+        target = model_cache.ResidentModel(model_name)
+        token = _model_load_target.set(target)
+        try:
+            ok = await load_model(model_name)
+        finally:
+            _model_load_target.reset(token)
+        if not ok or not target.loaded:
+            raise HTTPException(status_code=500, detail=f"Failed to load model {model_name}")
+    _invalidate_models_cache()
+    return target
+
+
+def _lighter_resident_model(model_name: Optional[str], scale: int) -> Optional[model_cache.ResidentModel]:
+    """Smallest resident ONNX/OpenCV model with this scale and fewer weight bytes than model_name.
+
+    The realtime quality ladder's "light" level; None when nothing lighter is resident.
+    """
+    current = _resident_models.peek(model_name) if model_name else None
+    if current is None or not current.nbytes:
+        return None
+    candidates = [e for e in (_resident_models.peek(n) for n in _resident_models.names())
+                  if e is not None and e.name != model_name and e.loaded and e.scale == scale
+                  and e.current_model_type in ("onnx", "opencv") and 0 < e.nbytes < current.nbytes
+                  and (e.use_gpu, e.gpu_device_id) == (state.use_gpu, state.gpu_device_id)]
+    return min(candidates, key=lambda e: e.nbytes, default=None)
+
+
 async def load_opencv_model(model_name: str, model_info: dict, model_path: Path) -> bool:
     """Load an OpenCV DNN Super Resolution model."""
     try:
@@ -2068,14 +2462,15 @@ async def load_opencv_model(model_name: str, model_info: dict, model_path: Path)
                 logger.info("No CUDA device available — using CPU backend for OpenCV DNN")
         
         with _model_lock:
-            state.cv_model = sr
-            state.cv_model_name = model_name
-            state.cv_model_scale = scale
-            state.current_model = model_name
-            state.current_model_type = "opencv"
+            dest = _load_destination()
+            dest.cv_model = sr
+            dest.cv_model_name = model_name
+            dest.cv_model_scale = scale
+            dest.current_model = model_name
+            dest.current_model_type = "opencv"
             # Clear competing backends to prevent stale references
-            state.onnx_session = None
-            state.ncnn_upscaler = None
+            dest.onnx_session = None
+            dest.ncnn_upscaler = None
             state.last_load_error = None
 
         state.model_last_used[model_name] = time.time()
@@ -2100,6 +2495,19 @@ async def load_model(model_name: str) -> bool:
         logger.error(f"Model {model_name} is not yet available")
         return False
     
+    target = _model_load_target.get()
+    if target is None:
+        # Already resident under the same GPU settings: activate without a disk load
+        entry = _resident_models.get(model_name, state.use_gpu, state.gpu_device_id)
+        if entry is not None:
+            with _model_lock:
+                entry.apply_to(state)
+                state.last_load_error = None
+            state.model_last_used[model_name] = time.time()
+            logger.info(f"Model {model_name} activated from the resident cache")
+            await _sync_inference_workers()
+            return True
+
     model_path = get_model_path(model_name)
     model_type = model_info.get("type", "pb")
 
@@ -2109,14 +2517,55 @@ async def load_model(model_name: str) -> bool:
         return False
 
     if model_type == "pb":
-        return await load_opencv_model(model_name, model_info, model_path)
+        ok = await load_opencv_model(model_name, model_info, model_path)
     elif model_type == "onnx":
-        return await load_onnx_model(model_name, model_info, model_path)
+        ok = await load_onnx_model(model_name, model_info, model_path)
     elif model_type == "ncnn":
-        return await load_ncnn_model(model_name, model_info, model_path)
+        ok = await load_ncnn_model(model_name, model_info, model_path)
     else:
         logger.error(f"Model type {model_type} not yet supported")
         return False
+    if ok:
+        _remember_resident(target)
+        if model_type == "onnx" and graph_io.ENABLED:
+            # Build the uint8-in/out companion now rather than on the first frame
+            src = target or state
+            await asyncio.get_running_loop().run_in_executor(
+                _admin_executor, _graph_io_session, src.onnx_session, src.onnx_model_path, src.onnx_model_name)
+        if target is None:
+            await _sync_inference_workers()
+    return ok
+
+
+async def _sync_inference_workers() -> None:
+    """Point the INFERENCE_WORKERS processes at the active model (none unless it is ONNX).
+
+    A pool that fails to come up is logged and inference stays in-process.
+    """
+    global _inference_pool
+    if not inference_workers.WORKERS:
+        return
+    with _model_lock:
+        model_path = state.onnx_model_path if state.current_model_type == "onnx" else None
+        scale = state.onnx_model_scale or 4
+        providers = list(state.providers or [])
+    old = _inference_pool
+    if old is not None and old.model_path == model_path:
+        return
+    _inference_pool = None
+    loop = asyncio.get_running_loop()
+    if old is not None:
+        await loop.run_in_executor(_admin_executor, old.close)
+    if model_path is None:
+        return
+    pool = inference_workers.WorkerPool(model_path, scale, providers)
+    try:
+        await loop.run_in_executor(_admin_executor, pool.start)
+    except inference_workers.WorkerCrashed as exc:
+        logger.warning(f"Inference workers unavailable, inferring in-process: {exc}")
+        return
+    _inference_pool = pool
+    logger.info(f"{inference_workers.WORKERS} inference worker(s) serving {Path(model_path).name}")
 
 
 async def load_ncnn_model(model_name: str, model_info: dict, model_path: Path) -> bool:
@@ -2155,18 +2604,19 @@ async def load_ncnn_model(model_name: str, model_info: dict, model_path: Path) -
             logger.info(f"ncnn-Vulkan: Loaded {model_name} via raw ncnn (GPU {gpu_id})")
 
         with _model_lock:
-            state.ncnn_upscaler = upscaler
-            state.ncnn_model_name = model_name
-            state.ncnn_model_scale = scale
-            state.ncnn_gpu_id = gpu_id
-            state.current_model = model_name
-            state.current_model_type = "ncnn"
-            state.current_model_input_frames = model_info.get("input_frames", 1)
-            state.onnx_model_scale = scale  # For compatibility with benchmark
-            state.providers = ["VulkanComputeProvider"]
+            dest = _load_destination()
+            dest.ncnn_upscaler = upscaler
+            dest.ncnn_model_name = model_name
+            dest.ncnn_model_scale = scale
+            dest.ncnn_gpu_id = gpu_id
+            dest.current_model = model_name
+            dest.current_model_type = "ncnn"
+            dest.current_model_input_frames = model_info.get("input_frames", 1)
+            dest.onnx_model_scale = scale  # For compatibility with benchmark
+            dest.providers = ["VulkanComputeProvider"]
             # Clear competing backends to prevent stale references
-            state.cv_model = None
-            state.onnx_session = None
+            dest.cv_model = None
+            dest.onnx_session = None
             state.last_load_error = None
 
         # Update model usage tracking
@@ -2183,8 +2633,9 @@ def upscale_with_ncnn(img: np.ndarray) -> np.ndarray:
     """Upscale image using ncnn-Vulkan backend.
     Uses RealSR wrapper (tile-based internally) or raw ncnn inference."""
     with _model_lock:
-        upscaler = state.ncnn_upscaler
-        scale = state.ncnn_model_scale
+        model = _active_model()
+        upscaler = model.ncnn_upscaler
+        scale = model.ncnn_model_scale
 
     if upscaler is None:
         raise ValueError("No ncnn model loaded")
@@ -2201,57 +2652,31 @@ def upscale_with_ncnn(img: np.ndarray) -> np.ndarray:
     else:
         # Raw ncnn — manual tile-based inference with weighted blending
         h, w = img.shape[:2]
-        tile_size = ONNX_TILE_SIZE
-        overlap = 32
-        step = tile_size - overlap
-        out_h, out_w = h * scale, w * scale
-        output = np.zeros((out_h, out_w, 3), dtype=np.float32)
-        weight = np.zeros((out_h, out_w, 3), dtype=np.float32)
-
-        def _ncnn_blend_weight(th: int, tw: int) -> np.ndarray:
-            wy = np.ones(th, dtype=np.float32)
-            wx = np.ones(tw, dtype=np.float32)
-            if overlap > 0:
-                ramp_len = min(overlap * scale, th // 2) if th > 1 else 0
-                if ramp_len > 0:
-                    ramp = np.linspace(0, 1, ramp_len + 1, dtype=np.float32)[1:]
-                    wy[:len(ramp)] = ramp
-                    wy[-len(ramp):] = ramp[::-1]
-                ramp_len_x = min(overlap * scale, tw // 2) if tw > 1 else 0
-                if ramp_len_x > 0:
-                    ramp_x = np.linspace(0, 1, ramp_len_x + 1, dtype=np.float32)[1:]
-                    wx[:len(ramp_x)] = ramp_x
-                    wx[-len(ramp_x):] = ramp_x[::-1]
-            return wy[:, None] * wx[None, :]
-
-        for y in range(0, h, step):
-            for x in range(0, w, step):
-                # Clamp tile to image boundaries
-                y_end = min(y + tile_size, h)
-                x_end = min(x + tile_size, w)
-                y_start = max(y_end - tile_size, 0)
-                x_start = max(x_end - tile_size, 0)
-                tile = img[y_start:y_end, x_start:x_end]
-                th, tw = tile.shape[:2]
-
-                # ncnn inference
-                mat_in = ncnn.Mat.from_pixels(tile, ncnn.Mat.PixelType.PIXEL_BGR, tw, th)
-                ex = upscaler.create_extractor()
-                ex.input("data", mat_in)
-                _, mat_out = ex.extract("output")
-                # ncnn outputs CHW planar layout — reshape to CHW then transpose to HWC
-                raw = np.array(mat_out)
-                result_tile = raw.reshape(3, th * scale, tw * scale).transpose(1, 2, 0).astype(np.float32)
-
-                oy, ox = y_start * scale, x_start * scale
-                oth, otw = th * scale, tw * scale
-                bw = _ncnn_blend_weight(oth, otw)[:, :, None]
-
-                output[oy:oy+oth, ox:ox+otw] += result_tile * bw
-                weight[oy:oy+oth, ox:ox+otw] += bw
-
-        weight = np.maximum(weight, 1e-8)
-        output = np.clip(output / weight, 0, 255).astype(np.uint8)
+        plan = tile_plan.get_plan(h, w, ONNX_TILE_SIZE, 32, scale)
+        output = plan.new_output()
+
+        def _prepare(tile):
+            tile_img = np.ascontiguousarray(img[tile.y0:tile.y1, tile.x0:tile.x1])
+            th, tw = tile_img.shape[:2]
+            return ncnn.Mat.from_pixels(tile_img, ncnn.Mat.PixelType.PIXEL_BGR, tw, th)
+
+        def _infer(tile, mat_in):
+            # ncnn inference
+            ex = upscaler.create_extractor()
+            ex.input("data", mat_in)
+            _, mat_out = ex.extract("output")
+            return mat_out
+
+        def _finish(tile, mat_out):
+            th, tw = tile.y1 - tile.y0, tile.x1 - tile.x0
+            # ncnn outputs CHW planar layout — reshape to CHW then transpose to HWC
+            raw = np.array(mat_out)
+            result_tile = raw.reshape(3, th * scale, tw * scale).transpose(1, 2, 0).astype(np.float32)
+            plan.accumulate(output, tile, result_tile)
+
+        tile_pipeline.run(plan.tiles, _prepare, _infer, _finish)
+
+        output = np.clip(plan.normalize(output), 0, 255).astype(np.uint8)
         return output
 
 
@@ -2302,6 +2727,183 @@ except Exception as e:
     return False
 
 
+def _hardware_fingerprint() -> str:
+    """Short id of this host for per-hardware tuning results (CPU, cores, GPU, ORT)."""
+    try:
+        providers = sorted(ort.get_available_providers()) if ONNX_AVAILABLE else []
+        ort_version = ort.__version__ if ONNX_AVAILABLE else ""
+    except Exception:
+        providers, ort_version = [], ""
+    ident = json.dumps([state.cpu_name, os.cpu_count(), state.gpu_name, state.use_gpu,
+                        ort_version, providers])
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()[:16]
+
+
+def _session_profile_for(model_name: Optional[str]) -> str:
+    model_default = AVAILABLE_MODELS.get(model_name, {}).get("session_profile") if model_name else None
+    return session_profiles.resolve(model_name, _hardware_fingerprint(), state.session_profile, model_default)
+
+
+def _session_options(model_name: Optional[str], intra_threads: Optional[int] = None,
+                     profile: Optional[str] = None) -> "ort.SessionOptions":
+    """SessionOptions for the upscaler session: full graph optimisation + its profile."""
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_profiles.apply(opts, profile or _session_profile_for(model_name), ort,
+                           os.cpu_count() or 4, intra_threads)
+    return opts
+
+
+def _partition_onnx_session(session, model_path, replicas: int, model_name: Optional[str] = None,
+                            rebuild: bool = False, profile: Optional[str] = None):
+    """Return `session` as-is, or a SessionPool of `replicas` CPU copies of the model.
+
+    Only CPU-only sessions are replicated - on a GPU every replica would hold its
+    own copy of the weights and workspace in VRAM for no gain. With replicas == 1
+    an existing pool is collapsed back to one session using all cores. rebuild
+    forces fresh sessions even when nothing changes shape (new SessionOptions).
+    """
+    base = session.replicas[0] if isinstance(session, session_pool.SessionPool) else session
+    try:
+        cpu_only = base.get_providers() == ["CPUExecutionProvider"]
+    except Exception:
+        cpu_only = False
+    if not cpu_only or model_path is None:
+        if replicas > 1:
+            logger.info("Session replicas only apply to CPU inference; keeping a single session")
+        return base
+    if replicas <= 1 and not rebuild and not isinstance(session, session_pool.SessionPool):
+        return session
+    threads = session_pool.split_threads(os.cpu_count() or 4, replicas, ONNX_THREADS_PER_REPLICA)
+    built = []
+    for _ in range(replicas):
+        opts = _session_options(model_name, threads if replicas > 1 else None, profile)
+        if replicas > 1:
+            # Parallelism comes from the replicas, not from inter-op threads
+            opts.inter_op_num_threads = 1
+            opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        built.append(graph_cache.session(ort, model_path, opts, ["CPUExecutionProvider"]))
+    if replicas == 1:
+        return built[0]
+    logger.info(f"ONNX session pool: {replicas} CPU replicas x {threads} intra-op threads")
+    return session_pool.SessionPool(built, threads)
+
+
+def _rebuild_onnx_session(session, model_path, model_name: Optional[str], profile: Optional[str] = None):
+    """Fresh session(s) for the same model and providers with current options.
+
+    Used when the SessionOptions profile or the replica count changes at runtime.
+    CPU sessions go through _partition_onnx_session; GPU sessions are rebuilt with
+    the providers (and provider options) they are already running on.
+    """
+    base = session.replicas[0] if isinstance(session, session_pool.SessionPool) else session
+    providers = base.get_providers()
+    if providers == ["CPUExecutionProvider"]:
+        return _partition_onnx_session(base, model_path, state.session_replicas, model_name,
+                                       rebuild=True, profile=profile)
+    provider_options = base.get_provider_options()
+    return graph_cache.session(ort, model_path, _session_options(model_name, profile=profile), providers,
+                               [provider_options.get(p, {}) for p in providers])
+
+
+def _swap_onnx_session(expected, replacement) -> bool:
+    """Install `replacement` unless a model load replaced `expected` meanwhile."""
+    with _model_lock:
+        if state.onnx_session is not expected:
+            return False
+        state.onnx_session = replacement
+        io_binding.forget(expected)
+        state.providers = replacement.get_providers()
+    _remember_resident()  # keep the resident entry on the new session
+    return True
+
+
+# Upscaler session -> its graph_io companion (same providers and options, uint8 BGR
+# in/out), or None for a model graph_io cannot wrap. Weak so the companion goes
+# with its session on unload / rebuild.
+_graph_io_sessions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_graph_io_lock = threading.Lock()
+
+
+def _graph_io_session(session, model_path, model_name: Optional[str] = None):
+    """The graph_io companion of an upscaler session (built on first use), or None."""
+    if not graph_io.ENABLED or session is None or model_path is None:
+        return None
+    companion = _graph_io_sessions.get(session, False)
+    if companion is not False:
+        return companion
+    with _graph_io_lock:
+        companion = _graph_io_sessions.get(session, False)
+        if companion is not False:
+            return companion
+        companion = None
+        path = graph_io.wrapped(model_path)
+        if path is not None:
+            try:
+                companion = _rebuild_onnx_session(session, path, model_name)
+            except Exception as e:
+                logger.warning(f"Graph I/O session for {model_name or model_path} failed, converting on the host: {e}")
+        _graph_io_sessions[session] = companion
+    return companion
+
+
+def _run_graph_io(io_session, frames: np.ndarray) -> np.ndarray:
+    """uint8 BGR ([N,] H, W, 3) in, uint8 BGR out through a graph_io companion."""
+    batch = frames[None] if frames.ndim == 3 else frames
+    out = io_session.run([graph_io.OUTPUT], {graph_io.INPUT: np.ascontiguousarray(batch)})[0]
+    return out[0] if frames.ndim == 3 else out
+
+
+def autotune_session_profile() -> dict:
+    """Benchmark every candidate profile on the loaded ONNX model; keep the fastest.
+
+    Each candidate is built with the providers the model runs on now, installed,
+    and measured with run_benchmark. The winner is saved for this model and
+    hardware fingerprint (used while the global profile is "auto") and the model
+    is left running on the session that the normal resolution order picks.
+    """
+    with _model_lock:
+        original = state.onnx_session
+        model_path, model_name = state.onnx_model_path, state.onnx_model_name
+        if state.current_model_type != "onnx" or original is None or model_path is None:
+            return {"error": "No ONNX model loaded"}
+    results: dict = {}
+    current = original
+    try:
+        for profile in session_profiles.CANDIDATES:
+            candidate = _rebuild_onnx_session(original, model_path, model_name, profile=profile)
+            if not _swap_onnx_session(current, candidate):
+                return {"error": "Model changed during auto-tune"}
+            current = candidate
+            bench = run_benchmark(256)
+            if "error" in bench:
+                logger.warning(f"Session profile {profile} failed to benchmark: {bench['error']}")
+                continue
+            results[profile] = bench["avg_time_ms"]
+    except Exception as e:
+        logger.error(f"Session profile auto-tune failed: {e}")
+        _swap_onnx_session(current, original)
+        return {"error": f"Auto-tune failed: {e}"}
+    if not results:
+        _swap_onnx_session(current, original)
+        return {"error": "No profile could be benchmarked"}
+
+    winner = min(results, key=results.get)
+    fingerprint = _hardware_fingerprint()
+    session_profiles.save_tuned(model_name, fingerprint, winner, results)
+    effective = _session_profile_for(model_name)
+    if not _swap_onnx_session(current, _rebuild_onnx_session(original, model_path, model_name)):
+        return {"error": "Model changed during auto-tune"}
+    logger.info(f"Session profile auto-tune for {model_name}: {results} -> {winner} (active: {effective})")
+    return {
+        "model": model_name,
+        "fingerprint": fingerprint,
+        "results_ms": results,
+        "winner": winner,
+        "active_profile": effective,
+    }
+
+
 async def load_onnx_model(model_name: str, model_info: dict, model_path: Path) -> bool:
     """Load an ONNX model (Real-ESRGAN) into memory with robust GPU fallback.
 
@@ -2328,17 +2930,20 @@ async def load_onnx_model(model_name: str, model_info: dict, model_path: Path) -
             providers = [p.strip() for p in override_providers.split(",")]
             logger.info(f"Using override providers: {providers}")
             try:
-                session = ort.InferenceSession(str(model_path), providers=providers)
+                session = graph_cache.session(ort, model_path, _session_options(model_name), providers)
+                session = _partition_onnx_session(session, model_path, state.session_replicas, model_name)
                 with _model_lock:
-                    state.onnx_session = session
-                    state.current_model = model_name
-                    state.current_model_type = "onnx"
-                    state.onnx_model_scale = model_info.get("scale", 4)
-                    state.current_model_input_frames = model_info.get("input_frames", 1)
-                    state.onnx_model_name = model_name
-                    state.cv_model = None
-                    state.providers = session.get_providers()
-                logger.info(f"ONNX model {model_name} loaded with override providers: {state.providers}")
+                    dest = _load_destination()
+                    dest.onnx_session = session
+                    dest.onnx_model_path = str(model_path)
+                    dest.current_model = model_name
+                    dest.current_model_type = "onnx"
+                    dest.onnx_model_scale = model_info.get("scale", 4)
+                    dest.current_model_input_frames = model_info.get("input_frames", 1)
+                    dest.onnx_model_name = model_name
+                    dest.cv_model = None
+                    dest.providers = session.get_providers()
+                logger.info(f"ONNX model {model_name} loaded with override providers: {dest.providers}")
                 return True
             except Exception as e:
                 logger.warning(f"Override providers failed: {e}, falling back to auto-detection")
@@ -2387,16 +2992,17 @@ async def load_onnx_model(model_name: str, model_info: dict, model_path: Path) -
                         if "CoreMLExecutionProvider" in active:
                             logger.info("CoreML provider active — using Apple Neural Engine")
                             with _model_lock:
-                                state.onnx_session = session
-                                state.current_model = model_name
-                                state.current_model_type = "onnx"
-                                state.onnx_model_scale = model_info.get("scale", 4)
-                                state.current_model_input_frames = model_info.get("input_frames", 1)
-                                state.onnx_model_name = model_name
+                                dest = _load_destination()
+                                dest.onnx_session = session
+                                dest.current_model = model_name
+                                dest.current_model_type = "onnx"
+                                dest.onnx_model_scale = model_info.get("scale", 4)
+                                dest.current_model_input_frames = model_info.get("input_frames", 1)
+                                dest.onnx_model_name = model_name
                                 state.use_gpu = True
                                 state.gpu_name = f"Apple Neural Engine ({platform.processor() or 'Apple Silicon'})"
-                                state.cv_model = None
-                                state.providers = active
+                                dest.cv_model = None
+                                dest.providers = active
                             logger.info(f"ONNX model {model_name} loaded with CoreML: {active}")
                             return True
                     except Exception as e:
@@ -2424,13 +3030,10 @@ async def load_onnx_model(model_name: str, model_info: dict, model_path: Path) -
             try:
                 logger.info(f"Trying chain {chain_idx + 1}/{len(provider_chains)}: {chain_name} ({providers})")
 
-                chain_sess_options = ort.SessionOptions()
-                chain_sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                chain_sess_options = _session_options(model_name)
 
-                session = ort.InferenceSession(
-                    str(model_path), chain_sess_options,
-                    providers=providers, provider_options=provider_options
-                )
+                session = graph_cache.session(ort, model_path, chain_sess_options,
+                                              providers, provider_options)
 
                 actual_providers = session.get_providers()
                 logger.info(f"Session created with providers: {actual_providers}")
@@ -2508,8 +3111,7 @@ async def load_onnx_model(model_name: str, model_info: dict, model_path: Path) -
             if trt_ok:
                 logger.info("TensorRT probe succeeded — reloading with TensorRT...")
                 try:
-                    trt_opts = ort.SessionOptions()
-                    trt_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                    trt_opts = _session_options(model_name)
                     trt_session = ort.InferenceSession(
                         str(model_path), trt_opts,
                         providers=['TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider'],
@@ -2531,29 +3133,37 @@ async def load_onnx_model(model_name: str, model_info: dict, model_path: Path) -
             else:
                 logger.info("TensorRT probe failed — keeping CUDA (no context poisoning)")
 
+        try:
+            session = _partition_onnx_session(session, model_path, state.session_replicas, model_name)
+        except Exception as pool_err:
+            logger.warning(f"Could not build session replicas (keeping one session): {pool_err}")
+
         with _model_lock:
+            dest = _load_destination()
             # Release old ONNX session before replacing to free GPU memory
-            old_session = state.onnx_session
-            state.onnx_session = session
-            state.onnx_model_name = model_name
-            state.onnx_model_scale = scale
-            state.current_model_input_frames = model_info.get("input_frames", 1)
-            state.current_model = model_name
-            state.current_model_type = "onnx"
+            old_session = dest.onnx_session
+            dest.onnx_session = session
+            dest.onnx_model_path = str(model_path)
+            dest.onnx_model_name = model_name
+            dest.onnx_model_scale = scale
+            dest.current_model_input_frames = model_info.get("input_frames", 1)
+            dest.current_model = model_name
+            dest.current_model_type = "onnx"
             # Clear competing backends to prevent stale references
-            state.cv_model = None
-            state.ncnn_upscaler = None
+            dest.cv_model = None
+            dest.ncnn_upscaler = None
             state.last_load_error = None
             # Update providers list inside lock for thread safety
-            state.providers = session.get_providers()
+            dest.providers = session.get_providers()
             if openvino_cpu_fallback:
                 state.use_gpu = False
         # Explicitly free old session outside lock to avoid holding it during GC
         if old_session is not None and old_session is not session:
+            io_binding.forget(old_session)
             del old_session
 
         state.model_last_used[model_name] = time.time()
-        logger.info(f"ONNX model {model_name} loaded successfully with: {state.providers}")
+        logger.info(f"ONNX model {model_name} loaded successfully with: {dest.providers}")
 
         return True
 
@@ -2693,18 +3303,8 @@ async def download_model(model_name: str, progress_cb=None) -> bool:
             return False
 
 
-def upscale_image(image_bytes: bytes) -> bytes:
-    """Upscale an image using the loaded model (OpenCV or ONNX)."""
-    # Snapshot model state under lock for thread-safe dispatch
-    with _model_lock:
-        model_type = state.current_model_type
-        cv_model = state.cv_model
-        has_onnx = state.onnx_session is not None
-        has_ncnn = state.ncnn_upscaler is not None
-        if state.current_model is None:
-            raise ModelNotReadyError("No model loaded")
-
-    # Decode image
+def _decode_upload_image(image_bytes: bytes) -> np.ndarray:
+    """Decode an uploaded image to BGR uint8, enforcing MAX_IMAGE_PIXELS."""
     nparr = np.frombuffer(image_bytes, np.uint8)
     img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
@@ -2714,24 +3314,92 @@ def upscale_image(image_bytes: bytes) -> bytes:
     h, w = img.shape[:2]
     if h * w > MAX_IMAGE_PIXELS:
         raise ValueError(f"Image too large: {w}x{h} ({h*w} pixels). Maximum: {MAX_IMAGE_PIXELS} pixels")
+    return img
+
+
+def _upscale_decoded(img: np.ndarray, stitch: Optional[str] = None) -> np.ndarray:
+    """Dispatch a decoded BGR image to the loaded backend. Returns BGR uint8."""
+    # Snapshot model state under lock for thread-safe dispatch
+    with _model_lock:
+        model = _active_model()
+        model_type = model.current_model_type
+        cv_model = model.cv_model
+        has_onnx = model.onnx_session is not None
+        has_ncnn = model.ncnn_upscaler is not None
+        if model.current_model is None:
+            raise ModelNotReadyError("No model loaded")
 
     if model_type == "opencv" and cv_model is not None:
         # Upscale using OpenCV DNN Super Resolution
-        result = cv_model.upsample(img)
+        return cv_model.upsample(img)
     elif model_type == "onnx" and has_onnx:
         # Upscale using ONNX Runtime (Real-ESRGAN)
-        result = upscale_with_onnx(img)
+        return upscale_with_onnx(img, stitch)
     elif model_type == "ncnn" and has_ncnn:
         # Upscale using ncnn-Vulkan
-        result = upscale_with_ncnn(img)
-    else:
+        return upscale_with_ncnn(img)
+    raise ModelNotReadyError("No model loaded")
+
+
+def upscale_image(image_bytes: bytes, stitch: Optional[str] = None) -> bytes:
+    """Upscale an image using the loaded model (OpenCV or ONNX).
+
+    stitch is forwarded to upscale_with_onnx (tile join mode); other backends ignore it.
+    """
+    if state.current_model is None:
         raise ModelNotReadyError("No model loaded")
+    return _upscale_to_png(_decode_upload_image(image_bytes), stitch)
+
+
+def _upscale_to_png(img: np.ndarray, stitch: Optional[str] = None) -> bytes:
+    result = _upscale_decoded(img, stitch)
 
     # Encode as PNG
     _, buffer = cv2.imencode('.png', result)
     return buffer.tobytes()
 
 
+def _with_tile_stats(fn, *args):
+    """Run fn(*args) on the current (executor) thread; return (result, tile stats or None).
+
+    The tile pipeline records per thread, so this has to run inside the same
+    run_in_executor call as the upscale itself.
+    """
+    tile_pipeline.begin()
+    try:
+        result = fn(*args)
+    finally:
+        stats = tile_pipeline.take()
+    return result, stats
+
+
+def iter_upscaled_png(img: np.ndarray, stitch: Optional[str] = None):
+    """Upscale a decoded BGR image in horizontal bands, yielding PNG bytes as it goes.
+
+    Each band of UPSCALE_BAND_ROWS input rows is upscaled together with
+    UPSCALE_BAND_CONTEXT rows of context above and below (the same job the tile
+    overlap does), then only the band's own output rows are kept and handed to the
+    incremental PNG encoder. Peak memory is one upscaled band instead of the full
+    output frame plus its encoded copy, and the first bytes are ready after one band.
+    """
+    h = img.shape[0]
+    writer = None
+    for y0 in range(0, h, UPSCALE_BAND_ROWS):
+        y1 = min(y0 + UPSCALE_BAND_ROWS, h)
+        a, b = max(y0 - UPSCALE_BAND_CONTEXT, 0), min(y1 + UPSCALE_BAND_CONTEXT, h)
+        out = _upscale_decoded(img[a:b], stitch)
+        scale = max(round(out.shape[0] / (b - a)), 1)
+        rows = cv2.cvtColor(out[(y0 - a) * scale:(y1 - a) * scale], cv2.COLOR_BGR2RGB)
+        del out
+        if writer is None:
+            # The size is only known once the backend reported its scale
+            writer = png_stream.PngStreamWriter(rows.shape[1], h * scale)
+            yield writer.header() + writer.add_rows(rows)
+        else:
+            yield writer.add_rows(rows[:, :writer.width])
+    yield writer.finish()
+
+
 def tonemap_hdr_to_sdr(frame_16bit: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
     """PQ (ST.2084) tone-map 16-bit HDR frame to 8-bit SDR for AI processing.
     Returns (sdr_frame_8bit, luminance_map) where luminance_map preserves HDR info."""
@@ -2861,18 +3529,151 @@ def upscale_image_hdr(image_bytes: bytes) -> bytes:
 
 def _onnx_infer_tile(img_rgb_float: np.ndarray, session, input_name: str, output_name: str) -> np.ndarray:
     """Run ONNX inference on a single tile (HWC float32 [0,1] RGB). Returns HWC float32 RGB."""
-    img_nchw = np.transpose(img_rgb_float, (2, 0, 1))  # HWC to CHW
-    img_batch = np.expand_dims(img_nchw, axis=0)  # Add batch dimension
+    h, w = img_rgb_float.shape[:2]
     # FP16 only when both globally enabled AND the loaded model expects float16 (issue #67)
     use_fp16 = state.use_fp16 and _session_input_is_fp16(session)
+    with io_binding.lease(session, input_name, output_name, (1, 3, h, w),
+                          np.float16 if use_fp16 else np.float32) as slot:
+        # HWC -> NCHW (and fp16 cast) straight into the reused input buffer
+        np.copyto(slot.input[0], np.transpose(img_rgb_float, (2, 0, 1)), casting="unsafe")
+        result = slot.run()
+        # CHW -> HWC copy out of the pooled output before the lease ends
+        return np.ascontiguousarray(np.transpose(result[0], (1, 2, 0)), dtype=np.float32)
+
+
+def _onnx_prepare_batch(tiles: list, use_fp16: bool) -> np.ndarray:
+    """Stack N same-shaped HWC float32 RGB tiles into the model's NCHW input tensor."""
+    batch = np.stack(tiles, axis=0)                      # (N, H, W, 3)
+    batch = np.ascontiguousarray(np.transpose(batch, (0, 3, 1, 2)))  # (N, 3, H, W)
     if use_fp16:
-        img_batch = img_batch.astype(np.float16)
-    result = session.run([output_name], {input_name: img_batch})[0]
+        batch = batch.astype(np.float16)
+    return batch
+
+
+def _onnx_run_batch(batch: np.ndarray, session, input_name: str, output_name: str,
+                    use_fp16: bool) -> np.ndarray:
+    """One session.run on a prepared NCHW batch. Returns an (N, H*s, W*s, 3) float32 view."""
+    result = session.run([output_name], {input_name: batch})[0]
     if use_fp16:
         result = result.astype(np.float32)
-    result = np.squeeze(result, axis=0)
-    result = np.transpose(result, (1, 2, 0))  # CHW to HWC
-    return result
+    return np.transpose(result, (0, 2, 3, 1))            # (N, H*s, W*s, 3)
+
+
+# Sessions whose graph turned out to reject batch > 1 at run time (a Reshape with
+# a hard-coded 1, typically). Remembered so every later request goes straight to
+# batch 1 instead of failing the batched call first. Weak so an unloaded model
+# does not stay pinned in memory by this set.
+_batch_unsupported_sessions: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _session_accepts_batches(session) -> bool:
+    """False for a pinned batch dimension or a graph that already refused a batch."""
+    if session in _batch_unsupported_sessions:
+        return False
+    try:
+        batch_dim = session.get_inputs()[0].shape[0]
+    except (IndexError, AttributeError, TypeError):
+        return False
+    return not (isinstance(batch_dim, int) and batch_dim > 0)
+
+
+def _resolve_tile_batch_size(session) -> int:
+    """Tiles per session.run() for this session.
+
+    A model exported with a fixed batch dimension gets 1 - feeding it anything
+    else is an INVALID_ARGUMENT. Otherwise ONNX_TILE_BATCH decides: an integer is
+    used as-is (clamped to 1-16), "auto" picks by provider. On CPU per-call overhead
+    and poor intra-op thread use dominate small tiles, so 4 tiles per call is a
+    clear win; CUDA-class GPUs already saturate on one tile and mostly gain launch
+    overhead back, so 2 keeps VRAM headroom; everything else stays at 1.
+    """
+    if not _session_accepts_batches(session):
+        return 1
+    if ONNX_TILE_BATCH != "auto":
+        try:
+            return max(1, min(16, int(ONNX_TILE_BATCH)))
+        except ValueError:
+            logger.warning(f"Invalid ONNX_TILE_BATCH={ONNX_TILE_BATCH!r}, using auto")
+    try:
+        active = session.get_providers()
+    except Exception:
+        active = []
+    if any(p in ("CUDAExecutionProvider", "TensorrtExecutionProvider",
+                 "ROCMExecutionProvider", "MIGraphXExecutionProvider") for p in active):
+        return 2
+    if not active or active == ["CPUExecutionProvider"] or "OpenVINOExecutionProvider" in active:
+        return 4
+    return 1
+
+
+def _infer_frame_batch(key: tuple, frames: list) -> list:
+    """Micro-batcher callback: upscale same-shaped BGR frames in one session.run.
+
+    A batch of one goes through upscale_with_onnx unchanged. A batch the graph
+    refuses (or one that runs out of memory) is retried frame by frame through the
+    same path, which brings its own OOM handling.
+    """
+    session, model = key[0], key[-1]
+    if len(frames) == 1:
+        return [_with_model(model, upscale_with_onnx, frames[0])]
+    source = model or state
+    io_session = _graph_io_session(session, source.onnx_model_path, source.onnx_model_name)
+    if io_session is not None:
+        try:
+            return list(_run_graph_io(io_session, np.stack(frames)))
+        except Exception as exc:
+            if not _is_cuda_oom(exc):
+                logger.warning(f"Batched frame inference failed ({exc}); serving frames one at a time for this model")
+                _batch_unsupported_sessions.add(session)
+            return [_with_model(model, upscale_with_onnx, f) for f in frames]
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    use_fp16 = state.use_fp16 and _session_input_is_fp16(session)
+    try:
+        batch = _onnx_prepare_batch(
+            [cv2.cvtColor(f, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0 for f in frames], use_fp16)
+        results = _onnx_run_batch(batch, session, input_name, output_name, use_fp16)
+    except Exception as exc:
+        if not _is_cuda_oom(exc):
+            logger.warning(f"Batched frame inference failed ({exc}); serving frames one at a time for this model")
+            _batch_unsupported_sessions.add(session)
+        return [_with_model(model, upscale_with_onnx, f) for f in frames]
+    out = []
+    for res in results:
+        res = _to_uint8(res)
+        out.append(cv2.cvtColor(res, cv2.COLOR_RGB2BGR, dst=res))
+    return out
+
+
+def _frame_batch_key(img: np.ndarray, model=None) -> Optional[tuple]:
+    """Batching key for an /upscale-frame request, or None to run it on its own.
+
+    Only ONNX frames small enough for the untiled path (<= ONNX_TILE_SIZE on both
+    sides) on a session that takes a dynamic batch can share a tensor. model is
+    the request's resident model (None = the active one); it rides in the key so
+    the single-frame fallback runs on the same model.
+    """
+    if not _frame_batcher.enabled:
+        return None
+    with _model_lock:
+        source = model or state
+        session = source.onnx_session
+        if source.current_model_type != "onnx" or session is None:
+            return None
+    h, w = img.shape[:2]
+    if h > ONNX_TILE_SIZE or w > ONNX_TILE_SIZE or not _session_accepts_batches(session):
+        return None
+    return (session, h, w, model)
+
+
+# Cross-request micro-batcher for /upscale-frame (see micro_batch.py). A window of
+# 0 disables it; the window only applies while other requests are in flight.
+_frame_batcher = micro_batch.MicroBatcher(
+    _infer_frame_batch,
+    window_ms=_safe_int_env("MICRO_BATCH_WINDOW_MS", 4, min_val=0, max_val=100),
+    max_batch=_safe_int_env("MICRO_BATCH_MAX", 8, min_val=1, max_val=32),
+    executor=_realtime_executor,
+)
 
 
 def _onnx_infer_multiframe_tile(tiles: list, session, input_name: str, output_name: str, num_frames: int) -> np.ndarray:
@@ -2904,120 +3705,263 @@ def _is_cuda_oom(exc: Exception) -> bool:
     return "out of memory" in msg or "cuda" in msg and ("oom" in msg or "alloc" in msg)
 
 
+def _resolve_stitch_mode(requested: Optional[str], out_pixels: int) -> str:
+    """Pick "blend" or "crop" for one request: explicit request > env > auto size rule."""
+    mode = (requested or ONNX_STITCH_MODE).lower()
+    if mode not in _STITCH_MODES:
+        raise ValueError(f"Invalid stitch mode {requested!r} (expected one of {', '.join(_STITCH_MODES)})")
+    if mode == "auto":
+        return "crop" if out_pixels > ONNX_CROP_STITCH_MPIX * 1_000_000 else "blend"
+    return mode
+
+
+def _to_uint8(img_float: np.ndarray) -> np.ndarray:
+    """[0,1] float -> uint8 [0,255], the same rounding the blend path applies."""
+    return np.clip(img_float * 255.0, 0, 255).astype(np.uint8, order="C")
+
+
 def _run_onnx_tiled(img_rgb: np.ndarray, tile_size: int, overlap: int,
-                     session, input_name: str, output_name: str, scale: int) -> np.ndarray:
-    """Run tile-based ONNX upscaling with the given tile size. Returns float32 RGB output."""
+                     session, input_name: str, output_name: str, scale: int,
+                     batch_size: int = 1, stitch: str = "blend",
+                     source_u8: Optional[np.ndarray] = None) -> np.ndarray:
+    """Run tile-based ONNX upscaling with the given tile size.
+
+    Returns float32 RGB output for stitch="blend" and uint8 RGB for stitch="crop"
+    (see tile_plan.py for the trade-off).
+
+    With batch_size > 1, consecutive tiles of the same shape are stacked into one
+    N x 3 x H x W tensor and inferred in a single session.run call. The grid and
+    the blend normalisation come from the cached tile plan for this geometry.
+    Tile preparation and stitching run on tile_pipeline helper threads, overlapped
+    with inference on this thread.
+
+    source_u8 is the uint8 frame img_rgb was made from; with ADAPTIVE_TILES on, its
+    flat tiles are interpolated instead of inferred (flat_tiles.py).
+    """
     h, w = img_rgb.shape[:2]
+    crop = stitch == "crop"
 
     # Small image: skip tiling, process directly
     if w <= tile_size and h <= tile_size:
-        return _onnx_infer_tile(img_rgb, session, input_name, output_name)
+        result = _onnx_infer_tile(img_rgb, session, input_name, output_name)
+        return _to_uint8(result[:h * scale, :w * scale]) if crop else result
 
     # Tile-based processing for large images
-    step = tile_size - overlap
-    out_h, out_w = h * scale, w * scale
-    output = np.zeros((out_h, out_w, 3), dtype=np.float32)
-    weight = np.zeros((out_h, out_w, 3), dtype=np.float32)
-
-    # Build a per-tile blending mask (linear ramp on overlap borders)
-    def _make_blend_weight(th: int, tw: int) -> np.ndarray:
-        """Create a 2D blending weight array that tapers at edges for seamless stitching."""
-        wy = np.ones(th, dtype=np.float32)
-        wx = np.ones(tw, dtype=np.float32)
-        if overlap > 0:
-            # Clamp ramp length to prevent negative index wrap on tiles smaller than overlap
-            ramp_y = min(overlap, th // 2) if th > 1 else 0
-            ramp_x = min(overlap, tw // 2) if tw > 1 else 0
-            if ramp_y > 0:
-                ramp = np.linspace(0, 1, ramp_y + 1, dtype=np.float32)[1:]
-                wy[:ramp_y] = ramp
-                wy[-ramp_y:] = ramp[::-1]
-            if ramp_x > 0:
-                ramp = np.linspace(0, 1, ramp_x + 1, dtype=np.float32)[1:]
-                wx[:ramp_x] = ramp
-                wx[-ramp_x:] = ramp[::-1]
-        return wy[:, None] * wx[None, :]  # (th, tw)
-
-    for y in range(0, h, step):
-        for x in range(0, w, step):
-            # Clamp tile to image boundaries
-            y_end = min(y + tile_size, h)
-            x_end = min(x + tile_size, w)
-            y_start = max(y_end - tile_size, 0)
-            x_start = max(x_end - tile_size, 0)
-
-            tile = img_rgb[y_start:y_end, x_start:x_end]
-
-            # Inference using captured session (no lock needed — snapshot is consistent)
-            out_tile = _onnx_infer_tile(tile, session, input_name, output_name)
-
-            # Compute output coordinates
-            oy_start = y_start * scale
-            ox_start = x_start * scale
-            oy_end = y_end * scale
-            ox_end = x_end * scale
-            actual_oh = oy_end - oy_start
-            actual_ow = ox_end - ox_start
-
-            # Trim inference output to match expected size (model may round)
-            out_tile = out_tile[:actual_oh, :actual_ow]
-
-            blend_w = _make_blend_weight(actual_oh, actual_ow)
-            blend_w3 = blend_w[:, :, None]  # broadcast to 3 channels
-
-            output[oy_start:oy_end, ox_start:ox_end] += out_tile.astype(np.float32) * blend_w3
-            weight[oy_start:oy_end, ox_start:ox_end] += blend_w3
-
-    # Normalize by accumulated weight
-    weight = np.maximum(weight, 1e-8)
-    output = output / weight
-    return output
+    plan = tile_plan.get_plan(h, w, tile_size, overlap, scale, blend=not crop)
+    output = plan.new_crop_output() if crop else plan.new_output()
+    # FP16 only when both globally enabled AND the loaded model expects float16 (issue #67)
+    use_fp16 = state.use_fp16 and _session_input_is_fp16(session)
+
+    flat = set()
+    if flat_tiles.ENABLED and source_u8 is not None:
+        flat = flat_tiles.flat_tiles(source_u8, plan.tiles)
+        tile_pipeline.record_flat(len(plan.tiles), len(flat))
+
+    # Group consecutive same-shaped tiles (only those can share a batch tensor)
+    groups: list[list[int]] = []
+    group_shape = None
+    for index, tile in enumerate(plan.tiles):
+        if index in flat:
+            continue
+        shape = (tile.y1 - tile.y0, tile.x1 - tile.x0)
+        if groups and shape == group_shape and len(groups[-1]) < batch_size:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+            group_shape = shape
+
+    def _prepare(group: list) -> np.ndarray:
+        return _onnx_prepare_batch(
+            [img_rgb[t.y0:t.y1, t.x0:t.x1] for t in (plan.tiles[i] for i in group)], use_fp16)
+
+    def _infer(group: list, batch: np.ndarray) -> np.ndarray:
+        # Inference using captured session (no lock needed — snapshot is consistent)
+        try:
+            return _onnx_run_batch(batch, session, input_name, output_name, use_fp16)
+        except Exception as exc:
+            if len(group) == 1 or _is_cuda_oom(exc):
+                raise
+            # Graph accepted a dynamic batch dim on paper but not in practice.
+            logger.warning(f"Batched tile inference failed ({exc}); falling back to batch size 1 for this model")
+            _batch_unsupported_sessions.add(session)
+            return np.concatenate([_onnx_run_batch(batch[k:k + 1], session, input_name, output_name, use_fp16)
+                                   for k in range(len(group))])
+
+    def _finish(group: list, results: np.ndarray) -> None:
+        for index, out_tile in zip(group, results):
+            if crop:
+                plan.place(output, index, _to_uint8(out_tile))
+            else:
+                plan.accumulate(output, plan.tiles[index], out_tile)
+
+    # Flat tiles: interpolated here, stitched with the same ramps as inferred ones
+    for index in sorted(flat):
+        t = plan.tiles[index]
+        _finish([index], [flat_tiles.upscale(img_rgb[t.y0:t.y1, t.x0:t.x1], scale)])
+
+    # Slicing/stacking and stitching overlap with session.run on helper threads
+    tile_pipeline.run(groups, _prepare, _infer, _finish, tiles_per_item=len)
+
+    if crop:
+        return output
+    # Normalize by the plan's precomputed reciprocal weight (in place, no divide)
+    return plan.normalize(output)
+
+
+def _primary_provider(session) -> str:
+    try:
+        return session.get_providers()[0]
+    except Exception:
+        return "unknown"
+
+
+def _tile_settings(session, model_name: Optional[str], width: int, height: int) -> tuple:
+    """(tile_size, overlap, batch_size, source) for one frame on this session.
+
+    source is "tuned"/"nearest"/"oom" when tile_tuner had an entry, else "default".
+    """
+    batch_size = _resolve_tile_batch_size(session)
+    tuned = tile_tuner.lookup(model_name, _primary_provider(session), width, height) if TILE_AUTOTUNE else None
+    if not tuned:
+        return ONNX_TILE_SIZE, 32, batch_size, "default"
+    # Tuned on a session that took batches; this one may have refused them since
+    batch = max(1, int(tuned["batch"])) if _session_accepts_batches(session) else 1
+    return int(tuned["tile"]), int(tuned["overlap"]), batch, tuned.get("source", "tuned")
+
+
+def autotune_tiles(resolutions: list, budget_s: float = 0) -> dict:
+    """Sweep tile size / overlap / batch for the loaded ONNX model per resolution.
+
+    Each candidate upscales one random frame (after a one-tile warm-up for its
+    tile shape) under a MemorySampler. The Pareto front over (wall time, peak
+    memory) is stored per (model, provider, resolution) and its fastest point
+    is used by upscale_with_onnx from then on. budget_s > 0 stops a resolution's
+    sweep once that much time was spent (the candidates run so far still count).
+    """
+    with _model_lock:
+        session = state.onnx_session
+        if session is None or state.current_model_type != "onnx":
+            return {"error": "No ONNX model loaded"}
+        model_name = state.onnx_model_name or state.current_model
+        scale = state.onnx_model_scale or 4
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    provider = _primary_provider(session)
+    batch_ok = _session_accepts_batches(session)
+    rng = np.random.default_rng(0)
+    report = {"model": model_name, "provider": provider, "resolutions": {}}
+
+    for width, height in resolutions:
+        img_rgb = rng.random((height, width, 3), dtype=np.float32)
+        started = time.perf_counter()
+        results = []
+        for cand in tile_tuner.candidates(width, height, batch_ok):
+            if budget_s and results and time.perf_counter() - started > budget_s:
+                break
+            tile, overlap, batch = cand["tile"], cand["overlap"], cand["batch"]
+            row = dict(cand)
+            try:
+                warm = img_rgb[:min(tile, height), :min(tile, width)]
+                _onnx_infer_tile(warm, session, input_name, output_name)
+                with tile_tuner.MemorySampler() as mem:
+                    t0 = time.perf_counter()
+                    _run_onnx_tiled(img_rgb, tile, overlap, session, input_name, output_name, scale, batch, "blend")
+                    row["wall_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                # Floor: the tensors this setting must hold at once (input, output,
+                # blend accumulator) - RSS misses memory an arena already had.
+                tensors = batch * 3 * 4 * min(tile, height) * min(tile, width) * (1 + scale * scale)
+                tensors += height * width * scale * scale * 4 * 4
+                row["peak_mb"] = max(mem.peak_mb, round(tensors / 1024 / 1024, 1))
+            except Exception as exc:
+                if not _is_cuda_oom(exc):
+                    logger.warning(f"Tile autotune: {cand} failed at {width}x{height}: {exc}")
+                row.update(wall_ms=None, peak_mb=None, error="oom" if _is_cuda_oom(exc) else str(exc)[:200])
+            results.append(row)
+        front = tile_tuner.pareto(results)
+        best = tile_tuner.choose(front, TILE_AUTOTUNE_MAX_MB)
+        if best is not None:
+            tile_tuner.save(model_name, provider, width, height, best, front)
+        report["resolutions"][tile_tuner.resolution_key(width, height)] = {
+            "best": best, "front": front, "results": results,
+            "elapsed_s": round(time.perf_counter() - started, 1),
+        }
+    return report
 
 
-def upscale_with_onnx(img: np.ndarray) -> np.ndarray:
+def upscale_with_onnx(img: np.ndarray, stitch: Optional[str] = None) -> np.ndarray:
     """Upscale an image using the loaded ONNX model (Real-ESRGAN).
 
     Uses tile-based processing for large images to prevent GPU OOM.
-    Tile size controlled by ONNX_TILE_SIZE env var (default 512).
-    Overlap of 32px between tiles prevents seam artifacts.
+    Tile size, overlap and tiles per call come from the tile autotuner for this
+    model, provider and frame size (tile_tuner.lookup); untuned combinations use
+    ONNX_TILE_SIZE (default 512), a 32px overlap and _resolve_tile_batch_size.
+
+    stitch selects how tiles are joined ("blend", "crop" or "auto"; None = the
+    ONNX_STITCH_MODE default) - see _resolve_stitch_mode.
 
-    On CUDA OOM, adaptively halves the tile size and retries (max 3 retries,
-    minimum tile size 64px). Updates the global ONNX_TILE_SIZE on success so
-    subsequent requests use the working size.
+    Same-shaped tiles are inferred in batches (see _resolve_tile_batch_size).
+    An untiled frame goes through the graph_io companion when ONNX_GRAPH_IO is on.
+
+    On CUDA OOM, first drops to one tile per call, then adaptively halves the tile
+    size and retries (max 3 retries, minimum tile size 64px). The working setting
+    is remembered for this model/provider/frame size only (tile_tuner.note_oom).
     """
-    global ONNX_TILE_SIZE
-    overlap = 32
-    tile_size = ONNX_TILE_SIZE
     h, w = img.shape[:2]
     min_tile_size = 64
     max_retries = 3
 
-    # Convert BGR to RGB and normalize to [0, 1]
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
-
     # Acquire model lock ONCE to capture consistent session/config snapshot
     with _model_lock:
-        session = state.onnx_session
+        model = _active_model()
+        session = model.onnx_session
         if session is None:
             raise ValueError("ONNX session not loaded")
         input_name = session.get_inputs()[0].name
         output_name = session.get_outputs()[0].name
-        scale = state.onnx_model_scale or 4
+        scale = model.onnx_model_scale or 4
+        model_name = model.onnx_model_name or model.current_model
+        model_path = model.onnx_model_path
+    tile_size, overlap, batch_size, _ = _tile_settings(session, model_name, w, h)
+    stitch_mode = _resolve_stitch_mode(stitch, h * w * scale * scale)
+
+    # Untiled frame: the graph_io companion takes the BGR uint8 frame as is
+    io_session = _graph_io_session(session, model_path, model_name) if w <= tile_size and h <= tile_size else None
+    if io_session is not None:
+        try:
+            return _run_graph_io(io_session, img)
+        except Exception as exc:
+            if not _is_cuda_oom(exc):
+                raise
+            logger.warning("CUDA OOM in the graph I/O session; falling back to tiled host conversion")
+
+    # Convert BGR to RGB and normalize to [0, 1]
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
 
-    for attempt in range(max_retries + 1):
+    attempt = 0  # counts tile-size halvings only; the batch fallback is free
+    oom_batch = False
+    while True:
         try:
             result = _run_onnx_tiled(img_rgb, tile_size, overlap, session,
-                                     input_name, output_name, scale)
-            # Success — persist working tile size for future requests
-            if tile_size != ONNX_TILE_SIZE:
-                with _model_lock:
-                    logger.info(f"Updating global ONNX_TILE_SIZE from {ONNX_TILE_SIZE} to {tile_size} after OOM recovery")
-                    ONNX_TILE_SIZE = tile_size
-            result = np.clip(result * 255.0, 0, 255).astype(np.uint8)
-            return cv2.cvtColor(result, cv2.COLOR_RGB2BGR)
+                                     input_name, output_name, scale, batch_size, stitch_mode, img)
+            if attempt or oom_batch:
+                # Remember what survived for this model and frame size only
+                logger.info(f"Using tile_size={tile_size}, batch={batch_size} for {model_name} at {w}x{h} after OOM recovery")
+                tile_tuner.note_oom(model_name or "", _primary_provider(session), w, h,
+                                    {"tile": tile_size, "overlap": overlap, "batch": batch_size})
+            if result.dtype != np.uint8:
+                result = _to_uint8(result)
+            # In place: the crop path exists to avoid a second full-size output buffer
+            return cv2.cvtColor(result, cv2.COLOR_RGB2BGR, dst=result)
         except Exception as exc:
             if not _is_cuda_oom(exc):
                 raise
+            if batch_size > 1:
+                # Cheapest fix first: the batch multiplies activation memory, the
+                # tile size only matters once we are back to one tile per call.
+                logger.warning(f"CUDA OOM with {batch_size} tiles per call; retrying one tile at a time")
+                batch_size = 1
+                oom_batch = True
+                continue
             new_tile_size = tile_size // 2
             if new_tile_size < min_tile_size or attempt >= max_retries:
                 logger.error(f"CUDA OOM at tile_size={tile_size} and cannot reduce further (min={min_tile_size}). Giving up.")
@@ -3028,6 +3972,7 @@ def upscale_with_onnx(img: np.ndarray) -> np.ndarray:
                 f"Halving tile size to {new_tile_size} and retrying."
             )
             tile_size = new_tile_size
+            attempt += 1
 
 
 def detect_scene_change(frame_a: np.ndarray, frame_b: np.ndarray, threshold: float = 0.35) -> bool:
@@ -3072,6 +4017,15 @@ def upscale_multiframe(frames: list) -> np.ndarray:
         input_name = session.get_inputs()[0].name
         output_name = session.get_outputs()[0].name
         scale = state.onnx_model_scale or 4
+        model_path, model_name = state.onnx_model_path, state.onnx_model_name
+
+    h, w = frames[0].shape[:2]
+    tile_size = ONNX_TILE_SIZE_MULTIFRAME
+    if w <= tile_size and h <= tile_size:
+        io_session = _graph_io_session(session, model_path, model_name)
+        if io_session is not None:
+            # [T, H, W, 3] BGR in, centre frame [1, H*s, W*s, 3] BGR out
+            return _run_graph_io(io_session, np.stack(frames))[0]
 
     # Convert all frames BGR -> RGB float32
     frames_rgb = []
@@ -3079,8 +4033,6 @@ def upscale_multiframe(frames: list) -> np.ndarray:
         rgb = cv2.cvtColor(f, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
         frames_rgb.append(rgb)
 
-    h, w, _ = frames_rgb[0].shape
-    tile_size = ONNX_TILE_SIZE_MULTIFRAME
     overlap = 32
 
     # Small image fast path: no tiling needed
@@ -3090,64 +4042,28 @@ def upscale_multiframe(frames: list) -> np.ndarray:
         return cv2.cvtColor(result_rgb, cv2.COLOR_RGB2BGR)
 
     # Tiled processing — same grid for all frames
-    out_h, out_w = h * scale, w * scale
-    output = np.zeros((out_h, out_w, 3), dtype=np.float32)
-    weight = np.zeros((out_h, out_w, 3), dtype=np.float32)
-
-    step = tile_size - overlap
-    y_tiles = list(range(0, max(h - tile_size, 0) + 1, step))
-    if not y_tiles or y_tiles[-1] + tile_size < h:
-        y_tiles.append(max(h - tile_size, 0))
-    x_tiles = list(range(0, max(w - tile_size, 0) + 1, step))
-    if not x_tiles or x_tiles[-1] + tile_size < w:
-        x_tiles.append(max(w - tile_size, 0))
-
-    for y in y_tiles:
-        for x in x_tiles:
-            # Extract same tile position from all frames, pad if edge tile is smaller than tile_size
-            tile_list = []
-            for frame_rgb in frames_rgb:
-                tile = frame_rgb[y:y+tile_size, x:x+tile_size, :]
-                # Pad undersized edge tiles to tile_size (e.g. when only one dimension > tile_size)
-                th_actual, tw_actual = tile.shape[:2]
-                if th_actual < tile_size or tw_actual < tile_size:
-                    padded = np.zeros((tile_size, tile_size, 3), dtype=tile.dtype)
-                    padded[:th_actual, :tw_actual, :] = tile
-                    tile = padded
-                tile_list.append(tile)
-
-            out_tile = _onnx_infer_multiframe_tile(tile_list, session, input_name, output_name, num_frames)
-
-            # Compute actual content dimensions (clip to canvas, crop padded regions)
-            oy, ox = y * scale, x * scale
-            oy_end = min(oy + out_tile.shape[0], out_h)
-            ox_end = min(ox + out_tile.shape[1], out_w)
-            actual_th = oy_end - oy
-            actual_tw = ox_end - ox
-
-            # Build blend weights using ACTUAL content size, not padded tile size
-            # This prevents brightness artifacts at edges where tiles were zero-padded
-            blend_y = np.ones(actual_th, dtype=np.float32)
-            blend_x = np.ones(actual_tw, dtype=np.float32)
-            ramp = overlap * scale
-            if ramp > 0:
-                # Clamp ramp to half tile size to prevent overlapping writes at center
-                ramp_y = min(ramp, actual_th // 2) if actual_th > 1 else 0
-                ramp_x = min(ramp, actual_tw // 2) if actual_tw > 1 else 0
-                for i in range(ramp_y):
-                    blend_y[i] = (i + 1) / (ramp + 1)
-                    blend_y[actual_th - 1 - i] = (i + 1) / (ramp + 1)
-                for i in range(ramp_x):
-                    blend_x[i] = (i + 1) / (ramp + 1)
-                    blend_x[actual_tw - 1 - i] = (i + 1) / (ramp + 1)
-            blend_w = blend_y[:, None] * blend_x[None, :]
-            blend_w3 = blend_w[:, :, None]
-
-            output[oy:oy_end, ox:ox_end] += out_tile[:actual_th, :actual_tw].astype(np.float32) * blend_w3
-            weight[oy:oy_end, ox:ox_end] += blend_w3
-
-    weight = np.maximum(weight, 1e-8)
-    output = output / weight
+    plan = tile_plan.get_plan(h, w, tile_size, overlap, scale)
+    output = plan.new_output()
+
+    for tile in plan.tiles:
+        # Extract same tile position from all frames, pad if edge tile is smaller than tile_size
+        tile_list = []
+        for frame_rgb in frames_rgb:
+            t = frame_rgb[tile.y0:tile.y1, tile.x0:tile.x1, :]
+            # Pad undersized edge tiles to tile_size (e.g. when only one dimension > tile_size)
+            th_actual, tw_actual = t.shape[:2]
+            if th_actual < tile_size or tw_actual < tile_size:
+                padded = np.zeros((tile_size, tile_size, 3), dtype=t.dtype)
+                padded[:th_actual, :tw_actual, :] = t
+                t = padded
+            tile_list.append(t)
+
+        out_tile = _onnx_infer_multiframe_tile(tile_list, session, input_name, output_name, num_frames)
+        # accumulate() crops the padded region and blends on the ACTUAL content size,
+        # which prevents brightness artifacts at edges where tiles were zero-padded
+        plan.accumulate(output, tile, out_tile)
+
+    output = plan.normalize(output)
     output = np.clip(output * 255.0, 0, 255).astype(np.uint8)
     return cv2.cvtColor(output, cv2.COLOR_RGB2BGR)
 
@@ -3187,7 +4103,7 @@ def load_rife_model(model_name: str = "rife-v4.9") -> bool:
             providers.append('OpenVINOExecutionProvider')
         providers.append('CPUExecutionProvider')
 
-        session = ort.InferenceSession(str(model_path), providers=providers)
+        session = graph_cache.session(ort, model_path, providers=providers)
         active_providers = session.get_providers()
 
         with _model_lock:
@@ -3349,7 +4265,7 @@ def load_face_restore_model(model_name: str) -> dict:
         providers.append('CUDAExecutionProvider')
     providers.append('CPUExecutionProvider')
 
-    sess = ort.InferenceSession(str(model_path), providers=providers)
+    sess = graph_cache.session(ort, model_path, providers=providers)
     with _model_lock:
         state.face_restore_session = sess
         state.face_restore_model_name = model_name
@@ -3488,12 +4404,13 @@ def restore_faces_in_frame(img: np.ndarray, max_faces: int = 6) -> tuple:
 def upscale_image_array(img: np.ndarray) -> np.ndarray:
     """Upscale a numpy image array using the loaded model. Avoids double encode/decode for frame pipeline."""
     with _model_lock:
-        if state.current_model is None:
+        model = _active_model()
+        if model.current_model is None:
             raise ModelNotReadyError("No model loaded")
-        model_type = state.current_model_type
-        cv_model = state.cv_model
-        has_onnx = state.onnx_session is not None
-        has_ncnn = state.ncnn_upscaler is not None
+        model_type = model.current_model_type
+        cv_model = model.cv_model
+        has_onnx = model.onnx_session is not None
+        has_ncnn = model.ncnn_upscaler is not None
 
     if model_type == "opencv" and cv_model is not None:
         return cv_model.upsample(img)
@@ -3505,11 +4422,31 @@ def upscale_image_array(img: np.ndarray) -> np.ndarray:
         raise ModelNotReadyError("No model loaded")
 
 
-async def upscale_frame_realtime(frame: np.ndarray, session, local_state) -> np.ndarray:
+def _upscale_frame_array(img: np.ndarray) -> np.ndarray:
+    """upscale_image_array for the frame endpoints (/upscale-frame, video chunks, /shm).
+
+    With INFERENCE_WORKERS the frame goes to the worker processes when they run the
+    active ONNX model. They tile like the realtime path (no blending, no stitch
+    mode), which is why /upscale and other still-image paths never use them.
+    """
+    pool = _inference_pool
+    if pool is not None:
+        with _model_lock:
+            model = _active_model()
+            model_path = model.onnx_model_path if model.current_model_type == "onnx" else None
+        if pool.serves(model_path, *img.shape[:2]):
+            return pool.infer(img)
+    return upscale_image_array(img)
+
+
+async def upscale_frame_realtime(frame: np.ndarray, session, local_state,
+                                 tile_cache: Optional[temporal_tiles.TileCache] = None) -> np.ndarray:
     """Optimized single-pass upscaling for real-time playback.
     Uses full-frame inference when possible (small enough for VRAM),
     falls back to minimal-overlap tiling only if needed.
-    Skips blend weighting for speed."""
+    Skips blend weighting for speed.
+    With a tile_cache (ONNX only), the frame is always tiled and tiles that did
+    not change since their last inference are reused (temporal_tiles.py)."""
     model_type = local_state["model_type"]
 
     # OpenCV DNN: already fast, just call directly
@@ -3518,12 +4455,12 @@ async def upscale_frame_realtime(frame: np.ndarray, session, local_state) -> np.
         if cv_model is None:
             raise ModelNotReadyError("No OpenCV model loaded")
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(_cpu_executor, cv_model.upsample, frame)
+        return await loop.run_in_executor(_realtime_executor, cv_model.upsample, frame)
 
     # ncnn: delegate to existing function
     if model_type == "ncnn":
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(_cpu_executor, upscale_with_ncnn, frame)
+        return await loop.run_in_executor(_realtime_executor, upscale_with_ncnn, frame)
 
     # ONNX: optimized single-pass (no blend weighting)
     if session is None:
@@ -3534,66 +4471,87 @@ async def upscale_frame_realtime(frame: np.ndarray, session, local_state) -> np.
     scale = local_state.get("scale", 4)
     h, w = frame.shape[:2]
 
-    # Convert BGR -> RGB float32
-    img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
-
     max_pixels = 512 * 512  # Threshold for full-frame inference
+    blob_dtype = np.float16 if state.use_fp16 else np.float32
+
+    def _infer_bound(bgr: np.ndarray) -> np.ndarray:
+        """One session call on a BGR uint8 frame/tile through a pooled I/O binding.
+
+        BGR->RGB, /255, HWC->CHW and the dtype cast happen in a single pass into
+        the reused input buffer; the result is converted out of the reused output
+        buffer to HWC uint8 RGB. No full-size temporaries on this path.
+        """
+        th, tw = bgr.shape[:2]
+        with io_binding.lease(session, input_name, output_name, (1, 3, th, tw), blob_dtype) as slot:
+            np.multiply(np.transpose(bgr[:, :, ::-1], (2, 0, 1)), np.float32(1.0 / 255.0),
+                        out=slot.input[0], casting="unsafe")
+            result = slot.run()
+            if result.ndim == 4:
+                result = result[0]
+            if result.ndim == 3 and result.shape[0] in (1, 3):
+                result = np.transpose(result, (1, 2, 0))
+            if result.dtype != np.float32:
+                result = result.astype(np.float32)
+            result *= 255.0  # in place: the buffer is ours until the lease ends
+            out = np.empty(result.shape, dtype=np.uint8)
+            np.clip(result, 0, 255, out=out, casting="unsafe")
+            return out
+
+    def _io_session():
+        # Resolved on the executor thread: the first call may build the companion
+        return _graph_io_session(session, local_state.get("model_path"), local_state.get("model_name"))
 
     def _infer_full():
         """Full-frame inference without tiling."""
-        blob = np.transpose(img_rgb, (2, 0, 1))[np.newaxis, ...]
-        if state.use_fp16:
-            blob = blob.astype(np.float16)
-        result = session.run([output_name], {input_name: blob})[0]
-        if state.use_fp16:
-            result = result.astype(np.float32)
-        if result.ndim == 4:
-            result = result[0]
-        if result.ndim == 3 and result.shape[0] in (1, 3):
-            result = np.transpose(result, (1, 2, 0))
-        result = np.clip(result * 255.0, 0, 255).astype(np.uint8)
-        return cv2.cvtColor(result, cv2.COLOR_RGB2BGR)
+        io_session = _io_session()
+        if io_session is not None:
+            return _run_graph_io(io_session, frame)
+        result = _infer_bound(frame)
+        return cv2.cvtColor(result, cv2.COLOR_RGB2BGR, dst=result)
 
     def _infer_tiled():
         """Minimal-overlap tiling without blend weighting for speed."""
+        io_session = _io_session()
         tile_size = min(ONNX_TILE_SIZE, 512)
         overlap = 8  # Minimal overlap for speed
-        step = max(tile_size - overlap, 1)
         out_h, out_w = h * scale, w * scale
-        output = np.zeros((out_h, out_w, 3), dtype=np.float32)
-
-        y_tiles = list(range(0, max(h - tile_size, 0) + 1, step))
-        if not y_tiles or y_tiles[-1] + tile_size < h:
-            y_tiles.append(max(h - tile_size, 0))
-        x_tiles = list(range(0, max(w - tile_size, 0) + 1, step))
-        if not x_tiles or x_tiles[-1] + tile_size < w:
-            x_tiles.append(max(w - tile_size, 0))
-
-        for y in y_tiles:
-            for x in x_tiles:
-                tile = img_rgb[y:y + tile_size, x:x + tile_size]
-                blob = np.transpose(tile, (2, 0, 1))[np.newaxis, ...]
-                if state.use_fp16:
-                    blob = blob.astype(np.float16)
-                res = session.run([output_name], {input_name: blob})[0]
-                if state.use_fp16:
-                    res = res.astype(np.float32)
-                res = np.squeeze(res, axis=0)
-                if res.shape[0] == 3:
-                    res = np.transpose(res, (1, 2, 0))
-
-                oy, ox = y * scale, x * scale
-                oh, ow = res.shape[:2]
-                output[oy:oy + oh, ox:ox + ow] = res
-
-        output = np.clip(output * 255.0, 0, 255).astype(np.uint8)
-        return cv2.cvtColor(output, cv2.COLOR_RGB2BGR)
+        output = np.zeros((out_h, out_w, 3), dtype=np.uint8)
 
-    loop = asyncio.get_running_loop()
-    if h * w <= max_pixels:
-        return await loop.run_in_executor(_cpu_executor, _infer_full)
+        for y, x in temporal_tiles.grid(h, w, tile_size, overlap):
+            # Same tile shape every frame, so every call after the first reuses a slot
+            tile = frame[y:y + tile_size, x:x + tile_size]
+            res = _run_graph_io(io_session, tile) if io_session is not None else _infer_bound(tile)
+
+            oy, ox = y * scale, x * scale
+            oh, ow = res.shape[:2]
+            output[oy:oy + oh, ox:ox + ow] = res
+
+        if io_session is not None:
+            return output  # already BGR
+        return cv2.cvtColor(output, cv2.COLOR_RGB2BGR, dst=output)
+
+    def _infer_temporal():
+        """Changed tiles only; cached tiles are kept in BGR."""
+        io_session = _io_session()
+
+        def _tile(tile: np.ndarray) -> np.ndarray:
+            if io_session is not None:
+                return _run_graph_io(io_session, tile)
+            res = _infer_bound(tile)
+            return cv2.cvtColor(res, cv2.COLOR_RGB2BGR, dst=res)
+
+        return tile_cache.upscale(frame, scale, _tile)
+
+    loop = asyncio.get_running_loop()
+    pool = _inference_pool
+    if tile_cache is None and pool is not None and pool.serves(local_state.get("model_path"), h, w):
+        return await loop.run_in_executor(_realtime_executor, pool.infer, frame)
+    if tile_cache is not None:
+        return await loop.run_in_executor(_realtime_executor, _infer_temporal)
+    if h * w <= max_pixels:
+        return await loop.run_in_executor(_realtime_executor, _infer_full)
     else:
-        return await loop.run_in_executor(_cpu_executor, _infer_tiled)
+        return await loop.run_in_executor(_realtime_executor, _infer_tiled)
 
 
 def run_benchmark(test_size: int = 256) -> dict:
@@ -3802,6 +4760,12 @@ async def status():
         "loaded_models": [state.current_model] if state.current_model else [],
         "processing_count": state.processing_count,
         "max_concurrent": state.max_concurrent,
+        "scheduler": _scheduler.stats(),
+        "executors": {name: e.stats() for name, e in _executors.items()},
+        "shm_transport": _shm_rings.stats(),
+        "inference_workers": (_inference_pool.stats() if _inference_pool is not None
+                              else {"enabled": inference_workers.WORKERS > 0, "alive": 0}),
+        "concurrency": _concurrency.snapshot(),
         "onnx_available": ONNX_AVAILABLE,
         "model_scale": scale,
         "cuda_available": has_cuda,
@@ -4357,6 +5321,7 @@ async def list_models():
     # (upload/delete) from causing "dictionary changed size during iteration".
     with _model_lock:
         items_snapshot = list(AVAILABLE_MODELS.items())
+    resident = set(_resident_models.names())
     models = []
     for model_id, info in items_snapshot:
         model_path = get_model_path(model_id)
@@ -4370,6 +5335,7 @@ async def list_models():
             "type": info.get("type", "pb"),
             "downloaded": model_path.exists() if is_available else False,
             "loaded": state.current_model == model_id,
+            "resident": model_id in resident,
             "available": is_available,
             "custom": bool(info.get("custom", False))
         })
@@ -4379,6 +5345,14 @@ async def list_models():
     return result
 
 
+@app.get("/models/resident")
+async def resident_models_endpoint():
+    """Models held in the resident model cache, most recently used first."""
+    result = _resident_models.stats()
+    result["active"] = state.current_model
+    return result
+
+
 @app.post("/models/download")
 async def download_model_endpoint(model_name: str = Form(...), request: Request = None):
     """Download a model."""
@@ -4543,17 +5517,42 @@ async def load_model_endpoint(
 async def upscale_endpoint(
     request: Request,
     file: UploadFile = File(...),
-    scale: int = Form(2)
+    scale: int = Form(2),
+    stitch: str = Form(""),
+    model: str = Form("")
 ):
-    """Upscale an image. Scale is determined by the loaded model; the scale parameter is validated for consistency."""
+    """Upscale an image. Scale is determined by the loaded model; the scale parameter is validated for consistency.
+
+    stitch: "blend", "crop" or "auto" (empty = ONNX_STITCH_MODE). "crop" skips the
+    float32 blend accumulator - use it for very large outputs.
+
+    model: run this request on another (downloaded) model without switching the
+    active one. It is kept in the resident model cache for later requests.
+
+    Results are cached by content (RESULT_CACHE): a repeated upload with the same
+    model and options is answered from CACHE_DIR, and concurrent identical
+    uploads share one computation. X-Result-Cache says hit, miss or coalesced.
+
+    X-Priority (realtime | interactive | batch, default interactive) and
+    X-Deadline-Ms order the wait for an inference slot; library scans should
+    send batch. When not admitted: 429 with Retry-After.
+    """
     _require_api_token(request)
     _check_circuit_breaker()
+    admission = _admission(request, scheduler.INTERACTIVE)
 
-    if state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
+    stitch = stitch.lower().strip()
+    if stitch and stitch not in _STITCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid stitch mode. Valid: {', '.join(_STITCH_MODES)}")
+
+    resident = await _resident_model(model)
+    if resident is None and state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
         raise HTTPException(status_code=400, detail="No model loaded. Please load a model first.")
 
     # Validate scale against loaded model's native scale
-    if state.current_model_type == "onnx":
+    if resident is not None:
+        model_scale = resident.scale
+    elif state.current_model_type == "onnx":
         model_scale = state.onnx_model_scale
     elif state.current_model_type == "ncnn":
         model_scale = state.ncnn_model_scale
@@ -4562,37 +5561,143 @@ async def upscale_endpoint(
     if scale != model_scale:
         logger.warning(f"Requested scale={scale} differs from loaded model scale={model_scale}. Using model's native scale={model_scale}.")
 
-    # Capture semaphore reference so release always targets the same instance
-    # (protects against /config recreating the semaphore mid-request)
-    sem = _upscale_semaphore
-    acquired = False
-    # Python 3.12 broke asyncio.wait_for(coro, timeout=0): the coroutine is
-    # wrapped in a Task, cancellation is scheduled immediately, and the Task
-    # never gets to run before being cancelled — causing permanent 429.
-    # Fix: check _value directly (safe in asyncio; no await between check and
-    # acquire, so no other coroutine can interleave).
-    if sem is None or sem._value <= 0:
-        raise HTTPException(status_code=429, detail="Too many concurrent requests")
-    await sem.acquire()
+    # Read image
+    image_bytes = await file.read()
+    if len(image_bytes) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image too large ({len(image_bytes)} bytes, max {MAX_UPLOAD_BYTES})")
+    if not result_cache.ENABLED:
+        return await _upscale_response(image_bytes, resident, stitch, admission)
+
+    # Served from the result cache without taking an inference slot
+    loop = asyncio.get_running_loop()
+    key = _result_cache_key(image_bytes, resident, model_scale, stitch)
+    cached = await loop.run_in_executor(_aux_executor, result_cache.get, key)
+    if cached is not None:
+        return Response(content=cached, media_type="image/png", headers={"X-Result-Cache": "hit"})
+
+    computed: dict = {}
+
+    async def _compute() -> Optional[bytes]:
+        response = await _upscale_response(image_bytes, resident, stitch, admission)
+        computed["response"] = response
+        if isinstance(response, StreamingResponse) or response.status_code != 200:
+            return None  # banded output is never held in memory as a whole
+        await loop.run_in_executor(_aux_executor, result_cache.put, key, response.body)
+        return response.body
+
+    data, leader = await result_cache.coalesce(key, _compute)
+    if leader:
+        response = computed["response"]
+        response.headers["X-Result-Cache"] = "miss"
+        return response
+    if data is not None:
+        return Response(content=data, media_type="image/png", headers={"X-Result-Cache": "coalesced"})
+    # The request we waited for failed or streamed: compute this one ourselves
+    return await _upscale_response(image_bytes, resident, stitch, admission)
+
+
+def _result_cache_key(image_bytes: bytes, resident, model_scale: int, stitch: str) -> str:
+    """result_cache key: the upload plus everything that changes the output."""
+    with _model_lock:
+        source = resident if resident is not None else state
+        model_name, model_type = source.current_model, source.current_model_type
+    try:
+        st = get_model_path(model_name).stat() if model_name else None
+        model_file = f"{st.st_size}-{st.st_mtime_ns}" if st else ""
+    except OSError:
+        model_file = ""  # ncnn models are bundled, not files
+    return result_cache.make_key(
+        image_bytes, model=model_name, model_type=model_type, model_file=model_file, scale=model_scale,
+        stitch=stitch or ONNX_STITCH_MODE, gpu=state.use_gpu, fp16=state.use_fp16, version=VERSION)
+
+
+class _ReleasingStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls on_close once it is done being sent, however that ends."""
+
+    def __init__(self, content, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+
+async def _upscale_response(image_bytes: bytes, resident, stitch: str, admission: tuple):
+    """The /upscale computation for an already-read upload (one inference slot)."""
+    ticket = await _admit(admission, 429)
     acquired = True
     with _processing_count_lock:
         state.processing_count += 1
 
     start_time = time.time()
-    model_name = state.current_model or "unknown"
+    model_name = (resident.name if resident is not None else state.current_model) or "unknown"
     try:
-        # Read image
-        image_bytes = await file.read()
-        if len(image_bytes) > MAX_UPLOAD_BYTES:
-            raise HTTPException(status_code=413, detail=f"Image too large ({len(image_bytes)} bytes, max {MAX_UPLOAD_BYTES})")
-
         # Upscale in thread pool to not block async
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(_cpu_executor, upscale_image, image_bytes)
+        executor = _inference_executor(ticket)
+        if resident is None and state.current_model is None:
+            raise ModelNotReadyError("No model loaded")
+        img = await loop.run_in_executor(executor, _decode_upload_image, image_bytes)
+
+        if UPSCALE_STREAM_MIN_MPIX and img.shape[0] * img.shape[1] >= UPSCALE_STREAM_MIN_MPIX * 1_000_000:
+            # Large input: stream the PNG band by band. The first band is computed
+            # here so decode/model errors still map to a proper status code; after
+            # that the generator owns the scheduler slot and releases it when done.
+            # No ticket.work: the hold time includes the client reading the body.
+            bands = iter_upscaled_png(img, stitch or None)
+            first = await loop.run_in_executor(executor, _with_model, resident, next, bands)
+            acquired = False
+            finished = False
+
+            def _finish(ok: bool) -> None:
+                nonlocal finished
+                if finished:
+                    return
+                finished = True
+                try:
+                    bands.close()
+                except ValueError:
+                    pass  # a band is still running in the executor; the generator ends with it
+                if ok:
+                    _record_success(model_name, (time.time() - start_time) * 1000)
+                else:
+                    _record_failure(model_name)
+                with _processing_count_lock:
+                    state.processing_count -= 1
+                _scheduler.release(ticket)
+
+            async def _band_stream():
+                ok = False
+                try:
+                    yield first
+                    while True:
+                        chunk = await loop.run_in_executor(executor, _with_model, resident, next, bands, None)
+                        if chunk is None:
+                            break
+                        yield chunk
+                    ok = True
+                except Exception as e:
+                    logger.error(f"Streamed upscale failed mid-response: {e}")
+                    raise
+                finally:
+                    _finish(ok)
+
+            # The generator's finally never runs if the client is gone before the
+            # first chunk: the response releases the slot however it ends.
+            return _ReleasingStreamingResponse(_band_stream(), lambda: _finish(False), media_type="image/png",
+                                               headers={"X-Upscale-Streamed": "bands"})
+
+        result, tile_stats = await loop.run_in_executor(
+            executor, _with_model, resident, _with_tile_stats, _upscale_to_png, img, stitch or None)
+        ticket.work = img.shape[0] * img.shape[1]  # an inference: a sample for the adaptive limit
 
         duration_ms = (time.time() - start_time) * 1000
         _record_success(model_name, duration_ms)
-        return Response(content=result, media_type="image/png")
+        return Response(content=result, media_type="image/png",
+                        headers=tile_stats.headers() if tile_stats else None)
 
     except ModelNotReadyError as e:
         _record_failure(model_name)
@@ -4610,7 +5715,16 @@ async def upscale_endpoint(
         if acquired:
             with _processing_count_lock:
                 state.processing_count -= 1
-            sem.release()
+            _scheduler.release(ticket)
+
+
+def _loaded_model_scale() -> int:
+    """Native scale of the active model."""
+    if state.current_model_type == "onnx":
+        return state.onnx_model_scale
+    if state.current_model_type == "ncnn":
+        return state.ncnn_model_scale
+    return state.cv_model_scale
 
 
 @app.post("/upscale-hdr")
@@ -4620,7 +5734,8 @@ async def upscale_frame_hdr(
     scale: int = Form(2)
 ):
     """Upscale a 16-bit HDR frame. Accepts 16-bit PNG, returns 16-bit PNG.
-    The pipeline: receive 16-bit -> tone-map to 8-bit SDR -> upscale -> inverse tone-map back to 16-bit."""
+    The pipeline: receive 16-bit -> tone-map to 8-bit SDR -> upscale -> inverse tone-map back to 16-bit.
+    Admitted as realtime work unless X-Priority says otherwise (see /upscale)."""
     _require_api_token(request)
     _check_circuit_breaker()
 
@@ -4628,22 +5743,12 @@ async def upscale_frame_hdr(
         raise HTTPException(status_code=400, detail="No model loaded. Please load a model first.")
 
     # Validate scale against loaded model's native scale
-    if state.current_model_type == "onnx":
-        model_scale = state.onnx_model_scale
-    elif state.current_model_type == "ncnn":
-        model_scale = state.ncnn_model_scale
-    else:
-        model_scale = state.cv_model_scale
+    model_scale = _loaded_model_scale()
     if scale != model_scale:
         logger.warning(f"HDR upscale: requested scale={scale} differs from model scale={model_scale}. Using model's native scale={model_scale}.")
 
-    # Capture semaphore reference for safe release
-    sem = _upscale_semaphore
-    acquired = False
-    # See /upscale for explanation of why we avoid asyncio.wait_for(timeout=0)
-    if sem is None or sem._value <= 0:
-        raise HTTPException(status_code=429, detail="Too many concurrent requests")
-    await sem.acquire()
+    # Wait for an inference slot (realtime unless X-Priority says otherwise)
+    ticket = await _admit(_admission(request, scheduler.REALTIME), 429)
     acquired = True
     with _processing_count_lock:
         state.processing_count += 1
@@ -4658,7 +5763,7 @@ async def upscale_frame_hdr(
 
         # Upscale HDR in thread pool to not block async
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(_cpu_executor, upscale_image_hdr, image_bytes)
+        result = await loop.run_in_executor(_inference_executor(ticket), upscale_image_hdr, image_bytes)
 
         duration_ms = (time.time() - start_time) * 1000
         _record_success(model_name, duration_ms)
@@ -4681,7 +5786,7 @@ async def upscale_frame_hdr(
         if acquired:
             with _processing_count_lock:
                 state.processing_count -= 1
-            sem.release()
+            _scheduler.release(ticket)
 
 
 @app.get("/benchmark")
@@ -4697,34 +5802,121 @@ async def benchmark_endpoint(request: Request = None):
         raise HTTPException(status_code=429, detail="Benchmark already in progress")
     try:
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(_cpu_executor, run_benchmark, 256)
+        result = await loop.run_in_executor(_admin_executor, run_benchmark, 256)
         return result
     finally:
         _benchmark_lock.release()
 
 
+@app.post("/benchmark/session-profiles")
+async def autotune_session_profiles_endpoint(request: Request = None):
+    """Benchmark the SessionOptions profiles on the loaded ONNX model and remember
+    the fastest for this model + hardware (applies while session_profile is "auto")."""
+    _require_api_token(request)
+    if state.onnx_session is None or state.current_model_type != "onnx":
+        raise HTTPException(status_code=400, detail="No ONNX model loaded")
+
+    try:
+        await asyncio.wait_for(_benchmark_lock.acquire(), timeout=5.0)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=429, detail="Benchmark already in progress")
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_admin_executor, autotune_session_profile)
+    finally:
+        _benchmark_lock.release()
+    if "error" in result:
+        raise HTTPException(status_code=409, detail=result["error"])
+    return result
+
+
+# Border trackers for the per-request frame endpoints, by X-Stream-Id (or client
+# and frame size when the caller does not send one)
+_letterbox_trackers = letterbox.TrackerRegistry()
+
+
+_frame_dedupers = letterbox.TrackerRegistry(factory=frame_dedup.FrameDeduper)
+
+
+def _stream_key(request: Request, img: np.ndarray) -> str:
+    """Per-stream state key for frame endpoints: X-Stream-Id, else client and frame size."""
+    h, w = img.shape[:2]
+    return request.headers.get("x-stream-id") or f"{request.client.host if request.client else ''}:{w}x{h}"
+
+
+def _letterbox_active(request: Request, img: np.ndarray) -> Optional[letterbox.Active]:
+    """Active picture area to upscale for this frame (None = whole frame)."""
+    if not letterbox.ENABLED:
+        return None
+    return _letterbox_trackers.get(_stream_key(request, img)).update(img)
+
+
+@app.post("/benchmark/tiles")
+async def autotune_tiles_endpoint(request: Request, resolutions: str = Form("")):
+    """Sweep tile size / overlap / batch for the loaded ONNX model and keep the
+    Pareto-best setting per resolution (used by default from then on).
+
+    resolutions: comma-separated "WxH" list; empty = the capture resolutions seen
+    on the frame endpoints (960x540 if none yet).
+    """
+    _require_api_token(request)
+    if state.onnx_session is None or state.current_model_type != "onnx":
+        raise HTTPException(status_code=400, detail="No ONNX model loaded")
+    try:
+        sizes = [tile_tuner.parse_resolution(r) for r in resolutions.split(",") if r.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="resolutions must be a comma-separated list like 1280x720,1920x1080")
+    sizes = sizes or tile_tuner.observed() or [(960, 540)]
+
+    try:
+        await asyncio.wait_for(_benchmark_lock.acquire(), timeout=5.0)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=429, detail="Benchmark already in progress")
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_admin_executor, autotune_tiles, sizes, TILE_AUTOTUNE_BUDGET_S)
+    finally:
+        _benchmark_lock.release()
+    if "error" in result:
+        raise HTTPException(status_code=409, detail=result["error"])
+    return result
+
+
+@app.get("/benchmark/tiles")
+async def tile_tuning_endpoint(request: Request):
+    """Stored tile tunings, observed capture resolutions and OOM overrides."""
+    _require_api_token(request)
+    return dict(tile_tuner.snapshot(), enabled=TILE_AUTOTUNE)
+
+
 @app.post("/upscale-frame")
 async def upscale_frame_endpoint(request: Request):
-    """Fast frame upscaling for real-time playback. Raw JPEG in, JPEG out. Returns 503 when busy."""
+    """Fast frame upscaling for real-time playback. Raw JPEG in, JPEG out. Returns 503 when busy.
+
+    Admitted as realtime work (X-Priority / X-Deadline-Ms as for /upscale); the
+    503 carries Retry-After.
+
+    An X-Model header runs the frame on that (downloaded) model via the resident
+    model cache instead of the active one. Frames sharing an X-Stream-Id share
+    black-bar detection (LETTERBOX_DETECT); X-Letterbox reports the bars skipped.
+    A near duplicate of the stream's last inferred frame (FRAME_DEDUP) gets that
+    frame's JPEG again, marked X-Frame-Duplicate: 1.
+    """
     _require_api_token(request)
     _check_circuit_breaker()
 
-    if state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
+    resident = await _resident_model(request.headers.get("x-model", ""))
+    if resident is None and state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
         raise HTTPException(status_code=400, detail="No model loaded")
 
-    # Capture semaphore reference for safe release
-    sem = _upscale_semaphore
-    acquired = False
-    # See /upscale for explanation of why we avoid asyncio.wait_for(timeout=0)
-    if sem is None or sem._value <= 0:
-        raise HTTPException(status_code=503, detail="Busy")
-    await sem.acquire()
+    # Wait for an inference slot (realtime unless X-Priority says otherwise)
+    ticket = await _admit(_admission(request, scheduler.REALTIME), 503)
     acquired = True
     with _processing_count_lock:
         state.processing_count += 1
 
     start_time = time.time()
-    model_name = state.current_model or "unknown"
+    model_name = (resident.name if resident is not None else state.current_model) or "unknown"
     try:
         body = await request.body()
         if not body:
@@ -4741,19 +5933,53 @@ async def upscale_frame_endpoint(request: Request):
         h, w = img.shape[:2]
         if h * w > MAX_IMAGE_PIXELS:
             raise HTTPException(status_code=413, detail=f"Image too large: {w}x{h}")
+        tile_tuner.observe(w, h)
+
+        # Same picture as this stream's last inferred frame: send that result again
+        dedup = _frame_dedupers.get(_stream_key(request, img)) if frame_dedup.ENABLED else None
+        if dedup is not None:
+            cached = dedup.lookup(img, model_name)
+            _realtime_stats.record_dedup(cached is not None)
+            if cached is not None:
+                ticket.measure = False  # no inference: not a service time
+                content, dup_headers = cached
+                _record_success(model_name, (time.time() - start_time) * 1000)
+                with _processing_count_lock:
+                    state.total_frames_processed += 1
+                return Response(content=content, media_type="image/jpeg",
+                                headers=dict(dup_headers, **{"X-Frame-Duplicate": "1"}))
+
+        # Black bars are cut off here and put back after inference
+        active = _letterbox_active(request, img)
+        picture = letterbox.crop(img, active) if active is not None else img
 
         # Upscale using array helper (no double encode/decode)
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(_cpu_executor, upscale_image_array, img)
+        batch_key = _frame_batch_key(picture, resident)
+        if batch_key is not None:
+            # Shares one inference with concurrent same-shaped frames
+            result, batch_size = await _frame_batcher.submit(batch_key, picture)
+            headers = {"X-Batch-Size": str(batch_size)}
+        else:
+            result, tile_stats = await loop.run_in_executor(
+                _inference_executor(ticket), _with_model, resident, _with_tile_stats, _upscale_frame_array, picture)
+            headers = tile_stats.headers() if tile_stats else None
+        ticket.work = h * w  # an inference: a sample for the adaptive limit
+        if active is not None:
+            result = letterbox.pad(result, active, h, w)
+            headers = dict(headers or {}, **{"X-Letterbox": active.bars(h, w)})
 
         # Encode as JPEG quality 85 (much faster than PNG)
         _, buffer = cv2.imencode('.jpg', result, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if dedup is not None:
+            dedup.store(img, (buffer.tobytes(), {k: v for k, v in (headers or {}).items() if k == "X-Letterbox"}),
+                        model_name)
 
         duration_ms = (time.time() - start_time) * 1000
         _record_success(model_name, duration_ms)
         with _processing_count_lock:
             state.total_frames_processed += 1
-        return Response(content=buffer.tobytes(), media_type="image/jpeg")
+        return Response(content=buffer.tobytes(), media_type="image/jpeg", headers=headers)
 
     except HTTPException:
         raise
@@ -4765,7 +5991,7 @@ async def upscale_frame_endpoint(request: Request):
         if acquired:
             with _processing_count_lock:
                 state.processing_count -= 1
-            sem.release()
+            _scheduler.release(ticket)
 
 
 @app.post("/upscale-video-chunk")
@@ -4781,13 +6007,8 @@ async def upscale_video_chunk(request: Request):
     with _model_lock:
         expected_frames = min(state.current_model_input_frames, MAX_INPUT_FRAMES)
 
-    # Capture semaphore reference for safe release
-    sem = _upscale_semaphore
-    acquired = False
-    # See /upscale for explanation of why we avoid asyncio.wait_for(timeout=0)
-    if sem is None or sem._value <= 0:
-        raise HTTPException(status_code=503, detail="Busy")
-    await sem.acquire()
+    # Wait for an inference slot (realtime unless X-Priority says otherwise)
+    ticket = await _admit(_admission(request, scheduler.REALTIME), 503)
     acquired = True
     with _processing_count_lock:
         state.processing_count += 1
@@ -4817,11 +6038,19 @@ async def upscale_video_chunk(request: Request):
                 raise HTTPException(status_code=413, detail=f"Image too large: {w}x{h}")
             frames.append(img)
 
+        # Same black bars on every frame of the chunk: detect on the centre frame
+        full_h, full_w = frames[len(frames) // 2].shape[:2]
+        active = _letterbox_active(request, frames[len(frames) // 2])
+        if active is not None and all(f.shape[:2] == (full_h, full_w) for f in frames):
+            frames = [letterbox.crop(f, active) for f in frames]
+        else:
+            active = None
+
         # If single-frame model loaded, transparent fallback: upscale center frame only
         if expected_frames == 1:
             center = frames[len(frames) // 2]
             loop = asyncio.get_running_loop()
-            result = await loop.run_in_executor(_cpu_executor, upscale_image_array, center)
+            result = await loop.run_in_executor(_inference_executor(ticket), _upscale_frame_array, center)
         else:
             # Scene-change detection: check consecutive frame pairs for abrupt
             # changes.  If any pair crosses the threshold the multi-frame model
@@ -4843,10 +6072,13 @@ async def upscale_video_chunk(request: Request):
             if scene_change_detected:
                 center = frames[len(frames) // 2]
                 loop = asyncio.get_running_loop()
-                result = await loop.run_in_executor(_cpu_executor, upscale_image_array, center)
+                result = await loop.run_in_executor(_inference_executor(ticket), _upscale_frame_array, center)
             else:
                 loop = asyncio.get_running_loop()
-                result = await loop.run_in_executor(_cpu_executor, upscale_multiframe, frames)
+                result = await loop.run_in_executor(_inference_executor(ticket), upscale_multiframe, frames)
+        ticket.work = full_h * full_w * len(frames)  # an inference: a sample for the adaptive limit
+        if active is not None:
+            result = letterbox.pad(result, active, full_h, full_w)
 
         # Encode as PNG
         _, buffer = cv2.imencode('.png', result)
@@ -4869,7 +6101,127 @@ async def upscale_video_chunk(request: Request):
         if acquired:
             with _processing_count_lock:
                 state.processing_count -= 1
-            sem.release()
+            _scheduler.release(ticket)
+
+
+def _shm_enabled() -> None:
+    if not shm_transport.ENABLED:
+        raise HTTPException(status_code=403, detail="Shared-memory transport disabled (SHM_TRANSPORT=false)")
+
+
+@app.post("/shm/register")
+async def shm_register(request: Request):
+    """Attach to a client's /dev/shm ring for raw-frame upscaling (see shm_transport.py).
+
+    JSON body: name (the segment, without /dev/shm/; must start with "jfup-"), width,
+    height, slots (default 2).
+    Returns the ring id and layout; the output size follows the active model's scale,
+    so register after loading the model. 400 when the segment is missing or too small.
+    """
+    _require_api_token(request)
+    _shm_enabled()
+    if state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
+        raise HTTPException(status_code=400, detail="No model loaded")
+    try:
+        body = await request.json()
+        width, height = int(body.get("width", 0)), int(body.get("height", 0))
+        slots = int(body.get("slots", 2))
+        name = str(body.get("name", ""))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Expected JSON with name, width, height and slots")
+    if width * height > MAX_IMAGE_PIXELS:
+        raise HTTPException(status_code=413, detail=f"Frame too large: {width}x{height}")
+    try:
+        ring = _shm_rings.register(name, width, height, slots, _loaded_model_scale())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return dict(ring.layout(), socket=shm_transport.SOCKET_PATH or None)
+
+
+@app.delete("/shm/{ring_id}")
+async def shm_unregister(ring_id: str, request: Request):
+    """Detach from a registered ring; the segment itself stays the client's."""
+    _require_api_token(request)
+    if not _shm_rings.remove(ring_id):
+        raise HTTPException(status_code=404, detail="Unknown ring")
+    return {"removed": ring_id}
+
+
+@app.get("/shm")
+async def shm_status(request: Request):
+    """Registered rings and frame counts."""
+    _require_api_token(request)
+    return _shm_rings.stats()
+
+
+@app.post("/shm/{ring_id}/frame/{slot}")
+async def shm_frame(ring_id: str, slot: int, request: Request):
+    """Upscale the raw frame in input slot `slot` into the slot's output area.
+
+    The HTTP form of the SHM_SOCKET notification; admitted as realtime work
+    (X-Priority / X-Deadline-Ms as for /upscale-frame), 503 with Retry-After when busy.
+    """
+    _require_api_token(request)
+    _shm_enabled()
+    return await _shm_frame(ring_id, slot, _admission(request, scheduler.REALTIME))
+
+
+def _shm_upscale(ring: shm_transport.Ring, slot: int) -> None:
+    result = _upscale_frame_array(ring.input(slot))
+    out = ring.output(slot)
+    if result.shape != out.shape:
+        raise ValueError(f"model output {result.shape} does not match the ring's {out.shape}")
+    out[:] = result
+
+
+async def _shm_frame(ring_id: str, slot: int, admission: Optional[tuple] = None) -> dict:
+    """Upscale one ring slot in place; shared by POST /shm/{id}/frame/{slot} and SHM_SOCKET."""
+    ring = _shm_rings.get(ring_id)
+    if ring is None:
+        raise HTTPException(status_code=404, detail="Unknown ring")
+    if not 0 <= slot < ring.slots:
+        raise HTTPException(status_code=400, detail=f"slot must be 0-{ring.slots - 1}")
+    _check_circuit_breaker()
+    if state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
+        raise HTTPException(status_code=400, detail="No model loaded")
+    if _loaded_model_scale() != ring.scale:
+        raise HTTPException(status_code=409, detail="Model scale changed since the ring was registered")
+    if slot in ring.busy:
+        raise HTTPException(status_code=409, detail=f"slot {slot} is already being processed")
+
+    # Claimed before waiting for admission, so a second signal for the slot cannot slip in
+    ring.busy.add(slot)
+    try:
+        ticket = await _admit(admission or (scheduler.REALTIME, None), 503)
+    except BaseException:
+        ring.busy.discard(slot)
+        raise
+    with _processing_count_lock:
+        state.processing_count += 1
+    start_time = time.time()
+    model_name = state.current_model or "unknown"
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_realtime_executor, _shm_upscale, ring, slot)
+        ticket.work = ring.width * ring.height
+        duration_ms = (time.time() - start_time) * 1000
+        _record_success(model_name, duration_ms)
+        ring.frames += 1
+        with _processing_count_lock:
+            state.total_frames_processed += 1
+        return {"slot": slot, "width": ring.width * ring.scale, "height": ring.height * ring.scale,
+                "ms": round(duration_ms, 2)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        _record_failure(model_name)
+        logger.error(f"Shared-memory frame upscale failed: {e}")
+        raise HTTPException(status_code=500, detail="Frame upscaling failed")
+    finally:
+        ring.busy.discard(slot)
+        with _processing_count_lock:
+            state.processing_count -= 1
+        _scheduler.release(ticket)
 
 
 def _run_frame_benchmark(width: int, height: int) -> dict:
@@ -4932,6 +6284,11 @@ async def upscale_stream(request: Request):
 
     Input: raw frame bytes (width * height * 3 per frame)
     Output: streaming response with upscaled raw frames
+
+    When frames take longer than the X-Target-FPS budget, the stream steps down
+    a quality ladder (reduced input, lighter resident model, bicubic) and back
+    up when there is headroom (REALTIME_QUALITY_CONTROL, see quality_ladder.py);
+    /realtime-stats reports the current level.
     """
     _require_api_token(request)
     _check_circuit_breaker()
@@ -4939,7 +6296,7 @@ async def upscale_stream(request: Request):
     if state.cv_model is None and state.onnx_session is None and state.ncnn_upscaler is None:
         raise HTTPException(status_code=400, detail="No model loaded")
 
-    # Validate headers BEFORE acquiring semaphore to prevent leaks on bad input
+    # Validate headers BEFORE taking a slot to prevent leaks on bad input
     try:
         frame_width = int(request.headers.get("X-Frame-Width", "0"))
         frame_height = int(request.headers.get("X-Frame-Height", "0"))
@@ -4951,6 +6308,7 @@ async def upscale_stream(request: Request):
 
     if frame_width > 3840 or frame_height > 2160:
         raise HTTPException(status_code=400, detail="Input resolution too high for real-time streaming (max 3840x2160)")
+    tile_tuner.observe(frame_width, frame_height)
 
     frame_format = request.headers.get("X-Frame-Format", "bgr24").lower()
     if frame_format not in ("rgb24", "bgr24"):
@@ -4962,11 +6320,9 @@ async def upscale_stream(request: Request):
         target_fps = 30.0
     target_fps = max(1.0, min(target_fps, 120.0))
 
-    # Acquire concurrency semaphore AFTER validation (prevents leak on bad headers)
-    sem = _upscale_semaphore
-    if sem is None or sem._value <= 0:
-        raise HTTPException(status_code=429, detail="Too many concurrent requests")
-    await sem.acquire()
+    # Take an inference slot AFTER validation (prevents leak on bad headers). A
+    # stream holds it for its whole length, so it is not a service-time sample.
+    ticket = await _admit(_admission(request, scheduler.REALTIME), 429, measure=False)
     with _processing_count_lock:
         state.processing_count += 1
 
@@ -4981,11 +6337,56 @@ async def upscale_stream(request: Request):
             "scale": (state.onnx_model_scale if state.current_model_type == "onnx"
                       else state.ncnn_model_scale if state.current_model_type == "ncnn"
                       else state.cv_model_scale),
+            "model_path": state.onnx_model_path,
+            "model_name": state.onnx_model_name,
         }
         onnx_session = state.onnx_session
 
     _realtime_stats.reset()
     model_name = state.current_model or "unknown"
+    borders = letterbox.BorderTracker() if letterbox.ENABLED else None
+    tile_caches: dict = {}  # quality level -> temporal_tiles.TileCache
+    dedup = frame_dedup.FrameDeduper() if frame_dedup.ENABLED else None
+
+    # Quality ladder; the "light" level needs a lighter resident model of the same scale
+    light = _lighter_resident_model(state.current_model, local_state["scale"])
+    light_state = None if light is None else {
+        "model_type": light.current_model_type,
+        "cv_model": light.cv_model,
+        "scale": light.scale,
+        "model_path": light.onnx_model_path,
+        "model_name": light.onnx_model_name,
+    }
+    quality = None
+    if quality_ladder.ENABLED:
+        levels = [lvl for lvl in (quality_ladder.FULL, quality_ladder.REDUCED,
+                                  quality_ladder.LIGHT, quality_ladder.BICUBIC)
+                  if lvl != quality_ladder.LIGHT or light is not None]
+        quality = quality_ladder.QualityController(target_fps, levels)
+        _realtime_stats.record_quality(quality.snapshot())
+
+    async def _upscale_at(img: np.ndarray, level: int) -> np.ndarray:
+        """Upscale img (BGR) at a quality-ladder level; always the full output size."""
+        h, w = img.shape[:2]
+        out_size = (w * local_state["scale"], h * local_state["scale"])
+        if level == quality_ladder.BICUBIC:
+            return cv2.resize(img, out_size, interpolation=cv2.INTER_CUBIC)
+        session, model_state = ((light.onnx_session, light_state) if level == quality_ladder.LIGHT
+                                else (onnx_session, local_state))
+        src = img
+        if level != quality_ladder.FULL:
+            src = cv2.resize(img, (max(1, round(w * quality_ladder.REDUCED_SCALE)),
+                                   max(1, round(h * quality_ladder.REDUCED_SCALE))),
+                             interpolation=cv2.INTER_AREA)
+        cache = None
+        if temporal_tiles.ENABLED and model_state["model_type"] == "onnx":
+            cache = tile_caches.setdefault(level, temporal_tiles.TileCache())
+        out = await upscale_frame_realtime(src, session, model_state, cache)
+        if cache is not None:
+            _realtime_stats.record_tiles(cache.last_tiles, cache.last_reused)
+        if (out.shape[1], out.shape[0]) != out_size:
+            out = cv2.resize(out, out_size, interpolation=cv2.INTER_LINEAR)
+        return out
 
     max_buffer_bytes = frame_size * 10  # Cap: at most 10 buffered frames to prevent OOM
 
@@ -5017,12 +6418,31 @@ async def upscale_stream(request: Request):
                     if frame_format == "rgb24":
                         frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
 
-                    # Upscale with real-time optimized path
-                    upscaled = await upscale_frame_realtime(frame, onnx_session, local_state)
-
-                    # Convert back to requested format for output
-                    if frame_format == "rgb24":
-                        upscaled = cv2.cvtColor(upscaled, cv2.COLOR_BGR2RGB)
+                    # A repeat of the last inferred frame gets its output again, but
+                    # only if it was produced at the rung the ladder is on now
+                    level = quality.level if quality is not None else quality_ladder.FULL
+                    tag = quality_ladder.NAMES[level]
+                    out_bytes = dedup.lookup(frame, tag) if dedup is not None else None
+                    if dedup is not None:
+                        _realtime_stats.record_dedup(out_bytes is not None)
+                    if out_bytes is None:
+                        # Upscale with real-time optimized path, black bars excluded
+                        active = borders.update(frame) if borders is not None else None
+                        if active is None:
+                            upscaled = await _upscale_at(frame, level)
+                        else:
+                            upscaled = letterbox.pad(await _upscale_at(letterbox.crop(frame, active), level),
+                                                     active, frame_height, frame_width)
+                        if quality is not None:
+                            quality.observe(time.time() - frame_start)
+                            _realtime_stats.record_quality(quality.snapshot())
+
+                        # Convert back to requested format for output
+                        if frame_format == "rgb24":
+                            upscaled = cv2.cvtColor(upscaled, cv2.COLOR_BGR2RGB)
+                        out_bytes = upscaled.tobytes()
+                        if dedup is not None:
+                            dedup.store(frame, out_bytes, tag)
 
                     duration = time.time() - frame_start
                     _realtime_stats.record_frame(duration)
@@ -5030,14 +6450,14 @@ async def upscale_stream(request: Request):
 
                     # Rate limiting: if we processed faster than target FPS, yield immediately
                     # (the consumer controls the actual playback rate)
-                    yield upscaled.tobytes()
+                    yield out_bytes
 
                     # Adaptive frame dropping: if processing is too slow, skip buffered frames
                     if duration > min_frame_interval * 2 and len(buffer) >= frame_size:
                         # Drop one frame to catch up — yield last good frame to keep consumer aligned
                         del buffer[:frame_size]
                         _realtime_stats.record_drop()
-                        yield upscaled.tobytes()  # Duplicate last frame to maintain alignment
+                        yield out_bytes  # Duplicate last frame to maintain alignment
                         logger.debug("Dropped frame to maintain real-time pace (%.1fms per frame)", duration * 1000)
 
                 except Exception as exc:
@@ -5046,7 +6466,7 @@ async def upscale_stream(request: Request):
                     # Yield empty frame marker (all zeros) so consumer knows a frame was skipped
                     continue
 
-        # Log final stats and release semaphore
+        # Log final stats and release the slot
         try:
             stats = _realtime_stats.snapshot()
             logger.info(
@@ -5059,7 +6479,7 @@ async def upscale_stream(request: Request):
         finally:
             with _processing_count_lock:
                 state.processing_count -= 1
-            sem.release()
+            _scheduler.release(ticket)
 
     return StreamingResponse(frame_generator(), media_type="application/octet-stream")
 
@@ -5083,6 +6503,7 @@ async def benchmark_frame_endpoint(width: int = 480, height: int = 270, request:
     # Clamp dimensions to reasonable range
     width = max(64, min(width, 1920))
     height = max(64, min(height, 1080))
+    tile_tuner.observe(width, height)
 
     try:
         await asyncio.wait_for(_benchmark_lock.acquire(), timeout=5.0)
@@ -5090,7 +6511,7 @@ async def benchmark_frame_endpoint(width: int = 480, height: int = 270, request:
         raise HTTPException(status_code=429, detail="Benchmark already in progress")
     try:
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(_cpu_executor, _run_frame_benchmark, width, height)
+        result = await loop.run_in_executor(_admin_executor, _run_frame_benchmark, width, height)
         return result
     finally:
         _benchmark_lock.release()
@@ -5101,32 +6522,101 @@ async def update_config(
     use_gpu: Optional[bool] = Form(None),
     max_concurrent: Optional[int] = Form(None),
     gpu_device_id: Optional[int] = Form(None),
+    micro_batch_window_ms: Optional[int] = Form(None),
+    micro_batch_max: Optional[int] = Form(None),
+    session_replicas: Optional[int] = Form(None),
+    session_profile: Optional[str] = Form(None),
+    session_profile_model: Optional[str] = Form(None),
     request: Request = None
 ):
-    """Update service configuration."""
+    """Update service configuration.
+
+    session_replicas re-partitions the loaded CPU model immediately (and applies
+    to every later load); in-flight requests finish on the sessions they hold.
+    session_profile sets the global SessionOptions profile, or - together with
+    session_profile_model - pins it for one model ("auto" removes the pin).
+    """
     _require_api_token(request)
+    if session_profile is not None:
+        try:
+            session_profile = session_profiles.validate(session_profile)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if session_profile_model is not None and session_profile is None:
+        raise HTTPException(status_code=400, detail="session_profile_model requires session_profile")
     if use_gpu is not None:
         state.use_gpu = use_gpu
     if max_concurrent is not None:
         if max_concurrent < 1 or max_concurrent > 256:
             raise HTTPException(status_code=400, detail="max_concurrent must be 1-256")
         state.max_concurrent = max_concurrent
-        global _upscale_semaphore
-        # Replace semaphore — new requests will use the new limit.
-        # In-flight requests still hold the old semaphore reference from their
-        # local 'acquired' variable, so they'll release correctly on completion.
-        _upscale_semaphore = asyncio.Semaphore(max_concurrent)
-        logger.info(f"max_concurrent changed to {max_concurrent}, new semaphore active (in-flight requests unaffected)")
+        # In-flight requests keep their slots; queued ones are admitted if it grew.
+        # With ADAPTIVE_CONCURRENCY the limit moves on from here.
+        concurrency_limit.MAX_LIMIT = max(concurrency_limit.MAX_LIMIT, max_concurrent)
+        _concurrency.reset(max_concurrent)
+        _scheduler.set_limit(max_concurrent)
+        logger.info(f"max_concurrent changed to {max_concurrent}")
     if gpu_device_id is not None:
         if gpu_device_id < 0 or gpu_device_id > 99:
             raise HTTPException(status_code=400, detail="gpu_device_id must be 0-99")
         state.gpu_device_id = gpu_device_id
         logger.info(f"GPU device ID updated to {gpu_device_id}")
+    if micro_batch_window_ms is not None:
+        if micro_batch_window_ms < 0 or micro_batch_window_ms > 100:
+            raise HTTPException(status_code=400, detail="micro_batch_window_ms must be 0-100")
+        _frame_batcher.window_ms = micro_batch_window_ms
+    if micro_batch_max is not None:
+        if micro_batch_max < 1 or micro_batch_max > 32:
+            raise HTTPException(status_code=400, detail="micro_batch_max must be 1-32")
+        _frame_batcher.max_batch = micro_batch_max
+    if session_replicas is not None:
+        if session_replicas < 1 or session_replicas > 64:
+            raise HTTPException(status_code=400, detail="session_replicas must be 1-64")
+        state.session_replicas = session_replicas
+        with _model_lock:
+            current, model_path, loaded = state.onnx_session, state.onnx_model_path, state.onnx_model_name
+        if current is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                # With the model's name, so its pinned or tuned profile survives
+                repartitioned = await loop.run_in_executor(
+                    _admin_executor, _partition_onnx_session, current, model_path, session_replicas, loaded)
+            except Exception as e:
+                logger.error(f"Session re-partitioning failed: {e}")
+                raise HTTPException(status_code=500, detail="Failed to rebuild session replicas")
+            _swap_onnx_session(current, repartitioned)
+            logger.info(f"session_replicas changed to {session_replicas}")
+    if session_profile is not None:
+        if session_profile_model:
+            session_profiles.pin(session_profile_model.strip(), session_profile)
+            logger.info(f"Session profile for {session_profile_model!r} pinned to {session_profile}")
+        else:
+            state.session_profile = session_profile
+            logger.info(f"Global session profile set to {session_profile}")
+        with _model_lock:
+            current, model_path, loaded = state.onnx_session, state.onnx_model_path, state.onnx_model_name
+        if current is not None and (not session_profile_model or session_profile_model.strip() == loaded):
+            loop = asyncio.get_running_loop()
+            try:
+                rebuilt = await loop.run_in_executor(_admin_executor, _rebuild_onnx_session, current, model_path, loaded)
+            except Exception as e:
+                logger.error(f"Session rebuild for new profile failed: {e}")
+                raise HTTPException(status_code=500, detail="Failed to apply session profile")
+            _swap_onnx_session(current, rebuilt)
 
+    pool = state.onnx_session if isinstance(state.onnx_session, session_pool.SessionPool) else None
     return {
         "use_gpu": state.use_gpu,
         "max_concurrent": state.max_concurrent,
-        "gpu_device_id": state.gpu_device_id
+        "gpu_device_id": state.gpu_device_id,
+        "micro_batch_window_ms": _frame_batcher.window_ms,
+        "micro_batch_max": _frame_batcher.max_batch,
+        "session_replicas": state.session_replicas,
+        "active_replicas": len(pool) if pool else (1 if state.onnx_session is not None else 0),
+        "threads_per_replica": pool.threads_per_replica if pool else None,
+        "session_profile": state.session_profile,
+        "effective_session_profile": (_session_profile_for(state.onnx_model_name)
+                                      if state.onnx_session is not None else None),
     }
 
 
@@ -5175,6 +6665,14 @@ async def revoke_api_token(token_id: str, request: Request = None):
     return {"revoked": True, "id": token_id}
 
 
+@app.delete("/cache/results")
+async def clear_result_cache(request: Request = None):
+    """Drop every cached /upscale result."""
+    _require_api_token(request)
+    loop = asyncio.get_running_loop()
+    return {"removed": await loop.run_in_executor(_admin_executor, result_cache.clear)}
+
+
 # ============================================================
 # === Prometheus-Style Metrics Endpoint ===
 # ============================================================
@@ -5223,6 +6721,299 @@ async def prometheus_metrics():
         f"upscaler_consecutive_failures {state.consecutive_failures}",
     ]
 
+    plan_info = tile_plan.cache_info()
+    lines += [
+        "",
+        "# HELP upscaler_tile_plan_cache_hits_total Tile-plan lookups served from cache",
+        "# TYPE upscaler_tile_plan_cache_hits_total counter",
+        f"upscaler_tile_plan_cache_hits_total {plan_info['hits']}",
+        "",
+        "# HELP upscaler_tile_plan_cache_misses_total Tile plans built from scratch",
+        "# TYPE upscaler_tile_plan_cache_misses_total counter",
+        f"upscaler_tile_plan_cache_misses_total {plan_info['misses']}",
+        "",
+        "# HELP upscaler_tile_plan_cache_bytes Memory held by cached tile plans",
+        "# TYPE upscaler_tile_plan_cache_bytes gauge",
+        f"upscaler_tile_plan_cache_bytes {plan_info['bytes']}",
+        "",
+    ]
+
+    binding_info = io_binding.stats()
+    lines += [
+        "# HELP upscaler_io_binding_reuse_total Inferences served from a pooled I/O-binding slot",
+        "# TYPE upscaler_io_binding_reuse_total counter",
+        f"upscaler_io_binding_reuse_total {binding_info['reused']}",
+        "",
+        "# HELP upscaler_io_binding_alloc_total I/O-binding slots allocated (new shape or pool exhausted)",
+        "# TYPE upscaler_io_binding_alloc_total counter",
+        f"upscaler_io_binding_alloc_total {binding_info['allocated']}",
+        "",
+        "# HELP upscaler_io_binding_fallback_total Sessions that fell back to plain run()",
+        "# TYPE upscaler_io_binding_fallback_total counter",
+        f"upscaler_io_binding_fallback_total {binding_info['fallbacks']}",
+        "",
+        "# HELP upscaler_io_binding_pooled_bytes Memory held by idle I/O-binding slots",
+        "# TYPE upscaler_io_binding_pooled_bytes gauge",
+        f"upscaler_io_binding_pooled_bytes {binding_info['pooled_bytes']}",
+        "",
+    ]
+    lines += _frame_batcher.prometheus("upscaler_micro_batch")
+    lines.append("")
+
+    graph_info = graph_cache.stats()
+    lines += [
+        "# HELP upscaler_graph_cache_hits_total Sessions built from a cached optimised graph",
+        "# TYPE upscaler_graph_cache_hits_total counter",
+        f"upscaler_graph_cache_hits_total {graph_info['hits']}",
+        "",
+        "# HELP upscaler_graph_cache_misses_total Sessions that ran full graph optimisation",
+        "# TYPE upscaler_graph_cache_misses_total counter",
+        f"upscaler_graph_cache_misses_total {graph_info['misses']}",
+        "",
+        "# HELP upscaler_graph_cache_bytes Disk used by cached optimised graphs",
+        "# TYPE upscaler_graph_cache_bytes gauge",
+        f"upscaler_graph_cache_bytes {graph_info['bytes']}",
+        "",
+        "# HELP upscaler_graph_io_sessions Loaded sessions with in-graph pre/post-processing",
+        "# TYPE upscaler_graph_io_sessions gauge",
+        f"upscaler_graph_io_sessions {sum(1 for c in list(_graph_io_sessions.values()) if c is not None)}",
+        "",
+    ]
+
+    result_info = result_cache.stats()
+    lines += [
+        "# HELP upscaler_result_cache_hits_total /upscale requests answered from the result cache",
+        "# TYPE upscaler_result_cache_hits_total counter",
+        f"upscaler_result_cache_hits_total {result_info['hits']}",
+        "",
+        "# HELP upscaler_result_cache_misses_total /upscale requests not in the result cache",
+        "# TYPE upscaler_result_cache_misses_total counter",
+        f"upscaler_result_cache_misses_total {result_info['misses']}",
+        "",
+        "# HELP upscaler_result_cache_coalesced_total Requests that waited for an identical in-flight request",
+        "# TYPE upscaler_result_cache_coalesced_total counter",
+        f"upscaler_result_cache_coalesced_total {result_info['coalesced']}",
+        "",
+        "# HELP upscaler_result_cache_evictions_total Cached results evicted to stay in budget",
+        "# TYPE upscaler_result_cache_evictions_total counter",
+        f"upscaler_result_cache_evictions_total {result_info['evicted']}",
+        "",
+        "# HELP upscaler_result_cache_bytes Disk used by cached results",
+        "# TYPE upscaler_result_cache_bytes gauge",
+        f"upscaler_result_cache_bytes {result_info['bytes']}",
+        "",
+        "# HELP upscaler_result_cache_entries Cached results",
+        "# TYPE upscaler_result_cache_entries gauge",
+        f"upscaler_result_cache_entries {result_info['entries']}",
+        "",
+    ]
+
+    flat_info = flat_tiles.stats()
+    lines += [
+        "# HELP upscaler_adaptive_tiles_total Tiles scored by the adaptive (flat-tile) mode",
+        "# TYPE upscaler_adaptive_tiles_total counter",
+        f"upscaler_adaptive_tiles_total {flat_info['tiles']}",
+        "",
+        "# HELP upscaler_adaptive_tiles_flat_total Flat tiles interpolated instead of inferred",
+        "# TYPE upscaler_adaptive_tiles_flat_total counter",
+        f"upscaler_adaptive_tiles_flat_total {flat_info['flat']}",
+        "",
+        "# HELP upscaler_adaptive_tiles_flat_ratio Share of scored tiles that skipped the model",
+        "# TYPE upscaler_adaptive_tiles_flat_ratio gauge",
+        f"upscaler_adaptive_tiles_flat_ratio {flat_info['flat'] / flat_info['tiles'] if flat_info['tiles'] else 0:.4f}",
+        "",
+    ]
+
+    realtime_info = _realtime_stats.snapshot()
+    lines += [
+        "# HELP upscaler_realtime_quality_level Quality-ladder level of the current stream (0 = full)",
+        "# TYPE upscaler_realtime_quality_level gauge",
+        f"upscaler_realtime_quality_level {realtime_info.get('quality_level', 0)}",
+        "",
+        "# HELP upscaler_realtime_quality_changes Quality-ladder steps taken by the current stream",
+        "# TYPE upscaler_realtime_quality_changes gauge",
+        f"upscaler_realtime_quality_changes {realtime_info.get('quality_changes', 0)}",
+        "",
+    ]
+
+    dedup_info = frame_dedup.stats()
+    lines += [
+        "# HELP upscaler_frame_dedup_frames_total Stream/frame-endpoint frames checked for duplication",
+        "# TYPE upscaler_frame_dedup_frames_total counter",
+        f"upscaler_frame_dedup_frames_total {dedup_info['frames']}",
+        "",
+        "# HELP upscaler_frame_dedup_hits_total Near-duplicate frames answered with the previous output",
+        "# TYPE upscaler_frame_dedup_hits_total counter",
+        f"upscaler_frame_dedup_hits_total {dedup_info['duplicates']}",
+        "",
+    ]
+
+    temporal_info = temporal_tiles.stats()
+    lines += [
+        "# HELP upscaler_temporal_tiles_total Realtime stream tiles considered for temporal reuse",
+        "# TYPE upscaler_temporal_tiles_total counter",
+        f"upscaler_temporal_tiles_total {temporal_info['tiles']}",
+        "",
+        "# HELP upscaler_temporal_tiles_reused_total Stream tiles served from the previous output",
+        "# TYPE upscaler_temporal_tiles_reused_total counter",
+        f"upscaler_temporal_tiles_reused_total {temporal_info['reused']}",
+        "",
+        "# HELP upscaler_temporal_tile_refreshes_total Forced full re-inferences of a stream frame",
+        "# TYPE upscaler_temporal_tile_refreshes_total counter",
+        f"upscaler_temporal_tile_refreshes_total {temporal_info['refreshes']}",
+        "",
+    ]
+
+    letterbox_info = letterbox.stats()
+    lines += [
+        "# HELP upscaler_letterbox_frames_cropped_total Frames upscaled without their black bars",
+        "# TYPE upscaler_letterbox_frames_cropped_total counter",
+        f"upscaler_letterbox_frames_cropped_total {letterbox_info['frames_cropped']}",
+        "",
+        "# HELP upscaler_letterbox_pixels_skipped_total Input pixels of black bars not sent through the model",
+        "# TYPE upscaler_letterbox_pixels_skipped_total counter",
+        f"upscaler_letterbox_pixels_skipped_total {letterbox_info['pixels_skipped']}",
+        "",
+    ]
+
+    resident_info = _resident_models.stats()
+    lines += [
+        "# HELP upscaler_resident_models Models held in the resident model cache",
+        "# TYPE upscaler_resident_models gauge",
+        f"upscaler_resident_models {len(resident_info['entries'])}",
+        "",
+        "# HELP upscaler_resident_model_bytes Estimated weight memory of resident models",
+        "# TYPE upscaler_resident_model_bytes gauge",
+        f"upscaler_resident_model_bytes {resident_info['resident_bytes']}",
+        "",
+        "# HELP upscaler_resident_model_hits_total Model loads/requests served from the resident cache",
+        "# TYPE upscaler_resident_model_hits_total counter",
+        f"upscaler_resident_model_hits_total {resident_info['hits']}",
+        "",
+        "# HELP upscaler_resident_model_misses_total Model loads that had to go to disk",
+        "# TYPE upscaler_resident_model_misses_total counter",
+        f"upscaler_resident_model_misses_total {resident_info['misses']}",
+        "",
+        "# HELP upscaler_resident_model_evictions_total Resident models evicted for budget",
+        "# TYPE upscaler_resident_model_evictions_total counter",
+        f"upscaler_resident_model_evictions_total {resident_info['evictions']}",
+        "",
+    ]
+
+    sched = _scheduler.stats()
+    lines += [
+        "# HELP upscaler_scheduler_limit Inference slots (concurrent requests admitted)",
+        "# TYPE upscaler_scheduler_limit gauge",
+        f"upscaler_scheduler_limit {sched['limit']}",
+        "",
+        "# HELP upscaler_scheduler_in_flight Requests holding an inference slot",
+        "# TYPE upscaler_scheduler_in_flight gauge",
+        f"upscaler_scheduler_in_flight {sched['in_flight']}",
+        "",
+        "# HELP upscaler_scheduler_service_ms Smoothed time a request holds its slot",
+        "# TYPE upscaler_scheduler_service_ms gauge",
+        f"upscaler_scheduler_service_ms {sched['service_ms']}",
+        "",
+        "# HELP upscaler_scheduler_queued Requests waiting for a slot, by priority class",
+        "# TYPE upscaler_scheduler_queued gauge",
+    ]
+    lines += [f'upscaler_scheduler_queued{{priority="{c}"}} {n}' for c, n in sched["queued_by_class"].items()]
+    lines += [
+        "# HELP upscaler_scheduler_rejected_total Requests not admitted, by reason",
+        "# TYPE upscaler_scheduler_rejected_total counter",
+    ]
+    lines += [f'upscaler_scheduler_rejected_total{{reason="{r}"}} {n}' for r, n in sched["rejected"].items()]
+    lines.append("")
+
+    conc = _concurrency.snapshot()
+    lines += [
+        "# HELP upscaler_concurrency_limit Adaptive inference limit (ADAPTIVE_CONCURRENCY)",
+        "# TYPE upscaler_concurrency_limit gauge",
+        f"upscaler_concurrency_limit {conc['limit']}",
+        "",
+        "# HELP upscaler_concurrency_limit_recent Lowest/highest limit over the recent change history",
+        "# TYPE upscaler_concurrency_limit_recent gauge",
+        f'upscaler_concurrency_limit_recent{{bound="min"}} {conc["recent_min"]}',
+        f'upscaler_concurrency_limit_recent{{bound="max"}} {conc["recent_max"]}',
+        "",
+        "# HELP upscaler_concurrency_limit_changes_total Adaptive limit increases and decreases",
+        "# TYPE upscaler_concurrency_limit_changes_total counter",
+        f'upscaler_concurrency_limit_changes_total{{direction="up"}} {conc["increases"]}',
+        f'upscaler_concurrency_limit_changes_total{{direction="down"}} {conc["decreases"]}',
+        "",
+        "# HELP upscaler_concurrency_latency_ratio Median latency / no-load baseline of the last window",
+        "# TYPE upscaler_concurrency_latency_ratio gauge",
+        f"upscaler_concurrency_latency_ratio {conc['last_ratio']}",
+        "",
+        "# HELP upscaler_concurrency_limit_history Recent limit values, newest last (age = changes ago)",
+        "# TYPE upscaler_concurrency_limit_history gauge",
+    ]
+    history = conc["history"][-10:]
+    lines += [f'upscaler_concurrency_limit_history{{age="{len(history) - 1 - i}"}} {h["limit"]}'
+              for i, h in enumerate(history)]
+    lines.append("")
+
+    pools = {name: e.stats() for name, e in _executors.items()}
+    for metric, key, kind, help_text in (
+        ("upscaler_executor_workers", "workers", "gauge", "Thread pool size per workload"),
+        ("upscaler_executor_active", "active", "gauge", "Jobs running per workload pool"),
+        ("upscaler_executor_queue_depth", "queue_depth", "gauge", "Jobs waiting for a thread per workload pool"),
+        ("upscaler_executor_completed_total", "completed", "counter", "Jobs finished per workload pool"),
+        ("upscaler_executor_yielded_total", "yielded", "counter",
+         "Times a pool held back its next job for queued realtime work"),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{pool="{name}"}} {st[key]}' for name, st in pools.items()]
+        lines.append("")
+
+    workers = _inference_pool.stats() if _inference_pool is not None else {}
+    lines += [
+        "# HELP upscaler_inference_workers Inference worker processes (INFERENCE_WORKERS)",
+        "# TYPE upscaler_inference_workers gauge",
+        f'upscaler_inference_workers{{state="configured"}} {inference_workers.WORKERS}',
+        f'upscaler_inference_workers{{state="alive"}} {workers.get("alive", 0)}',
+        "",
+        "# HELP upscaler_inference_worker_in_flight Frames in the worker shared-memory slots",
+        "# TYPE upscaler_inference_worker_in_flight gauge",
+        f"upscaler_inference_worker_in_flight {workers.get('in_flight', 0)}",
+        "",
+        "# HELP upscaler_inference_worker_jobs_total Frames sent to inference worker processes",
+        "# TYPE upscaler_inference_worker_jobs_total counter",
+        f"upscaler_inference_worker_jobs_total {workers.get('jobs_total', 0)}",
+        "",
+        "# HELP upscaler_inference_worker_restarts_total Crashed inference workers that were restarted",
+        "# TYPE upscaler_inference_worker_restarts_total counter",
+        f"upscaler_inference_worker_restarts_total {workers.get('restarts', 0)}",
+        "",
+    ]
+
+    shm = _shm_rings.stats()
+    lines += [
+        "# HELP upscaler_shm_rings Registered shared-memory frame rings (SHM_TRANSPORT)",
+        "# TYPE upscaler_shm_rings gauge",
+        f"upscaler_shm_rings {shm['rings']}",
+        "",
+        "# HELP upscaler_shm_frames_total Frames upscaled through the registered shared-memory rings",
+        "# TYPE upscaler_shm_frames_total counter",
+        f"upscaler_shm_frames_total {shm['frames_total']}",
+        "",
+    ]
+
+    pool = state.onnx_session
+    if isinstance(pool, session_pool.SessionPool):
+        lines += [
+            "# HELP upscaler_session_replica_inflight Inference calls running on each session replica",
+            "# TYPE upscaler_session_replica_inflight gauge",
+        ]
+        replica_stats = pool.stats()
+        lines += [f'upscaler_session_replica_inflight{{replica="{r["replica"]}"}} {r["inflight"]}' for r in replica_stats]
+        lines += [
+            "# HELP upscaler_session_replica_calls_total Inference calls routed to each session replica",
+            "# TYPE upscaler_session_replica_calls_total counter",
+        ]
+        lines += [f'upscaler_session_replica_calls_total{{replica="{r["replica"]}"}} {r["served"]}' for r in replica_stats]
+        lines.append("")
+
     # Per-model usage metrics
     for model_name, count in state.model_usage_count.items():
         safe_name = model_name.replace("-", "_").replace(".", "_").replace('"', '_')
@@ -5448,6 +7239,7 @@ async def models_cleanup(max_age_days: int = 30, dry_run: bool = True, request:
 
     with _model_lock:
         current = state.current_model
+    resident = set(_resident_models.names())
 
     for f in os.listdir(models_dir):
         fpath = os.path.join(models_dir, f)
@@ -5461,6 +7253,9 @@ async def models_cleanup(max_age_days: int = 30, dry_run: bool = True, request:
         if current and model_key == current:
             kept.append({"name": f, "reason": "currently loaded"})
             continue
+        if model_key in resident:
+            kept.append({"name": f, "reason": "resident"})
+            continue
 
         if last_used < cutoff:
             try:
@@ -5579,7 +7374,7 @@ async def interpolate_frames(request: Request):
                 raise HTTPException(status_code=500, detail=f"Failed to auto-download RIFE model {model_name}")
 
         loop = asyncio.get_running_loop()
-        loaded = await loop.run_in_executor(None, load_rife_model, model_name)
+        loaded = await loop.run_in_executor(_aux_executor, load_rife_model, model_name)
         if not loaded:
             raise HTTPException(status_code=500, detail=f"Failed to load RIFE model {model_name}")
 
@@ -5595,7 +7390,7 @@ async def interpolate_frames(request: Request):
     try:
         loop = asyncio.get_running_loop()
         result = await loop.run_in_executor(
-            _cpu_executor, interpolate_frame_rife, img1, img2, session, timestep
+            _aux_executor, interpolate_frame_rife, img1, img2, session, timestep
         )
 
         # Encode result as PNG
@@ -5666,7 +7461,7 @@ async def face_restore_load_endpoint(model_name: str = Form("gfpgan-v1.4"), requ
     _require_api_token(request)
     try:
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(None, load_face_restore_model, model_name)
+        result = await loop.run_in_executor(_aux_executor, load_face_restore_model, model_name)
         return result
     except FileNotFoundError as e:
         # Auto-download on first load, same pattern as RIFE
@@ -5675,7 +7470,7 @@ async def face_restore_load_endpoint(model_name: str = Form("gfpgan-v1.4"), requ
         if not dl_success:
             raise HTTPException(status_code=404, detail=str(e))
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(None, load_face_restore_model, model_name)
+        result = await loop.run_in_executor(_aux_executor, load_face_restore_model, model_name)
         return result
     except (ValueError, RuntimeError) as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -5765,7 +7560,7 @@ async def load_detector_endpoint(request: Request, model_name: str = Form(...),
         return ort.InferenceSession(str(path), providers=providers)
 
     loop = asyncio.get_running_loop()
-    sess = await loop.run_in_executor(_cpu_executor, _load)
+    sess = await loop.run_in_executor(_aux_executor, _load)
 
     # Ask the model how it wants to be driven instead of assuming one shape. A
     # mismatch here is not an exception - it is boxes painted over the wrong part of
@@ -5865,7 +7660,7 @@ async def detect_mask_endpoint(
     try:
         # The executor matters: this is full-frame inference, and running it inline
         # would freeze the event loop for every other request while it works.
-        masked, count = await loop.run_in_executor(_cpu_executor, _run)
+        masked, count = await loop.run_in_executor(_aux_executor, _run)
     except HTTPException:
         raise
     except Exception as e:
@@ -5910,7 +7705,7 @@ async def face_restore_frame_endpoint(request: Request):
             if not model_path.exists():
                 await download_model("gfpgan-v1.4")
             loop = asyncio.get_running_loop()
-            await loop.run_in_executor(None, load_face_restore_model, "gfpgan-v1.4")
+            await loop.run_in_executor(_aux_executor, load_face_restore_model, "gfpgan-v1.4")
         except Exception as e:
             raise HTTPException(status_code=503, detail=f"Face-restore model unavailable: {e}")
 
@@ -5918,7 +7713,7 @@ async def face_restore_frame_endpoint(request: Request):
     try:
         loop = asyncio.get_running_loop()
         restored, face_count = await loop.run_in_executor(
-            _cpu_executor, restore_faces_in_frame, img
+            _aux_executor, restore_faces_in_frame, img
         )
     except Exception as e:
         logger.error(f"Face restoration failed: {e}")
@@ -6619,7 +8414,7 @@ async def convert_model_from_catalog(request: Request, body: dict = Body(...)):
 
     pth_data = await _download_pinned(entry["download_url"], entry.get("sha256") or "")
     loop = asyncio.get_running_loop()
-    onnx_bytes, scale, _in_ch = await loop.run_in_executor(None, _convert_pth_bytes_to_onnx, pth_data)
+    onnx_bytes, scale, _in_ch = await loop.run_in_executor(_admin_executor, _convert_pth_bytes_to_onnx, pth_data)
 
     model_name = _to_import_model_name(entry.get("id") or "")
     desc = f"{entry.get('name')} (OpenModelDB, converted pth->onnx, license: {entry.get('license') or 'unclear'})"
@@ -6658,7 +8453,7 @@ async def _run_import_job(job_id: str, kind: str, entry: dict):
                 raise HTTPException(status_code=502, detail="sha256 mismatch - the upstream file changed since the catalog was generated. Import refused.")
             _import_job_set(job_id, status="converting")
             loop = asyncio.get_running_loop()
-            onnx_bytes, scale, _in_ch = await loop.run_in_executor(None, _convert_pth_bytes_to_onnx, data)
+            onnx_bytes, scale, _in_ch = await loop.run_in_executor(_admin_executor, _convert_pth_bytes_to_onnx, data)
             desc = f"{entry.get('name')} (OpenModelDB, converted pth->onnx, license: {entry.get('license') or 'unclear'})"
             _import_job_set(job_id, status="validating")
             result = _ingest_onnx_bytes(onnx_bytes, model_name, scale or _catalog_scale(entry), desc)
@@ -6734,6 +8529,158 @@ async def import_status(job_id: str, request: Request = None):
         return dict(job)
 
 
+# ── INT8 quantization jobs ───────────────────────────────────────────────────
+# Same job pattern as the imports: start, get a job id, poll. Quantizing and
+# scoring a GAN-sized model takes minutes of CPU, so only one job runs at a time.
+# Categories that are not upscalers (their I/O is not one NCHW frame)
+_QUANTIZE_EXCLUDED_CATEGORIES = ("interpolation", "face_restore", "object-detection", "vulkan")
+
+_quantize_jobs: dict = {}
+_quantize_jobs_guard = threading.Lock()
+
+
+def _quantize_job_set(job_id: str, **kw):
+    with _quantize_jobs_guard:
+        job = _quantize_jobs.get(job_id)
+        if job is not None:
+            job.update(kw)
+
+
+def _quantized_variant_name(model_name: str, mode: str) -> str:
+    suffix = "-int8" if mode == "static" else "-int8-dyn"
+    return model_name[:64 - len(suffix)] + suffix
+
+
+def _time_session_ms(session, feed: dict, runs: int = 3) -> float:
+    session.run(None, feed)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        session.run(None, feed)
+    return round((time.perf_counter() - t0) * 1000 / runs, 2)
+
+
+def _quantize_model_sync(job_id: str, model_name: str, mode: str, min_psnr: float, min_ssim: float) -> dict:
+    """Build, score and (if it passes) register the INT8 variant of model_name."""
+    info = AVAILABLE_MODELS[model_name]
+    reference = ort.InferenceSession(str(get_model_path(model_name)), providers=["CPUExecutionProvider"])
+    model_input = reference.get_inputs()[0]
+    if model_input.type != "tensor(float)" or len(model_input.shape) != 4:
+        raise ValueError("Only single-frame FP32 NCHW models can be quantized")
+    size = tuple(d if isinstance(d, int) and d > 0 else quantize.SAMPLE_SIZE for d in model_input.shape[2:])
+    variant = _quantized_variant_name(model_name, mode)
+
+    with tempfile.TemporaryDirectory(dir=str(CACHE_DIR)) as tmp:
+        dst = os.path.join(tmp, f"{variant}.onnx")
+        quantize.quantize(str(get_model_path(model_name)), dst, mode, model_input.name,
+                          quantize.sample_images(quantize.CALIBRATION_IMAGES, size))
+        _quantize_job_set(job_id, status="scoring")
+        candidate = ort.InferenceSession(dst, providers=["CPUExecutionProvider"])
+        metrics = quantize.score(reference, candidate, model_input.name, compute_quality_metrics,
+                                 quantize.sample_images(quantize.SCORE_IMAGES, size, seed=1))
+        feed = {model_input.name: quantize.to_input(quantize.sample_images(1, size, seed=2)[0])}
+        metrics["fp32_ms"] = _time_session_ms(reference, feed)
+        metrics["int8_ms"] = _time_session_ms(candidate, feed)
+        metrics["speedup"] = round(metrics["fp32_ms"] / max(metrics["int8_ms"], 1e-3), 2)
+        del candidate
+        passed = metrics["psnr_db"] >= min_psnr and metrics["ssim"] >= min_ssim
+        if not passed:
+            logger.info(f"INT8 {mode} variant of {model_name} rejected by the quality gate: {metrics}")
+            return {"status": "rejected", "variant": variant, "metrics": metrics}
+        with open(dst, "rb") as fh:
+            data = fh.read()
+
+    desc = (f"{info.get('name', model_name)} INT8 ({mode}; {metrics['psnr_db']} dB PSNR, "
+            f"SSIM {metrics['ssim']} vs FP32)")
+    _resident_models.remove(variant)  # a re-run replaces the file under a resident session
+    result = _ingest_onnx_bytes(data, variant, info.get("scale", 4), desc)
+    with _model_lock:
+        entry = AVAILABLE_MODELS.get(variant)
+        if entry is not None:
+            entry.update({"quantized_from": model_name, "precision": "int8", "quantization": mode})
+    logger.info(f"Registered INT8 {mode} variant {variant} ({metrics['speedup']}x, {metrics['psnr_db']} dB)")
+    return {"status": "completed", "variant": variant, "metrics": metrics,
+            "file_size_mb": result.get("file_size_mb")}
+
+
+async def _run_quantize_job(job_id: str, model_name: str, mode: str, min_psnr: float, min_ssim: float):
+    try:
+        _quantize_job_set(job_id, status="quantizing")
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_admin_executor, _quantize_model_sync, job_id, model_name, mode,
+                                            min_psnr, min_ssim)
+        _quantize_job_set(job_id, **result)
+    except HTTPException as e:
+        logger.warning(f"Quantize job {job_id} failed: {e.detail}")
+        _quantize_job_set(job_id, status="failed", error=str(e.detail))
+    except Exception as e:
+        logger.error(f"Quantize job {job_id} failed: {e}", exc_info=True)
+        _quantize_job_set(job_id, status="failed", error=str(e))
+
+
+@app.post("/models/quantize", tags=["Models"])
+async def quantize_model_endpoint(
+    request: Request,
+    model_name: str = Form(...),
+    mode: str = Form("static"),
+    min_psnr: Optional[float] = Form(None),
+    min_ssim: Optional[float] = Form(None),
+):
+    """Build an INT8 variant of a downloaded/imported ONNX upscaler in the background.
+
+    mode: "static" (calibrated on a built-in image set) or "dynamic". The variant
+    is scored against the FP32 model with compute_quality_metrics and registered
+    as <model>-int8 / <model>-int8-dyn only if mean PSNR >= min_psnr and mean
+    SSIM >= min_ssim (defaults QUANTIZE_MIN_PSNR / QUANTIZE_MIN_SSIM).
+    Poll /models/quantize-status/{job_id}.
+    """
+    _require_api_token(request)
+    if not ONNX_AVAILABLE or not quantize.available():
+        raise HTTPException(status_code=501, detail="Quantization needs onnxruntime and the onnx package")
+    mode = (mode or "").lower().strip()
+    if mode not in quantize.MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Valid: {', '.join(quantize.MODES)}")
+    min_psnr = QUANTIZE_MIN_PSNR if min_psnr is None else min_psnr
+    min_ssim = QUANTIZE_MIN_SSIM if min_ssim is None else min_ssim
+    if not 0.0 <= min_psnr <= 100.0 or not 0.0 <= min_ssim <= 1.0:
+        raise HTTPException(status_code=400, detail="min_psnr must be 0-100 and min_ssim 0-1")
+
+    model_name = _resolve_model_key(model_name)
+    info = AVAILABLE_MODELS.get(model_name)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+    if (info.get("type") != "onnx" or info.get("category") in _QUANTIZE_EXCLUDED_CATEGORIES
+            or info.get("input_frames", 1) != 1):
+        raise HTTPException(status_code=400, detail="Only single-frame ONNX upscalers can be quantized")
+    if info.get("precision") == "int8":
+        raise HTTPException(status_code=400, detail=f"{model_name} is already an INT8 variant")
+    if not get_model_path(model_name).exists():
+        raise HTTPException(status_code=400, detail=f"Model {model_name} is not downloaded")
+
+    with _quantize_jobs_guard:
+        if any(j["status"] in ("queued", "quantizing", "scoring") for j in _quantize_jobs.values()):
+            raise HTTPException(status_code=409, detail="A quantization job is already running")
+        job_id = uuid.uuid4().hex
+        _quantize_jobs[job_id] = {
+            "job_id": job_id, "model": model_name, "mode": mode,
+            "variant": _quantized_variant_name(model_name, mode),
+            "min_psnr": min_psnr, "min_ssim": min_ssim,
+            "status": "queued", "error": None, "started_at": time.time(),
+        }
+    asyncio.create_task(_run_quantize_job(job_id, model_name, mode, min_psnr, min_ssim))
+    return {"status": "queued", "job_id": job_id, "variant": _quantized_variant_name(model_name, mode)}
+
+
+@app.get("/models/quantize-status/{job_id}", tags=["Models"])
+async def quantize_status(job_id: str, request: Request = None):
+    """Poll a quantize job (queued|quantizing|scoring|completed|rejected|failed)."""
+    _require_api_token(request)
+    with _quantize_jobs_guard:
+        job = _quantize_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"No quantize job {job_id}")
+        return dict(job)
+
+
 @app.post("/models/convert-upload", tags=["Models"])
 async def convert_uploaded_model(
     request: Request,
@@ -6755,7 +8702,7 @@ async def convert_uploaded_model(
     if len(pth_data) > MAX_MODEL_UPLOAD_BYTES:
         raise HTTPException(status_code=413, detail=f"Model too large (max {MAX_MODEL_UPLOAD_BYTES // (1024*1024)} MB)")
     loop = asyncio.get_running_loop()
-    onnx_bytes, scale, _in_ch = await loop.run_in_executor(None, _convert_pth_bytes_to_onnx, pth_data)
+    onnx_bytes, scale, _in_ch = await loop.run_in_executor(_admin_executor, _convert_pth_bytes_to_onnx, pth_data)
     result = _ingest_onnx_bytes(onnx_bytes, model_name, scale, description or f"Converted upload ({scale}x)")
     return {**result, "converted": True}
 
@@ -6818,6 +8765,8 @@ async def delete_custom_model(request: Request, model_name: str):
 
         # Remove file + its persistence sidecar (v1.8.3.7)
         if model_path.exists() and model_path.is_file():
+            graph_io.forget(model_path)
+            graph_cache.forget(model_path)
             os.unlink(str(model_path))
         sidecar = models_dir / f"{model_name}.custom.json"
         if sidecar.exists() and sidecar.is_file():
@@ -6830,8 +8779,11 @@ async def delete_custom_model(request: Request, model_name: str):
         # serialises all model state mutations, the dict pop is safe without the
         # registry lock.
         AVAILABLE_MODELS.pop(model_name, None)
+        _resident_models.remove(model_name)
         if state.current_model == model_name:
             state.current_model = None
+            if state.onnx_session is not None:
+                io_binding.forget(state.onnx_session)
             state.onnx_session = None
             logger.info(f"Unloaded active model: {model_name}")
 
@@ -0,0 +1,144 @@
+"""Cross-request micro-batching for small frames (/upscale-frame).
+
+Several Jellyfin clients streaming at once each send one frame per request. Run
+one by one, those requests queue up on the same ONNX session and each pays the
+full per-call overhead - small frames leave most of a GPU (or most CPU cores)
+idle. The batcher gathers frames that can share one input tensor (same session,
+same height and width) for a short window and runs them as a single batched
+inference, then hands every request its own slice of the result.
+
+Single-stream latency is protected: when a frame arrives and no other request is
+in flight, it is dispatched immediately as a batch of one - the window only
+applies while there is actual concurrency to batch with. A batch is also
+dispatched as soon as it reaches max_batch.
+
+Everything here runs on the event loop (no locks needed); the batched inference
+itself runs in the executor passed in. Stats (batch sizes, queue delay = submit
+until inference starts) are kept as Prometheus-style cumulative histograms.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Hashable
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16)
+QUEUE_DELAY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.total += 1
+        self.sum += value
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+
+    def prometheus(self, name: str, help_text: str) -> list[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for le, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{le="{le}"}} {count}')
+        lines += [
+            f'{name}_bucket{{le="+Inf"}} {self.total}',
+            f"{name}_sum {self.sum:.6f}",
+            f"{name}_count {self.total}",
+        ]
+        return lines
+
+
+class MicroBatcher:
+    """Group submit() calls by key and run each group with one run_batch call.
+
+    run_batch(key, items) -> list of results (same order), executed in `executor`.
+    """
+
+    def __init__(self, run_batch: Callable[[Hashable, list], list], window_ms: int,
+                 max_batch: int, executor: Any = None):
+        self._run_batch = run_batch
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._executor = executor
+        self._pending: dict[Hashable, list] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self._active = 0  # submit() calls not yet answered
+        self.batches_total = 0
+        self.items_total = 0
+        self.batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delay = _Histogram(QUEUE_DELAY_BUCKETS)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0 and self.max_batch > 1
+
+    async def submit(self, key: Hashable, item: Any) -> tuple[Any, int]:
+        """Queue one item; returns (its result, size of the batch it ran in)."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._active += 1
+        try:
+            group = self._pending.setdefault(key, [])
+            group.append((item, fut, time.perf_counter()))
+            if len(group) >= self.max_batch or self._active == 1:
+                # Full batch, or nobody to batch with - do not make it wait
+                self._dispatch(key)
+            elif key not in self._timers:
+                self._timers[key] = loop.call_later(self.window_ms / 1000.0, self._dispatch, key)
+            return await fut
+        finally:
+            self._active -= 1
+
+    def _dispatch(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        entries = self._pending.pop(key, None)
+        if entries:
+            asyncio.get_running_loop().create_task(self._run(key, entries))
+
+    async def _run(self, key: Hashable, entries: list) -> None:
+        loop = asyncio.get_running_loop()
+        items = [e[0] for e in entries]
+        self.batches_total += 1
+        self.items_total += len(items)
+        self.batch_sizes.observe(len(items))
+
+        def _call():
+            started = time.perf_counter()
+            return started, self._run_batch(key, items)
+
+        try:
+            started, results = await loop.run_in_executor(self._executor, _call)
+        except BaseException as exc:
+            for _, fut, _ in entries:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for (_, fut, queued), result in zip(entries, results):
+            self.queue_delay.observe(max(started - queued, 0.0))
+            if not fut.done():  # the request may have been cancelled meanwhile
+                fut.set_result((result, len(items)))
+
+    def prometheus(self, prefix: str) -> list[str]:
+        return [
+            f"# HELP {prefix}_window_ms Batching window (0 = disabled)",
+            f"# TYPE {prefix}_window_ms gauge",
+            f"{prefix}_window_ms {self.window_ms}",
+            f"# HELP {prefix}_max_size Maximum frames per batch",
+            f"# TYPE {prefix}_max_size gauge",
+            f"{prefix}_max_size {self.max_batch}",
+            f"# HELP {prefix}_batches_total Batched inference calls",
+            f"# TYPE {prefix}_batches_total counter",
+            f"{prefix}_batches_total {self.batches_total}",
+            f"# HELP {prefix}_frames_total Frames served through the batcher",
+            f"# TYPE {prefix}_frames_total counter",
+            f"{prefix}_frames_total {self.items_total}",
+            *self.batch_sizes.prometheus(f"{prefix}_size", "Frames per batched inference"),
+            *self.queue_delay.prometheus(f"{prefix}_queue_delay_seconds",
+                                         "Time from request arrival to batch inference start"),
+        ]
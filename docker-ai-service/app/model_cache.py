@@ -0,0 +1,182 @@
+"""Resident upscaler models: several loaded at once, bounded by a memory budget.
+
+load_model used to keep exactly one upscaler: loading an OpenCV, ONNX or ncnn
+model cleared the other backends, so a library that mixes anime and live action
+reloaded (and re-optimised) the two models from disk every time a scan switched
+between them.
+
+The cache keeps a ResidentModel for every successfully loaded model - a snapshot
+of the AppState fields that describe one loaded upscaler (session/net, scale,
+providers, ...). The active model still lives in AppState as before; a resident
+entry is what load_model re-activates instead of going to disk, and what a
+request that names its own model (/upscale model=..., /upscale-frame X-Model)
+runs on without touching the active one.
+
+  * Budget: MODEL_CACHE_MB of estimated weight memory (RAM or VRAM, wherever the
+    session lives) and at most MODEL_CACHE_MAX entries. 1 entry = the old
+    single-model behaviour.
+  * Eviction is least-recently-used. The active model and the entry being added
+    are never evicted, so one oversized model still loads - it just pushes every
+    other entry out.
+  * An entry is only reused with the GPU settings it was loaded under
+    (use_gpu, gpu_device_id); a /models/load with other settings reloads it.
+  * Eviction only drops the cache's reference. A request already running on an
+    evicted entry finishes on it; the memory is freed when that request ends.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Iterable, Optional
+
+# Wired by main.py from MODEL_CACHE_MB / MODEL_CACHE_MAX.
+BUDGET_BYTES = 1024 * 1024 * 1024
+MAX_ENTRIES = 3
+
+# AppState fields that describe the loaded upscaler. ResidentModel carries the
+# same names so inference code can read either one.
+FIELDS = (
+    "current_model", "current_model_type", "current_model_input_frames",
+    "cv_model", "cv_model_name", "cv_model_scale",
+    "onnx_session", "onnx_model_name", "onnx_model_scale", "onnx_model_path",
+    "ncnn_upscaler", "ncnn_model_name", "ncnn_model_scale", "ncnn_gpu_id",
+    "providers",
+)
+
+
+class ResidentModel:
+    """One loaded upscaler, with the same attribute names as AppState."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.current_model: Optional[str] = None
+        self.current_model_type = "opencv"
+        self.current_model_input_frames = 1
+        self.cv_model = None
+        self.cv_model_name: Optional[str] = None
+        self.cv_model_scale = 2
+        self.onnx_session = None
+        self.onnx_model_name: Optional[str] = None
+        self.onnx_model_scale = 4
+        self.onnx_model_path: Optional[str] = None
+        self.ncnn_upscaler = None
+        self.ncnn_model_name: Optional[str] = None
+        self.ncnn_model_scale = 4
+        self.ncnn_gpu_id = 0
+        self.providers: list = []
+        self.use_gpu = True
+        self.gpu_device_id = 0
+        self.nbytes = 0
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+
+    @classmethod
+    def capture(cls, src, use_gpu: bool, gpu_device_id: int, nbytes: int) -> "ResidentModel":
+        entry = cls(src.current_model)
+        entry.copy_from(src)
+        entry.use_gpu, entry.gpu_device_id, entry.nbytes = use_gpu, gpu_device_id, nbytes
+        return entry
+
+    def copy_from(self, src) -> None:
+        for field in FIELDS:
+            setattr(self, field, getattr(src, field))
+
+    def apply_to(self, dst) -> None:
+        """Make dst (AppState) serve this model. Also clears the other backends."""
+        for field in FIELDS:
+            setattr(dst, field, getattr(self, field))
+
+    @property
+    def scale(self) -> int:
+        if self.current_model_type == "onnx":
+            return self.onnx_model_scale
+        if self.current_model_type == "ncnn":
+            return self.ncnn_model_scale
+        return self.cv_model_scale
+
+    @property
+    def loaded(self) -> bool:
+        return (self.cv_model is not None or self.onnx_session is not None
+                or self.ncnn_upscaler is not None)
+
+
+class ModelCache:
+    """LRU of ResidentModel entries under a byte budget and an entry cap."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "collections.OrderedDict[str, ResidentModel]" = collections.OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, name: str, use_gpu: bool, gpu_device_id: int) -> Optional[ResidentModel]:
+        """The entry for name if loaded under these GPU settings (counted as a hit)."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or (entry.use_gpu, entry.gpu_device_id) != (use_gpu, gpu_device_id):
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(name)
+            entry.hits += 1
+            entry.last_used = time.time()
+            self._stats["hits"] += 1
+            return entry
+
+    def peek(self, name: str) -> Optional[ResidentModel]:
+        with self._lock:
+            return self._entries.get(name)
+
+    def put(self, entry: ResidentModel, keep: Iterable[str] = ()) -> list:
+        """Add (or replace) entry as most recent; returns the names evicted for it."""
+        protected = set(keep) | {entry.name}
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(entry.name, None)
+            if old is not None:
+                entry.hits = old.hits
+            self._entries[entry.name] = entry
+            for name in list(self._entries):
+                if not self._over_budget():
+                    break
+                if name in protected:
+                    continue
+                del self._entries[name]
+                evicted.append(name)
+                self._stats["evictions"] += 1
+        return evicted
+
+    def _over_budget(self) -> bool:
+        total = sum(e.nbytes for e in self._entries.values())
+        return len(self._entries) > MAX_ENTRIES or total > BUDGET_BYTES
+
+    def remove(self, name: str) -> Optional[ResidentModel]:
+        with self._lock:
+            return self._entries.pop(name, None)
+
+    def names(self) -> list:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for k in self._stats:
+                self._stats[k] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = [{
+                "name": e.name,
+                "type": e.current_model_type,
+                "scale": e.scale,
+                "providers": list(e.providers or []),
+                "estimated_mb": round(e.nbytes / 1024 / 1024, 1),
+                "hits": e.hits,
+                "idle_s": round(time.time() - e.last_used, 1),
+            } for e in reversed(self._entries.values())]  # most recent first
+            return dict(self._stats,
+                        entries=entries,
+                        resident_bytes=sum(e.nbytes for e in self._entries.values()),
+                        budget_bytes=BUDGET_BYTES,
+                        max_entries=MAX_ENTRIES)
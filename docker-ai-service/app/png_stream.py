@@ -0,0 +1,77 @@
+"""Incremental PNG encoder: write an image band by band instead of all at once.
+
+cv2.imencode('.png') needs the complete output frame in memory and only returns
+once the whole file is compressed. For a 256 MP input at 4x that is a multi-GB
+array plus its PNG copy before the first byte leaves the service. PNG itself is a
+row format - IHDR, a zlib stream of filtered scanlines split across any number of
+IDAT chunks, IEND - so rows can be filtered, compressed and emitted as they are
+produced. Peak memory is one band plus the zlib window.
+
+Only what the upscaler emits is supported: 8-bit RGB, non-interlaced. Every row
+uses the "Up" filter (type 2; delta to the previous row), which is vectorisable
+with numpy and compresses photographic content far better than no filter. The
+previous row is carried across add_rows() calls so band boundaries are invisible
+to the decoder.
+"""
+from __future__ import annotations
+
+import struct
+import zlib
+
+import numpy as np
+
+_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_FILTER_UP = 2
+
+# Wired by main.py from PNG_STREAM_COMPRESSION. 1 matches OpenCV's imencode default.
+COMPRESSION_LEVEL = 1
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+class PngStreamWriter:
+    """Encode an RGB uint8 image of known size as a sequence of byte chunks.
+
+    Usage: header() once, add_rows(band) for each band top to bottom, finish()
+    once. Each call returns the bytes to send next (possibly empty).
+    """
+
+    def __init__(self, width: int, height: int, level: int | None = None):
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid PNG size {width}x{height}")
+        self.width, self.height = width, height
+        self.rows_written = 0
+        self._prev = np.zeros((1, width * 3), dtype=np.uint8)
+        self._z = zlib.compressobj(COMPRESSION_LEVEL if level is None else level)
+
+    def header(self) -> bytes:
+        # bit depth 8, colour type 2 (RGB), deflate, adaptive filtering, no interlace
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return _SIGNATURE + _chunk(b"IHDR", ihdr)
+
+    def add_rows(self, rows_rgb: np.ndarray) -> bytes:
+        """Filter + compress a (n, width, 3) uint8 RGB band; returns an IDAT chunk or b""."""
+        n = rows_rgb.shape[0]
+        if rows_rgb.shape[1:] != (self.width, 3) or rows_rgb.dtype != np.uint8:
+            raise ValueError(f"Band shape {rows_rgb.shape} {rows_rgb.dtype} does not match {self.width}x3 uint8")
+        if self.rows_written + n > self.height:
+            raise ValueError(f"Too many rows: {self.rows_written + n} > {self.height}")
+        if n == 0:
+            return b""
+        flat = rows_rgb.reshape(n, self.width * 3)
+        filtered = np.empty((n, self.width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = _FILTER_UP
+        # uint8 subtraction wraps modulo 256, which is exactly what PNG specifies
+        np.subtract(flat[:1], self._prev, out=filtered[:1, 1:])
+        np.subtract(flat[1:], flat[:-1], out=filtered[1:, 1:])
+        self._prev = flat[-1:].copy()
+        self.rows_written += n
+        data = self._z.compress(filtered.tobytes())
+        return _chunk(b"IDAT", data) if data else b""
+
+    def finish(self) -> bytes:
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG incomplete: {self.rows_written}/{self.height} rows written")
+        return _chunk(b"IDAT", self._z.flush()) + _chunk(b"IEND", b"")
@@ -0,0 +1,95 @@
+"""Closed-loop quality control for realtime streams.
+
+/upscale-stream's only answer to falling behind was to drop a buffered frame and
+send the last output twice, so a stream that was slightly too slow stuttered
+for as long as it ran. A QualityController per stream compares the smoothed
+per-frame latency with the target frame interval (X-Target-FPS) and moves along
+a ladder of cheaper ways to produce the same output size:
+
+  0 full      the stream's model on the full frame
+  1 reduced   the same model on the frame downscaled by REDUCED_SCALE, the
+              output resized to full size
+  2 light     a lighter resident model (same scale, smaller weights), still
+              on the reduced frame - skipped when none is resident
+  3 bicubic   cv2 bicubic resize, no model
+
+Hysteresis: the controller steps down after DOWN_FRAMES consecutive frames over
+HIGH x interval, and up only after up_wait frames under LOW x interval. A
+level whose upward probe fails (it steps down again within up_wait frames)
+doubles up_wait, up to MAX_UP_WAIT, so a stream does not oscillate between a
+level it cannot sustain and the one below; up_wait resets once a level holds.
+The smoothed latency restarts on every level change, since the cost changed.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+# Wired by main.py from REALTIME_QUALITY_CONTROL / REALTIME_REDUCED_SCALE_PCT.
+ENABLED = True
+REDUCED_SCALE = 0.75
+HIGH = 0.9           # x frame interval: over this is falling behind
+LOW = 0.6            # x frame interval: under this is headroom
+ALPHA = 0.25         # EWMA weight of the newest frame
+DOWN_FRAMES = 3
+UP_FRAMES = 30
+MAX_UP_WAIT = 960
+
+FULL, REDUCED, LIGHT, BICUBIC = 0, 1, 2, 3
+NAMES = ("full", "reduced", "light", "bicubic")
+
+
+class QualityController:
+    """Latency-driven ladder position for one stream."""
+
+    def __init__(self, target_fps: float, levels: Iterable[int] = (FULL, REDUCED, LIGHT, BICUBIC)):
+        self.interval_s = 1.0 / max(target_fps, 1e-3)
+        self.levels = sorted(set(levels))
+        self._pos = 0
+        self.ewma_s = 0.0
+        self.changes = 0
+        self._over = self._under = 0
+        self._up_wait = UP_FRAMES
+        self._since_up = None  # frames since the last step up, while probing
+
+    @property
+    def level(self) -> int:
+        return self.levels[self._pos]
+
+    @property
+    def name(self) -> str:
+        return NAMES[self.level]
+
+    def observe(self, latency_s: float) -> int:
+        """Account one frame produced at the current level; returns the level for the next."""
+        self.ewma_s = latency_s if self.ewma_s == 0.0 else ALPHA * latency_s + (1 - ALPHA) * self.ewma_s
+        if self._since_up is not None:
+            self._since_up += 1
+            if self._since_up >= self._up_wait:  # the probe held: back to normal patience
+                self._since_up, self._up_wait = None, UP_FRAMES
+        self._over = self._over + 1 if self.ewma_s > HIGH * self.interval_s else 0
+        self._under = self._under + 1 if self.ewma_s < LOW * self.interval_s else 0
+
+        if self._over >= DOWN_FRAMES and self._pos < len(self.levels) - 1:
+            if self._since_up is not None:  # the last step up did not hold
+                self._up_wait = min(self._up_wait * 2, MAX_UP_WAIT)
+                self._since_up = None
+            self._move(+1)
+        elif self._under >= self._up_wait and self._pos > 0:
+            self._move(-1)
+            self._since_up = 0
+        return self.level
+
+    def _move(self, step: int) -> None:
+        self._pos += step
+        self.changes += 1
+        self.ewma_s = 0.0
+        self._over = self._under = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "quality_level": self.level,
+            "quality_name": self.name,
+            "quality_changes": self.changes,
+            "smoothed_frame_ms": round(self.ewma_s * 1000, 2),
+            "frame_budget_ms": round(self.interval_s * 1000, 2),
+        }
@@ -0,0 +1,160 @@
+"""INT8 variants of ONNX upscalers, built in-service and gated on quality.
+
+The only precision switch so far (_resolve_fp16_setting) is FP16 on GPUs; CPU
+nodes ran every Real-ESRGAN-class model in FP32. ONNX Runtime's CPU kernels
+for QLinearConv / ConvInteger use VNNI (AVX512-VNNI, AVX-VNNI) where present,
+which is where most of the 2-4x comes from; on older AVX2 parts the gain is
+smaller but the model is still ~4x smaller on disk and in RAM.
+
+  static   QDQ format, per-channel INT8 weights, UINT8 activations calibrated
+           (MinMax) on CALIBRATION_IMAGES. Best speed; needs representative data.
+  dynamic  INT8 weights, activation ranges computed per inference. No
+           calibration, usually a little slower than static, sometimes safer on
+           models with wide activation ranges.
+
+Calibration and scoring use a small built-in image set generated here
+(gradients, edges, text-like strokes, texture, noise) rather than files
+shipped in the image - deterministic and free of licensing questions. Scoring
+uses a separate seed so the variant is not judged on its own calibration data.
+
+Nothing here registers a model: main.py runs the job, compares outputs with
+compute_quality_metrics and only then ingests the variant as a custom model.
+Requires the `onnx` package (onnxruntime.quantization is built on it).
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODES = ("static", "dynamic")
+CALIBRATION_IMAGES = 8
+SCORE_IMAGES = 4
+SAMPLE_SIZE = 64  # px, used when the model input has dynamic H/W
+
+
+def available() -> bool:
+    try:
+        import onnx  # noqa: F401
+        from onnxruntime import quantization  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def sample_images(count: int, size=SAMPLE_SIZE, seed: int = 0) -> list:
+    """Deterministic RGB uint8 test images covering typical upscaler content.
+
+    size is an int (square) or an (h, w) pair for models with a fixed input.
+    """
+    rng = np.random.default_rng(seed)
+    h, w = (size, size) if isinstance(size, int) else size
+    yy = np.linspace(0, 1, h, dtype=np.float32)[:, None].repeat(w, 1)
+    xx = np.linspace(0, 1, w, dtype=np.float32)[None, :].repeat(h, 0)
+    images = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:    # smooth colour gradients (skies, anime fills)
+            a, b = rng.random(3), rng.random(3)
+            img = (a[None, None] * xx[..., None] + b[None, None] * yy[..., None]) / 2
+        elif kind == 1:  # hard edges (line art, letterbox borders)
+            img = np.zeros((h, w, 3), np.float32)
+            for _ in range(4):
+                y0, x0 = rng.integers(0, h), rng.integers(0, w)
+                img[y0:y0 + h // 3, x0:x0 + w // 4] = rng.random(3)
+        elif kind == 2:  # thin strokes (subtitles, text)
+            img = np.full((h, w, 3), rng.random(), np.float32)
+            for row in range(2, h - 2, 6):
+                img[row, rng.integers(0, w // 2):rng.integers(w // 2, w)] = 1.0 - img[0, 0]
+        elif kind == 3:  # fine texture (foliage, fabric)
+            freq = rng.uniform(4, 16, 2)
+            img = 0.5 + 0.5 * np.sin(2 * np.pi * (freq[0] * xx + freq[1] * yy))[..., None] * rng.random(3)
+        else:            # sensor / compression noise on a mid-grey base
+            img = np.clip(0.5 + rng.normal(0, 0.15, (h, w, 3)), 0, 1)
+        images.append((np.clip(img, 0, 1) * 255).astype(np.uint8))
+    return images
+
+
+def to_input(img_rgb: np.ndarray) -> np.ndarray:
+    """uint8 HWC RGB -> float32 NCHW [0, 1], the catalog models' input contract."""
+    return np.ascontiguousarray(img_rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def to_image(output: np.ndarray) -> np.ndarray:
+    """float NCHW [0, 1] model output -> uint8 HWC RGB."""
+    out = np.clip(np.asarray(output, dtype=np.float32)[0].transpose(1, 2, 0), 0, 1)
+    return (out * 255.0 + 0.5).astype(np.uint8)
+
+
+def _calibration_reader(input_name: str, images: Iterable[np.ndarray]):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._it = iter([{input_name: to_input(img)} for img in images])
+
+        def get_next(self) -> Optional[dict]:
+            return next(self._it, None)
+
+    return _Reader()
+
+
+def quantize(src_path: str, dst_path: str, mode: str, input_name: str,
+             images: Optional[list] = None) -> None:
+    """Write an INT8 copy of src_path to dst_path (mode: static | dynamic)."""
+    from onnxruntime import quantization as q
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown quantization mode {mode!r} (valid: {', '.join(MODES)})")
+    # Shape inference + graph cleanup first: the quantizer skips ops it cannot type
+    prepared = dst_path + ".prep.onnx"
+    source = src_path
+    try:
+        q.quant_pre_process(src_path, prepared, skip_symbolic_shape=True)
+        source = prepared
+    except Exception as e:
+        logger.info(f"Quantization pre-processing skipped for {os.path.basename(src_path)}: {e}")
+    try:
+        if mode == "dynamic":
+            q.quantize_dynamic(source, dst_path, weight_type=q.QuantType.QInt8, per_channel=True)
+        else:
+            q.quantize_static(
+                source, dst_path,
+                _calibration_reader(input_name, images if images is not None else sample_images(CALIBRATION_IMAGES)),
+                quant_format=q.QuantFormat.QDQ,
+                activation_type=q.QuantType.QUInt8,
+                weight_type=q.QuantType.QInt8,
+                per_channel=True,
+                calibrate_method=q.CalibrationMethod.MinMax,
+            )
+    finally:
+        if os.path.exists(prepared):
+            os.unlink(prepared)
+
+
+def score(reference, candidate, input_name: str, metric: Callable[[np.ndarray, np.ndarray], dict],
+          images: Optional[list] = None) -> dict:
+    """Mean/min PSNR and SSIM of candidate's outputs against reference's.
+
+    reference/candidate are ORT sessions; metric is compute_quality_metrics
+    (BGR uint8 in), fed the FP32 output as "original".
+    """
+    psnr, ssim = [], []
+    for img in images if images is not None else sample_images(SCORE_IMAGES, seed=1):
+        feed = {input_name: to_input(img)}
+        ref = to_image(reference.run(None, feed)[0])[..., ::-1]
+        out = to_image(candidate.run(None, feed)[0])[..., ::-1]
+        m = metric(np.ascontiguousarray(ref), np.ascontiguousarray(out))
+        psnr.append(m["psnr_db"])
+        ssim.append(m["ssim"])
+    return {
+        "psnr_db": round(float(np.mean(psnr)), 2),
+        "min_psnr_db": round(float(np.min(psnr)), 2),
+        "ssim": round(float(np.mean(ssim)), 4),
+        "min_ssim": round(float(np.min(ssim)), 4),
+        "images": len(psnr),
+    }
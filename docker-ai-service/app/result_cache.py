@@ -0,0 +1,181 @@
+"""Content-addressed cache of /upscale results under CACHE_DIR.
+
+Library scans send the same poster, backdrop or thumbnail again on every rescan
+and for every item that shares the artwork; each one was upscaled from scratch.
+Results are stored by make_key(): sha256 over the uploaded bytes plus everything
+that changes the output (model and its file, scale, stitch mode, precision,
+service version), so a changed model or option is simply a different key - there
+is no invalidation step.
+
+  * Files live in DIR/<2 hex>/<key>.png and are written atomically; the
+    directory is bounded to BUDGET_BYTES, least recently used first. The LRU
+    order is kept in memory and mirrored to file mtimes (a hit touches the file),
+    so it survives restarts: the index is rebuilt from a directory scan on first
+    use.
+  * coalesce() is a singleflight for the event loop: concurrent requests for
+    the same key wait for the first one instead of computing it again. If that
+    leader fails or produces nothing cacheable (a streamed response) the
+    waiters get None and compute on their own.
+
+get()/put() do file I/O - main.py runs them on the executor.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Wired by main.py from RESULT_CACHE / RESULT_CACHE_MB and CACHE_DIR.
+ENABLED = True
+DIR = Path("/app/cache") / "results"
+BUDGET_BYTES = 1024 * 1024 * 1024
+
+_lock = threading.Lock()
+_index: Optional["collections.OrderedDict[str, int]"] = None  # key -> bytes, LRU first
+_index_dir: Optional[Path] = None  # DIR the index was built from
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "stored": 0, "evicted": 0}
+_inflight: dict = {}  # key -> asyncio.Future, touched on the event loop only
+
+
+def make_key(data: bytes, **parts) -> str:
+    h = hashlib.sha256(data)
+    h.update(json.dumps(parts, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _path(key: str) -> Path:
+    return DIR / key[:2] / f"{key}.png"
+
+
+def _load_index() -> "collections.OrderedDict[str, int]":
+    """Caller holds _lock. Scan DIR once; order by mtime (oldest first)."""
+    global _index, _index_dir
+    if _index is None or _index_dir != DIR:
+        entries = []
+        try:
+            for sub in DIR.iterdir():
+                if not sub.is_dir():
+                    continue
+                for p in sub.glob("*.png"):
+                    try:
+                        st = p.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, p.stem, st.st_size))
+        except OSError:
+            pass
+        _index = collections.OrderedDict((k, size) for _, k, size in sorted(entries))
+        _index_dir = DIR
+    return _index
+
+
+def get(key: str) -> Optional[bytes]:
+    """Cached result bytes, or None (counted as a hit or a miss)."""
+    path = _path(key)
+    try:
+        data = path.read_bytes()
+        os.utime(path)  # LRU touch, survives restarts
+    except OSError:
+        with _lock:
+            _stats["misses"] += 1
+            _load_index().pop(key, None)
+        return None
+    with _lock:
+        _stats["hits"] += 1
+        index = _load_index()
+        index[key] = len(data)
+        index.move_to_end(key)
+    return data
+
+
+def put(key: str, data: bytes) -> int:
+    """Store a result; returns the number of entries evicted to stay in budget."""
+    if len(data) > BUDGET_BYTES:
+        return 0
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".put-", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Result cache: cannot store {key[:12]} ({e})")
+        return 0
+    with _lock:
+        _stats["stored"] += 1
+        index = _load_index()
+        index[key] = len(data)
+        index.move_to_end(key)
+    return evict()
+
+
+def evict() -> int:
+    """Delete least recently used results until the cache fits BUDGET_BYTES."""
+    removed = []
+    with _lock:
+        index = _load_index()
+        total = sum(index.values())
+        while index and total > BUDGET_BYTES:
+            key, size = index.popitem(last=False)
+            total -= size
+            removed.append(key)
+        _stats["evicted"] += len(removed)
+    for key in removed:
+        try:
+            _path(key).unlink()
+        except OSError:
+            pass
+    return len(removed)
+
+
+def clear() -> int:
+    """Drop every cached result; returns how many were removed."""
+    with _lock:
+        index = _load_index()
+        keys = list(index)
+        index.clear()
+    for key in keys:
+        try:
+            _path(key).unlink()
+        except OSError:
+            pass
+    return len(keys)
+
+
+async def coalesce(key: str, compute: Callable[[], Awaitable[Optional[bytes]]]) -> tuple:
+    """Run compute() once for concurrent callers of the same key.
+
+    Returns (result, leader): the leader gets compute()'s own return value (and
+    its exceptions); waiters get the leader's bytes or None.
+    """
+    pending = _inflight.get(key)
+    if pending is not None:
+        with _lock:
+            _stats["coalesced"] += 1
+        return await asyncio.shield(pending), False
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    result = None
+    try:
+        result = await compute()
+        return result, True
+    finally:
+        _inflight.pop(key, None)
+        future.set_result(result)
+
+
+def stats() -> dict:
+    with _lock:
+        index = _load_index()
+        return dict(_stats, entries=len(index), bytes=sum(index.values()),
+                    budget_bytes=BUDGET_BYTES, inflight=len(_inflight))
@@ -0,0 +1,201 @@
+"""Deadline- and priority-aware admission for the inference endpoints.
+
+/upscale, /upscale-frame, /upscale-video-chunk, /upscale-hdr and /upscale-stream
+used to peek at an asyncio.Semaphore and fail at once with 429/503 when it was
+full - a playback frame and a library-scan poster were turned away alike, and
+clients retried in a tight loop. Scheduler replaces that semaphore:
+
+  * `limit` requests hold a slot at once (MAX_CONCURRENT_REQUESTS / /config).
+  * A request that finds no free slot waits in a bounded queue (MAX_QUEUE),
+    ordered by priority class (realtime > interactive > batch) and then by
+    earliest deadline. A full queue sheds its worst entry if the newcomer
+    outranks it, otherwise turns the newcomer away - playback never loses its
+    place to batch work.
+  * The deadline is the caller's X-Deadline-Ms, else DEFAULT_WAIT_MS for the
+    class. A request whose deadline cannot be met by the estimated wait is
+    rejected up front, and one whose deadline passes while queued is dropped -
+    work nobody waits for any more is never started.
+  * Every rejection carries retry_after_s, estimated from the measured service
+    time (EWMA of how long a slot is held) and the work queued ahead, so
+    clients can back off for as long as it actually takes.
+
+Everything runs on the event loop; no locks. Long-lived holders (a stream) pass
+measure=False so they do not distort the service time. `listener`, when set, is
+called with every measured hold time, the ticket's `work` (input pixels, set by
+the endpoint once the model has run; None otherwise) and whether requests were queued behind it - the hook the
+adaptive limit (concurrency_limit.py) uses.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Callable, Optional
+
+REALTIME, INTERACTIVE, BATCH = "realtime", "interactive", "batch"
+CLASSES = (REALTIME, INTERACTIVE, BATCH)  # highest priority first
+
+# Wired by main.py from SCHEDULER_MAX_QUEUE.
+MAX_QUEUE = 32
+DEFAULT_WAIT_MS = {REALTIME: 250, INTERACTIVE: 5000, BATCH: 60000}
+ALPHA = 0.2  # EWMA weight of the newest service time
+
+
+class Rejected(Exception):
+    """Not admitted: reason is full, shed, deadline or expired."""
+
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+    @property
+    def retry_after(self) -> str:
+        """Retry-After header value (whole seconds, at least 1)."""
+        return str(max(1, math.ceil(self.retry_after_s)))
+
+
+class Ticket:
+    """One admitted (or queued) request."""
+
+    __slots__ = ("priority", "rank", "deadline", "seq", "measure", "future", "granted_at", "work")
+
+    def __init__(self, priority: str, deadline: float, seq: int, measure: bool):
+        self.priority = priority
+        self.rank = CLASSES.index(priority)
+        self.deadline = deadline
+        self.seq = seq
+        self.measure = measure
+        self.future: Optional[asyncio.Future] = None
+        self.granted_at: Optional[float] = None
+        self.work: Optional[int] = None  # input pixels, for the latency listener
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return (self.rank, self.deadline, self.seq) < (other.rank, other.deadline, other.seq)
+
+
+class Scheduler:
+    """Slots plus an EDF-within-priority wait queue."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.in_flight = 0
+        self.service_s = 0.0
+        self._queue: list = []  # heap of Tickets
+        self._seq = itertools.count()
+        self._stats = {"admitted": 0, "queued": 0, "full": 0, "shed": 0, "deadline": 0, "expired": 0}
+        self.listener: Optional[Callable[[float, Optional[int], bool], None]] = None
+
+    def set_limit(self, limit: int) -> None:
+        """Change the number of slots; queued requests are admitted if it grew."""
+        self.limit = max(1, int(limit))
+        self._dispatch()
+
+    def estimated_wait(self, rank: int) -> float:
+        """Seconds until a new request of this rank would get a slot."""
+        ahead = sum(1 for t in self._queue if t.rank <= rank)
+        if self.in_flight < self.limit and not ahead:
+            return 0.0
+        return (ahead + 1) * self.service_s / self.limit
+
+    def _reject(self, reason: str, rank: int) -> Rejected:
+        self._stats[reason] += 1
+        return Rejected(reason, self.estimated_wait(rank) or self.service_s)
+
+    async def acquire(self, priority: str = INTERACTIVE, deadline: Optional[float] = None,
+                      measure: bool = True) -> Ticket:
+        """Wait for a slot (raises Rejected). deadline is absolute time.monotonic()."""
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + DEFAULT_WAIT_MS[priority] / 1000.0
+        ticket = Ticket(priority, deadline, next(self._seq), measure)
+        if self.in_flight < self.limit and not any(t.rank <= ticket.rank for t in self._queue):
+            self._grant(ticket, now)
+            return ticket
+        if self.service_s and now + self.estimated_wait(ticket.rank) > deadline:
+            raise self._reject("deadline", ticket.rank)
+        if len(self._queue) >= MAX_QUEUE:
+            # MAX_QUEUE=0 is the old fail-fast behaviour: nothing queued to shed
+            worst = max(self._queue) if self._queue else None
+            if worst is None or worst.rank <= ticket.rank:
+                raise self._reject("full", ticket.rank)
+            self._remove(worst)
+            worst.future.set_exception(self._reject("shed", worst.rank))
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, ticket)
+        self._stats["queued"] += 1
+        try:
+            done, _ = await asyncio.wait({ticket.future}, timeout=max(0.0, deadline - now))
+        except asyncio.CancelledError:
+            self._abandon(ticket)
+            raise
+        if not done:
+            self._abandon(ticket)
+            raise self._reject("expired", ticket.rank)
+        return ticket.future.result()  # the ticket, or Rejected when shed
+
+    def _abandon(self, ticket: Ticket) -> None:
+        """The waiter left (timeout or cancelled): give back a slot granted meanwhile."""
+        if ticket.granted_at is not None:
+            ticket.measure = False  # never used: not a service time
+            self.release(ticket)
+        else:
+            self._remove(ticket)
+            ticket.future.cancel()
+
+    def _remove(self, ticket: Ticket) -> None:
+        try:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+        except ValueError:
+            pass
+
+    def _grant(self, ticket: Ticket, now: float) -> None:
+        self.in_flight += 1
+        ticket.granted_at = now
+        self._stats["admitted"] += 1
+        if ticket.future is not None:
+            ticket.future.set_result(ticket)
+
+    def release(self, ticket: Ticket) -> None:
+        """Give the slot back and admit the next queued request."""
+        if ticket.granted_at is None:
+            return
+        now = time.monotonic()
+        if ticket.measure:
+            held = now - ticket.granted_at
+            self.service_s = held if self.service_s == 0.0 else ALPHA * held + (1 - ALPHA) * self.service_s
+            if self.listener is not None:
+                self.listener(held, ticket.work, bool(self._queue))
+        ticket.granted_at = None
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self._queue and self.in_flight < self.limit:
+            ticket = heapq.heappop(self._queue)
+            if ticket.future.done():
+                continue
+            if ticket.deadline < now:
+                ticket.future.set_exception(self._reject("expired", ticket.rank))
+                continue
+            self._grant(ticket, now)
+
+    def stats(self) -> dict:
+        queued = {c: 0 for c in CLASSES}
+        for t in self._queue:
+            queued[t.priority] += 1
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._queue),
+            "queued_by_class": queued,
+            "service_ms": round(self.service_s * 1000, 2),
+            "rejected": {k: self._stats[k] for k in ("full", "shed", "deadline", "expired")},
+            "admitted_total": self._stats["admitted"],
+            "queued_total": self._stats["queued"],
+        }
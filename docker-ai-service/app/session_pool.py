@@ -0,0 +1,89 @@
+"""Replicated ONNX sessions with partitioned CPU thread budgets.
+
+One InferenceSession with intra-op threads = all cores scales poorly on CPU past a
+handful of cores: a single tile's operators cannot keep 32 threads busy, and every
+concurrent request queues on the same session. N replicas with cores/N threads
+each run N tiles truly in parallel - e.g. 4 x 4 on a 16-core host.
+
+SessionPool is a drop-in stand-in for state.onnx_session: run() leases the
+least-loaded replica for the duration of the call, so every existing call site
+(tiled, batched, realtime) is routed without knowing about the pool. Metadata
+calls (get_inputs, get_providers, ...) go to replica 0 - all replicas load the
+same file with the same options. Code that must stay on ONE replica across
+several calls (I/O bindings are tied to the session that created them) uses
+lease() explicitly.
+
+Building the replicas (providers, SessionOptions) stays in main.py next to the
+other session construction; this module only routes.
+"""
+from __future__ import annotations
+
+import contextlib
+import itertools
+import threading
+from typing import Iterator
+
+
+class SessionPool:
+    """Least-loaded routing over N equivalent ONNX Runtime sessions."""
+
+    def __init__(self, replicas: list, threads_per_replica: int):
+        if not replicas:
+            raise ValueError("SessionPool needs at least one replica")
+        self.replicas = list(replicas)
+        self.threads_per_replica = threads_per_replica
+        self._inflight = [0] * len(self.replicas)
+        self._served = [0] * len(self.replicas)
+        self._lock = threading.Lock()
+        # Rotating tie-break so an idle pool spreads work instead of piling on #0
+        self._rr = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    @contextlib.contextmanager
+    def lease(self) -> Iterator:
+        """Borrow the least-loaded replica until the block exits."""
+        n = len(self.replicas)
+        with self._lock:
+            start = next(self._rr) % n
+            idx = min(range(n), key=lambda i: (self._inflight[i], (i - start) % n))
+            self._inflight[idx] += 1
+            self._served[idx] += 1
+        try:
+            yield self.replicas[idx]
+        finally:
+            with self._lock:
+                self._inflight[idx] -= 1
+
+    def run(self, output_names, input_feed, run_options=None):
+        with self.lease() as session:
+            return session.run(output_names, input_feed, run_options)
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            return [{"replica": i, "inflight": self._inflight[i], "served": self._served[i]}
+                    for i in range(len(self.replicas))]
+
+    # Metadata: identical across replicas
+    def get_inputs(self):
+        return self.replicas[0].get_inputs()
+
+    def get_outputs(self):
+        return self.replicas[0].get_outputs()
+
+    def get_providers(self):
+        return self.replicas[0].get_providers()
+
+    def __getattr__(self, name):
+        # Anything else read-only (get_modelmeta, get_provider_options, ...)
+        if name.startswith("_") or name in ("replicas", "threads_per_replica"):
+            raise AttributeError(name)
+        return getattr(self.replicas[0], name)
+
+
+def split_threads(cpu_count: int, replicas: int, threads_per_replica: int = 0) -> int:
+    """Intra-op threads per replica: explicit value, else an even share of the cores."""
+    if threads_per_replica > 0:
+        return threads_per_replica
+    return max(1, cpu_count // max(replicas, 1))
@@ -0,0 +1,125 @@
+"""Named ONNX Runtime SessionOptions profiles, with per-model pins and auto-tuning.
+
+load_onnx_model used to set only graph_optimization_level and leave everything
+else at ORT defaults: intra-op threads = every core, spin-waiting worker threads,
+memory-pattern planning and the CPU arena on. That is tuned for a dedicated
+benchmark box, not for a media server where Jellyfin's own ffmpeg transcodes on
+the same cores - spinning threads steal exactly the cycles ffmpeg needs.
+
+Profiles (thread counts are fractions of os.cpu_count(), resolved at build time):
+
+  default      ORT defaults (the previous behaviour)
+  latency      all cores on one request, sequential graph, spin-wait on
+  throughput   half the cores per session, no spinning - concurrent requests
+               (or a session_pool) fill the rest
+  low-memory   quarter of the cores, no memory-pattern pre-planning, no CPU arena
+
+Which profile a model gets, most specific first:
+  1. a pin for that model (/config session_profile + session_profile_model)
+  2. if the global choice is "auto": the auto-tune winner recorded for this
+     model on this hardware fingerprint
+  3. the model's own "session_profile" entry in its model info, if any
+  4. the global choice (ONNX_SESSION_PROFILE or /config), "auto" meaning "default"
+
+Pins and tuning results live in CONFIG_DIR/session_profiles.json. A fingerprint
+changes with CPU, core count, GPU, ORT version or provider set, so moving the
+volume to another box does not apply stale winners.
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from . import config_store
+
+STORE = "session_profiles.json"
+
+PROFILES: dict[str, dict] = {
+    "default": {},
+    "latency": {"intra": 1.0, "inter": 1, "sequential": True, "spin": True},
+    "throughput": {"intra": 0.5, "inter": 1, "sequential": True, "spin": False},
+    "low-memory": {"intra": 0.25, "inter": 1, "sequential": True, "spin": False,
+                   "mem_pattern": False, "cpu_arena": False},
+}
+# Benchmarked by auto-tune, in this order
+CANDIDATES = ("default", "latency", "throughput", "low-memory")
+CHOICES = ("auto",) + tuple(PROFILES)
+
+
+def _empty() -> dict:
+    return {"version": 1, "models": {}, "tuned": {}}
+
+
+def validate(name: str) -> str:
+    name = (name or "").lower().strip()
+    if name not in CHOICES:
+        raise ValueError(f"Unknown session profile {name!r} (valid: {', '.join(CHOICES)})")
+    return name
+
+
+def apply(opts, profile: str, ort, cpu_count: int, intra_threads: Optional[int] = None) -> None:
+    """Set the profile's fields on an ort.SessionOptions.
+
+    intra_threads overrides the profile's thread share (a session_pool replica
+    already got its slice of the cores).
+    """
+    spec = PROFILES.get(profile, {})
+    share = spec.get("intra")
+    if intra_threads is not None:
+        opts.intra_op_num_threads = max(1, intra_threads)
+    elif share is not None:
+        opts.intra_op_num_threads = max(1, int(cpu_count * share))
+    if "inter" in spec:
+        opts.inter_op_num_threads = spec["inter"]
+    if spec.get("sequential"):
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if "mem_pattern" in spec:
+        opts.enable_mem_pattern = spec["mem_pattern"]
+    if "cpu_arena" in spec:
+        opts.enable_cpu_mem_arena = spec["cpu_arena"]
+    if "spin" in spec:
+        flag = "1" if spec["spin"] else "0"
+        opts.add_session_config_entry("session.intra_op.allow_spinning", flag)
+        opts.add_session_config_entry("session.inter_op.allow_spinning", flag)
+
+
+def resolve(model_name: Optional[str], fingerprint: str, global_choice: str,
+            model_default: Optional[str] = None) -> str:
+    """Effective profile for a model (see module docstring for the order)."""
+    data = config_store.load(STORE, _empty)
+    if model_name:
+        pinned = data.get("models", {}).get(model_name)
+        if pinned in PROFILES:
+            return pinned
+        if global_choice == "auto":
+            tuned = data.get("tuned", {}).get(f"{model_name}|{fingerprint}", {}).get("profile")
+            if tuned in PROFILES:
+                return tuned
+    if model_default in PROFILES:
+        return model_default
+    return global_choice if global_choice in PROFILES else "default"
+
+
+def pin(model_name: str, profile: Optional[str]) -> None:
+    """Pin a profile for one model; profile None (or "auto") removes the pin."""
+    def _mutate(data: dict) -> None:
+        models = data.setdefault("models", {})
+        if profile in PROFILES:
+            models[model_name] = profile
+        else:
+            models.pop(model_name, None)
+    config_store.update(STORE, _empty, _mutate)
+
+
+def save_tuned(model_name: str, fingerprint: str, winner: str, results: dict) -> None:
+    def _mutate(data: dict) -> None:
+        data.setdefault("tuned", {})[f"{model_name}|{fingerprint}"] = {
+            "profile": winner,
+            "results_ms": results,
+            "tuned_at": int(time.time()),
+        }
+    config_store.update(STORE, _empty, _mutate)
+
+
+def snapshot() -> dict:
+    return config_store.load(STORE, _empty)
@@ -0,0 +1,201 @@
+"""Shared-memory frame transport for clients on the same host.
+
+A Jellyfin server next to the service still sent every frame as JPEG or PNG
+over HTTP and got one back: two encodes and two decodes per frame, hundreds of
+MB/s of codec work for 1080p -> 4K. With SHM_TRANSPORT on, a local client can
+skip all of that:
+
+  1. It creates a POSIX shared-memory segment (/dev/shm/<name>, the name
+     starting with NAME_PREFIX) and registers it with POST /shm/register (name,
+     width, height, slots). The service attaches to the segment and answers with
+     the ring id and the layout below.
+  2. It writes a raw frame (uint8 BGR, height x width x 3) into an input slot
+     and signals the slot: POST /shm/{id}/frame/{slot}, or the line
+     "<id> <slot>" on the Unix socket at SHM_SOCKET.
+  3. The service upscales the frame and writes the raw result
+     (height*scale x width*scale x 3) into the same slot's output area, then
+     answers (JSON, or "OK <slot> <out_w> <out_h> <ms>" / "ERR <status> <detail>").
+
+Layout: slot i starts at i * stride; the input frame comes first, the output
+right after it (stride = input bytes + output bytes). The segment belongs to the
+client: the service never unlinks it, and only detaches on DELETE /shm/{id} or
+shutdown. The prefix keeps a client from pointing the service at segments that
+are not frame rings - in particular the inference workers' own slots. Ring ids
+are random and act as the capability for the socket, which is created with
+SOCKET_MODE permissions.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from . import inference_workers
+
+logger = logging.getLogger(__name__)
+
+# Wired by main.py from SHM_TRANSPORT / SHM_SOCKET / SHM_MAX_RINGS.
+ENABLED = False
+SOCKET_PATH = ""
+SOCKET_MODE = 0o660
+MAX_RINGS = 16
+MAX_SLOTS = 64
+
+NAME_PREFIX = "jfup-"
+_NAME_RE = re.compile(r"^" + re.escape(NAME_PREFIX) + r"[A-Za-z0-9_.-]{1,59}$")
+
+
+class Ring:
+    """One client segment attached by the service."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, name: str, width: int, height: int, slots: int,
+                 scale: int):
+        self.id = secrets.token_hex(16)
+        self.shm = shm
+        self.name = name
+        self.width, self.height, self.slots, self.scale = width, height, slots, scale
+        self.in_bytes = width * height * 3
+        self.out_bytes = self.in_bytes * scale * scale
+        self.stride = self.in_bytes + self.out_bytes
+        self.frames = 0
+        self.created = time.time()
+        self.busy: set = set()  # slots being processed
+        self.closed = False
+
+    def input(self, slot: int) -> np.ndarray:
+        return np.ndarray((self.height, self.width, 3), np.uint8, buffer=self.shm.buf, offset=slot * self.stride)
+
+    def output(self, slot: int) -> np.ndarray:
+        return np.ndarray((self.height * self.scale, self.width * self.scale, 3), np.uint8,
+                          buffer=self.shm.buf, offset=slot * self.stride + self.in_bytes)
+
+    def layout(self) -> dict:
+        return {
+            "id": self.id, "name": self.name, "width": self.width, "height": self.height,
+            "slots": self.slots, "scale": self.scale, "format": "bgr24",
+            "stride": self.stride, "input_offset": 0, "output_offset": self.in_bytes,
+            "output_width": self.width * self.scale, "output_height": self.height * self.scale,
+            "bytes": self.stride * self.slots,
+        }
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a frame is still being copied; the mapping goes with the last view
+
+
+def required_bytes(width: int, height: int, slots: int, scale: int) -> int:
+    return width * height * 3 * (1 + scale * scale) * slots
+
+
+class Registry:
+    """Registered rings by id. Thread-safe."""
+
+    def __init__(self):
+        self._rings: dict = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, width: int, height: int, slots: int, scale: int) -> Ring:
+        """Attach to /dev/shm/<name>; ValueError for bad parameters or a short segment."""
+        if not _NAME_RE.match(name or ""):
+            raise ValueError(f"name must be {NAME_PREFIX!r} followed by 1-59 characters of A-Z a-z 0-9 _ . -")
+        if name in inference_workers.segment_names():
+            raise ValueError(f"{name!r} belongs to the service")
+        if width <= 0 or height <= 0 or not 1 <= slots <= MAX_SLOTS:
+            raise ValueError(f"width and height must be positive, slots 1-{MAX_SLOTS}")
+        with self._lock:
+            if len(self._rings) >= MAX_RINGS:
+                raise ValueError(f"at most {MAX_RINGS} rings can be registered")
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            raise ValueError(f"no shared-memory segment named {name!r}")
+        # The client owns the segment: keep our resource tracker from unlinking it at exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+        need = required_bytes(width, height, slots, scale)
+        if shm.size < need:
+            shm.close()
+            raise ValueError(f"segment is {shm.size} bytes, {need} needed for {slots} slot(s) at x{scale}")
+        ring = Ring(shm, name, width, height, slots, scale)
+        with self._lock:
+            self._rings[ring.id] = ring
+        logger.info(f"Shared-memory ring {name} registered: {width}x{height} x{scale}, {slots} slot(s)")
+        return ring
+
+    def get(self, ring_id: str) -> Optional[Ring]:
+        with self._lock:
+            return self._rings.get(ring_id)
+
+    def remove(self, ring_id: str) -> bool:
+        with self._lock:
+            ring = self._rings.pop(ring_id, None)
+        if ring is None:
+            return False
+        ring.close()
+        return True
+
+    def close_all(self) -> None:
+        with self._lock:
+            rings, self._rings = list(self._rings.values()), {}
+        for ring in rings:
+            ring.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rings = list(self._rings.values())
+        return {
+            "enabled": ENABLED,
+            "socket": SOCKET_PATH or None,
+            "rings": len(rings),
+            "frames_total": sum(r.frames for r in rings),
+            "registered": [{"name": r.name, "width": r.width, "height": r.height, "slots": r.slots,
+                            "scale": r.scale, "frames": r.frames} for r in rings],
+        }
+
+
+Handler = Callable[[str, int], Awaitable[dict]]
+
+
+async def serve_socket(path: str, handle: Handler) -> asyncio.AbstractServer:
+    """Unix socket front end: one "<ring id> <slot>" line per frame, one reply line each."""
+
+    async def _client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("ascii", "replace").split()
+                if len(parts) != 2 or not parts[1].isdigit():
+                    writer.write(b"ERR 400 expected '<ring id> <slot>'\n")
+                else:
+                    try:
+                        done = await handle(parts[0], int(parts[1]))
+                        reply = f"OK {done['slot']} {done['width']} {done['height']} {done['ms']}\n"
+                    except Exception as exc:
+                        status = getattr(exc, "status_code", 500)
+                        detail = str(getattr(exc, "detail", "") or "upscaling failed").replace("\n", " ")
+                        reply = f"ERR {status} {detail}\n"
+                    writer.write(reply.encode("ascii", "replace"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    server = await asyncio.start_unix_server(_client, path=path)
+    os.chmod(path, SOCKET_MODE)
+    logger.info(f"Shared-memory frame socket listening on {path}")
+    return server
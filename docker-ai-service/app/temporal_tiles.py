@@ -0,0 +1,111 @@
+"""Temporal tile reuse for /upscale-stream: only changed tiles are inferred.
+
+upscale_frame_realtime inferred every frame in full, although talking heads,
+anime holds and static overlays leave most of the picture unchanged from one
+frame to the next. With TEMPORAL_TILES on, each stream keeps a TileCache: the
+frame is cut into the same TILE_SIZE grid as the realtime tiled path, and a tile
+whose input differs from the input its cached output was made from by no more
+than THRESHOLD levels (max abs difference, any channel) reuses that output.
+
+  * The realtime path infers tiles independently and pastes them without
+    blending, so a reused tile is exactly what inference would have produced
+    for the reference input; upscale() pastes tiles in grid order, as the full
+    path does, so the overlaps come out the same too.
+  * References are kept per tile and only replaced when the tile is inferred.
+    A slow fade therefore cannot creep through THRESHOLD a few levels per frame:
+    it is compared against the input the output was made from, not against the
+    previous frame.
+  * Every REFRESH_FRAMES frames all tiles are inferred again, which bounds any
+    drift below THRESHOLD and recovers from a bad output.
+
+Frames with a different shape (letterbox change, new stream) start over.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+# Wired by main.py from TEMPORAL_TILES / TEMPORAL_TILE_SIZE / TEMPORAL_TILE_THRESHOLD /
+# TEMPORAL_TILE_REFRESH.
+ENABLED = False
+TILE_SIZE = 128
+OVERLAP = 8
+THRESHOLD = 6          # 8-bit levels; compression noise on static content stays below
+REFRESH_FRAMES = 120   # full re-inference every N frames (0 = never)
+
+_lock = threading.Lock()
+_stats = {"tiles": 0, "reused": 0, "refreshes": 0}
+
+
+def grid(h: int, w: int, tile_size: int, overlap: int) -> list:
+    """(y, x) origins of the realtime tile grid; the last row/column is flush with the edge."""
+    step = max(tile_size - overlap, 1)
+
+    def _axis(size: int) -> list:
+        starts = list(range(0, max(size - tile_size, 0) + 1, step))
+        if not starts or starts[-1] + tile_size < size:
+            starts.append(max(size - tile_size, 0))
+        return starts
+
+    return [(y, x) for y in _axis(h) for x in _axis(w)]
+
+
+class TileCache:
+    """Per-stream tile inputs and outputs from the last time each tile was inferred."""
+
+    def __init__(self):
+        self.shape: Optional[tuple] = None
+        self.origins: list = []
+        self._reference: list = []  # input tile each output was made from
+        self._outputs: list = []
+        self._frames = 0
+        self._lock = threading.Lock()
+        self.last_tiles = 0   # grid size and reused tiles of the last frame
+        self.last_reused = 0
+
+    def upscale(self, frame: np.ndarray, scale: int,
+                infer: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Upscaled frame; infer(tile) is called for the changed tiles only.
+
+        infer returns the upscaled tile in the frame's channel order.
+        """
+        h, w = frame.shape[:2]
+        with self._lock:
+            if self.shape != frame.shape:
+                self.shape = frame.shape
+                self.origins = grid(h, w, TILE_SIZE, OVERLAP)
+                self._reference = [None] * len(self.origins)
+                self._outputs = [None] * len(self.origins)
+                self._frames = 0
+            refresh = self._frames == 0 or (REFRESH_FRAMES > 0 and self._frames % REFRESH_FRAMES == 0)
+            self._frames += 1
+
+            reused = 0
+            for i, (y, x) in enumerate(self.origins):
+                tile = frame[y:y + TILE_SIZE, x:x + TILE_SIZE]
+                ref = self._reference[i]
+                if not refresh and ref is not None and cv2.absdiff(tile, ref).max() <= THRESHOLD:
+                    reused += 1
+                    continue
+                self._outputs[i] = infer(tile)
+                self._reference[i] = tile.copy()
+
+            output = np.empty((h * scale, w * scale) + frame.shape[2:], dtype=np.uint8)
+            for (y, x), out in zip(self.origins, self._outputs):
+                oy, ox = y * scale, x * scale
+                output[oy:oy + out.shape[0], ox:ox + out.shape[1]] = out
+            self.last_tiles, self.last_reused = len(self.origins), reused
+
+        with _lock:
+            _stats["tiles"] += len(self.origins)
+            _stats["reused"] += reused
+            _stats["refreshes"] += int(refresh)
+        return output
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
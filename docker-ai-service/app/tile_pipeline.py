@@ -0,0 +1,215 @@
+"""Double-buffered tile pipeline: prepare / infer / stitch on three threads.
+
+The tiled backends used to do everything for a tile on one thread, in sequence:
+slice the tile, convert and transpose it, run the model, transpose back and blend
+it into the output - then start the next tile. The host-side steps are pure
+numpy/cv2 work that releases the GIL, so on a multi-core host they can run while
+the model is busy with the neighbouring tile:
+
+    prepare thread:   tile k+1 ──▶ ready queue (bounded) ──▶
+    calling thread:                                  infer tile k ──▶ done queue (bounded) ──▶
+    stitch thread:                                                          stitch tile k-1
+
+Both queues hold at most DEPTH items, so at any moment only a couple of prepared
+inputs and un-stitched outputs are alive - memory stays at "a few tiles", not
+"the whole image twice". Inference stays on the calling thread: it owns the
+session snapshot, and an OOM raised there reaches upscale_with_onnx's retry loop
+exactly as before. A failure on either helper thread stops the pipeline and is
+re-raised on the calling thread.
+
+Every run records its timings. Callers bracket a request with begin()/take() on
+the same thread to get the totals for the response headers (tiles/s and average
+busy cores = summed stage time / wall time). record_flat() adds the tiles that
+flat_tiles interpolated instead of inferring.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+# Wired by main.py from TILE_PIPELINE / TILE_PIPELINE_DEPTH.
+ENABLED = True
+DEPTH = 2
+# Below this many work items the two thread hand-offs cost more than they hide.
+MIN_ITEMS = 3
+
+_POLL_S = 0.1
+_DONE = object()
+
+
+@dataclass
+class PipelineStats:
+    tiles: int = 0
+    wall_s: float = 0.0
+    prepare_s: float = 0.0
+    infer_s: float = 0.0
+    stitch_s: float = 0.0
+    scored: int = 0  # tiles scored by flat_tiles (adaptive mode)
+    flat: int = 0    # ... of which were interpolated, not inferred
+
+    @property
+    def busy_s(self) -> float:
+        return self.prepare_s + self.infer_s + self.stitch_s
+
+    @property
+    def tiles_per_s(self) -> float:
+        return self.tiles / self.wall_s if self.wall_s > 0 else 0.0
+
+    @property
+    def core_usage(self) -> float:
+        """Average number of cores kept busy (1.0 = fully serial)."""
+        return self.busy_s / self.wall_s if self.wall_s > 0 else 0.0
+
+    def add(self, other: "PipelineStats") -> None:
+        self.tiles += other.tiles
+        self.wall_s += other.wall_s
+        self.prepare_s += other.prepare_s
+        self.infer_s += other.infer_s
+        self.stitch_s += other.stitch_s
+        self.scored += other.scored
+        self.flat += other.flat
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-Tile-Count": str(self.tiles),
+            "X-Tile-Throughput": f"{self.tiles_per_s:.2f}",
+            "X-Tile-Core-Usage": f"{self.core_usage:.2f}",
+        }
+        if self.scored:
+            headers["X-Tile-Flat-Fraction"] = f"{self.flat / self.scored:.3f}"
+        return headers
+
+
+_local = threading.local()
+
+
+def begin() -> None:
+    """Start collecting stats for the current thread (one request)."""
+    _local.stats = PipelineStats()
+
+
+def take() -> Optional[PipelineStats]:
+    """Return and clear the stats collected since begin(); None if nothing ran."""
+    stats = getattr(_local, "stats", None)
+    _local.stats = None
+    return stats if stats is not None and (stats.tiles or stats.scored) else None
+
+
+def _record(stats: PipelineStats) -> None:
+    acc = getattr(_local, "stats", None)
+    if acc is not None:
+        acc.add(stats)
+
+
+def record_flat(scored: int, flat: int) -> None:
+    """Count adaptive-mode tiles for the current request (see flat_tiles.py)."""
+    _record(PipelineStats(scored=scored, flat=flat))
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is being torn down."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run(items: Iterable, prepare: Callable[[Any], Any], infer: Callable[[Any, Any], Any],
+        finish: Callable[[Any, Any], None], tiles_per_item: Callable[[Any], int] = lambda _: 1) -> PipelineStats:
+    """Run finish(item, infer(item, prepare(item))) for every item, pipelined.
+
+    Items are finished in order. Falls back to a plain loop when pipelining is
+    disabled or there are fewer than MIN_ITEMS items.
+    """
+    items = list(items)
+    stats = PipelineStats(tiles=sum(tiles_per_item(i) for i in items))
+    t_start = time.perf_counter()
+    if not ENABLED or len(items) < MIN_ITEMS:
+        for item in items:
+            t0 = time.perf_counter()
+            x = prepare(item)
+            t1 = time.perf_counter()
+            y = infer(item, x)
+            t2 = time.perf_counter()
+            finish(item, y)
+            stats.prepare_s += t1 - t0
+            stats.infer_s += t2 - t1
+            stats.stitch_s += time.perf_counter() - t2
+        stats.wall_s = time.perf_counter() - t_start
+        _record(stats)
+        return stats
+
+    depth = max(1, DEPTH)
+    ready: queue.Queue = queue.Queue(maxsize=depth)
+    done: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def _prepare_loop() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                t0 = time.perf_counter()
+                x = prepare(item)
+                stats.prepare_s += time.perf_counter() - t0
+                if not _put(ready, (item, x), stop):
+                    return
+            _put(ready, _DONE, stop)
+        except BaseException as exc:  # re-raised on the calling thread
+            errors.append(exc)
+            stop.set()
+
+    def _stitch_loop() -> None:
+        try:
+            while True:
+                try:
+                    entry = done.get(timeout=_POLL_S)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if entry is _DONE:
+                    return
+                t0 = time.perf_counter()
+                finish(*entry)
+                stats.stitch_s += time.perf_counter() - t0
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+
+    producer = threading.Thread(target=_prepare_loop, name="tile-prepare", daemon=True)
+    stitcher = threading.Thread(target=_stitch_loop, name="tile-stitch", daemon=True)
+    producer.start()
+    stitcher.start()
+    try:
+        while not stop.is_set():
+            try:
+                entry = ready.get(timeout=_POLL_S)
+            except queue.Empty:
+                continue
+            if entry is _DONE:
+                _put(done, _DONE, stop)
+                break
+            item, x = entry
+            t0 = time.perf_counter()
+            y = infer(item, x)
+            stats.infer_s += time.perf_counter() - t0
+            del x, entry
+            _put(done, (item, y), stop)
+        stitcher.join()
+    finally:
+        stop.set()
+        producer.join()
+        stitcher.join()
+    if errors:
+        raise errors[0]
+    stats.wall_s = time.perf_counter() - t_start
+    _record(stats)
+    return stats
@@ -0,0 +1,220 @@
+"""Tile plans: the tiling grid and its blend normalisation, computed once per geometry.
+
+_run_onnx_tiled, upscale_with_ncnn and upscale_multiframe used to rebuild the tile
+grid and the per-tile blend ramps for every tile of every frame, accumulate into TWO
+full-resolution float32 arrays (output and weight) and finish with a full-frame
+divide. None of that depends on the pixels - only on (input size, tile size,
+overlap, scale) - and a realtime stream or a library scan hits the same handful of
+geometries over and over.
+
+A TilePlan holds, for one geometry:
+  * the tile rectangles, de-duplicated (the old range(0, h, step) grid emitted
+    redundant clamped tiles on the last row/column)
+  * one blend ramp per distinct tile shape, shared by every tile of that shape
+  * the reciprocal of the summed blend weights, so stitching is "accumulate, then
+    multiply in place" - no weight array, no divide per frame. The tiles form a
+    full grid of one shape and every ramp is an outer product, so the summed
+    weight is one too: sum_y(y) * sum_x(x). The plan keeps the two reciprocal
+    vectors (out_h + out_w floats) instead of an out_h x out_w map, which was
+    ~530 MB for a 4K frame at 4x and never fit the cache budget.
+
+Plans live in a small LRU bounded both by entry count and by bytes; what is left
+of a plan's size is the blend ramps, one tile each. A plan too large for the
+budget is still built and used, just not kept.
+
+Crop mode (blend=False) is the memory-lean alternative for very large outputs: each
+tile keeps only its centre - the overlap is split at its midpoint - and is written
+straight into a uint8 frame. No float accumulator, no weight map; the cost is a hard
+seam instead of a cross-fade, which the overlap context makes invisible for
+convolutional SR models in practice.
+
+Blend convention: a linear ramp over the overlap band IN OUTPUT PIXELS (overlap *
+scale), clamped to half the tile. The three backends previously disagreed (ONNX
+ramped over `overlap` output pixels, i.e. only 1/scale of the band); they now share
+one definition.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+# Wired by main.py from TILE_PLAN_CACHE_SIZE / TILE_PLAN_CACHE_MB so the env parsing
+# stays next to the other limits. These defaults only apply standalone (tests).
+MAX_ENTRIES = 8
+MAX_BYTES = 512 * 1024 * 1024
+
+
+class Tile(NamedTuple):
+    """One tile, in INPUT pixel coordinates (half-open). Output = input * scale."""
+    y0: int
+    y1: int
+    x0: int
+    x1: int
+
+
+def _axis_starts(length: int, tile: int, step: int) -> list[int]:
+    """Tile start positions along one axis, clamped so every tile fits the image."""
+    last = max(length - tile, 0)
+    starts = sorted({min(p, last) for p in range(0, max(length, 1), step)})
+    return starts or [0]
+
+
+def _owned_spans(starts: list[int], length: int, dim: int) -> list[tuple[int, int]]:
+    """Split each overlap at its midpoint: the span of the axis each tile writes."""
+    cuts = [0] + [(nxt + cur + length) // 2 for cur, nxt in zip(starts, starts[1:])] + [dim]
+    return list(zip(cuts, cuts[1:]))
+
+
+def _ramp_1d(n: int, ramp: int) -> np.ndarray:
+    w = np.ones(n, dtype=np.float32)
+    # Clamp ramp length to prevent negative index wrap on tiles smaller than overlap
+    r = min(ramp, n // 2) if n > 1 else 0
+    if r > 0:
+        ramp_v = np.linspace(0, 1, r + 1, dtype=np.float32)[1:]
+        w[:r] = ramp_v
+        w[-r:] = ramp_v[::-1]
+    return w
+
+
+class TilePlan:
+    """Grid + blend normalisation for one (h, w, tile_size, overlap, scale)."""
+
+    def __init__(self, h: int, w: int, tile_size: int, overlap: int, scale: int,
+                 blend: bool = True):
+        self.h, self.w = h, w
+        self.tile_size, self.overlap, self.scale = tile_size, overlap, scale
+        self.out_h, self.out_w = h * scale, w * scale
+        self.blend_mode = blend
+        step = max(tile_size - overlap, 1)
+        th, tw = min(tile_size, h), min(tile_size, w)
+        ys, xs = _axis_starts(h, tile_size, step), _axis_starts(w, tile_size, step)
+        self.tiles: tuple[Tile, ...] = tuple(
+            Tile(y, y + th, x, x + tw) for y in ys for x in xs
+        )
+        self._blends: dict[tuple[int, int], np.ndarray] = {}
+        if not blend:
+            # Each tile owns [previous midpoint, next midpoint) along each axis.
+            y_own, x_own = _owned_spans(ys, th, h), _owned_spans(xs, tw, w)
+            self.crops: tuple[Tile, ...] = tuple(
+                Tile(ya, yb, xa, xb) for ya, yb in y_own for xa, xb in x_own
+            )
+            self.inv_rows = self.inv_cols = np.ones((0, 0, 1), dtype=np.float32)
+            return
+        ramp = overlap * scale
+        self.inv_rows = self._inv_axis_weight(ys, th, self.out_h, ramp)[:, None, None]  # (out_h, 1, 1)
+        self.inv_cols = self._inv_axis_weight(xs, tw, self.out_w, ramp)[None, :, None]  # (1, out_w, 1)
+
+    def _inv_axis_weight(self, starts: list[int], length: int, dim: int, ramp: int) -> np.ndarray:
+        """1 / (sum of the 1-D ramps of every tile along one output axis)."""
+        n = length * self.scale
+        r = _ramp_1d(n, ramp)
+        weight = np.zeros(dim, dtype=np.float32)
+        for p in starts:
+            weight[p * self.scale:p * self.scale + n] += r
+        np.maximum(weight, 1e-8, out=weight)
+        return np.reciprocal(weight, out=weight)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.inv_rows.nbytes + self.inv_cols.nbytes
+                + sum(b.nbytes for b in self._blends.values()))
+
+    def blend(self, oh: int, ow: int) -> np.ndarray:
+        """(oh, ow, 1) float32 blend ramp for an output tile of that shape."""
+        b = self._blends.get((oh, ow))
+        if b is None:
+            ramp = self.overlap * self.scale
+            b = (_ramp_1d(oh, ramp)[:, None] * _ramp_1d(ow, ramp)[None, :])[:, :, None]
+            self._blends[(oh, ow)] = b
+        return b
+
+    def new_output(self) -> np.ndarray:
+        return np.zeros((self.out_h, self.out_w, 3), dtype=np.float32)
+
+    def accumulate(self, output: np.ndarray, tile: Tile, out_tile: np.ndarray) -> None:
+        """Add one inferred tile (HWC, any float/uint8 dtype) into the accumulator.
+
+        The model output is trimmed to the expected size (some models round) and
+        an edge tile padded up to tile_size is cropped back to its real content.
+        """
+        s = self.scale
+        oy, ox = tile.y0 * s, tile.x0 * s
+        oh, ow = (tile.y1 - tile.y0) * s, (tile.x1 - tile.x0) * s
+        out_tile = out_tile[:oh, :ow]
+        b = self.blend(out_tile.shape[0], out_tile.shape[1])
+        output[oy:oy + out_tile.shape[0], ox:ox + out_tile.shape[1]] += out_tile * b
+
+    def new_crop_output(self) -> np.ndarray:
+        return np.empty((self.out_h, self.out_w, 3), dtype=np.uint8)
+
+    def place(self, output: np.ndarray, index: int, out_tile_u8: np.ndarray) -> None:
+        """Crop mode: copy tile `index`'s owned centre from a uint8 HWC tile."""
+        s = self.scale
+        tile, own = self.tiles[index], self.crops[index]
+        ty, tx = (own.y0 - tile.y0) * s, (own.x0 - tile.x0) * s
+        oh, ow = (own.y1 - own.y0) * s, (own.x1 - own.x0) * s
+        output[own.y0 * s:own.y1 * s, own.x0 * s:own.x1 * s] = out_tile_u8[ty:ty + oh, tx:tx + ow]
+
+    def normalize(self, output: np.ndarray) -> np.ndarray:
+        """Finish stitching in place: multiply by the precomputed 1/sum(weights)."""
+        output *= self.inv_rows
+        output *= self.inv_cols
+        return output
+
+
+_cache: "collections.OrderedDict[tuple, TilePlan]" = collections.OrderedDict()
+# Size charged at insert time. A plan can grow afterwards (a model that rounds its
+# output adds a blend shape), and evicting by the live size would drift the total.
+_charged: dict[tuple, int] = {}
+_cache_bytes = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_plan(h: int, w: int, tile_size: int, overlap: int, scale: int,
+             blend: bool = True) -> TilePlan:
+    """Return the (cached) plan for this geometry, building it on a miss."""
+    global _cache_bytes
+    key = (h, w, tile_size, overlap, scale, blend)
+    with _lock:
+        plan = _cache.get(key)
+        if plan is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return plan
+        _stats["misses"] += 1
+    # Build outside the lock: a 4K plan takes a while and other geometries should
+    # not queue behind it. Two threads racing on the same key build it twice, once.
+    plan = TilePlan(h, w, tile_size, overlap, scale, blend)
+    with _lock:
+        if key in _cache or plan.nbytes > MAX_BYTES:
+            return _cache.get(key, plan)
+        _cache[key] = plan
+        _charged[key] = plan.nbytes
+        _cache_bytes += _charged[key]
+        while _cache and (len(_cache) > MAX_ENTRIES or _cache_bytes > MAX_BYTES):
+            old_key, _ = _cache.popitem(last=False)
+            _cache_bytes -= _charged.pop(old_key)
+    return plan
+
+
+def cache_info() -> dict:
+    with _lock:
+        return {
+            "entries": len(_cache),
+            "bytes": _cache_bytes,
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+        }
+
+
+def clear() -> None:
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _charged.clear()
+        _cache_bytes = 0
+        _stats.update(hits=0, misses=0)
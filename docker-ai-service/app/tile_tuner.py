@@ -0,0 +1,219 @@
+"""Per-(model, provider, resolution) tile size / overlap / batch autotuning.
+
+upscale_with_onnx used one global ONNX_TILE_SIZE and only ever changed it when a
+CUDA OOM forced a halving - after which the halved value applied to every model
+and every resolution for the rest of the process. That finds a tile size that
+survives, never the fastest one, and the fastest one moves by 2x and more with
+the model's receptive field, the provider and the cache sizes of the box.
+
+The tuner (POST /benchmark/tiles, driven by main.autotune_tiles) sweeps
+candidates() for the loaded model at each capture resolution the plugin has
+sent (observe() records the frame sizes of /upscale-frame, /upscale-stream and
+/benchmark-frame) and measures, per setting, the wall time of one full frame and
+the peak memory while it ran (MemorySampler: process RSS on Linux; the analytic
+tensor footprint where RSS is unavailable). The Pareto front over (time, memory)
+is kept and its fastest point becomes the default for that model, provider and
+resolution - lookup() - in CONFIG_DIR/tile_tuning.json.
+
+A resolution that was never tuned borrows the nearest tuned one (by pixel count,
+within 2x) of the same model and provider; otherwise the ONNX_TILE_SIZE /
+ONNX_TILE_BATCH defaults apply as before. An OOM recovery is remembered for that
+key in memory only (note_oom) - an OOM may be transient (another process holding
+VRAM) and should not outlive the process.
+"""
+from __future__ import annotations
+
+import collections
+import os
+import threading
+import time
+from typing import Optional
+
+from . import config_store
+
+STORE = "tile_tuning.json"
+TILE_SIZES = (128, 192, 256, 384, 512, 768)
+OVERLAPS = (16, 32)
+BATCHES = (1, 2, 4)
+MAX_OBSERVED = 16
+
+_lock = threading.Lock()
+_observed: "collections.Counter[tuple]" = collections.Counter()
+_oom: dict = {}  # key -> {"tile": ..., "overlap": ..., "batch": ...}
+
+
+def _empty() -> dict:
+    return {"version": 1, "tuned": {}}
+
+
+def resolution_key(width: int, height: int) -> str:
+    return f"{int(width)}x{int(height)}"
+
+
+def parse_resolution(text: str) -> tuple:
+    """'1280x720' -> (1280, 720); raises ValueError."""
+    w, _, h = text.strip().lower().partition("x")
+    width, height = int(w), int(h)
+    if not (16 <= width <= 7680 and 16 <= height <= 4320):
+        raise ValueError(f"Resolution out of range: {text}")
+    return width, height
+
+
+def key(model: str, provider: str, width: int, height: int) -> str:
+    return f"{model}|{provider}|{resolution_key(width, height)}"
+
+
+def observe(width: int, height: int) -> None:
+    """Count a capture resolution seen on a frame endpoint (bounded)."""
+    if width <= 0 or height <= 0:
+        return
+    with _lock:
+        _observed[(int(width), int(height))] += 1
+        if len(_observed) > MAX_OBSERVED:
+            for res, _ in _observed.most_common()[MAX_OBSERVED:]:
+                del _observed[res]
+
+
+def observed(limit: int = 3) -> list:
+    """Most frequently seen capture resolutions, (width, height) pairs."""
+    with _lock:
+        return [res for res, _ in _observed.most_common(limit)]
+
+
+def candidates(width: int, height: int, batch_ok: bool,
+               tile_sizes=TILE_SIZES, overlaps=OVERLAPS, batches=BATCHES) -> list:
+    """Settings worth timing at this resolution, smallest tiles first.
+
+    Small-to-large order also makes the RSS sampler meaningful: allocator and
+    arena memory is reused, so each setting's growth is the new high it caused.
+    Tiles at least as large as the frame collapse into one "whole frame" setting
+    (overlap and batch are meaningless there); batches larger than the tile
+    count are skipped.
+    """
+    longest = max(width, height)
+    out, whole_frame = [], False
+    for tile in tile_sizes:
+        if tile >= longest:
+            if not whole_frame:
+                out.append({"tile": tile, "overlap": 0, "batch": 1})
+                whole_frame = True
+            continue
+        step_tiles = -(-height // tile) * -(-width // tile)
+        for overlap in overlaps:
+            if overlap * 2 >= tile:
+                continue
+            for batch in batches if batch_ok else (1,):
+                if batch > 1 and batch > step_tiles:
+                    continue
+                out.append({"tile": tile, "overlap": overlap, "batch": batch})
+    return out
+
+
+def pareto(results: list) -> list:
+    """Non-dominated results over (wall_ms, peak_mb), fastest first."""
+    ok = [r for r in results if r.get("wall_ms") is not None]
+    front = [r for r in ok if not any(
+        o is not r and o["wall_ms"] <= r["wall_ms"] and o["peak_mb"] <= r["peak_mb"]
+        and (o["wall_ms"] < r["wall_ms"] or o["peak_mb"] < r["peak_mb"]) for o in ok)]
+    return sorted(front, key=lambda r: (r["wall_ms"], r["peak_mb"]))
+
+
+def choose(front: list, max_peak_mb: float = 0) -> Optional[dict]:
+    """Fastest point of the front, optionally under a memory cap (0 = no cap)."""
+    for r in front:
+        if not max_peak_mb or r["peak_mb"] <= max_peak_mb:
+            return r
+    return front[-1] if front else None  # nothing fits: the leanest point
+
+
+def save(model: str, provider: str, width: int, height: int, best: dict, front: list) -> None:
+    def _mutate(data: dict) -> None:
+        data.setdefault("tuned", {})[key(model, provider, width, height)] = {
+            "tile": best["tile"], "overlap": best["overlap"], "batch": best["batch"],
+            "wall_ms": best["wall_ms"], "peak_mb": best["peak_mb"],
+            "front": [{k: r[k] for k in ("tile", "overlap", "batch", "wall_ms", "peak_mb")} for r in front],
+            "tuned_at": int(time.time()),
+        }
+    config_store.update(STORE, _empty, _mutate)
+    with _lock:
+        _oom.pop(key(model, provider, width, height), None)
+
+
+def note_oom(model: str, provider: str, width: int, height: int, config: dict) -> None:
+    with _lock:
+        _oom[key(model, provider, width, height)] = dict(config, source="oom")
+
+
+def lookup(model: Optional[str], provider: str, width: int, height: int) -> Optional[dict]:
+    """Tuned {tile, overlap, batch} for this frame size, or None for the defaults."""
+    if not model:
+        return None
+    exact = key(model, provider, width, height)
+    with _lock:
+        if exact in _oom:
+            return dict(_oom[exact])
+    tuned = config_store.load_cached(STORE, _empty).get("tuned", {})
+    if exact in tuned:
+        return dict(tuned[exact], source="tuned")
+    prefix = f"{model}|{provider}|"
+    pixels = width * height
+    best, best_ratio = None, 2.0
+    for k, v in tuned.items():
+        if not k.startswith(prefix):
+            continue
+        try:
+            w, h = parse_resolution(k[len(prefix):])
+        except ValueError:
+            continue
+        ratio = max(pixels, w * h) / max(1, min(pixels, w * h))
+        if ratio <= best_ratio:
+            best, best_ratio = v, ratio
+    return dict(best, source="nearest") if best else None
+
+
+def snapshot() -> dict:
+    data = config_store.load(STORE, _empty)
+    with _lock:
+        data["observed"] = [resolution_key(w, h) for (w, h), _ in _observed.most_common()]
+        data["oom_overrides"] = dict(_oom)
+    return data
+
+
+class MemorySampler:
+    """Peak process RSS growth while the context is open, in MB (Linux /proc).
+
+    A background thread polls /proc/self/statm every interval_s. Where /proc is
+    unavailable `available` is False and peak_mb stays 0 - the caller falls back
+    to its analytic estimate.
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.peak_mb = 0.0
+        self.available = os.path.exists("/proc/self/statm")
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _rss(self) -> int:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * self._page
+
+    def _poll(self, base: int) -> None:
+        peak = base
+        while not self._stop.wait(self.interval_s):
+            peak = max(peak, self._rss())
+        peak = max(peak, self._rss())
+        self.peak_mb = round((peak - base) / 1024 / 1024, 1)
+
+    def __enter__(self) -> "MemorySampler":
+        if self.available:
+            base = self._rss()
+            self._thread = threading.Thread(target=self._poll, args=(base,), name="tile-tune-mem", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
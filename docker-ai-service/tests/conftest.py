@@ -82,3 +82,86 @@ def client():
                 # those module-level values remain None and semaphore tests fail.
                 with TestClient(app_module.app) as client:
                     yield client
+
+
+def make_upscale_onnx(path: str, scale: int = 2, batch_dim="N") -> str:
+    """Write a tiny nearest-neighbour x`scale` upscaler as an ONNX file.
+
+    Stands in for Real-ESRGAN wherever a test needs real onnxruntime inference:
+    NCHW float in, NCHW float out, same I/O contract as the catalog models. Nearest
+    resize makes overlapping tiles agree exactly, so any stitching or batching bug
+    shows up as a pixel difference rather than hiding inside a learned blur.
+    batch_dim=1 pins the batch axis like models exported without dynamic_axes.
+    """
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper
+
+    scales = helper.make_tensor("scales", TensorProto.FLOAT, [4], [1.0, 1.0, float(scale), float(scale)])
+    node = helper.make_node("Resize", ["input", "", "scales"], ["output"], mode="nearest")
+    graph = helper.make_graph(
+        [node], "upscale",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [batch_dim, 3, "H", "W"])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [batch_dim, 3, "OH", "OW"])],
+        initializer=[scales],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 9      # onnxruntime 1.x rejects newer IR versions
+    onnx.save(model, path)
+    return path
+
+
+class CountingSession:
+    """Delegates to a real session and records the batch size of every run().
+
+    reject_batches=True fails batched calls like a model with a fixed batch axis.
+    """
+
+    def __init__(self, session, reject_batches=False):
+        self._s = session
+        self.batches = []
+        self.reject_batches = reject_batches
+
+    @property
+    def tiles(self) -> int:
+        return sum(self.batches)
+
+    def run(self, names, feed, *args):
+        n = next(iter(feed.values())).shape[0]
+        self.batches.append(n)
+        if self.reject_batches and n > 1:
+            raise RuntimeError("Reshape: requested shape does not match")
+        return self._s.run(names, feed, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._s, name)
+
+
+@pytest.fixture
+def session(tmp_path):
+    """CPU onnxruntime session over make_upscale_onnx(scale=2)."""
+    ort = pytest.importorskip("onnxruntime")
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    return ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+
+@pytest.fixture
+def real_main():
+    """app.main imported against the REAL cv2/onnxruntime, with temp data dirs.
+
+    For tests that drive inference helpers directly; the lifespan does not run.
+    """
+    pytest.importorskip("onnxruntime")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {k: os.path.join(tmp, k.split("_")[0].lower()) for k in
+               ("MODELS_DIR", "CACHE_DIR", "STATIC_DIR", "CONFIG_DIR")}
+        for d in env.values():
+            os.makedirs(d)
+        with patch.dict(os.environ, env):
+            for mod in ("app.main", "app"):
+                sys.modules.pop(mod, None)
+            from app import main as app_main
+            try:
+                yield app_main
+            finally:
+                for mod in ("app.main", "app"):
+                    sys.modules.pop(mod, None)
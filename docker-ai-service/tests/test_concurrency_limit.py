@@ -0,0 +1,105 @@
+"""Adaptive concurrency limit: AIMD on latency against per-size baselines."""
+import asyncio
+
+import pytest
+
+from app import concurrency_limit as cl
+from app.scheduler import INTERACTIVE, Scheduler
+
+
+@pytest.fixture(autouse=True)
+def _defaults(monkeypatch):
+    monkeypatch.setattr(cl, "MIN_LIMIT", 1)
+    monkeypatch.setattr(cl, "MAX_LIMIT", 8)
+    monkeypatch.setattr(cl, "WINDOW", 4)
+    monkeypatch.setattr(cl, "TOLERANCE", 1.5)
+    monkeypatch.setattr(cl, "BACKOFF", 0.75)
+
+
+def _feed(limit, latency_s, pixels=1920 * 1080, binding=True, samples=4):
+    changes = [limit.observe(latency_s, pixels, binding) for _ in range(samples)]
+    return [c for c in changes if c is not None]
+
+
+def test_grows_only_while_binding_and_backs_off_on_latency():
+    limit = cl.AdaptiveLimit(4)
+    assert _feed(limit, 0.1, binding=False) == []   # idle slots: no reason to grow
+    assert _feed(limit, 0.1) == [5]
+    assert _feed(limit, 0.12) == [6]                 # within tolerance of the baseline
+    assert _feed(limit, 0.3) == [4]                  # 3x baseline: 6 * 0.75
+    snap = limit.snapshot()
+    assert snap["increases"] == 2 and snap["decreases"] == 1
+    assert snap["recent_min"] == 4 and snap["recent_max"] == 6
+    assert [h["limit"] for h in snap["history"]] == [4, 5, 6, 4]
+
+
+def test_baselines_are_per_input_size():
+    limit = cl.AdaptiveLimit(4)
+    _feed(limit, 0.02, pixels=640 * 360, binding=False)
+    # A 4K poster is slow because it is big, not because the device is overloaded
+    assert _feed(limit, 0.5, pixels=3840 * 2160) == [5]
+    assert limit.last_ratio == 1.0
+
+
+def test_limit_stays_within_bounds():
+    limit = cl.AdaptiveLimit(100)
+    assert limit.limit == 8
+    _feed(limit, 0.1)
+    assert limit.limit == 8                          # already at MAX_LIMIT
+    for _ in range(10):
+        _feed(limit, 1.0)
+    assert limit.limit == 1
+    limit.reset(3)
+    assert limit.limit == 3 and limit.history[-1][2] == "configured"
+
+
+async def test_scheduler_reports_hold_time_size_and_binding():
+    sched = Scheduler(1)
+    seen = []
+    sched.listener = lambda held, work, binding: seen.append((work, binding))
+    first = await sched.acquire(INTERACTIVE)
+    first.work = 640 * 360
+    waiter = asyncio.create_task(sched.acquire(INTERACTIVE))
+    await asyncio.sleep(0)
+    sched.release(first)                             # someone was waiting: binding
+    second = await waiter
+    sched.release(second)
+    stream = await sched.acquire(INTERACTIVE, measure=False)
+    sched.release(stream)                            # not a service time
+    assert seen == [(640 * 360, True), (None, False)]
+
+
+def test_unsized_samples_are_ignored():
+    limit = cl.AdaptiveLimit(4)
+    # Dedup hits and 4xx exits carry no pixel count: they must not become the baseline
+    for _ in range(20):
+        assert limit.observe(0.001, None, True) is None
+    assert _feed(limit, 0.05) == [5]
+    assert limit.last_ratio == 1.0
+
+
+def test_only_inferred_frames_reach_the_listener(real_main, monkeypatch):
+    import cv2
+    import numpy as np
+    from starlette.testclient import TestClient
+
+    class _Nearest:
+        def upsample(self, img):
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    sched = real_main.scheduler.Scheduler(1)
+    seen = []
+    sched.listener = lambda held, work, binding: seen.append(work)
+    monkeypatch.setattr(real_main, "_scheduler", sched)
+    monkeypatch.setattr(real_main.frame_dedup, "ENABLED", True)
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": _Nearest(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    client = TestClient(real_main.app)
+    frame = cv2.imencode(".png", np.random.default_rng(0).integers(0, 256, (24, 32, 3), dtype=np.uint8))[1]
+
+    for body in (frame.tobytes(), frame.tobytes(), b"not an image"):
+        client.post("/upscale-frame", content=body, headers={"X-Stream-Id": "s"})
+    # The duplicate is not measured at all, the undecodable body has no size
+    assert seen == [24 * 32, None]
@@ -0,0 +1,49 @@
+"""Crop-stitch tile mode: uint8 output straight from tile centres.
+
+Crop mode must cover every output pixel exactly once and, for a model without
+border effects, produce the same image as the blend path.
+"""
+import numpy as np
+import pytest
+
+from app import tile_plan
+
+
+@pytest.mark.parametrize("h,w,tile,overlap", [(300, 200, 128, 16), (97, 250, 64, 8), (50, 40, 64, 8)])
+def test_crops_partition_the_output(h, w, tile, overlap):
+    plan = tile_plan.TilePlan(h, w, tile, overlap, 1, blend=False)
+    covered = np.zeros((h, w), dtype=np.int32)
+    for t, own in zip(plan.tiles, plan.crops):
+        # A tile only ever writes inside itself
+        assert t.y0 <= own.y0 < own.y1 <= t.y1
+        assert t.x0 <= own.x0 < own.x1 <= t.x1
+        covered[own.y0:own.y1, own.x0:own.x1] += 1
+    assert (covered == 1).all()
+    # No float buffers kept around for crop plans
+    assert plan.nbytes == 0
+
+
+def test_crop_matches_blend_for_a_pointwise_model(real_main, session):
+    rng = np.random.default_rng(1)
+    img = rng.random((300, 200, 3), dtype=np.float32)
+    blended = real_main._run_onnx_tiled(img, 128, 16, session, "input", "output", 2, batch_size=2)
+    cropped = real_main._run_onnx_tiled(img, 128, 16, session, "input", "output", 2,
+                                        batch_size=2, stitch="crop")
+    assert cropped.dtype == np.uint8
+    assert cropped.shape == (600, 400, 3)
+    diff = np.abs(cropped.astype(np.int16) - real_main._to_uint8(blended).astype(np.int16))
+    # Blend weights sum to 1 only up to float rounding - allow one code value
+    assert diff.max() <= 1
+
+
+def test_auto_switches_to_crop_above_the_threshold(real_main, monkeypatch):
+    monkeypatch.setattr(real_main, "ONNX_STITCH_MODE", "auto")
+    monkeypatch.setattr(real_main, "ONNX_CROP_STITCH_MPIX", 64)
+    assert real_main._resolve_stitch_mode(None, 8_000_000) == "blend"
+    assert real_main._resolve_stitch_mode(None, 3840 * 2160 * 16) == "crop"
+    # An explicit per-request choice wins over the size rule
+    assert real_main._resolve_stitch_mode("blend", 3840 * 2160 * 16) == "blend"
+    monkeypatch.setattr(real_main, "ONNX_STITCH_MODE", "crop")
+    assert real_main._resolve_stitch_mode(None, 100) == "crop"
+    with pytest.raises(ValueError):
+        real_main._resolve_stitch_mode("feather", 100)
@@ -0,0 +1,81 @@
+"""Workload-isolated executor pools: separate queues, bulk yields to realtime."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import executor_pools
+from app.executor_pools import WorkloadExecutor
+
+
+@pytest.fixture(autouse=True)
+def _defaults(monkeypatch):
+    monkeypatch.setattr(executor_pools, "YIELD_S", 5.0)
+
+
+def _busy(pool):
+    """Block until the pool's thread has picked up its first job."""
+    until = time.monotonic() + 1
+    while not pool.active and time.monotonic() < until:
+        time.sleep(0.001)
+
+
+def test_bulk_waits_while_realtime_work_is_queued():
+    realtime = WorkloadExecutor("realtime", 1)
+    bulk = WorkloadExecutor("bulk", 1, yields_to=realtime)
+    gate = threading.Event()
+    order = []
+    try:
+        running = realtime.submit(gate.wait)          # occupies the realtime thread
+        _busy(realtime)
+        queued = realtime.submit(order.append, "frame")
+        assert realtime.queue_depth == 1
+        poster = bulk.submit(order.append, "poster")
+        time.sleep(0.05)
+        assert not poster.done() and bulk.stats()["yielded"] == 1  # its thread is free, yet it waits
+        gate.set()
+        running.result(1), queued.result(1), poster.result(1)
+        assert sorted(order) == ["frame", "poster"] and realtime.stats()["completed"] == 2
+    finally:
+        gate.set()
+        realtime.shutdown()
+        bulk.shutdown()
+
+
+def test_yield_is_bounded(monkeypatch):
+    monkeypatch.setattr(executor_pools, "YIELD_S", 0.02)
+    realtime = WorkloadExecutor("realtime", 1)
+    bulk = WorkloadExecutor("bulk", 1, yields_to=realtime)
+    gate = threading.Event()
+    try:
+        realtime.submit(gate.wait)
+        _busy(realtime)
+        realtime.submit(lambda: None)
+        assert bulk.submit(lambda: "done").result(1) == "done"  # realtime still stuck
+    finally:
+        gate.set()
+        realtime.shutdown()
+        bulk.shutdown()
+
+
+async def test_run_in_executor_and_exceptions():
+    pool = WorkloadExecutor("aux", 2)
+    loop = asyncio.get_running_loop()
+    assert await loop.run_in_executor(pool, sum, [1, 2, 3]) == 6
+    with pytest.raises(ZeroDivisionError):
+        await loop.run_in_executor(pool, lambda: 1 / 0)
+    pool.shutdown()
+    assert pool.stats()["completed"] == 2 and pool.stats()["threads"] <= 2
+    with pytest.raises(RuntimeError):
+        pool.submit(print)
+
+
+def test_inference_is_routed_by_priority(real_main):
+    sched = real_main.scheduler
+    ticket = sched.Ticket(sched.REALTIME, 0.0, 0, True)
+    assert real_main._inference_executor(ticket) is real_main._realtime_executor
+    ticket = sched.Ticket(sched.BATCH, 0.0, 0, True)
+    assert real_main._inference_executor(ticket) is real_main._bulk_executor
+    assert real_main._bulk_executor.yields_to is real_main._realtime_executor
+    assert set(real_main._executors) == set(executor_pools.POOLS)
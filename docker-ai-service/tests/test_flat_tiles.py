@@ -0,0 +1,69 @@
+"""Complexity-adaptive tiling: flat tiles are interpolated instead of inferred."""
+import numpy as np
+import pytest
+
+from app import flat_tiles, tile_pipeline
+from tests.conftest import CountingSession, make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(autouse=True)
+def _adaptive(request, monkeypatch):
+    if "real_main" in request.fixturenames:
+        request.getfixturevalue("real_main")  # its import re-wires the env defaults
+    monkeypatch.setattr(flat_tiles, "ENABLED", True)
+    monkeypatch.setattr(flat_tiles, "EDGE_LEVEL", 10)
+    monkeypatch.setattr(flat_tiles, "INTERPOLATION", "cubic")
+
+
+def _half_flat(h=256, w=256) -> np.ndarray:
+    """Smooth gradient on the left, noise on the right."""
+    img = np.empty((h, w, 3), dtype=np.uint8)
+    img[:, : w // 2] = np.linspace(60, 70, w // 2, dtype=np.uint8)[None, :, None]
+    img[:, w // 2:] = np.random.default_rng(0).integers(0, 256, (h, w - w // 2, 3), dtype=np.uint8)
+    return img
+
+
+def test_edge_fraction_separates_flat_from_textured():
+    img = _half_flat()
+    assert flat_tiles.edge_fraction(img[:, :100]) == 0.0
+    assert flat_tiles.edge_fraction(img[:, 160:]) > 0.5
+    # One thin line through a flat tile is detail, not flatness
+    line = np.full((64, 64, 3), 128, dtype=np.uint8)
+    line[32] = 255
+    assert flat_tiles.edge_fraction(line) > flat_tiles.MAX_EDGE_FRACTION
+
+
+def test_flat_tiles_skip_the_model(real_main, session):
+    img = _half_flat()
+    img_rgb = img[..., ::-1].astype(np.float32) / 255.0
+    plan = real_main.tile_plan.get_plan(256, 256, 64, 8, 2)
+
+    counting = CountingSession(session)
+    before = flat_tiles.stats()
+    result, stats = real_main._with_tile_stats(
+        real_main._run_onnx_tiled, img_rgb, 64, 8, counting, "input", "output", 2, 2, "blend", img)
+    flat = flat_tiles.stats()["flat"] - before["flat"]
+    assert 0 < flat < len(plan.tiles)
+    assert counting.tiles == len(plan.tiles) - flat
+    assert stats.scored == len(plan.tiles) and stats.flat == flat
+    assert float(stats.headers()["X-Tile-Flat-Fraction"]) == pytest.approx(flat / len(plan.tiles), abs=1e-3)
+
+    full = real_main._run_onnx_tiled(img_rgb, 64, 8, session, "input", "output", 2, batch_size=2)
+    assert result.shape == full.shape == (512, 512, 3)
+    # The interpolated half is as good as the model on a smooth gradient
+    assert np.abs(result[:, :200] - full[:, :200]).max() < 2 / 255
+
+
+def test_disabled_or_without_source_infers_everything(real_main, tmp_path, monkeypatch):
+    session = CountingSession(ort.InferenceSession(
+        make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2), providers=["CPUExecutionProvider"]))
+    img = _half_flat(128, 128)
+    img_rgb = img.astype(np.float32) / 255.0
+    tiles = len(real_main.tile_plan.get_plan(128, 128, 64, 8, 2).tiles)
+    real_main._run_onnx_tiled(img_rgb, 64, 8, session, "input", "output", 2)
+    monkeypatch.setattr(flat_tiles, "ENABLED", False)
+    real_main._run_onnx_tiled(img_rgb, 64, 8, session, "input", "output", 2, source_u8=img)
+    assert session.tiles == 2 * tiles
+    assert tile_pipeline.take() is None
@@ -0,0 +1,76 @@
+"""Near-duplicate frame detection: repeated frames reuse the previous output."""
+import numpy as np
+import pytest
+
+from app import frame_dedup
+
+
+@pytest.fixture(autouse=True)
+def _defaults(monkeypatch):
+    monkeypatch.setattr(frame_dedup, "HASH_TOLERANCE", 4)
+    monkeypatch.setattr(frame_dedup, "MAX_MSE", 1.0)
+
+
+def _frame(seed=0, h=90, w=160) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def test_identical_and_noisy_copies_match():
+    dedup = frame_dedup.FrameDeduper()
+    frame = _frame()
+    assert dedup.lookup(frame) is None
+    dedup.store(frame, "out-1")
+    assert dedup.lookup(frame.copy()) == "out-1"
+    noise = np.random.default_rng(1).integers(-1, 2, frame.shape)
+    assert dedup.lookup(np.clip(frame.astype(int) + noise, 0, 255).astype(np.uint8)) == "out-1"
+
+
+def test_real_changes_and_other_models_do_not_match():
+    dedup = frame_dedup.FrameDeduper()
+    frame = _frame()
+    dedup.store(frame, "out-1", "model-a")
+    moved = frame.copy()
+    moved[30:50, 60:90] = 255  # a subtitle / moving mouth
+    assert dedup.lookup(moved, "model-a") is None
+    assert dedup.lookup(_frame(seed=2), "model-a") is None
+    assert dedup.lookup(frame, "model-b") is None
+    assert dedup.lookup(frame[:, :80].copy(), "model-a") is None
+
+
+def test_reference_is_the_last_inferred_frame():
+    dedup = frame_dedup.FrameDeduper()
+    frame = np.full((64, 64, 3), 100, dtype=np.uint8)
+    dedup.store(frame, "out-1")
+    assert dedup.lookup(frame + 1) == "out-1"  # MSE 1
+    assert dedup.lookup(frame + 2) is None     # MSE 4 against the stored frame, not the previous one
+
+
+def test_upscale_frame_reuses_output_for_repeats(real_main, monkeypatch):
+    import cv2
+    from starlette.testclient import TestClient
+
+    calls = []
+
+    class _Nearest:
+        def upsample(self, img):
+            calls.append(img.shape)
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(real_main, "_scheduler", real_main.scheduler.Scheduler(1))
+    monkeypatch.setattr(frame_dedup, "ENABLED", True)
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": _Nearest(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    real_main._realtime_stats.reset()
+    client = TestClient(real_main.app)
+    on_twos = [_frame(0), _frame(0), _frame(1), _frame(1)]
+
+    responses = [client.post("/upscale-frame", content=cv2.imencode(".png", f)[1].tobytes(),
+                             headers={"X-Stream-Id": "anime"}) for f in on_twos]
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len(calls) == 2
+    assert [r.headers.get("X-Frame-Duplicate") for r in responses] == [None, "1", None, "1"]
+    assert responses[1].content == responses[0].content
+    stats = real_main._realtime_stats.snapshot()
+    assert stats["duplicate_frames"] == 2 and stats["dedup_ratio"] == 0.5
@@ -0,0 +1,106 @@
+"""Graph-embedded pre/post-processing: parity with the host conversion, caching."""
+import numpy as np
+import pytest
+
+from app import graph_io
+from tests.conftest import make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+onnx = pytest.importorskip("onnx")
+
+
+@pytest.fixture(autouse=True)
+def _io_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_io, "DIR", tmp_path / "io-graphs")
+    monkeypatch.setattr(graph_io, "ENABLED", True)
+    monkeypatch.setattr(graph_io, "_unsupported", set())
+
+
+def _host(session, bgr: np.ndarray) -> np.ndarray:
+    """The host-side path: BGR->RGB, /255, NCHW in; clip x255, uint8, BGR out."""
+    x = np.ascontiguousarray(bgr[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+    y = session.run(None, {session.get_inputs()[0].name: x})[0]
+    return np.clip(y * 255.0, 0, 255).astype(np.uint8).transpose(0, 2, 3, 1)[..., ::-1]
+
+
+def _frames(*shape) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_wrapped_model_matches_host_conversion(tmp_path):
+    src = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    path = graph_io.wrapped(src)
+    assert path is not None and path.is_file()
+    assert graph_io.wrapped(src) == path  # second call reuses the cached file
+    wrapped = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    inp = wrapped.get_inputs()[0]
+    assert inp.name == graph_io.INPUT and inp.type == "tensor(uint8)" and inp.shape[-1] == 3
+
+    bgr = _frames(2, 12, 20, 3)
+    out = wrapped.run([graph_io.OUTPUT], {graph_io.INPUT: bgr})[0]
+    reference = _host(ort.InferenceSession(src, providers=["CPUExecutionProvider"]), bgr)
+    assert out.dtype == np.uint8 and out.shape == (2, 24, 40, 3)
+    np.testing.assert_array_equal(out, reference)
+
+
+def test_multiframe_model_returns_centre_frame(tmp_path):
+    from onnx import TensorProto, helper
+
+    scales = helper.make_tensor("scales", TensorProto.FLOAT, [5], [1.0, 1.0, 1.0, 2.0, 2.0])
+    graph = helper.make_graph(
+        [helper.make_node("Resize", ["input", "", "scales"], ["output"], mode="nearest")], "mf",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [1, 3, 3, "H", "W"])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [1, 3, 3, "OH", "OW"])],
+        initializer=[scales])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 9
+    src = str(tmp_path / "mf.onnx")
+    onnx.save(model, src)
+
+    wrapped = ort.InferenceSession(str(graph_io.wrapped(src)), providers=["CPUExecutionProvider"])
+    frames = _frames(3, 8, 10, 3)
+    out = wrapped.run([graph_io.OUTPUT], {graph_io.INPUT: frames})[0]
+    assert out.shape == (1, 16, 20, 3)
+    np.testing.assert_array_equal(out[0], frames[1].repeat(2, 0).repeat(2, 1))
+
+
+def test_unsupported_models_are_left_alone(tmp_path):
+    from onnx import TensorProto, helper
+
+    graph = helper.make_graph(
+        [helper.make_node("Add", ["a", "b"], ["output"])], "two_inputs",
+        [helper.make_tensor_value_info(n, TensorProto.FLOAT, [1, 3, 4, 4]) for n in ("a", "b")],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [1, 3, 4, 4])])
+    src = str(tmp_path / "add.onnx")
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)]), src)
+    assert graph_io.wrapped(src) is None
+    assert not any(graph_io.DIR.glob("*.onnx"))
+
+
+def test_forget_and_prune(tmp_path):
+    src = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    graph_io.wrapped(src)
+    (graph_io.DIR / "deadbeef-io0.onnx").write_bytes(b"x")
+    assert graph_io.prune() == 1
+    assert graph_io.forget(src) == 1
+    assert not any(graph_io.DIR.glob("*.onnx"))
+
+
+def test_upscale_paths_use_the_companion_session(real_main, tmp_path, monkeypatch):
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    for attr, value in {"onnx_session": session, "onnx_model_path": path, "onnx_model_name": "tiny",
+                        "current_model": "tiny", "current_model_type": "onnx", "onnx_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    img = _frames(1, 24, 32, 3)[0]
+
+    monkeypatch.setattr(graph_io, "ENABLED", False)
+    host = real_main.upscale_with_onnx(img.copy())
+    monkeypatch.setattr(graph_io, "ENABLED", True)
+    in_graph = real_main.upscale_with_onnx(img.copy())
+    assert real_main._graph_io_sessions.get(session) is not None
+    np.testing.assert_array_equal(in_graph, host)
+
+    batched = real_main._infer_frame_batch((session, 24, 32, None), [img, img[::-1].copy()])
+    np.testing.assert_array_equal(batched[0], host)
+    assert batched[1].shape == (48, 64, 3)
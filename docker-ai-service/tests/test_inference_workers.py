@@ -0,0 +1,118 @@
+"""Multi-process inference workers: shared-memory slots, tiling, crash restart."""
+import time
+
+import numpy as np
+import pytest
+
+from app import inference_workers
+from tests.conftest import CountingSession, make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    workers = inference_workers.WorkerPool(path, 2, ["CPUExecutionProvider"], workers=2, slots=2,
+                                           slot_bytes=8 * 1024 * 1024)
+    workers.start(timeout=60)
+    try:
+        yield workers
+    finally:
+        workers.close()
+
+
+def _frame(h, w, seed=0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def _nearest(img: np.ndarray) -> np.ndarray:
+    return img.repeat(2, axis=0).repeat(2, axis=1)
+
+
+def test_frames_round_trip_through_shared_memory(pool):
+    small, large = _frame(24, 32), _frame(600, 700, seed=1)  # the large one is tiled in the child
+    np.testing.assert_array_equal(pool.infer(small), _nearest(small))
+    np.testing.assert_array_equal(pool.infer(large), _nearest(large))
+    assert pool.stats()["jobs_total"] == 2 and pool.stats()["in_flight"] == 0
+    assert not pool.fits(1080, 1920)
+    assert not pool.serves("/elsewhere.onnx", 24, 32) and pool.serves(pool.model_path, 24, 32)
+    # shm_transport refuses to attach to these
+    assert {w.shm.name for w in pool._workers} <= inference_workers.segment_names()
+
+
+@pytest.mark.parametrize("h,w,calls", [(270, 480, 1), (360, 640, 1), (720, 1280, 6)])
+def test_frames_are_tiled_like_the_realtime_path(session, h, w, calls):
+    # Nearest-neighbour output is the same however a frame is cut: count the runs
+    counting = CountingSession(session)
+    img = _frame(h, w)
+    out = np.empty((h * 2, w * 2, 3), np.uint8)
+    inference_workers._upscale(counting, img, out, 2)
+    assert len(counting.batches) == calls
+    np.testing.assert_array_equal(out, _nearest(img))
+
+
+def test_crashed_worker_is_restarted(pool):
+    for index in (0, 1):
+        pool.kill(index)
+    until = time.monotonic() + 10
+    while pool.stats()["alive"] and time.monotonic() < until:
+        time.sleep(0.01)
+    img = _frame(24, 32)
+    np.testing.assert_array_equal(pool.infer(img), _nearest(img))  # waits for a restart
+    assert pool.stats()["restarts"] == 2
+
+
+def test_fp16_input_models_get_fp16_tensors(tmp_path):
+    import onnx
+    from onnx import TensorProto, helper
+
+    scales = helper.make_tensor("scales", TensorProto.FLOAT, [4], [1.0, 1.0, 2.0, 2.0])
+    graph = helper.make_graph(
+        [helper.make_node("Cast", ["input"], ["x32"], to=TensorProto.FLOAT),
+         helper.make_node("Resize", ["x32", "", "scales"], ["y32"], mode="nearest"),
+         helper.make_node("Cast", ["y32"], ["output"], to=TensorProto.FLOAT16)],
+        "upscale16",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT16, ["N", 3, "H", "W"])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT16, ["N", 3, "OH", "OW"])],
+        initializer=[scales],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 9
+    path = str(tmp_path / "up16.onnx")
+    onnx.save(model, path)
+    workers = inference_workers.WorkerPool(path, 2, ["CPUExecutionProvider"], workers=1, slots=1,
+                                           slot_bytes=1024 * 1024)
+    workers.start(timeout=60)
+    try:
+        img = _frame(24, 32)
+        # float16 holds x/255 to ~3 significant digits: off by one at most
+        diff = workers.infer(img).astype(int) - _nearest(img)
+        assert np.abs(diff).max() <= 1
+    finally:
+        workers.close()
+
+
+def test_model_that_does_not_load_fails_start(tmp_path):
+    broken = tmp_path / "broken.onnx"
+    broken.write_bytes(b"not a model")
+    workers = inference_workers.WorkerPool(str(broken), 2, ["CPUExecutionProvider"], workers=1, slots=1,
+                                           slot_bytes=1024 * 1024)
+    with pytest.raises(inference_workers.WorkerCrashed):
+        workers.start(timeout=60)
+    assert workers.closed
+
+
+def test_only_frame_paths_dispatch_to_the_pool(real_main, pool, monkeypatch):
+    session = ort.InferenceSession(pool.model_path, providers=["CPUExecutionProvider"])
+    for attr, value in {"onnx_session": session, "onnx_model_path": pool.model_path, "onnx_model_name": "tiny",
+                        "current_model": "tiny", "current_model_type": "onnx", "onnx_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    monkeypatch.setattr(real_main, "_inference_pool", pool)
+    img = _frame(24, 32)
+    # Still images keep the in-process blend/stitch plan
+    np.testing.assert_array_equal(real_main.upscale_with_onnx(img), _nearest(img))
+    assert pool.stats()["jobs_total"] == 0
+    np.testing.assert_array_equal(real_main._upscale_frame_array(img), _nearest(img))
+    assert pool.stats()["jobs_total"] == 1
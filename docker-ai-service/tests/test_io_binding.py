@@ -0,0 +1,110 @@
+"""Pooled I/O-binding slots: buffers are reused per shape and results stay exact."""
+import numpy as np
+import pytest
+
+from app import io_binding
+from tests.conftest import make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pool(monkeypatch):
+    io_binding.clear()
+    monkeypatch.setattr(io_binding, "ENABLED", True)
+    monkeypatch.setattr(io_binding, "POOL_SLOTS", 2)
+    monkeypatch.setattr(io_binding, "MAX_SHAPES", 8)
+    yield
+    io_binding.clear()
+
+
+def _infer(session, x):
+    with io_binding.lease(session, "input", "output", x.shape, np.float32) as slot:
+        slot.input[...] = x
+        return slot.run().copy(), slot
+
+
+def test_same_shape_reuses_one_slot(session):
+    rng = np.random.default_rng(0)
+    slots = []
+    for _ in range(5):
+        x = rng.random((1, 3, 16, 12), dtype=np.float32)
+        out, slot = _infer(session, x)
+        np.testing.assert_array_equal(out, session.run(["output"], {"input": x})[0])
+        slots.append(slot)
+    # first call learns the output shape, second allocates, the rest reuse it
+    assert len({id(s) for s in slots[1:]}) == 1
+    info = io_binding.stats()
+    assert (info["allocated"], info["reused"]) == (1, 3)
+    assert info["pooled_bytes"] == slots[-1].nbytes
+
+
+def test_concurrent_leases_never_share_a_buffer(session):
+    x = np.zeros((1, 3, 8, 8), dtype=np.float32)
+    _infer(session, x)
+    with io_binding.lease(session, "input", "output", x.shape, np.float32) as a:
+        with io_binding.lease(session, "input", "output", x.shape, np.float32) as b:
+            assert a.input is not b.input and a.output is not b.output
+
+
+def test_shapes_are_lru_bounded(session, monkeypatch):
+    monkeypatch.setattr(io_binding, "MAX_SHAPES", 2)
+    for w in (8, 9, 10):
+        _infer(session, np.zeros((1, 3, 8, w), dtype=np.float32))
+    assert io_binding.stats()["evicted"] == 1
+
+
+def test_binding_failure_falls_back_to_plain_run(session):
+    class NoBinding:
+        def __init__(self, s):
+            self._s = s
+
+        def run(self, names, feed):
+            return self._s.run(names, feed)
+
+        def io_binding(self):
+            raise RuntimeError("provider does not support binding")
+
+    wrapped = NoBinding(session)
+    x = np.ones((1, 3, 8, 8), dtype=np.float32)
+    for _ in range(3):
+        out, _ = _infer(wrapped, x)
+        assert out.shape == (1, 3, 16, 16)
+    assert io_binding.stats()["fallbacks"] == 1
+
+
+async def test_realtime_path_matches_nearest_upscale(real_main, session):
+    import cv2
+
+    frame = np.random.default_rng(1).integers(0, 256, (48, 40, 3), dtype=np.uint8)
+    local_state = {"model_type": "onnx", "cv_model": None, "scale": 2}
+    for _ in range(3):
+        out = await real_main.upscale_frame_realtime(frame, session, local_state)
+        expected = cv2.resize(frame, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+        # float round trip through /255 and *255 may truncate a code value down
+        assert np.abs(out.astype(int) - expected.astype(int)).max() <= 1
+    assert io_binding.stats()["reused"] >= 1
+
+
+def test_pooled_slots_do_not_keep_the_session_alive(tmp_path):
+    import gc
+    import weakref
+
+    path = make_upscale_onnx(str(tmp_path / "gone.onnx"), scale=2)
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    x = np.zeros((1, 3, 8, 8), dtype=np.float32)
+    for _ in range(2):
+        _infer(session, x)
+    assert io_binding.stats()["pooled_bytes"] > 0
+    ref = weakref.ref(session)
+    del session
+    gc.collect()
+    assert ref() is None and io_binding.stats()["pooled_bytes"] == 0
+
+
+def test_forget_drops_a_swapped_out_session(session):
+    x = np.zeros((1, 3, 8, 8), dtype=np.float32)
+    for _ in range(2):
+        _infer(session, x)
+    io_binding.forget(session)
+    assert io_binding.stats()["pooled_bytes"] == 0
@@ -0,0 +1,93 @@
+"""Letterbox/pillarbox detection, tracking and padding."""
+import numpy as np
+
+from app import letterbox
+
+
+def _letterboxed(h=540, w=960, top=66, bottom=474, left=0, right=None, seed=0) -> np.ndarray:
+    img = np.zeros((h, w, 3), np.uint8)
+    right = w if right is None else right
+    img[top:bottom, left:right] = np.random.default_rng(seed).integers(
+        30, 256, (bottom - top, right - left, 3), dtype=np.uint8)
+    return img
+
+
+def test_detects_letterbox_and_pillarbox_with_safety_margin():
+    active = letterbox.detect(_letterboxed())
+    assert active.x0 == 0 and active.x1 == 960
+    assert 60 <= active.y0 <= 66 and 474 <= active.y1 <= 480
+    pillar = letterbox.detect(_letterboxed(top=0, bottom=540, left=120, right=840))
+    assert pillar.y0 == 0 and pillar.y1 == 540 and pillar.x0 <= 120 and pillar.x1 >= 840
+    assert letterbox.detect(np.zeros((64, 64, 3), np.uint8)) is None  # fade to black
+    assert letterbox.detect(_letterboxed(top=4, bottom=536)) == letterbox.Active(0, 540, 0, 960)
+
+
+def test_tracker_narrows_only_after_confirmation_and_widens_at_once(monkeypatch):
+    monkeypatch.setattr(letterbox, "REDETECT_FRAMES", 4)
+    tracker = letterbox.BorderTracker()
+    frame = _letterboxed()
+    seen = [tracker.update(frame) for _ in range(letterbox.CONFIRM)]
+    assert seen[:-1] == [None] * (letterbox.CONFIRM - 1) and seen[-1] is not None
+    cropped = seen[-1]
+
+    # A dark scene inside the picture area does not crop further by itself
+    dark = _letterboxed(top=150, bottom=390)
+    assert tracker.update(dark) == cropped  # frame 4: redetect, only pending
+    assert tracker.update(frame) == cropped
+    assert tracker._pending is None
+
+    # Full-frame content comes back: the next detection widens immediately
+    full = np.full((540, 960, 3), 128, np.uint8)
+    for _ in range(3):
+        tracker.update(full)
+    assert tracker.update(full) is None
+
+
+def test_pad_restores_the_full_frame_with_black_bars():
+    frame = _letterboxed()
+    active = letterbox.detect(frame)
+
+    def x2(img):
+        return img.repeat(2, 0).repeat(2, 1)
+
+    np.testing.assert_array_equal(letterbox.apply(frame, active, x2), x2(frame))
+
+
+def test_registry_is_bounded():
+    reg = letterbox.TrackerRegistry(max_entries=2)
+    a = reg.get("a")
+    reg.get("b")
+    assert reg.get("a") is a
+    reg.get("c")
+    assert len(reg) == 2 and reg.get("a") is a  # "b" was least recently used
+
+
+def test_upscale_frame_skips_bars(real_main, monkeypatch):
+    import cv2
+    from starlette.testclient import TestClient
+
+    shapes = []
+
+    class _Nearest:
+        def upsample(self, img):
+            shapes.append(img.shape[:2])
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(real_main, "_scheduler", real_main.scheduler.Scheduler(1))
+    monkeypatch.setattr(real_main.frame_dedup, "ENABLED", False)  # the same frame is sent repeatedly
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": _Nearest(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    frame = _letterboxed(h=180, w=320, top=22, bottom=158)
+    body = cv2.imencode(".png", frame)[1].tobytes()
+    client = TestClient(real_main.app)
+
+    for _ in range(letterbox.CONFIRM):
+        resp = client.post("/upscale-frame", content=body, headers={"X-Stream-Id": "s1"})
+        assert resp.status_code == 200
+    assert resp.headers["X-Letterbox"].startswith("2")
+    assert shapes[0] == (180, 320) and shapes[-1][0] < 180
+    out = cv2.imdecode(np.frombuffer(resp.content, np.uint8), cv2.IMREAD_COLOR)
+    assert out.shape == (360, 640, 3)
+    assert out[:30].max() <= 16  # the bars are still black (JPEG noise aside)
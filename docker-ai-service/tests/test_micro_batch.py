@@ -0,0 +1,97 @@
+"""Cross-request micro-batching for /upscale-frame."""
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app import micro_batch
+from tests.conftest import make_upscale_onnx
+
+
+class _Recorder:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, key, items):
+        self.release.wait(2)
+        self.calls.append((key, list(items)))
+        if self.fail:
+            raise RuntimeError("model exploded")
+        return [x * 10 for x in items]
+
+
+async def test_lone_request_is_not_delayed():
+    rec = _Recorder()
+    batcher = micro_batch.MicroBatcher(rec, window_ms=1000, max_batch=8)
+    result = await asyncio.wait_for(batcher.submit("k", 1), timeout=0.5)
+    assert result == (10, 1)
+
+
+async def test_concurrent_same_key_requests_share_one_call():
+    rec = _Recorder()
+    batcher = micro_batch.MicroBatcher(rec, window_ms=50, max_batch=8)
+    # Hold the first (immediately dispatched) frame in "inference" so the others
+    # arrive while something is in flight - the situation batching exists for.
+    rec.release.clear()
+    first = asyncio.ensure_future(batcher.submit("k", 0))
+    await asyncio.sleep(0.01)
+    rest = [asyncio.ensure_future(batcher.submit("k", i)) for i in range(1, 4)]
+    other = asyncio.ensure_future(batcher.submit("other-shape", 9))
+    await asyncio.sleep(0.01)
+    rec.release.set()
+    results = await asyncio.gather(first, *rest, other)
+    assert results == [(0, 1), (10, 3), (20, 3), (30, 3), (90, 1)]
+    assert sorted(len(items) for _, items in rec.calls) == [1, 1, 3]
+    assert batcher.batch_sizes.total == 3
+    assert batcher.queue_delay.total == 5
+
+
+async def test_full_batch_dispatches_before_the_window():
+    rec = _Recorder()
+    batcher = micro_batch.MicroBatcher(rec, window_ms=10_000, max_batch=2)
+    rec.release.clear()
+    first = asyncio.ensure_future(batcher.submit("k", 0))
+    await asyncio.sleep(0.01)
+    pair = [asyncio.ensure_future(batcher.submit("k", i)) for i in (1, 2)]
+    rec.release.set()
+    results = await asyncio.wait_for(asyncio.gather(first, *pair), timeout=1)
+    assert [r[1] for r in results] == [1, 2, 2]
+
+
+async def test_batch_failure_reaches_every_request():
+    rec = _Recorder(fail=True)
+    batcher = micro_batch.MicroBatcher(rec, window_ms=20, max_batch=4)
+    tasks = [asyncio.ensure_future(batcher.submit("k", i)) for i in range(3)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_metrics_text_is_a_valid_histogram():
+    batcher = micro_batch.MicroBatcher(lambda k, items: items, window_ms=4, max_batch=8)
+    batcher.batch_sizes.observe(3)
+    text = "\n".join(batcher.prometheus("upscaler_micro_batch"))
+    assert 'upscaler_micro_batch_size_bucket{le="2"} 0' in text
+    assert 'upscaler_micro_batch_size_bucket{le="4"} 1' in text
+    assert 'upscaler_micro_batch_size_bucket{le="+Inf"} 1' in text
+    assert "upscaler_micro_batch_window_ms 4" in text
+
+
+def test_batched_frames_match_single_frame_path(real_main, tmp_path, monkeypatch):
+    ort = pytest.importorskip("onnxruntime")
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    monkeypatch.setattr(real_main.state, "onnx_session", session)
+    monkeypatch.setattr(real_main.state, "onnx_model_scale", 2)
+    monkeypatch.setattr(real_main.state, "current_model_type", "onnx")
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (32, 48, 3), dtype=np.uint8) for _ in range(3)]
+
+    key = real_main._frame_batch_key(frames[0])
+    assert key == (session, 32, 48, None)  # None = the active model
+    batched = real_main._infer_frame_batch(key, frames)
+    for frame, out in zip(frames, batched):
+        np.testing.assert_array_equal(out, real_main.upscale_with_onnx(frame))
@@ -0,0 +1,86 @@
+"""Resident model cache: LRU/budget eviction and per-request model selection."""
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from app import model_cache
+from tests.conftest import make_upscale_onnx
+
+
+class _Src:
+    """Stand-in for AppState with one model loaded."""
+
+    def __init__(self, name, nbytes_hint=0):
+        self.current_model = name
+        self.current_model_type = "onnx"
+        self.current_model_input_frames = 1
+        self.cv_model = self.cv_model_name = None
+        self.cv_model_scale = 2
+        self.onnx_session = object()
+        self.onnx_model_name = name
+        self.onnx_model_scale = 4
+        self.onnx_model_path = None
+        self.ncnn_upscaler = self.ncnn_model_name = None
+        self.ncnn_model_scale = 4
+        self.ncnn_gpu_id = 0
+        self.providers = ["CPUExecutionProvider"]
+
+
+def _entry(name, mb):
+    return model_cache.ResidentModel.capture(_Src(name), True, 0, mb * 1024 * 1024)
+
+
+def test_lru_eviction_respects_budget_and_protected_names(monkeypatch):
+    monkeypatch.setattr(model_cache, "BUDGET_BYTES", 100 * 1024 * 1024)
+    monkeypatch.setattr(model_cache, "MAX_ENTRIES", 3)
+    cache = model_cache.ModelCache()
+    assert cache.put(_entry("a", 40)) == []
+    assert cache.put(_entry("b", 40)) == []
+    assert cache.get("a", True, 0) is not None  # a is now the most recent
+    # c needs room: b is the least recently used
+    assert cache.put(_entry("c", 40)) == ["b"]
+    # an active model is never evicted, even when it is the oldest
+    assert cache.put(_entry("d", 40), keep=["a"]) == ["c"]
+    assert cache.names() == ["a", "d"]
+    # different GPU settings do not match
+    assert cache.get("d", False, 0) is None
+    stats = cache.stats()
+    assert stats["evictions"] == 2 and stats["hits"] == 1 and stats["misses"] == 1
+    assert [e["name"] for e in stats["entries"]] == ["d", "a"]
+
+
+def test_oversized_model_is_still_kept(monkeypatch):
+    monkeypatch.setattr(model_cache, "BUDGET_BYTES", 10 * 1024 * 1024)
+    cache = model_cache.ModelCache()
+    cache.put(_entry("small", 5))
+    assert cache.put(_entry("huge", 50)) == ["small"]
+    assert cache.names() == ["huge"]
+
+
+def test_per_request_model_leaves_active_model_alone(real_main, monkeypatch):
+    monkeypatch.setenv("ONNX_PROVIDERS", "CPUExecutionProvider")
+    models_dir = real_main.MODELS_DIR
+    for name, scale in (("tiny-x2", 2), ("tiny-x3", 3)):
+        make_upscale_onnx(os.path.join(models_dir, f"{name}.onnx"), scale=scale)
+        monkeypatch.setitem(real_main.AVAILABLE_MODELS, name, {
+            "name": name, "description": "test", "scale": scale, "type": "onnx"})
+    img = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    assert asyncio.run(real_main.load_model("tiny-x2"))
+    other = asyncio.run(real_main._resident_model("tiny-x3"))
+    assert other is not None and other.scale == 3
+    assert real_main.state.current_model == "tiny-x2"
+    assert real_main._with_model(other, real_main.upscale_image_array, img).shape == (24, 24, 3)
+    assert real_main.upscale_image_array(img).shape == (16, 16, 3)
+    assert asyncio.run(real_main._resident_model("tiny-x2")) is None  # the active one
+
+    # Switching the active model reuses the resident session: no disk load
+    assert asyncio.run(real_main.load_model("tiny-x3"))
+    assert real_main.state.onnx_session is other.onnx_session
+    assert real_main.upscale_image_array(img).shape == (24, 24, 3)
+    assert real_main._resident_models.stats()["hits"] >= 1
+
+    with pytest.raises(real_main.HTTPException):
+        asyncio.run(real_main._resident_model("no-such-model"))
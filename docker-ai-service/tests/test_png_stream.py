@@ -0,0 +1,116 @@
+"""Band-streamed /upscale: incremental PNG encoding and band stitching."""
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from app import png_stream
+
+
+def _decode(data: bytes) -> np.ndarray:
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert img is not None, "not a valid PNG"
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def test_incremental_png_roundtrips_across_uneven_bands():
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (101, 37, 3), dtype=np.uint8)
+    writer = png_stream.PngStreamWriter(37, 101)
+    data = writer.header()
+    for y0, y1 in [(0, 1), (1, 40), (40, 40), (40, 101)]:
+        data += writer.add_rows(img[y0:y1])
+    data += writer.finish()
+    np.testing.assert_array_equal(_decode(data), img)
+
+
+def test_incremental_png_rejects_wrong_row_count():
+    writer = png_stream.PngStreamWriter(4, 4)
+    writer.add_rows(np.zeros((3, 4, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        writer.finish()
+    with pytest.raises(ValueError):
+        writer.add_rows(np.zeros((2, 4, 3), dtype=np.uint8))
+
+
+class _NearestX2:
+    """Stand-in OpenCV SR model: pixel-doubling, so bands must stitch exactly."""
+
+    def upsample(self, img):
+        return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+
+@pytest.fixture
+def nearest_model(real_main, monkeypatch):
+    monkeypatch.setattr(real_main.state, "current_model", "nearest-x2")
+    monkeypatch.setattr(real_main.state, "current_model_type", "opencv")
+    monkeypatch.setattr(real_main.state, "cv_model", _NearestX2())
+    monkeypatch.setattr(real_main.state, "cv_model_scale", 2)
+    monkeypatch.setattr(real_main, "UPSCALE_BAND_ROWS", 16)
+    monkeypatch.setattr(real_main, "UPSCALE_BAND_CONTEXT", 4)
+    return real_main
+
+
+def test_band_stream_matches_whole_image_upscale(nearest_model):
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (70, 33, 3), dtype=np.uint8)
+    chunks = list(nearest_model.iter_upscaled_png(img))
+    # header+first band, one chunk per further band, then the trailer
+    assert len(chunks) == 1 + (70 - 16 + 15) // 16 + 1
+    expected = cv2.cvtColor(_NearestX2().upsample(img), cv2.COLOR_BGR2RGB)
+    np.testing.assert_array_equal(_decode(b"".join(chunks)), expected)
+
+
+def test_upscale_endpoint_streams_large_inputs(nearest_model, monkeypatch):
+    from starlette.testclient import TestClient
+
+    main = nearest_model
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(main, "UPSCALE_STREAM_MIN_MPIX", 0)
+    monkeypatch.setattr(main, "_scheduler", main.scheduler.Scheduler(1))
+    rng = np.random.default_rng(2)
+    img = rng.integers(0, 256, (40, 30, 3), dtype=np.uint8)
+    png = cv2.imencode(".png", img)[1].tobytes()
+    client = TestClient(main.app)
+
+    resp = client.post("/upscale", files={"file": ("a.png", io.BytesIO(png), "image/png")})
+    assert resp.status_code == 200
+    assert "X-Upscale-Streamed" not in resp.headers  # streaming disabled (0)
+
+    monkeypatch.setattr(main, "UPSCALE_STREAM_MIN_MPIX", 1)
+    monkeypatch.setattr(main, "MAX_IMAGE_PIXELS", 16000 * 16000)
+    big = np.tile(img, (30, 40, 1))  # 1200x1200 = 1.44 MP
+    png = cv2.imencode(".png", big)[1].tobytes()
+    resp = client.post("/upscale", files={"file": ("b.png", io.BytesIO(png), "image/png")})
+    assert resp.status_code == 200
+    assert resp.headers["X-Upscale-Streamed"] == "bands"
+    np.testing.assert_array_equal(_decode(resp.content), cv2.cvtColor(_NearestX2().upsample(big), cv2.COLOR_BGR2RGB))
+    # The generator handed the slot back
+    assert main._scheduler.in_flight == 0
+    assert main.state.processing_count == 0
+
+
+async def test_band_stream_releases_the_slot_when_the_client_is_gone(nearest_model, monkeypatch):
+    from starlette.requests import ClientDisconnect
+
+    main = nearest_model
+    monkeypatch.setattr(main, "UPSCALE_STREAM_MIN_MPIX", 0.001)
+    monkeypatch.setattr(main, "_scheduler", main.scheduler.Scheduler(1))
+    img = np.random.default_rng(3).integers(0, 256, (70, 33, 3), dtype=np.uint8)
+    png = cv2.imencode(".png", img)[1].tobytes()
+    resp = await main._upscale_response(png, None, "", (main.scheduler.INTERACTIVE, None))
+    assert main._scheduler.in_flight == 1 and main.state.processing_count == 1
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")  # what uvicorn does once the peer is gone
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}}
+    with pytest.raises(ClientDisconnect):
+        await resp(scope, receive, send)
+    # The body was never iterated, so only the response can have given the slot back
+    assert main._scheduler.in_flight == 0
+    assert main.state.processing_count == 0
@@ -0,0 +1,137 @@
+"""Realtime quality ladder: step down when behind, back up with hysteresis."""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app import quality_ladder as ql
+
+
+@pytest.fixture(autouse=True)
+def _defaults(monkeypatch):
+    monkeypatch.setattr(ql, "DOWN_FRAMES", 3)
+    monkeypatch.setattr(ql, "UP_FRAMES", 10)
+    monkeypatch.setattr(ql, "MAX_UP_WAIT", 40)
+
+
+def _feed(controller, latency_s, frames):
+    for _ in range(frames):
+        controller.observe(latency_s)
+    return controller.level
+
+
+def test_steps_down_when_over_budget_and_up_after_headroom():
+    c = ql.QualityController(target_fps=25)  # 40 ms budget
+    assert _feed(c, 0.030, 50) == ql.FULL    # 75% of budget: neither behind nor idle
+    assert _feed(c, 0.060, 3) == ql.REDUCED
+    assert _feed(c, 0.060, 3) == ql.LIGHT
+    assert _feed(c, 0.010, 9) == ql.LIGHT    # not yet: UP_FRAMES of headroom needed
+    assert _feed(c, 0.010, 1) == ql.REDUCED
+    assert c.snapshot()["quality_name"] == "reduced" and c.changes == 3
+
+
+def test_failed_probe_doubles_the_wait():
+    c = ql.QualityController(target_fps=25, levels=(ql.FULL, ql.REDUCED, ql.BICUBIC))
+    _feed(c, 0.060, 3)
+    assert c.level == ql.REDUCED
+    _feed(c, 0.010, 10)
+    assert c.level == ql.FULL
+    _feed(c, 0.060, 3)                       # the full level still cannot keep up
+    assert c.level == ql.REDUCED
+    assert _feed(c, 0.010, 19) == ql.REDUCED  # now waits 20 frames
+    assert _feed(c, 0.010, 1) == ql.FULL
+
+
+def test_missing_levels_are_skipped():
+    c = ql.QualityController(target_fps=25, levels=(ql.FULL, ql.REDUCED, ql.BICUBIC))
+    assert _feed(c, 0.5, 6) == ql.BICUBIC
+    assert _feed(c, 0.5, 6) == ql.BICUBIC     # bottom of the ladder
+
+
+async def _post_stream(app, headers: dict, body: bytes) -> tuple:
+    """POST to /upscale-stream as an ASGI 2.4 server (uvicorn) would; returns (status, body).
+
+    TestClient speaks ASGI 2.0, where StreamingResponse's disconnect listener
+    competes with the endpoint for the request body.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/upscale-stream", "raw_path": b"/upscale-stream",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 1), "server": ("test", 80),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if pending:
+            return pending.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+async def test_stream_steps_down_under_load(real_main, monkeypatch):
+    import cv2
+
+    class _Slow:
+        """Nearest 2x that takes 30 ms on full 64x48 frames, nothing on smaller ones."""
+
+        def upsample(self, img):
+            if img.shape[:2] == (48, 64):
+                time.sleep(0.03)
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(real_main, "_scheduler", real_main.scheduler.Scheduler(1))
+    monkeypatch.setattr(real_main.quality_ladder, "ENABLED", True)
+    monkeypatch.setattr(real_main.frame_dedup, "ENABLED", False)
+    for attr, value in {"current_model": "slow-x2", "current_model_type": "opencv",
+                        "cv_model": _Slow(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    frames = np.random.default_rng(0).integers(0, 256, (8, 48, 64, 3), dtype=np.uint8)
+
+    status, out = await _post_stream(
+        real_main.app, {"X-Frame-Width": "64", "X-Frame-Height": "48", "X-Target-FPS": "50"},
+        frames.tobytes())
+    assert status == 200
+    assert len(out) % (96 * 128 * 3) == 0 and len(out) >= 96 * 128 * 3
+    stats = real_main._realtime_stats.snapshot()
+    assert stats["quality_level"] == ql.REDUCED and stats["quality_name"] == "reduced"
+
+
+async def test_repeats_reuse_output_only_from_the_current_rung(real_main, monkeypatch):
+    import cv2
+
+    calls = []
+
+    class _Slow:
+        def upsample(self, img):
+            calls.append(img.shape[:2])
+            if img.shape[:2] == (48, 64):
+                time.sleep(0.03)
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(real_main, "_scheduler", real_main.scheduler.Scheduler(1))
+    monkeypatch.setattr(real_main.quality_ladder, "ENABLED", True)
+    monkeypatch.setattr(real_main.quality_ladder, "DOWN_FRAMES", 1)
+    monkeypatch.setattr(real_main.frame_dedup, "ENABLED", True)
+    for attr, value in {"current_model": "slow-x2", "current_model_type": "opencv",
+                        "cv_model": _Slow(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    frame = np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+    status, out = await _post_stream(
+        real_main.app, {"X-Frame-Width": "64", "X-Frame-Height": "48", "X-Target-FPS": "50"},
+        frame.tobytes() * 3)
+    assert status == 200 and len(out) == 3 * 96 * 128 * 3
+    # The first copy was made at full quality and pushed the ladder down: the
+    # second is inferred again at the reduced rung, the third reuses that
+    assert calls == [(48, 64), (36, 48)]
@@ -0,0 +1,82 @@
+"""INT8 quantization: calibration set, quality gate and registration."""
+import numpy as np
+import pytest
+
+from app import quantize
+
+ort = pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+
+def make_conv_upscale_onnx(path: str, scale: int = 2) -> str:
+    """Conv -> Relu -> Conv -> nearest Resize: small, but with weights to quantize."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    w1 = rng.normal(0, 0.05, (8, 3, 3, 3)).astype(np.float32)
+    w2 = rng.normal(0, 0.05, (3, 8, 3, 3)).astype(np.float32)
+    for c in range(3):  # keep an identity path so outputs look like images
+        w1[c, c, 1, 1] += 1.0
+        w2[c, c, 1, 1] += 1.0
+    inits = [
+        numpy_helper.from_array(w1, "w1"), numpy_helper.from_array(np.zeros(8, np.float32), "b1"),
+        numpy_helper.from_array(w2, "w2"), numpy_helper.from_array(np.zeros(3, np.float32), "b2"),
+        helper.make_tensor("scales", TensorProto.FLOAT, [4], [1.0, 1.0, float(scale), float(scale)]),
+    ]
+    nodes = [
+        helper.make_node("Conv", ["input", "w1", "b1"], ["c1"], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["c1"], ["r1"]),
+        helper.make_node("Conv", ["r1", "w2", "b2"], ["c2"], pads=[1, 1, 1, 1]),
+        helper.make_node("Resize", ["c2", "", "scales"], ["output"], mode="nearest"),
+    ]
+    graph = helper.make_graph(
+        nodes, "conv_upscale",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["N", 3, "H", "W"])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["N", 3, "OH", "OW"])],
+        initializer=inits,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 9
+    onnx.save(model, path)
+    return path
+
+
+def test_sample_images_are_deterministic_and_shaped():
+    a = quantize.sample_images(5, (24, 40))
+    b = quantize.sample_images(5, (24, 40))
+    assert all(x.shape == (24, 40, 3) and x.dtype == np.uint8 for x in a)
+    assert all(np.array_equal(x, y) for x, y in zip(a, b))
+    assert not np.array_equal(a[4], quantize.sample_images(5, (24, 40), seed=1)[4])
+
+
+@pytest.mark.parametrize("mode", quantize.MODES)
+def test_int8_variant_tracks_fp32(tmp_path, mode, real_main):
+    src = make_conv_upscale_onnx(str(tmp_path / "m.onnx"))
+    dst = str(tmp_path / f"m-{mode}.onnx")
+    quantize.quantize(src, dst, mode, "input", quantize.sample_images(4, 32))
+    ref = ort.InferenceSession(src, providers=["CPUExecutionProvider"])
+    cand = ort.InferenceSession(dst, providers=["CPUExecutionProvider"])
+    metrics = quantize.score(ref, cand, "input", real_main.compute_quality_metrics,
+                             quantize.sample_images(3, 32, seed=1))
+    assert metrics["images"] == 3
+    assert metrics["psnr_db"] > 25 and metrics["ssim"] > 0.8
+
+
+def test_quantize_job_registers_only_passing_variants(real_main, monkeypatch):
+    import os
+
+    make_conv_upscale_onnx(os.path.join(real_main.MODELS_DIR, "convx2.onnx"))
+    monkeypatch.setitem(real_main.AVAILABLE_MODELS, "convx2", {
+        "name": "Conv x2", "description": "test", "scale": 2, "type": "onnx", "category": "quality"})
+    real_main._quantize_jobs["j"] = {"status": "queued"}
+
+    rejected = real_main._quantize_model_sync("j", "convx2", "static", 100.0, 1.0)
+    assert rejected["status"] == "rejected"
+    assert "convx2-int8" not in real_main.AVAILABLE_MODELS
+
+    done = real_main._quantize_model_sync("j", "convx2", "static", 20.0, 0.5)
+    assert done["status"] == "completed" and done["variant"] == "convx2-int8"
+    entry = real_main.AVAILABLE_MODELS.pop("convx2-int8")
+    assert entry["quantized_from"] == "convx2" and entry["scale"] == 2 and entry["custom"]
+    assert os.path.exists(os.path.join(real_main.MODELS_DIR, "convx2-int8.onnx"))
@@ -0,0 +1,117 @@
+"""Content-addressed /upscale result cache: LRU budget, singleflight, endpoint."""
+import asyncio
+import io
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app import result_cache
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "DIR", tmp_path / "results")
+    monkeypatch.setattr(result_cache, "BUDGET_BYTES", 1024 * 1024)
+    monkeypatch.setattr(result_cache, "_index", None)
+    for k in result_cache._stats:
+        monkeypatch.setitem(result_cache._stats, k, 0)
+
+
+def test_key_covers_input_and_options():
+    a = result_cache.make_key(b"img", model="m", scale=2)
+    assert a == result_cache.make_key(b"img", scale=2, model="m")
+    assert a != result_cache.make_key(b"img", model="m", scale=4)
+    assert a != result_cache.make_key(b"img2", model="m", scale=2)
+
+
+def test_put_get_and_lru_eviction(monkeypatch):
+    monkeypatch.setattr(result_cache, "BUDGET_BYTES", 250)
+    keys = [result_cache.make_key(bytes([i])) for i in range(3)]
+    assert result_cache.get(keys[0]) is None
+    result_cache.put(keys[0], b"a" * 100)
+    result_cache.put(keys[1], b"b" * 100)
+    assert result_cache.get(keys[0]) == b"a" * 100  # now most recently used
+    assert result_cache.put(keys[2], b"c" * 100) == 1
+    assert result_cache.get(keys[1]) is None
+    stats = result_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evicted"], stats["entries"]) == (1, 2, 1, 2)
+
+
+def test_index_is_rebuilt_from_disk_in_lru_order(monkeypatch):
+    old, new = result_cache.make_key(b"old"), result_cache.make_key(b"new")
+    result_cache.put(old, b"x" * 100)
+    result_cache.put(new, b"y" * 100)
+    past = time.time() - 60
+    os.utime(result_cache._path(old), (past, past))
+    monkeypatch.setattr(result_cache, "_index", None)  # as after a restart
+    monkeypatch.setattr(result_cache, "BUDGET_BYTES", 150)
+    assert result_cache.evict() == 1
+    assert result_cache.get(new) is not None and result_cache.get(old) is None
+
+
+def test_concurrent_identical_requests_compute_once():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return b"result"
+
+    async def main():
+        return await asyncio.gather(*(result_cache.coalesce("k", compute) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(leader for _, leader in results) == [False, False, False, True]
+    assert all(data == b"result" for data, _ in results)
+    assert result_cache.stats()["coalesced"] == 3
+
+
+def test_failed_leader_releases_waiters():
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("model failed")
+
+    async def main():
+        return await asyncio.gather(result_cache.coalesce("k", boom),
+                                    result_cache.coalesce("k", boom), return_exceptions=True)
+
+    leader, waiter = asyncio.run(main())
+    assert isinstance(leader, RuntimeError)
+    assert waiter == (None, False)  # the waiter computes on its own
+    assert not result_cache._inflight
+
+
+def test_upscale_endpoint_serves_repeats_from_cache(real_main, monkeypatch):
+    import cv2
+    from starlette.testclient import TestClient
+
+    calls = []
+
+    class _Counting:
+        def upsample(self, img):
+            calls.append(img.shape)
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(result_cache, "ENABLED", True)
+    monkeypatch.setattr(real_main, "_scheduler", real_main.scheduler.Scheduler(1))
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": _Counting(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    img = np.random.default_rng(0).integers(0, 256, (20, 30, 3), dtype=np.uint8)
+    png = cv2.imencode(".png", img)[1].tobytes()
+    client = TestClient(real_main.app)
+
+    first = client.post("/upscale", files={"file": ("a.png", io.BytesIO(png), "image/png")})
+    second = client.post("/upscale", files={"file": ("b.png", io.BytesIO(png), "image/png")})
+    assert first.status_code == second.status_code == 200
+    assert (first.headers["X-Result-Cache"], second.headers["X-Result-Cache"]) == ("miss", "hit")
+    assert first.content == second.content and len(calls) == 1
+
+    assert client.post("/upscale", data={"stitch": "crop"},
+                       files={"file": ("a.png", io.BytesIO(png), "image/png")}).headers["X-Result-Cache"] == "miss"
+    assert "upscaler_result_cache_hits_total 1" in client.get("/metrics").text
+    assert client.delete("/cache/results").json() == {"removed": 2}
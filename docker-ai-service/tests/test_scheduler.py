@@ -0,0 +1,130 @@
+"""Priority/deadline admission scheduler that replaced the fail-fast semaphore."""
+import asyncio
+import time
+
+import pytest
+
+from app import scheduler
+from app.scheduler import BATCH, INTERACTIVE, REALTIME, Rejected, Scheduler
+
+
+@pytest.fixture(autouse=True)
+def _defaults(monkeypatch):
+    monkeypatch.setattr(scheduler, "MAX_QUEUE", 3)
+
+
+def _later(s: float) -> float:
+    return time.monotonic() + s
+
+
+async def test_queued_requests_are_admitted_by_priority_then_deadline():
+    sched = Scheduler(1)
+    holder = await sched.acquire(INTERACTIVE)
+    order = []
+
+    async def wait(priority, deadline_s):
+        ticket = await sched.acquire(priority, _later(deadline_s))
+        order.append((priority, deadline_s))
+        sched.release(ticket)
+
+    tasks = [asyncio.create_task(wait(*args)) for args in
+             [(BATCH, 5), (INTERACTIVE, 5), (REALTIME, 3), (REALTIME, 2)]]
+    await asyncio.sleep(0)
+    # The queue holds 3: the last realtime request pushed the batch one out
+    assert sched.stats()["queued_by_class"] == {REALTIME: 2, INTERACTIVE: 1, BATCH: 0}
+    sched.release(holder)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert isinstance(results[0], Rejected) and results[0].reason == "shed"
+    assert order == [(REALTIME, 2), (REALTIME, 3), (INTERACTIVE, 5)]
+    assert sched.in_flight == 0
+
+
+async def test_full_queue_turns_away_equal_priority_with_retry_after():
+    sched = Scheduler(1)
+    sched.service_s = 2.5
+    holder = await sched.acquire(BATCH)
+    waiters = [asyncio.create_task(sched.acquire(BATCH, _later(60))) for _ in range(3)]
+    await asyncio.sleep(0)
+    with pytest.raises(Rejected) as info:
+        await sched.acquire(BATCH, _later(60))
+    assert info.value.reason == "full"
+    # 3 queued ahead + itself, one slot, 2.5 s each
+    assert info.value.retry_after == "10"
+    for w in waiters:
+        w.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    assert sched.stats()["queue_depth"] == 0
+    sched.release(holder)
+    assert sched.in_flight == 0
+
+
+async def test_deadlines_reject_up_front_and_expire_in_the_queue():
+    sched = Scheduler(1)
+    holder = await sched.acquire(INTERACTIVE)
+
+    # No service time measured yet: it queues, then gives up at its deadline
+    with pytest.raises(Rejected) as info:
+        await sched.acquire(REALTIME, _later(0.02))
+    assert info.value.reason == "expired"
+    assert sched.in_flight == 1 and sched.stats()["queue_depth"] == 0
+
+    sched.service_s = 1.0  # a slot frees up in ~1 s: a 100 ms deadline cannot be met
+    with pytest.raises(Rejected) as info:
+        await sched.acquire(REALTIME, _later(0.1))
+    assert info.value.reason == "deadline" and info.value.retry_after == "1"
+    sched.release(holder)
+    assert sched.stats()["rejected"] == {"full": 0, "shed": 0, "deadline": 1, "expired": 1}
+
+
+async def test_raising_the_limit_admits_waiters_and_service_time_is_measured():
+    sched = Scheduler(1)
+    holder = await sched.acquire(INTERACTIVE)
+    waiter = asyncio.create_task(sched.acquire(INTERACTIVE))
+    await asyncio.sleep(0)
+    sched.set_limit(2)
+    ticket = await waiter
+    assert sched.in_flight == 2
+    await asyncio.sleep(0.02)
+    sched.release(ticket)
+    sched.release(holder)
+    assert sched.service_s >= 0.015
+    stream = await sched.acquire(REALTIME, measure=False)
+    before = sched.service_s
+    sched.release(stream)
+    assert sched.service_s == before
+
+
+def test_busy_frame_endpoint_sends_retry_after(real_main, monkeypatch):
+    import cv2
+    import numpy as np
+    from starlette.testclient import TestClient
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    busy = Scheduler(1)
+    busy.in_flight = 1  # the only slot is taken
+    busy.service_s = 3.0
+    monkeypatch.setattr(real_main, "_scheduler", busy)
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": object(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    body = cv2.imencode(".png", np.zeros((8, 8, 3), np.uint8))[1].tobytes()
+    client = TestClient(real_main.app)
+
+    resp = client.post("/upscale-frame", content=body)
+    assert resp.status_code == 503 and resp.headers["Retry-After"] == "3"
+    resp = client.post("/upscale-frame", content=body, headers={"X-Priority": "urgent"})
+    assert resp.status_code == 400
+    resp = client.post("/upscale-frame", content=body, headers={"X-Deadline-Ms": "soon"})
+    assert resp.status_code == 400
+
+
+async def test_zero_queue_fails_fast(monkeypatch):
+    monkeypatch.setattr(scheduler, "MAX_QUEUE", 0)
+    sched = Scheduler(1)
+    sched.service_s = 0.5
+    holder = await sched.acquire(BATCH)
+    with pytest.raises(Rejected) as info:
+        await sched.acquire(REALTIME, _later(60))
+    assert info.value.reason == "full" and info.value.retry_after == "1"
+    sched.release(holder)
+    sched.release(await sched.acquire(REALTIME))
@@ -76,10 +76,10 @@ async def test_wait_for_timeout0_broken_on_py312():
         )
 
 
-def test_upscale_semaphore_is_initialized(client):
-    """After app startup the global semaphore must exist and have free slots."""
+def test_upscale_scheduler_is_initialized(client):
+    """After app startup the admission scheduler has free slots (it replaced the semaphore)."""
     from app import main as app_module
-    sem = app_module._upscale_semaphore
-    assert sem is not None, "_upscale_semaphore was not initialized"
-    assert sem._value > 0, f"semaphore has no free slots: _value={sem._value}"
-    assert sem._value >= 1, "at least 1 concurrent slot expected"
+    sched = app_module._scheduler
+    assert sched.limit >= 1, "at least 1 concurrent slot expected"
+    assert sched.limit == app_module.state.max_concurrent
+    assert sched.in_flight < sched.limit, f"scheduler has no free slots: {sched.stats()}"
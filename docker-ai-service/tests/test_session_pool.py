@@ -0,0 +1,64 @@
+"""Replicated CPU sessions: least-loaded routing and thread partitioning."""
+import numpy as np
+import pytest
+
+from app import io_binding, session_pool
+from tests.conftest import make_upscale_onnx
+
+
+class _FakeSession:
+    def __init__(self, name):
+        self.name = name
+
+    def run(self, names, feed, run_options=None):
+        return [self.name]
+
+    def get_providers(self):
+        return ["CPUExecutionProvider"]
+
+
+def test_lease_picks_the_least_loaded_replica():
+    pool = session_pool.SessionPool([_FakeSession(i) for i in range(3)], threads_per_replica=2)
+    with pool.lease() as a, pool.lease() as b, pool.lease() as c:
+        # three concurrent leases land on three different replicas
+        assert {a.name, b.name, c.name} == {0, 1, 2}
+        with pool.lease() as d:
+            assert d.name in (0, 1, 2)
+    assert all(r["inflight"] == 0 for r in pool.stats())
+    assert sum(r["served"] for r in pool.stats()) == 4
+
+
+def test_idle_pool_spreads_sequential_calls():
+    pool = session_pool.SessionPool([_FakeSession(i) for i in range(4)], threads_per_replica=1)
+    seen = {pool.run(["y"], {})[0] for _ in range(8)}
+    assert seen == {0, 1, 2, 3}
+
+
+def test_split_threads():
+    assert session_pool.split_threads(16, 4) == 4
+    assert session_pool.split_threads(3, 8) == 1
+    assert session_pool.split_threads(16, 4, threads_per_replica=2) == 2
+
+
+def test_partitioned_session_matches_single_session(real_main, tmp_path):
+    ort = pytest.importorskip("onnxruntime")
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    single = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+    pooled = real_main._partition_onnx_session(single, path, 3)
+    assert isinstance(pooled, session_pool.SessionPool) and len(pooled) == 3
+    assert pooled.get_inputs()[0].name == "input"
+    x = np.random.default_rng(0).random((1, 3, 8, 8), dtype=np.float32)
+    np.testing.assert_array_equal(pooled.run(["output"], {"input": x})[0],
+                                  single.run(["output"], {"input": x})[0])
+
+    # I/O bindings stay on the replica that owns them
+    io_binding.clear()
+    for _ in range(4):
+        with io_binding.lease(pooled, "input", "output", x.shape, np.float32) as slot:
+            slot.input[...] = x
+            np.testing.assert_array_equal(slot.run(), single.run(["output"], {"input": x})[0])
+
+    # Back to one replica collapses the pool
+    collapsed = real_main._partition_onnx_session(pooled, path, 1)
+    assert not isinstance(collapsed, session_pool.SessionPool)
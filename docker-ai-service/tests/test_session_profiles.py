@@ -0,0 +1,99 @@
+"""SessionOptions profiles: option mapping, resolution order, auto-tune persistence."""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app import session_profiles
+from tests.conftest import make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(autouse=True)
+def _config_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CONFIG_DIR", str(tmp_path / "config"))
+
+
+def test_low_memory_profile_sets_every_field():
+    opts = ort.SessionOptions()
+    session_profiles.apply(opts, "low-memory", ort, cpu_count=16)
+    assert opts.intra_op_num_threads == 4
+    assert opts.inter_op_num_threads == 1
+    assert opts.execution_mode == ort.ExecutionMode.ORT_SEQUENTIAL
+    assert opts.enable_mem_pattern is False
+    assert opts.enable_cpu_mem_arena is False
+    assert opts.get_session_config_entry("session.intra_op.allow_spinning") == "0"
+
+
+def test_replica_thread_budget_overrides_the_profile_share():
+    opts = ort.SessionOptions()
+    session_profiles.apply(opts, "latency", ort, cpu_count=32, intra_threads=4)
+    assert opts.intra_op_num_threads == 4
+
+
+def test_default_profile_leaves_ort_defaults():
+    opts = ort.SessionOptions()
+    session_profiles.apply(opts, "default", ort, cpu_count=16)
+    assert opts.intra_op_num_threads == 0  # 0 = ORT picks
+
+
+def test_resolution_order():
+    resolve = session_profiles.resolve
+    assert resolve("m", "fp1", "auto") == "default"
+    assert resolve("m", "fp1", "auto", model_default="latency") == "latency"
+    session_profiles.save_tuned("m", "fp1", "throughput", {"throughput": 1.0})
+    # tuned winner applies only under "auto" and only on the same hardware
+    assert resolve("m", "fp1", "auto", model_default="latency") == "throughput"
+    assert resolve("m", "fp2", "auto") == "default"
+    assert resolve("m", "fp1", "latency") == "latency"
+    # an explicit pin beats everything
+    session_profiles.pin("m", "low-memory")
+    assert resolve("m", "fp1", "auto") == "low-memory"
+    session_profiles.pin("m", "auto")
+    assert resolve("m", "fp1", "auto") == "throughput"
+    with pytest.raises(ValueError):
+        session_profiles.validate("turbo")
+
+
+def test_autotune_saves_winner_and_keeps_model_running(real_main, tmp_path, monkeypatch):
+    import numpy as np
+
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    for attr, value in {"onnx_session": session, "onnx_model_path": path, "onnx_model_name": "tiny",
+                        "current_model": "tiny", "current_model_type": "onnx", "onnx_model_scale": 2,
+                        "session_profile": "auto"}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+
+    result = real_main.autotune_session_profile()
+    assert set(result["results_ms"]) == set(session_profiles.CANDIDATES)
+    assert result["winner"] in session_profiles.CANDIDATES
+    assert result["active_profile"] == result["winner"]
+
+    stored = json.loads((Path(os.environ["CONFIG_DIR"]) / "session_profiles.json").read_text())
+    assert stored["tuned"][f"tiny|{result['fingerprint']}"]["profile"] == result["winner"]
+    # The model is still served, by a fresh session
+    assert real_main.state.onnx_session is not session
+    out = real_main.upscale_with_onnx(np.zeros((16, 16, 3), dtype=np.uint8))
+    assert out.shape == (32, 32, 3)
+
+
+def test_replica_change_keeps_the_models_profile(real_main, session, tmp_path, monkeypatch):
+    from starlette.testclient import TestClient
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    for attr, value in {"onnx_session": session, "onnx_model_path": str(tmp_path / "up.onnx"),
+                        "onnx_model_name": "tiny", "current_model": "tiny", "current_model_type": "onnx",
+                        "onnx_model_scale": 2, "session_profile": "auto"}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    session_profiles.pin("tiny", "low-memory")
+    profiles = []
+    build = real_main._session_options
+    monkeypatch.setattr(real_main, "_session_options",
+                        lambda name, *args: profiles.append(real_main._session_profile_for(name)) or build(name, *args))
+
+    resp = TestClient(real_main.app).post("/config", data={"session_replicas": "2"})
+    assert resp.status_code == 200 and resp.json()["active_replicas"] == 2
+    assert profiles == ["low-memory", "low-memory"]
@@ -0,0 +1,142 @@
+"""Shared-memory frame transport: ring registration, in-place upscale, socket protocol."""
+import asyncio
+import secrets
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from app import inference_workers, shm_transport
+
+
+@pytest.fixture
+def segment():
+    shm = shared_memory.SharedMemory(name=f"{shm_transport.NAME_PREFIX}test-{secrets.token_hex(4)}", create=True,
+                                     size=shm_transport.required_bytes(32, 24, 2, 2))
+    try:
+        yield shm
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _frame(seed=0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (24, 32, 3), dtype=np.uint8)
+
+
+def test_register_validates_and_maps_the_slots(segment):
+    rings = shm_transport.Registry()
+    for name, slots in (("../etc/passwd", 2), ("jfup-no-such-segment", 2), (segment.name, 3), (segment.name, 0)):
+        with pytest.raises(ValueError):
+            rings.register(name, 32, 24, slots, 2)
+    ring = rings.register(segment.name, 32, 24, 2, 2)
+    layout = ring.layout()
+    assert layout["stride"] == 32 * 24 * 3 * 5 and layout["output_offset"] == 32 * 24 * 3
+    assert (layout["output_width"], layout["output_height"]) == (64, 48)
+
+    frame = _frame()
+    np.ndarray(frame.shape, np.uint8, buffer=segment.buf, offset=layout["stride"])[:] = frame
+    np.testing.assert_array_equal(ring.input(1), frame)
+    ring.output(1)[:] = 7
+    assert segment.buf[layout["stride"] + layout["output_offset"]] == 7
+
+    assert rings.remove(ring.id) and not rings.remove(ring.id)
+    # Detaching leaves the client's segment alone
+    shared_memory.SharedMemory(name=segment.name).close()
+
+
+def test_only_prefixed_client_segments_are_attached(segment, monkeypatch):
+    rings = shm_transport.Registry()
+    own = shared_memory.SharedMemory(create=True, size=segment.size)  # psm_...: like a worker's
+    try:
+        with pytest.raises(ValueError, match="jfup-"):
+            rings.register(own.name, 32, 24, 2, 2)
+    finally:
+        own.close()
+        own.unlink()
+    monkeypatch.setattr(inference_workers, "_segment_names", {segment.name})
+    with pytest.raises(ValueError, match="belongs to the service"):
+        rings.register(segment.name, 32, 24, 2, 2)
+
+
+async def test_socket_protocol(tmp_path):
+    async def handle(ring_id, slot):
+        if ring_id != "ring":
+            raise type("NotFound", (Exception,), {"status_code": 404, "detail": "Unknown ring"})()
+        return {"slot": slot, "width": 64, "height": 48, "ms": 1.5}
+
+    path = str(tmp_path / "frames.sock")
+    server = await shm_transport.serve_socket(path, handle)
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b"ring 1\nother 0\ngarbage\n")
+        await writer.drain()
+        replies = [await reader.readline() for _ in range(3)]
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    assert replies == [b"OK 1 64 48 1.5\n", b"ERR 404 Unknown ring\n", b"ERR 400 expected '<ring id> <slot>'\n"]
+
+
+def test_frames_are_upscaled_into_the_output_slot(real_main, segment, monkeypatch):
+    import cv2
+    from starlette.testclient import TestClient
+
+    class _Nearest:
+        def upsample(self, img):
+            return cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+    monkeypatch.setenv("API_TOKEN", "disable")
+    monkeypatch.setattr(real_main, "_scheduler", real_main.scheduler.Scheduler(1))
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": _Nearest(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    client = TestClient(real_main.app)
+    body = {"name": segment.name, "width": 32, "height": 24, "slots": 2}
+
+    monkeypatch.setattr(shm_transport, "ENABLED", False)
+    assert client.post("/shm/register", json=body).status_code == 403
+    monkeypatch.setattr(shm_transport, "ENABLED", True)
+    layout = client.post("/shm/register", json=body).json()
+
+    frame = _frame(3)
+    base = layout["stride"]  # slot 1
+    np.ndarray(frame.shape, np.uint8, buffer=segment.buf, offset=base)[:] = frame
+    resp = client.post(f"/shm/{layout['id']}/frame/1")
+    assert resp.status_code == 200 and resp.json()["width"] == 64
+    out = np.ndarray((48, 64, 3), np.uint8, buffer=segment.buf, offset=base + layout["output_offset"])
+    np.testing.assert_array_equal(out, frame.repeat(2, axis=0).repeat(2, axis=1))
+    del out
+
+    assert client.post(f"/shm/{layout['id']}/frame/2").status_code == 400
+    monkeypatch.setattr(real_main.state, "cv_model_scale", 4)
+    assert client.post(f"/shm/{layout['id']}/frame/0").status_code == 409
+    assert client.get("/shm").json()["frames_total"] == 1
+    assert client.delete(f"/shm/{layout['id']}").status_code == 200
+    assert client.post(f"/shm/{layout['id']}/frame/0").status_code == 404
+
+
+async def test_a_slot_is_claimed_before_admission(real_main, segment, monkeypatch):
+    from fastapi import HTTPException
+
+    sched = real_main.scheduler.Scheduler(1)
+    monkeypatch.setattr(real_main, "_scheduler", sched)
+    for attr, value in {"current_model": "nearest-x2", "current_model_type": "opencv",
+                        "cv_model": object(), "cv_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    ring = real_main._shm_rings.register(segment.name, 32, 24, 2, 2)
+    try:
+        held = await sched.acquire(real_main.scheduler.REALTIME)
+        waiting = asyncio.create_task(real_main._shm_frame(ring.id, 0))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as second:
+            await real_main._shm_frame(ring.id, 0)
+        assert second.value.status_code == 409
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert ring.busy == set()  # the abandoned claim was given back
+        sched.release(held)
+    finally:
+        real_main._shm_rings.remove(ring.id)
@@ -0,0 +1,90 @@
+"""Temporal tile reuse for realtime streams: unchanged tiles keep their output."""
+import numpy as np
+import pytest
+
+from app import temporal_tiles
+from tests.conftest import make_upscale_onnx
+
+
+@pytest.fixture(autouse=True)
+def _defaults(monkeypatch):
+    monkeypatch.setattr(temporal_tiles, "TILE_SIZE", 64)
+    monkeypatch.setattr(temporal_tiles, "OVERLAP", 8)
+    monkeypatch.setattr(temporal_tiles, "THRESHOLD", 6)
+    monkeypatch.setattr(temporal_tiles, "REFRESH_FRAMES", 10)
+
+
+class _Nearest:
+    """Stand-in model: 2x nearest neighbour, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, tile):
+        self.calls += 1
+        return tile.repeat(2, 0).repeat(2, 1)
+
+
+def _frame(h=200, w=240) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def test_grid_covers_the_frame_flush_with_the_edges():
+    origins = temporal_tiles.grid(200, 240, 64, 8)
+    assert origins[0] == (0, 0) and origins[-1] == (136, 176)
+    assert temporal_tiles.grid(40, 50, 64, 8) == [(0, 0)]
+
+
+def test_only_changed_tiles_are_inferred():
+    cache, infer = temporal_tiles.TileCache(), _Nearest()
+    frame = _frame()
+    tiles = len(temporal_tiles.grid(200, 240, 64, 8))
+
+    first = cache.upscale(frame, 2, infer)
+    np.testing.assert_array_equal(first, frame.repeat(2, 0).repeat(2, 1))
+    assert infer.calls == tiles
+
+    # Compression-level noise everywhere, one real change in the top-left corner
+    noisy = np.clip(frame.astype(int) + 3, 0, 255).astype(np.uint8)
+    noisy[10:20, 10:20] = 255 - noisy[10:20, 10:20]
+    out = cache.upscale(noisy, 2, infer)
+    assert infer.calls == tiles + 1
+    assert (cache.last_tiles, cache.last_reused) == (tiles, tiles - 1)
+    np.testing.assert_array_equal(out[20:40, 20:40], noisy[10:20, 10:20].repeat(2, 0).repeat(2, 1))
+
+
+def test_slow_drift_is_caught_against_the_reference():
+    cache, infer = temporal_tiles.TileCache(), _Nearest()
+    frame = np.full((64, 64, 3), 100, dtype=np.uint8)
+    cache.upscale(frame, 2, infer)
+    for level in (102, 104, 106):  # 2 levels a frame: never 6 from the previous frame
+        cache.upscale(np.full_like(frame, level), 2, infer)
+    assert infer.calls == 1
+    out = cache.upscale(np.full_like(frame, 108), 2, infer)
+    assert infer.calls == 2 and out.max() == 108
+
+
+def test_forced_refresh_and_shape_change():
+    cache, infer = temporal_tiles.TileCache(), _Nearest()
+    frame = _frame(64, 64)
+    for _ in range(10):
+        cache.upscale(frame, 2, infer)
+    assert infer.calls == 1
+    cache.upscale(frame, 2, infer)  # 11th frame: REFRESH_FRAMES reached
+    assert infer.calls == 2
+    cache.upscale(_frame(64, 32), 2, infer)
+    assert infer.calls == 3 and cache.shape == (64, 32, 3)
+
+
+async def test_realtime_path_uses_the_tile_cache(real_main, tmp_path):
+    ort = pytest.importorskip("onnxruntime")
+    session = ort.InferenceSession(make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2),
+                                   providers=["CPUExecutionProvider"])
+    local_state = {"model_type": "onnx", "cv_model": None, "scale": 2}
+    frame = _frame(150, 170)
+    cache = temporal_tiles.TileCache()
+    expected = frame.repeat(2, 0).repeat(2, 1).astype(int)
+    for _ in range(2):
+        out = await real_main.upscale_frame_realtime(frame, session, local_state, cache)
+        assert np.abs(out.astype(int) - expected).max() <= 1
+    assert cache.last_reused == cache.last_tiles > 1
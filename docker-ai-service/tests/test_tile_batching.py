@@ -0,0 +1,63 @@
+"""Batched tile inference in _run_onnx_tiled.
+
+Batching only changes how many tiles go into one session.run call - the stitched
+image must be identical to the one-tile-per-call path, and a model that refuses a
+batch must still produce a result.
+"""
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from tests.conftest import CountingSession, make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+
+
+def _image(h=300, w=200):
+    rng = np.random.default_rng(0)
+    return rng.random((h, w, 3), dtype=np.float32)
+
+
+def test_batched_output_matches_single_tile_path(real_main, session):
+    img = _image()
+    single = real_main._run_onnx_tiled(img, 128, 16, session, "input", "output", 2, batch_size=1)
+    batched = real_main._run_onnx_tiled(img, 128, 16, session, "input", "output", 2, batch_size=4)
+    np.testing.assert_allclose(batched, single, atol=1e-6)
+    # Nearest x2 stitched back together is just the image with every pixel doubled
+    np.testing.assert_allclose(batched, img.repeat(2, axis=0).repeat(2, axis=1), atol=1e-5)
+
+
+def test_batching_cuts_the_number_of_session_calls(real_main, session):
+    img = _image()
+    counting = CountingSession(session)
+    real_main._run_onnx_tiled(img, 128, 16, counting, "input", "output", 2, batch_size=4)
+    tiles = sum(counting.batches)
+    assert max(counting.batches) == 4
+    assert len(counting.batches) == -(-tiles // 4)
+
+
+def test_model_that_rejects_batches_falls_back_and_is_remembered(real_main, session):
+    img = _image()
+    counting = CountingSession(session, reject_batches=True)
+    out = real_main._run_onnx_tiled(img, 128, 16, counting, "input", "output", 2, batch_size=4)
+    np.testing.assert_allclose(out, img.repeat(2, axis=0).repeat(2, axis=1), atol=1e-5)
+    assert real_main._resolve_tile_batch_size(counting) == 1
+
+
+def test_fixed_batch_dimension_forces_batch_one(real_main, tmp_path):
+    path = make_upscale_onnx(str(tmp_path / "fixed.onnx"), scale=2, batch_dim=1)
+    fixed = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    assert real_main._resolve_tile_batch_size(fixed) == 1
+
+
+def test_auto_batch_size_follows_the_provider(real_main, session, monkeypatch):
+    monkeypatch.setattr(real_main, "ONNX_TILE_BATCH", "auto")
+    assert real_main._resolve_tile_batch_size(session) == 4
+
+    gpu = MagicMock()
+    gpu.get_inputs.return_value = [MagicMock(shape=["N", 3, "H", "W"])]
+    gpu.get_providers.return_value = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    assert real_main._resolve_tile_batch_size(gpu) == 2
+
+    monkeypatch.setattr(real_main, "ONNX_TILE_BATCH", "8")
+    assert real_main._resolve_tile_batch_size(gpu) == 8
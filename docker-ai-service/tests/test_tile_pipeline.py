@@ -0,0 +1,80 @@
+"""Double-buffered tile pipeline (prepare / infer / stitch on separate threads)."""
+import threading
+
+import numpy as np
+import pytest
+
+from app import tile_pipeline
+from tests.conftest import make_upscale_onnx
+
+ort = pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(autouse=True)
+def _pipeline_defaults(monkeypatch):
+    monkeypatch.setattr(tile_pipeline, "ENABLED", True)
+    monkeypatch.setattr(tile_pipeline, "DEPTH", 2)
+
+
+def test_items_finish_in_order_with_stage_threads():
+    seen, threads = [], {}
+
+    def prepare(i):
+        threads.setdefault("prepare", threading.current_thread().name)
+        return i * 10
+
+    def infer(i, x):
+        threads.setdefault("infer", threading.current_thread().name)
+        return x + 1
+
+    def finish(i, y):
+        threads.setdefault("finish", threading.current_thread().name)
+        seen.append((i, y))
+
+    stats = tile_pipeline.run(range(20), prepare, infer, finish)
+    assert seen == [(i, i * 10 + 1) for i in range(20)]
+    assert stats.tiles == 20
+    # Inference stays on the caller; the host-side stages do not
+    assert threads["infer"] == threading.current_thread().name
+    assert threads["prepare"] == "tile-prepare"
+    assert threads["finish"] == "tile-stitch"
+
+
+@pytest.mark.parametrize("stage", ["prepare", "infer", "finish"])
+def test_stage_errors_reach_the_caller(stage):
+    def boom(*args):
+        if args[0] == 5:
+            raise MemoryError(f"{stage} failed")
+        return args[-1]
+
+    stages = {"prepare": lambda i: i, "infer": lambda i, x: x, "finish": lambda i, y: None}
+    stages[stage] = boom
+    with pytest.raises(MemoryError, match=stage):
+        tile_pipeline.run(range(50), stages["prepare"], stages["infer"], stages["finish"])
+    # No helper threads left behind
+    assert not [t for t in threading.enumerate() if t.name in ("tile-prepare", "tile-stitch")]
+
+
+def test_stats_accumulate_between_begin_and_take():
+    tile_pipeline.begin()
+    tile_pipeline.run(range(4), lambda i: i, lambda i, x: x, lambda i, y: None,
+                      tiles_per_item=lambda _: 2)
+    tile_pipeline.run(range(1), lambda i: i, lambda i, x: x, lambda i, y: None)
+    stats = tile_pipeline.take()
+    assert stats.tiles == 9
+    assert set(stats.headers()) == {"X-Tile-Count", "X-Tile-Throughput", "X-Tile-Core-Usage"}
+    assert tile_pipeline.take() is None
+
+
+def test_pipelined_onnx_tiling_matches_serial(real_main, tmp_path, monkeypatch):
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    img = np.random.default_rng(0).random((300, 260, 3), dtype=np.float32)
+
+    monkeypatch.setattr(tile_pipeline, "ENABLED", False)
+    serial = real_main._run_onnx_tiled(img, 64, 8, session, "input", "output", 2, batch_size=2)
+    monkeypatch.setattr(tile_pipeline, "ENABLED", True)
+    result, stats = real_main._with_tile_stats(
+        real_main._run_onnx_tiled, img, 64, 8, session, "input", "output", 2, 2)
+    np.testing.assert_array_equal(result, serial)
+    assert stats.tiles == len(real_main.tile_plan.get_plan(300, 260, 64, 8, 2).tiles)
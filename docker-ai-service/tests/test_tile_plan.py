@@ -0,0 +1,95 @@
+"""Tile plans (app/tile_plan.py): grid, blend normalisation and the LRU around them.
+
+The plan replaced a per-frame weight array and divide in three backends, so the
+invariant that matters is the one the divide used to guarantee: blending a tile
+set that agrees everywhere must reproduce that value exactly, at every pixel.
+"""
+import numpy as np
+import pytest
+
+from app import tile_plan
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    tile_plan.clear()
+    monkeypatch.setattr(tile_plan, "MAX_ENTRIES", 8)
+    monkeypatch.setattr(tile_plan, "MAX_BYTES", 512 * 1024 * 1024)
+    yield
+    tile_plan.clear()
+
+
+@pytest.mark.parametrize("h,w,tile,overlap,scale", [
+    (300, 200, 128, 16, 2),
+    (1000, 257, 256, 32, 1),
+    (100, 700, 128, 32, 4),   # only one axis needs tiling
+])
+def test_tiles_cover_the_image_without_duplicates(h, w, tile, overlap, scale):
+    plan = tile_plan.TilePlan(h, w, tile, overlap, scale)
+    covered = np.zeros((h, w), dtype=bool)
+    for t in plan.tiles:
+        assert 0 <= t.y0 < t.y1 <= h and 0 <= t.x0 < t.x1 <= w
+        covered[t.y0:t.y1, t.x0:t.x1] = True
+    assert covered.all()
+    assert len(set(plan.tiles)) == len(plan.tiles)
+
+
+def test_normalisation_reproduces_agreeing_tiles_exactly():
+    plan = tile_plan.TilePlan(300, 200, 128, 16, 2)
+    out = plan.new_output()
+    for t in plan.tiles:
+        th, tw = (t.y1 - t.y0) * 2, (t.x1 - t.x0) * 2
+        plan.accumulate(out, t, np.full((th, tw, 3), 0.5, dtype=np.float32))
+    np.testing.assert_allclose(plan.normalize(out), 0.5, rtol=1e-5)
+
+
+def test_oversized_model_output_is_trimmed_to_the_tile():
+    plan = tile_plan.TilePlan(200, 200, 128, 16, 2)
+    out = plan.new_output()
+    for t in plan.tiles:
+        th, tw = (t.y1 - t.y0) * 2, (t.x1 - t.x0) * 2
+        plan.accumulate(out, t, np.ones((th + 4, tw + 4, 3), dtype=np.float32))
+    np.testing.assert_allclose(plan.normalize(out), 1.0, rtol=1e-5)
+
+
+def test_repeat_geometry_is_a_cache_hit():
+    a = tile_plan.get_plan(300, 200, 128, 16, 2)
+    b = tile_plan.get_plan(300, 200, 128, 16, 2)
+    assert a is b
+    info = tile_plan.cache_info()
+    assert (info["hits"], info["misses"], info["entries"]) == (1, 1, 1)
+
+
+def test_lru_evicts_the_least_recently_used_plan(monkeypatch):
+    monkeypatch.setattr(tile_plan, "MAX_ENTRIES", 2)
+    first = tile_plan.get_plan(100, 100, 64, 8, 2)
+    tile_plan.get_plan(120, 100, 64, 8, 2)
+    tile_plan.get_plan(100, 100, 64, 8, 2)       # touch: first is now most recent
+    tile_plan.get_plan(140, 100, 64, 8, 2)       # evicts the 120-row plan
+    assert tile_plan.cache_info()["entries"] == 2
+    assert tile_plan.get_plan(100, 100, 64, 8, 2) is first
+
+
+def test_plan_over_the_byte_budget_is_used_but_not_kept(monkeypatch):
+    monkeypatch.setattr(tile_plan, "MAX_BYTES", 1024)
+    plan = tile_plan.get_plan(300, 200, 128, 16, 2)
+    assert len(plan.tiles) > 1
+    assert tile_plan.cache_info()["entries"] == 0
+
+
+@pytest.mark.parametrize("h,w,tile,overlap,scale", [(300, 200, 128, 16, 2), (100, 700, 128, 32, 4)])
+def test_separable_weights_match_the_summed_blend_map(h, w, tile, overlap, scale):
+    plan = tile_plan.TilePlan(h, w, tile, overlap, scale)
+    weight = np.zeros((h * scale, w * scale), dtype=np.float64)
+    for t in plan.tiles:
+        b = plan.blend((t.y1 - t.y0) * scale, (t.x1 - t.x0) * scale)[:, :, 0]
+        weight[t.y0 * scale:t.y0 * scale + b.shape[0], t.x0 * scale:t.x0 * scale + b.shape[1]] += b
+    np.testing.assert_allclose(plan.inv_rows[:, :, 0] * plan.inv_cols[:, :, 0], 1 / weight, rtol=1e-5)
+
+
+def test_4k_x4_plan_fits_the_default_budget():
+    tile_plan.get_plan(2160, 3840, 512, 32, 4)
+    tile_plan.get_plan(2160, 3840, 512, 32, 4)
+    info = tile_plan.cache_info()
+    assert (info["entries"], info["hits"]) == (1, 1)
+    assert info["bytes"] < 1024 * 1024
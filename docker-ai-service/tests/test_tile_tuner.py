@@ -0,0 +1,87 @@
+"""Tile size / overlap / batch autotuning: candidates, Pareto choice, lookup."""
+import numpy as np
+import pytest
+
+from app import tile_tuner
+from tests.conftest import make_upscale_onnx
+
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch, tmp_path):
+    monkeypatch.setenv("CONFIG_DIR", str(tmp_path / "config"))
+    monkeypatch.setattr(tile_tuner, "_oom", {})
+    monkeypatch.setattr(tile_tuner, "_observed", tile_tuner.collections.Counter())
+
+
+def test_candidates_collapse_whole_frame_tiles_and_respect_batching():
+    cands = tile_tuner.candidates(300, 200, batch_ok=True)
+    whole = [c for c in cands if c["tile"] >= 300]
+    assert whole == [{"tile": 384, "overlap": 0, "batch": 1}]
+    assert [c["tile"] for c in cands] == sorted(c["tile"] for c in cands)
+    # 256px tiles on 300x200 -> 2 tiles, so batch 4 is pointless
+    assert not any(c["tile"] == 256 and c["batch"] == 4 for c in cands)
+    assert all(c["batch"] == 1 for c in tile_tuner.candidates(300, 200, batch_ok=False))
+
+
+def test_pareto_and_choose():
+    rows = [
+        {"tile": 128, "overlap": 16, "batch": 1, "wall_ms": 90.0, "peak_mb": 10.0},
+        {"tile": 256, "overlap": 16, "batch": 1, "wall_ms": 50.0, "peak_mb": 30.0},
+        {"tile": 256, "overlap": 32, "batch": 1, "wall_ms": 60.0, "peak_mb": 40.0},  # dominated
+        {"tile": 512, "overlap": 0, "batch": 1, "wall_ms": 40.0, "peak_mb": 80.0},
+        {"tile": 768, "overlap": 0, "batch": 1, "wall_ms": None, "peak_mb": None, "error": "oom"},
+    ]
+    front = tile_tuner.pareto(rows)
+    assert [r["tile"] for r in front] == [512, 256, 128]
+    assert tile_tuner.choose(front)["tile"] == 512
+    assert tile_tuner.choose(front, max_peak_mb=35)["tile"] == 256
+    assert tile_tuner.choose(front, max_peak_mb=1)["tile"] == 128
+    assert tile_tuner.choose([]) is None
+
+
+def test_lookup_prefers_oom_then_exact_then_nearest():
+    best = {"tile": 256, "overlap": 16, "batch": 2, "wall_ms": 5.0, "peak_mb": 3.0}
+    tile_tuner.save("m", "CPUExecutionProvider", 1280, 720, best, [best])
+    assert tile_tuner.lookup("m", "CPUExecutionProvider", 1280, 720)["source"] == "tuned"
+    near = tile_tuner.lookup("m", "CPUExecutionProvider", 1366, 768)
+    assert near["source"] == "nearest" and near["tile"] == 256
+    assert tile_tuner.lookup("m", "CPUExecutionProvider", 3840, 2160) is None
+    assert tile_tuner.lookup("m", "CUDAExecutionProvider", 1280, 720) is None
+    assert tile_tuner.lookup(None, "CPUExecutionProvider", 1280, 720) is None
+
+    tile_tuner.note_oom("m", "CPUExecutionProvider", 1280, 720, {"tile": 128, "overlap": 16, "batch": 1})
+    oom = tile_tuner.lookup("m", "CPUExecutionProvider", 1280, 720)
+    assert oom["source"] == "oom" and oom["tile"] == 128
+    tile_tuner.save("m", "CPUExecutionProvider", 1280, 720, best, [best])  # a new tuning clears it
+    assert tile_tuner.lookup("m", "CPUExecutionProvider", 1280, 720)["source"] == "tuned"
+
+
+def test_observed_is_bounded_and_ranked(monkeypatch):
+    monkeypatch.setattr(tile_tuner, "MAX_OBSERVED", 2)
+    for res in [(640, 360)] * 3 + [(1280, 720)] * 2 + [(320, 180)]:
+        tile_tuner.observe(*res)
+    assert tile_tuner.observed() == [(640, 360), (1280, 720)]
+
+
+def test_autotune_stores_setting_used_by_upscale(real_main, tmp_path, monkeypatch):
+    ort = pytest.importorskip("onnxruntime")
+    path = make_upscale_onnx(str(tmp_path / "up.onnx"), scale=2)
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    for attr, value in {"onnx_session": session, "onnx_model_path": path, "onnx_model_name": "tiny",
+                        "current_model": "tiny", "current_model_type": "onnx", "onnx_model_scale": 2}.items():
+        monkeypatch.setattr(real_main.state, attr, value)
+    monkeypatch.setattr(tile_tuner, "TILE_SIZES", (128, 192, 256))
+
+    report = real_main.autotune_tiles([(240, 160)])
+    entry = report["resolutions"]["240x160"]
+    assert entry["best"] is not None and entry["front"]
+    assert all(r["peak_mb"] > 0 for r in entry["front"])
+
+    provider = session.get_providers()[0]
+    tuned = tile_tuner.lookup("tiny", provider, 240, 160)
+    assert tuned["tile"] == entry["best"]["tile"]
+    tile, overlap, batch, source = real_main._tile_settings(session, "tiny", 240, 160)
+    assert (tile, overlap, batch, source) == (
+        tuned["tile"], tuned["overlap"], tuned["batch"], "tuned")
+    out = real_main.upscale_with_onnx(np.zeros((160, 240, 3), dtype=np.uint8))
+    assert out.shape == (320, 480, 3)